@@ -3,6 +3,7 @@
 
 __RCSID__ = "$Id$"
 
+import copy
 import datetime
 import time
 import threading
@@ -23,6 +24,8 @@ class AccountingDB(DB):
   def __init__(self, name='Accounting/AccountingDB', readOnly=False):
     DB.__init__(self, 'AccountingDB', name)
     self.maxBucketTime = 604800  # 1 w
+    # The rollup of a type keeps its buckets with at least this length
+    self.rollupBucketLength = 86400  # 1 d
     self.autoCompact = False
     self.__readOnly = readOnly
     self.__doingCompaction = False
@@ -33,7 +36,13 @@ class AccountingDB(DB):
     self.__queuedRecordsToInsert = []
     self.dbCatalog = {}
     self.dbBucketsLength = {}
+    self.__rollupTypes = set()
     self.__keysCache = {}
+    # Incremental compaction: start time up to which the buckets are compacted for ( type, bucket length ),
+    # type the last call stopped at, and last purge of each type
+    self.__compactionMarks = {}
+    self.__compactionType = None
+    self.__compactionPurges = {}
     maxParallelInsertions = self.getCSOption("ParallelRecordInsertions", 10)
     self.__threadPool = ThreadPool(1, maxParallelInsertions)
     self.__threadPool.daemonize()
@@ -49,6 +58,28 @@ class AccountingDB(DB):
             'PrimaryKey': 'name'
         }
     })
+    self.compactionTableName = _getTableName("catalog", "Compaction")
+    self._createTables({
+        self.compactionTableName: {
+            'Fields': {
+                'name': "VARCHAR(64) NOT NULL",
+                'bucketLength': "INT UNSIGNED NOT NULL",
+                'highWaterMark': "INT UNSIGNED NOT NULL",
+            },
+            'PrimaryKey': ['name', 'bucketLength']
+        }
+    })
+    self.rollupCatalogTableName = _getTableName("catalog", "Rollup")
+    self._createTables({
+        self.rollupCatalogTableName: {
+            'Fields': {
+                'name': "VARCHAR(64) NOT NULL",
+                'filledUntil': "INT UNSIGNED NOT NULL",
+                'complete': "TINYINT(1) NOT NULL",
+            },
+            'PrimaryKey': 'name'
+        }
+    })
     self.__loadCatalogFromDB()
     gMonitor.registerActivity("registeradded",
                               "Register added",
@@ -65,6 +96,11 @@ class AccountingDB(DB):
                               "Accounting",
                               "seconds",
                               gMonitor.OP_MEAN)
+    gMonitor.registerActivity("compactedbuckets",
+                              "Buckets compacted",
+                              "Accounting",
+                              "buckets/s",
+                              gMonitor.OP_RATE)
 
     self.__compactTime = datetime.time(hour=2,
                                        minute=random.randint(0, 59),
@@ -85,10 +121,20 @@ class AccountingDB(DB):
 
   def autoCompactDB(self):
     self.autoCompact = True
-    th = threading.Thread(target=self.__periodicAutoCompactDB)
+    if self.getCSOption("CompactionMode", "daily") == "incremental":
+      th = threading.Thread(target=self.__periodicIncrementalCompactDB)
+    else:
+      th = threading.Thread(target=self.__periodicAutoCompactDB)
     th.setDaemon(1)
     th.start()
 
+  def __periodicIncrementalCompactDB(self):
+    period = int(self.getCSOption("CompactionPeriod", 300))
+    self.log.info("Incremental db compaction", "every %s seconds" % period)
+    while self.autoCompact:
+      time.sleep(period)
+      self.incrementalCompactBuckets()
+
   def __periodicAutoCompactDB(self):
     while self.autoCompact:
       nct = Time.dateTime()
@@ -368,6 +414,14 @@ class AccountingDB(DB):
       tables[bucketTableName] = {'Fields': bucketFieldsDict,
                                  'UniqueIndexes': {'UniqueConstraint': uniqueIndexFields}
                                  }
+    # The rollup of a new type is created with it. The rollup of a type created before the rollups
+    # is filled from its buckets by fillRollups, an explicit step, and only used once complete
+    rollupTableName = _getTableName("rollup", name)
+    newRollup = rollupTableName not in tablesInThere and bucketTableName not in tablesInThere
+    if newRollup:
+      tables[rollupTableName] = {'Fields': bucketFieldsDict,
+                                 'UniqueIndexes': {'UniqueConstraint': uniqueIndexFields}
+                                 }
     typeTableName = _getTableName("type", name)
     if typeTableName not in tablesInThere:
       tables[typeTableName] = {'Fields': fieldsDict}
@@ -386,6 +440,8 @@ class AccountingDB(DB):
           pass
       else:
         self.log.notice("ReadOnly mode: %s is OK" % name)
+        if self.__isRollupComplete(name):
+          self.__rollupTypes.add(name)
       return S_OK(not updateDBCatalog)
 
     if tables:
@@ -393,6 +449,15 @@ class AccountingDB(DB):
       if not retVal['OK']:
         self.log.error("Can't create type", "%s: %s" % (name, retVal['Message']))
         return S_ERROR("Can't create type %s: %s" % (name, retVal['Message']))
+    if newRollup:
+      retVal = self._update("INSERT INTO `%s` ( `name`, `filledUntil`, `complete` ) VALUES ( '%s', 0, 1 ) "
+                            "ON DUPLICATE KEY UPDATE `complete`=1" % (self.rollupCatalogTableName, name))
+      if not retVal['OK']:
+        self.log.error("Can't register the rollup", "%s: %s" % (name, retVal['Message']))
+    if self.__isRollupComplete(name):
+      self.__rollupTypes.add(name)
+    else:
+      self.log.notice("The rollup is not used until it is filled by dirac-accounting-fill-rollups", name)
     if updateDBCatalog:
       bucketsLength.sort()
       bucketsEncoding = DEncode.encode(bucketsLength)
@@ -473,6 +538,13 @@ class AccountingDB(DB):
     tablesToDelete.insert(0, "`%s`" % _getTableName("type", typeName))
     tablesToDelete.insert(0, "`%s`" % _getTableName("bucket", typeName))
     tablesToDelete.insert(0, "`%s`" % _getTableName("in", typeName))
+    self.__rollupTypes.discard(typeName)
+    retVal = self._query("DROP TABLE IF EXISTS `%s`" % _getTableName("rollup", typeName))
+    if not retVal['OK']:
+      return retVal
+    retVal = self._update("DELETE FROM `%s` WHERE name='%s'" % (self.rollupCatalogTableName, typeName))
+    if not retVal['OK']:
+      return retVal
     retVal = self._query("DROP TABLE %s" % ", ".join(tablesToDelete))
     if not retVal['OK']:
       return retVal
@@ -500,12 +572,7 @@ class AccountingDB(DB):
     """
       Adds a key value to a key table if not existant
     """
-    # Cast to string just in case
-    if not isinstance(keyValue, basestring):
-      keyValue = str(keyValue)
-    # No more than 64 chars for keys
-    if len(keyValue) > 64:
-      keyValue = keyValue[:64]
+    keyValue = _normalizeKeyValue(keyValue)
 
     # Look into the cache
     if typeName not in self.__keysCache:
@@ -537,6 +604,56 @@ class AccountingDB(DB):
     keyCache[keyValue] = result['Value']
     return result
 
+  def __getIdsForKeyValues(self, typeName, keyName, keyValues, chunkSize=1000):
+    """
+      Finds the id numbers of values in a key table, and adds them to the cache
+    """
+    keyCache = self.__keysCache[typeName][keyName]
+    keyValues = list(keyValues)
+    for i in xrange(0, len(keyValues), chunkSize):
+      retVal = self._escapeValues(keyValues[i:i + chunkSize])
+      if not retVal['OK']:
+        return retVal
+      retVal = self._query("SELECT `id`, `value` FROM `%s` WHERE `value` IN ( %s )" % (
+          _getTableName("key", typeName, keyName), ", ".join(retVal['Value'])))
+      if not retVal['OK']:
+        return retVal
+      for iD, keyValue in retVal['Value']:
+        keyCache[keyValue] = iD
+    return S_OK()
+
+  def __addKeyValues(self, typeName, keyName, keyValues):
+    """
+      Adds the key values of a bundle of records to a key table if not existant,
+      with one query for the values not in the cache and one insertion for the new ones
+
+      :return: S_OK( list of the ids of the key values )
+    """
+    keyValues = [_normalizeKeyValue(keyValue) for keyValue in keyValues]
+    keyCache = self.__keysCache.setdefault(typeName, {}).setdefault(keyName, {})
+    missing = set(keyValues).difference(keyCache)
+    if missing:
+      retVal = self.__getIdsForKeyValues(typeName, keyName, missing)
+      if not retVal['OK']:
+        return retVal
+      missing.difference_update(keyCache)
+    if missing:
+      self.log.info("Values for key didn't exist, inserting", "%s: %s" % (keyName, ", ".join(sorted(missing))))
+      retVal = self.insertMany(_getTableName("key", typeName, keyName), ['id', 'value'],
+                               [[0, keyValue] for keyValue in missing], ignore=True)
+      if not retVal['OK']:
+        return retVal
+      retVal = self.__getIdsForKeyValues(typeName, keyName, missing)
+      if not retVal['OK']:
+        return retVal
+      missing.difference_update(keyCache)
+    # The collation of the key table can match a value with another spelling of it
+    for keyValue in missing:
+      retVal = self.__addKeyValue(typeName, keyName, keyValue)
+      if not retVal['OK']:
+        return retVal
+    return S_OK([keyCache[keyValue] for keyValue in keyValues])
+
   def calculateBucketLengthForTime(self, typeName, now, when):
     """
     Get the expected bucket time for a moment in time
@@ -548,14 +665,16 @@ class AccountingDB(DB):
         return granuT[1]
     return self.maxBucketTime
 
-  def calculateBuckets(self, typeName, startTime, endTime, nowEpoch=False):
+  def calculateBuckets(self, typeName, startTime, endTime, nowEpoch=False, minBucketLength=0):
     """
     Magic function for calculating buckets between two times and
     the proportional part for each bucket
+
+    :param int minBucketLength: minimum length of the buckets, the rollup length for the rollup buckets
     """
     if not nowEpoch:
       nowEpoch = int(Time.toEpoch(Time.dateTime()))
-    bucketTimeLength = self.calculateBucketLengthForTime(typeName, nowEpoch, startTime)
+    bucketTimeLength = max(minBucketLength, self.calculateBucketLengthForTime(typeName, nowEpoch, startTime))
     currentBucketStart = startTime - startTime % bucketTimeLength
     if startTime == endTime:
       return [(currentBucketStart,
@@ -571,7 +690,8 @@ class AccountingDB(DB):
                       proportion,
                       bucketTimeLength))
       currentBucketStart += bucketTimeLength
-      bucketTimeLength = self.calculateBucketLengthForTime(typeName, nowEpoch, currentBucketStart)
+      bucketTimeLength = max(minBucketLength,
+                             self.calculateBucketLengthForTime(typeName, nowEpoch, currentBucketStart))
     return buckets
 
   def __insertInQueueTable(self, typeName, startTime, endTime, valuesList):
@@ -593,17 +713,28 @@ class AccountingDB(DB):
     return S_OK(retVal['lastRowId'])
 
   def insertRecordBundleThroughQueue(self, recordsToQueue):
+    """
+    Insert a bundle of records in the intables, with one multi-row insertion per type
+    """
     if self.__readOnly:
       return S_ERROR("ReadOnly mode enabled. No modification allowed")
-    recordsToProcess = []
-    now = Time.toEpoch()
+    sqlValuesPerType = {}
     for record in recordsToQueue:
       typeName, startTime, endTime, valuesList = record
-      result = self.__insertInQueueTable(typeName, startTime, endTime, valuesList)
+      if typeName not in self.dbCatalog:
+        return S_ERROR("Type %s has not been defined in the db" % typeName)
+      numExp = len(self.dbCatalog[typeName]['typeFields'])
+      if len(valuesList) + 2 != numExp:
+        return S_ERROR("Fields mismatch for record %s. %s fields and %s expected" % (typeName,
+                                                                                     len(valuesList) + 2,
+                                                                                     numExp))
+      sqlValuesPerType.setdefault(typeName, []).append(['0', '0', 'UTC_TIMESTAMP()'] + list(valuesList) +
+                                                       [startTime, endTime])
+    for typeName, sqlValuesList in sqlValuesPerType.items():
+      sqlFields = ['id', 'taken', 'takenSince'] + self.dbCatalog[typeName]['typeFields']
+      result = self.insertMany(_getTableName("in", typeName), sqlFields, sqlValuesList)
       if not result['OK']:
         return result
-      iD = result['Value']
-      recordsToProcess.append((iD, typeName, startTime, endTime, valuesList, now))
 
     return S_OK()
 
@@ -632,6 +763,36 @@ class AccountingDB(DB):
     Do the real insert and delete from the in buffer table
     """
     self.log.verbose("Received bundle to process", "of %s elements" % len(recordTuples))
+    recordsPerType = {}
+    for record in recordTuples:
+      recordsPerType.setdefault(record[1], []).append(record)
+    for typeName, typeRecords in recordsPerType.items():
+      result = self.insertRecordBundleDirectly(typeName, [record[2:5] for record in typeRecords])
+      if result['OK']:
+        self.__deleteFromINTable(typeName, typeRecords)
+        continue
+      # Insert the records one by one, so that a wrong record does not keep the others waiting
+      self.log.warn("Can't insert bundle, inserting records one by one", result['Message'])
+      self.__insertRecordsFromINTable(typeRecords)
+
+  def __deleteFromINTable(self, typeName, recordTuples, chunkSize=1000):
+    """
+    Delete inserted records from the in buffer table
+    """
+    for i in xrange(0, len(recordTuples), chunkSize):
+      chunk = recordTuples[i:i + chunkSize]
+      result = self._update("DELETE FROM `%s` WHERE id in (%s)" % (_getTableName("in", typeName),
+                                                                   ", ".join(str(record[0]) for record in chunk)))
+      if not result['OK']:
+        self.log.error("Can't delete rows from the IN table", result['Message'])
+    now = Time.toEpoch()
+    for record in recordTuples:
+      gMonitor.addMark("insertiontime", now - record[5])
+
+  def __insertRecordsFromINTable(self, recordTuples):
+    """
+    Insert records of the in buffer table one by one, and delete them from it
+    """
     for record in recordTuples:
       iD, typeName, startTime, endTime, valuesList, insertionEpoch = record
       result = self.insertRecordDirectly(typeName, startTime, endTime, valuesList)
@@ -687,6 +848,8 @@ class AccountingDB(DB):
       if not retVal['OK']:
         return retVal
       retVal = self.__splitInBuckets(typeName, startTime, endTime, valuesList, connObj=connObj)
+      if retVal['OK'] and typeName in self.__rollupTypes:
+        retVal = self.__splitInBuckets(typeName, startTime, endTime, valuesList, connObj=connObj, tableType="rollup")
       if not retVal['OK']:
         self.__rollbackTransaction(connObj)
         return retVal
@@ -694,6 +857,77 @@ class AccountingDB(DB):
     finally:
       connObj.close()
 
+  def insertRecordBundleDirectly(self, typeName, recordsList):
+    """
+    Add a bundle of entries to the type contents, in a single transaction.
+    The key values are resolved for the whole bundle, and the contributions of the entries
+    to each bucket are added up before writing the buckets with multi-row statements
+
+    :param str typeName: name of the type
+    :param list recordsList: list of tuples ( startTime, endTime, valuesList )
+
+    :return: S_OK( number of entries added )
+    """
+    if self.__readOnly:
+      return S_ERROR("ReadOnly mode enabled. No modification allowed")
+    if typeName not in self.dbCatalog:
+      return S_ERROR("Type %s has not been defined in the db" % typeName)
+    if not recordsList:
+      return S_OK(0)
+    keyFields = self.dbCatalog[typeName]['keys']
+    numKeys = len(keyFields)
+    numValues = len(self.dbCatalog[typeName]['values'])
+    for _startTime, _endTime, valuesList in recordsList:
+      if len(valuesList) != numKeys + numValues:
+        return S_ERROR("Fields mismatch for record %s. %s fields and %s expected" % (typeName,
+                                                                                     len(valuesList) + 2,
+                                                                                     numKeys + numValues + 2))
+    gMonitor.addMark("registeradded", len(recordsList))
+    gMonitor.addMark("registeradded:%s" % typeName, len(recordsList))
+    self.log.info("Adding records bundle", "of %s records for type %s" % (len(recordsList), typeName))
+    # Discover key indexes
+    keyIdsLists = []
+    for keyPos, keyName in enumerate(keyFields):
+      retVal = self.__addKeyValues(typeName, keyName, [record[2][keyPos] for record in recordsList])
+      if not retVal['OK']:
+        return retVal
+      keyIdsLists.append(retVal['Value'])
+
+    # Add up the contributions to the buckets: [ entriesInBucket, value1, value2... ] for each
+    # ( startTime, bucketLength, key ids )
+    nowEpoch = int(Time.toEpoch(Time.dateTime()))
+    withRollup = typeName in self.__rollupTypes
+    typeRows = []
+    buckets = {}
+    rollupBuckets = {}
+    for (startTime, endTime, valuesList), keyIds in zip(recordsList, zip(*keyIdsLists)):
+      values = valuesList[numKeys:]
+      typeRows.append(list(keyIds) + list(values) + [startTime, endTime])
+      _addToBuckets(buckets, self.calculateBuckets(typeName, startTime, endTime, nowEpoch), keyIds, values)
+      if withRollup:
+        _addToBuckets(rollupBuckets, self.calculateBuckets(typeName, startTime, endTime, nowEpoch,
+                                                           self.rollupBucketLength), keyIds, values)
+    self.log.verbose("Splitting bundle", "in %s buckets" % len(buckets))
+
+    for _i in range(max(1, self.__deadLockRetries)):
+      retVal = self.transactionStart()
+      if not retVal['OK']:
+        return retVal
+      retVal = self.insertMany(_getTableName("type", typeName), self.dbCatalog[typeName]['typeFields'], typeRows)
+      if retVal['OK']:
+        retVal = self.__writeBucketsBundle(typeName, buckets)
+      if retVal['OK'] and withRollup:
+        retVal = self.__writeBucketsBundle(typeName, rollupBuckets, tableType="rollup")
+      if retVal['OK']:
+        retVal = self.transactionCommit()
+        if retVal['OK']:
+          return S_OK(len(recordsList))
+      self.transactionRollback()
+      # If failed because of dead lock try restarting
+      if retVal['Message'].find("try restarting transaction") == -1:
+        break
+    return retVal
+
   def deleteRecord(self, typeName, startTime, endTime, valuesList):
     """
     Add an entry to the type contents
@@ -757,6 +991,9 @@ class AccountingDB(DB):
       return S_OK(0)
     sqlValues.append(1)
     retVal = self.__deleteFromBuckets(typeName, startTime, endTime, sqlValues, numInsertions, connObj=connObj)
+    if retVal['OK'] and typeName in self.__rollupTypes:
+      retVal = self.__deleteFromBuckets(typeName, startTime, endTime, sqlValues, numInsertions, connObj=connObj,
+                                        tableType="rollup")
     if not retVal['OK']:
       self.__rollbackTransaction(connObj)
       return retVal
@@ -766,25 +1003,28 @@ class AccountingDB(DB):
       return retVal
     return S_OK(numInsertions)
 
-  def __splitInBuckets(self, typeName, startTime, endTime, valuesList, connObj=False):
+  def __splitInBuckets(self, typeName, startTime, endTime, valuesList, connObj=False, tableType="bucket"):
     """
-    Bucketize a record
+    Bucketize a record, in the buckets or in the rollup
     """
     # Calculate amount of buckets
-    buckets = self.calculateBuckets(typeName, startTime, endTime)
+    buckets = self.calculateBuckets(typeName, startTime, endTime,
+                                    minBucketLength=self.rollupBucketLength if tableType == "rollup" else 0)
     # Separate key values from normal values
     numKeys = len(self.dbCatalog[typeName]['keys'])
     keyValues = valuesList[:numKeys]
     valuesList = valuesList[numKeys:]
     self.log.verbose("Splitting entry", " in %s buckets" % len(buckets))
-    return self.__writeBuckets(typeName, buckets, keyValues, valuesList, connObj=connObj)
+    return self.__writeBuckets(typeName, buckets, keyValues, valuesList, connObj=connObj, tableType=tableType)
 
-  def __deleteFromBuckets(self, typeName, startTime, endTime, valuesList, numInsertions, connObj=False):
+  def __deleteFromBuckets(self, typeName, startTime, endTime, valuesList, numInsertions, connObj=False,
+                          tableType="bucket"):
     """
-    DeBucketize a record
+    DeBucketize a record, from the buckets or from the rollup
     """
     # Calculate amount of buckets
-    buckets = self.calculateBuckets(typeName, startTime, endTime, self.__lastCompactionEpoch)
+    buckets = self.calculateBuckets(typeName, startTime, endTime, self.__lastCompactionEpoch,
+                                    self.rollupBucketLength if tableType == "rollup" else 0)
     # Separate key values from normal values
     numKeys = len(self.dbCatalog[typeName]['keys'])
     keyValues = valuesList[:numKeys]
@@ -799,7 +1039,8 @@ class AccountingDB(DB):
                                           bucketStartTime,
                                           bucketLength,
                                           keyValues,
-                                          valuesList, bucketProportion * numInsertions, connObj=connObj)
+                                          valuesList, bucketProportion * numInsertions, connObj=connObj,
+                                          tableType=tableType)
         if not retVal['OK']:
           # If failed because of dead lock try restarting
           if retVal['Message'].find("try restarting transaction"):
@@ -813,7 +1054,7 @@ class AccountingDB(DB):
   def getBucketsDef(self, typeName):
     return self.dbBucketsLength[typeName]
 
-  def __generateSQLConditionForKeys(self, typeName, keyValues):
+  def __generateSQLConditionForKeys(self, typeName, keyValues, tableType="bucket"):
     """
     Generate sql condition for buckets, values are indexes to real values
     """
@@ -825,7 +1066,7 @@ class AccountingDB(DB):
       if not retVal['OK']:
         return retVal
       keyValue = retVal['Value']
-      realCondList.append("`%s`.`%s` = %s" % (_getTableName("bucket", typeName), keyField, keyValue))
+      realCondList.append("`%s`.`%s` = %s" % (_getTableName(tableType, typeName), keyField, keyValue))
     return " AND ".join(realCondList)
 
   def __getBucketFromDB(self, typeName, startTime, bucketLength, keyValues, connObj=False):
@@ -847,11 +1088,12 @@ class AccountingDB(DB):
     cmd += self.__generateSQLConditionForKeys(typeName, keyValues)
     return self._query(cmd, conn=connObj)
 
-  def __extractFromBucket(self, typeName, startTime, bucketLength, keyValues, bucketValues, proportion, connObj=False):
+  def __extractFromBucket(self, typeName, startTime, bucketLength, keyValues, bucketValues, proportion, connObj=False,
+                          tableType="bucket"):
     """
     Update a bucket when coming from the raw insert
     """
-    tableName = _getTableName("bucket", typeName)
+    tableName = _getTableName(tableType, typeName)
     cmd = "UPDATE `%s` SET " % tableName
     sqlValList = []
     for pos in range(len(self.dbCatalog[typeName]['values'])):
@@ -872,10 +1114,10 @@ class AccountingDB(DB):
         tableName,
         bucketLength
     )
-    cmd += self.__generateSQLConditionForKeys(typeName, keyValues)
+    cmd += self.__generateSQLConditionForKeys(typeName, keyValues, tableType)
     return self._update(cmd, conn=connObj)
 
-  def __writeBuckets(self, typeName, buckets, keyValues, valuesList, connObj=False):
+  def __writeBuckets(self, typeName, buckets, keyValues, valuesList, connObj=False, tableType="bucket"):
     """ Insert or update a bucket
     """
 #     tableName = _getTableName( "bucket", typeName )
@@ -901,7 +1143,7 @@ class AccountingDB(DB):
         sqlValues.append("(%s*%s)" % (valuesList[valPos], bProportion))
       valuesGroups.append("( %s )" % ",".join(str(val) for val in sqlValues))
 
-    cmd = "INSERT INTO `%s` ( %s ) " % (_getTableName("bucket", typeName), ", ".join(sqlFields))
+    cmd = "INSERT INTO `%s` ( %s ) " % (_getTableName(tableType, typeName), ", ".join(sqlFields))
     cmd += "VALUES %s " % ", ".join(valuesGroups)
     cmd += "ON DUPLICATE KEY UPDATE %s" % ", ".join(sqlUpData)
 
@@ -918,6 +1160,173 @@ class AccountingDB(DB):
 
     return S_ERROR("Cannot update bucket: %s" % result['Message'])
 
+  def __writeBucketsBundle(self, typeName, buckets, chunkSize=1000, tableType="bucket"):
+    """ Add the aggregated contributions of a bundle of records to the buckets,
+        with multi-row statements of chunkSize buckets
+
+        :param dict buckets: [ entriesInBucket, value1, value2... ] for each ( startTime, bucketLength, key ids )
+        :param str tableType: bucket or rollup
+    """
+    sqlFields = ['`startTime`', '`bucketLength`', '`entriesInBucket`']
+    sqlFields.extend("`%s`" % keyField for keyField in self.dbCatalog[typeName]['keys'])
+    sqlUpData = ["`entriesInBucket`=`entriesInBucket`+VALUES(`entriesInBucket`)"]
+    for valueField in self.dbCatalog[typeName]['values']:
+      sqlFields.append("`%s`" % valueField)
+      sqlUpData.append("`%s`=`%s`+VALUES(`%s`)" % (valueField, valueField, valueField))
+    cmd = "INSERT INTO `%s` ( %s ) VALUES %%s ON DUPLICATE KEY UPDATE %s" % (_getTableName(tableType, typeName),
+                                                                             ", ".join(sqlFields),
+                                                                             ", ".join(sqlUpData))
+    valuesGroups = []
+    for (bStartTime, bLength, keyIds), bucket in buckets.iteritems():
+      valuesGroups.append("( %s )" % ",".join([str(bStartTime), str(bLength), _sqlNumber(bucket[0])] +
+                                              [str(keyId) for keyId in keyIds] +
+                                              [_sqlNumber(value) for value in bucket[1:]]))
+    for i in xrange(0, len(valuesGroups), chunkSize):
+      result = self._update(cmd % ", ".join(valuesGroups[i:i + chunkSize]))
+      if not result['OK']:
+        return result
+    return S_OK()
+
+  def __aggregateInRollup(self, typeName, sourceTableType, bucketLengthSQL, sqlCond="", connObj=False):
+    """ Add up the buckets of the source table in the rollup, with one statement
+
+        :param str sourceTableType: bucket or rollup
+        :param str bucketLengthSQL: SQL expression of the length of the rollup buckets
+        :param str sqlCond: SQL condition on the source buckets
+    """
+    sourceTableName = _getTableName(sourceTableType, typeName)
+    tableName = _getTableName("rollup", typeName)
+    sqlFields = ['`startTime`', '`bucketLength`', '`entriesInBucket`']
+    sqlSelectList = [_bucketizeDataField("`%s`.`startTime`" % sourceTableName, bucketLengthSQL),
+                     bucketLengthSQL,
+                     "SUM( `%s`.`entriesInBucket` )" % sourceTableName]
+    sqlGroupList = ["1", "2"]
+    sqlUpData = ["`%s`.`entriesInBucket`=`%s`.`entriesInBucket`+VALUES(`entriesInBucket`)" % (tableName, tableName)]
+    for keyField in self.dbCatalog[typeName]['keys']:
+      sqlFields.append("`%s`" % keyField)
+      sqlSelectList.append("`%s`.`%s`" % (sourceTableName, keyField))
+      sqlGroupList.append("`%s`.`%s`" % (sourceTableName, keyField))
+    for valueField in self.dbCatalog[typeName]['values']:
+      sqlFields.append("`%s`" % valueField)
+      sqlSelectList.append("SUM( `%s`.`%s` )" % (sourceTableName, valueField))
+      sqlUpData.append("`%s`.`%s`=`%s`.`%s`+VALUES(`%s`)" % (tableName, valueField, tableName, valueField, valueField))
+    selectSQL = "SELECT %s FROM `%s`" % (", ".join(sqlSelectList), sourceTableName)
+    if sqlCond:
+      selectSQL += " WHERE %s" % sqlCond
+    selectSQL += " GROUP BY %s" % ", ".join(sqlGroupList)
+    # The derived table allows to read from the rollup itself
+    cmd = "INSERT INTO `%s` ( %s ) SELECT * FROM ( %s ) AS rollupData ON DUPLICATE KEY UPDATE %s" % (
+        tableName,
+        ", ".join(sqlFields),
+        selectSQL,
+        ", ".join(sqlUpData))
+    return self._update(cmd, conn=connObj)
+
+  def __isRollupComplete(self, typeName):
+    """
+    Whether the rollup of a type has all the buckets added
+    """
+    result = self._query("SELECT `complete` FROM `%s` WHERE `name`='%s'" % (self.rollupCatalogTableName, typeName))
+    if not result['OK']:
+      self.log.error("Can't get the state of the rollup", "%s: %s" % (typeName, result['Message']))
+      return False
+    return bool(result['Value'] and result['Value'][0][0])
+
+  def fillRollups(self, sliceLength=None):
+    """
+    Fill the rollups of the types created before them, which are not used until then.
+    An explicit step, as it takes long for big types, to run while no records are inserted:
+    the buckets of the records inserted meanwhile may not be added to the rollups.
+
+    :param int sliceLength: seconds of buckets added at once, 30 days by default
+    """
+    if self.__readOnly:
+      return S_ERROR("ReadOnly mode enabled. No modification allowed")
+    for typeName in sorted(self.dbCatalog):
+      if typeName not in self.__rollupTypes:
+        result = self.fillRollup(typeName, sliceLength)
+        if not result['OK']:
+          return result
+    return S_OK()
+
+  def fillRollup(self, typeName, sliceLength=None):
+    """
+    Fill the rollup of a type from its buckets, a slice of time after the other.
+    The start time up to which the buckets are added is kept in the DB, and locked while a slice is added,
+    so that a slice is only added once, even when filling is interrupted or done twice at the same time.
+
+    :param int sliceLength: seconds of buckets added at once, 30 days by default
+    """
+    if not sliceLength:
+      sliceLength = 30 * self.rollupBucketLength
+    bucketTableName = _getTableName("bucket", typeName)
+    retVal = self._update("CREATE TABLE IF NOT EXISTS `%s` LIKE `%s`" % (_getTableName("rollup", typeName),
+                                                                        bucketTableName))
+    if not retVal['OK']:
+      return retVal
+    retVal = self._update("INSERT IGNORE INTO `%s` ( `name`, `filledUntil`, `complete` ) VALUES ( '%s', 0, 0 )" % (
+        self.rollupCatalogTableName, typeName))
+    if not retVal['OK']:
+      return retVal
+    self.log.info("Filling the rollup", typeName)
+    while True:
+      retVal = self.transactionStart()
+      if not retVal['OK']:
+        return retVal
+      retVal = self.__fillRollupSlice(typeName, sliceLength)
+      if retVal['OK']:
+        complete = retVal['Value']
+        retVal = self.transactionCommit()
+      if not retVal['OK']:
+        self.transactionRollback()
+        return retVal
+      if complete:
+        break
+    self.__rollupTypes.add(typeName)
+    self.log.info("Rollup filled", typeName)
+    return S_OK()
+
+  def __fillRollupSlice(self, typeName, sliceLength):
+    """
+    Add the next slice of buckets to the rollup, within the transaction of the caller
+
+    :return: S_OK with whether the rollup is complete
+    """
+    # The mark stays locked until the transaction is over
+    retVal = self._query("SELECT `filledUntil`, `complete` FROM `%s` WHERE `name`='%s' FOR UPDATE" % (
+        self.rollupCatalogTableName, typeName))
+    if not retVal['OK']:
+      return retVal
+    filledUntil, complete = retVal['Value'][0]
+    if complete:
+      return S_OK(True)
+    bucketTableName = _getTableName("bucket", typeName)
+    retVal = self._query("SELECT MIN(`startTime`) FROM `%s` WHERE `startTime` >= %d" % (bucketTableName,
+                                                                                        filledUntil))
+    if not retVal['OK']:
+      return retVal
+    if retVal['Value'][0][0] is None:
+      retVal = self._update("UPDATE `%s` SET `complete`=1 WHERE `name`='%s'" % (self.rollupCatalogTableName,
+                                                                                typeName))
+      return S_OK(True) if retVal['OK'] else retVal
+    # The slices start with a rollup bucket
+    sliceStart = int(retVal['Value'][0][0])
+    sliceStart = max(sliceStart - sliceStart % self.rollupBucketLength, filledUntil)
+    sliceEnd = sliceStart + sliceLength
+    retVal = self.__aggregateInRollup(typeName, "bucket",
+                                      "GREATEST( `%s`.`bucketLength`, %d )" % (bucketTableName,
+                                                                              self.rollupBucketLength),
+                                      "`%s`.`startTime` >= %d AND `%s`.`startTime` < %d" % (
+                                          bucketTableName, sliceStart, bucketTableName, sliceEnd))
+    if not retVal['OK']:
+      return retVal
+    retVal = self._update("UPDATE `%s` SET `filledUntil`=%d WHERE `name`='%s'" % (self.rollupCatalogTableName,
+                                                                                  sliceEnd, typeName))
+    if not retVal['OK']:
+      return retVal
+    self.log.verbose("Rollup filled", "%s until %s" % (typeName, sliceEnd))
+    return S_OK(False)
+
   def __checkFieldsExistsInType(self, typeName, fields, tableType):
     """
     Check wether a list of fields exist for a given typeName
@@ -970,7 +1379,8 @@ class AccountingDB(DB):
           condDict,
           groupFields,
           orderFields,
-          connObj=False):
+          connObj=False,
+          useRollup=False):
     """
     Get data from the DB
 
@@ -987,6 +1397,8 @@ class AccountingDB(DB):
                       ( "%s, %s, %s", ( "field1name", "field2name", "field3name" ) )
      - orderFields -> list of fields to order by
                       ( "%s, %s, %s", ( "field1name", "field2name", "field3name" ) )
+     - useRollup -> the buckets of at least one day are read from the rollup of the type.
+                    Only for queries grouped by startTime whose values are added over time
 
     """
     if typeName not in self.dbCatalog:
@@ -1000,20 +1412,59 @@ class AccountingDB(DB):
     nowEpoch = Time.toEpoch(Time.dateTime())
     bucketTimeLength = self.calculateBucketLengthForTime(typeName, nowEpoch, startTime)
     startTime = startTime - startTime % bucketTimeLength
-    result = self.__queryType(
-        typeName,
-        startTime,
-        endTime,
-        selectFields,
-        condDict,
-        groupFields,
-        orderFields,
-        "bucket",
-        connObj=connObj
-    )
+    if useRollup and typeName in self.__rollupTypes and groupFields and 'startTime' in groupFields[1]:
+      result = self.__queryWithRollup(typeName, startTime, endTime, selectFields, condDict, groupFields, orderFields,
+                                      nowEpoch, connObj=connObj)
+    else:
+      result = self.__queryType(
+          typeName,
+          startTime,
+          endTime,
+          selectFields,
+          condDict,
+          groupFields,
+          orderFields,
+          "bucket",
+          connObj=connObj
+      )
     gMonitor.addMark("querytime", Time.toEpoch() - startQueryEpoch)
     return result
 
+  def __queryWithRollup(self, typeName, startTime, endTime, selectFields, condDict, groupFields, orderFields,
+                        nowEpoch, connObj=False):
+    """
+    Query the rollup for the part of the time range with buckets of at least the rollup length,
+    and the buckets for the most recent part
+    """
+    rollupLength = self.rollupBucketLength
+    # Same bucket boundaries as the query of the buckets
+    bucketStart = self.calculateBuckets(typeName, startTime + 3600, startTime + 3600, nowEpoch)[0][0]
+    bucketEnd = self.calculateBuckets(typeName, endTime + 3600, endTime + 3600, nowEpoch)[0][0]
+    if self.calculateBucketLengthForTime(typeName, nowEpoch, bucketStart) < rollupLength:
+      rollupEnd = bucketStart
+    elif self.calculateBucketLengthForTime(typeName, nowEpoch, bucketEnd) >= rollupLength:
+      rollupEnd = None
+    else:
+      rollupEnd = bucketEnd - bucketEnd % rollupLength
+      if self.calculateBucketLengthForTime(typeName, nowEpoch, rollupEnd - 1) > rollupLength:
+        rollupEnd = bucketStart
+    if rollupEnd is not None and rollupEnd <= bucketStart:
+      return self.__queryType(typeName, startTime, endTime, selectFields, condDict, groupFields, orderFields,
+                              "bucket", connObj=connObj)
+
+    # The query arguments are modified by __queryType
+    result = self.__queryType(typeName, bucketStart, bucketEnd if rollupEnd is None else rollupEnd - 1,
+                              copy.deepcopy(selectFields), copy.deepcopy(condDict), copy.deepcopy(groupFields),
+                              copy.deepcopy(orderFields), "rollup", connObj=connObj)
+    if not result['OK'] or rollupEnd is None:
+      return result
+    rollupData = result['Value']
+    result = self.__queryType(typeName, rollupEnd - 3600, endTime, selectFields, condDict, groupFields,
+                              orderFields, "bucket", connObj=connObj)
+    if not result['OK']:
+      return result
+    return S_OK(tuple(rollupData) + tuple(result['Value']))
+
   def __queryType(
           self,
           typeName,
@@ -1093,6 +1544,8 @@ class AccountingDB(DB):
         endTimeSQLVar = "startTime"
         endTime = endTime + 3600
         endTime = self.calculateBuckets(typeName, endTime, endTime)[0][0]
+      elif tableType == "rollup":
+        endTimeSQLVar = "startTime"
       else:
         endTimeSQLVar = "endTime"
       sqlTimeCond.append("`%s`.`%s` <= %s" % (tableName, endTimeSQLVar, endTime))
@@ -1174,6 +1627,8 @@ class AccountingDB(DB):
         self.__slowCompactBucketsForType(typeName)
       else:
         self.__compactBucketsForType(typeName)
+      if typeName in self.__rollupTypes:
+        self.__compactRollupForType(typeName)
     self.log.info("[COMPACT] Compaction finished")
     self.__lastCompactionEpoch = int(Time.toEpoch())
     gSynchro.lock()
@@ -1184,6 +1639,174 @@ class AccountingDB(DB):
       gSynchro.unlock()
     return S_OK()
 
+  def incrementalCompactBuckets(self, timeBudget=None, sliceSize=None):
+    """
+    Compact the buckets of all the types by slices, until there is nothing left to compact or
+    the time budget is spent. Each slice is compacted in a transaction of its own, locking only
+    its buckets so that the records can be inserted meanwhile, and the start time reached
+    for each type and bucket length is kept in the DB: the next call goes on from there.
+
+    :param float timeBudget: seconds to spend, CompactionTimeBudget option of the DB by default
+    :param int sliceSize: number of buckets of a slice, CompactionSliceSize option of the DB by default
+    :return: S_OK with the number of buckets compacted
+    """
+    if self.__readOnly:
+      return S_ERROR("ReadOnly mode enabled. No modification allowed")
+    if timeBudget is None:
+      timeBudget = float(self.getCSOption("CompactionTimeBudget", 10))
+    if sliceSize is None:
+      sliceSize = int(self.getCSOption("CompactionSliceSize", 1000))
+    gSynchro.lock()
+    try:
+      if self.__doingCompaction:
+        return S_OK(0)
+      self.__doingCompaction = True
+    finally:
+      gSynchro.unlock()
+    startCompaction = time.time()
+    try:
+      compacted = self.__incrementalCompaction(startCompaction + timeBudget, sliceSize)
+    finally:
+      gSynchro.lock()
+      try:
+        self.__doingCompaction = False
+      finally:
+        gSynchro.unlock()
+    elapsedTime = time.time() - startCompaction
+    gMonitor.addMark("compactedbuckets", compacted)
+    self.log.info("[COMPACT] Incremental compaction", "%d buckets in %.2f secs (%.2f buckets/s)" % (
+        compacted, elapsedTime, compacted / elapsedTime if elapsedTime else 0.))
+    return S_OK(compacted)
+
+  def __incrementalCompaction(self, deadline, sliceSize):
+    """
+    Compact the slices of each type in turn, starting with the one the previous call stopped at
+
+    :return: number of buckets compacted
+    """
+    compacted = 0
+    typeNames = sorted(self.dbCatalog)
+    if self.__compactionType in typeNames:
+      typePos = typeNames.index(self.__compactionType)
+      typeNames = typeNames[typePos:] + typeNames[:typePos]
+    for typeName in typeNames:
+      self.__compactionType = typeName
+      nowEpoch = int(Time.toEpoch())
+      for bPos in range(len(self.dbBucketsLength[typeName]) - 1):
+        secondsLimit = self.dbBucketsLength[typeName][bPos][0]
+        bucketLength = self.dbBucketsLength[typeName][bPos][1]
+        timeLimit = (nowEpoch - nowEpoch % bucketLength) - secondsLimit
+        while True:
+          if time.time() > deadline:
+            return compacted
+          result = self.__compactBucketsSlice(typeName, bucketLength, timeLimit, sliceSize, nowEpoch)
+          if not result['OK']:
+            self.log.error("[COMPACT] Error while compacting buckets", "%s: %s" % (typeName, result['Message']))
+            break
+          sliceCompacted, finished = result['Value']
+          compacted += sliceCompacted
+          if finished:
+            break
+      # The purge of old records and the compaction of the rollup are done once a day, within the time budget:
+      # the next call goes on with them when it is over
+      if nowEpoch - self.__compactionPurges.get(typeName, 0) > 86400:
+        finished = True
+        if self.dbCatalog[typeName].get('dataTimespan', 0) > 0:
+          finished = self.__deleteRecordsOlderThanDataTimespan(typeName, deadline)
+        if finished and typeName in self.__rollupTypes:
+          result = self.__compactRollupForType(typeName, deadline)
+          # After an error, the compaction of the rollup is tried again the next day
+          finished = not result['OK'] or result['Value']
+        if not finished:
+          return compacted
+        self.__compactionPurges[typeName] = nowEpoch
+    # All the types are compacted
+    self.__compactionType = None
+    self.__lastCompactionEpoch = int(Time.toEpoch())
+    return compacted
+
+  def __compactBucketsSlice(self, typeName, bucketLength, timeLimit, sliceSize, nowEpoch):
+    """
+    Compact the next slice of about sliceSize buckets of bucketLength older than timeLimit
+
+    :return: S_OK with the number of buckets compacted, and whether there is nothing left before timeLimit
+    """
+    tableName = _getTableName("bucket", typeName)
+    result = self.__getCompactionMark(typeName, bucketLength)
+    if not result['OK']:
+      return result
+    sliceStart = result['Value']
+    if sliceStart >= timeLimit:
+      return S_OK((0, True))
+    sqlCond = "`%s`.`startTime` >= %%d AND `%s`.`startTime` < %%d AND `%s`.`bucketLength` = %d" % (
+        tableName, tableName, tableName, bucketLength)
+    # The slice ends with the first start time after sliceSize buckets
+    result = self._query("SELECT `startTime` FROM `%s` WHERE %s ORDER BY `startTime` LIMIT 1 OFFSET %d" % (
+        tableName, sqlCond % (sliceStart, timeLimit), sliceSize))
+    if not result['OK']:
+      return result
+    sliceEnd = max(int(result['Value'][0][0]), sliceStart + 1) if result['Value'] else timeLimit
+    sliceCond = sqlCond % (sliceStart, sliceEnd)
+
+    sqlSelectList = ["`%s`.`%s`" % (tableName, field) for field in self.dbCatalog[typeName]['keys']]
+    sqlSelectList.extend("`%s`.`%s`" % (tableName, field) for field in self.dbCatalog[typeName]['values'])
+    sqlSelectList.append("`%s`.`entriesInBucket`" % tableName)
+    sqlSelectList.append("`%s`.`startTime`" % tableName)
+    numKeys = len(self.dbCatalog[typeName]['keys'])
+    retVal = self.transactionStart()
+    if not retVal['OK']:
+      return retVal
+    # The buckets of the slice stay locked until they are replaced
+    retVal = self._query("SELECT %s FROM `%s` WHERE %s FOR UPDATE" % (", ".join(sqlSelectList),
+                                                                      tableName,
+                                                                      sliceCond))
+    if retVal['OK']:
+      bucketsData = retVal['Value']
+      buckets = {}
+      for record in bucketsData:
+        startTime = int(record[-1])
+        # The DECIMAL values can not be multiplied by the proportions
+        _addToBuckets(buckets, self.calculateBuckets(typeName, startTime, startTime + bucketLength, nowEpoch),
+                      tuple(record[:numKeys]), [float(value) for value in record[numKeys:-2]], float(record[-2]))
+      retVal = self._update("DELETE FROM `%s` WHERE %s" % (tableName, sliceCond))
+    if retVal['OK']:
+      retVal = self.__writeBucketsBundle(typeName, buckets)
+    if retVal['OK']:
+      retVal = self.transactionCommit()
+    if not retVal['OK']:
+      self.transactionRollback()
+      return retVal
+    result = self.__setCompactionMark(typeName, bucketLength, sliceEnd)
+    if not result['OK']:
+      return result
+    self.log.verbose("[COMPACT] Compacted slice", "%s buckets of %s secs of %s before %s" % (
+        len(bucketsData), bucketLength, typeName, sliceEnd))
+    return S_OK((len(bucketsData), sliceEnd >= timeLimit))
+
+  def __getCompactionMark(self, typeName, bucketLength):
+    """
+    Get the start time up to which the buckets of bucketLength are compacted
+    """
+    if (typeName, bucketLength) not in self.__compactionMarks:
+      result = self._query("SELECT `highWaterMark` FROM `%s` WHERE `name`='%s' AND `bucketLength`=%d" % (
+          self.compactionTableName, typeName, bucketLength))
+      if not result['OK']:
+        return result
+      self.__compactionMarks[(typeName, bucketLength)] = int(result['Value'][0][0]) if result['Value'] else 0
+    return S_OK(self.__compactionMarks[(typeName, bucketLength)])
+
+  def __setCompactionMark(self, typeName, bucketLength, highWaterMark):
+    """
+    Keep the start time up to which the buckets of bucketLength are compacted
+    """
+    result = self._update("INSERT INTO `%s` ( `name`, `bucketLength`, `highWaterMark` ) VALUES ( '%s', %d, %d ) "
+                          "ON DUPLICATE KEY UPDATE `highWaterMark`=VALUES(`highWaterMark`)" % (
+                              self.compactionTableName, typeName, bucketLength, highWaterMark))
+    if not result['OK']:
+      return result
+    self.__compactionMarks[(typeName, bucketLength)] = highWaterMark
+    return S_OK()
+
   def __selectForCompactBuckets(self, typeName, timeLimit, bucketLength, nextBucketLength, connObj=False):
     """
     Nasty SQL query to get ideal buckets using grouping by date calculations and adding value contents
@@ -1326,6 +1949,47 @@ class AccountingDB(DB):
     # return self.__commitTransaction( connObj )
     return S_OK()
 
+  def __compactRollupForType(self, typeName, deadline=None):
+    """
+    Compact the rollup of a given type, following the buckets lengths longer than the rollup one
+
+    :param float deadline: time after which no compaction is started
+    :return: S_OK with whether all the rollup is compacted
+    """
+    tableName = _getTableName("rollup", typeName)
+    nowEpoch = Time.toEpoch()
+    for bPos in range(len(self.dbBucketsLength[typeName]) - 1):
+      if deadline is not None and time.time() > deadline:
+        return S_OK(False)
+      secondsLimit = self.dbBucketsLength[typeName][bPos][0]
+      bucketLength = self.dbBucketsLength[typeName][bPos][1]
+      rollupLength = max(bucketLength, self.rollupBucketLength)
+      nextRollupLength = max(self.dbBucketsLength[typeName][bPos + 1][1], self.rollupBucketLength)
+      if nextRollupLength <= rollupLength:
+        continue
+      timeLimit = (nowEpoch - nowEpoch % bucketLength) - secondsLimit
+      self.log.info("[COMPACT] Compacting rollup older than %s with bucket size %s for %s" % (
+          Time.fromEpoch(timeLimit),
+          rollupLength,
+          typeName))
+      sqlCond = "`%s`.`startTime` < %d AND `%s`.`bucketLength` = %d" % (tableName, timeLimit,
+                                                                          tableName, rollupLength)
+      retVal = self.transactionStart()
+      if not retVal['OK']:
+        return retVal
+      retVal = self.__aggregateInRollup(typeName, "rollup", str(nextRollupLength), sqlCond)
+      if retVal['OK']:
+        retVal = self._update("DELETE FROM `%s` WHERE %s" % (tableName, sqlCond))
+      if retVal['OK']:
+        compacted = retVal['Value']
+        retVal = self.transactionCommit()
+      if not retVal['OK']:
+        self.transactionRollback()
+        self.log.error("[COMPACT] Error while compacting the rollup", "%s: %s" % (typeName, retVal['Message']))
+        return retVal
+      self.log.info("[COMPACT] Compacted %s rollup buckets of %s" % (compacted, typeName))
+    return S_OK(True)
+
   def __selectIndividualForCompactBuckets(self, typeName, timeLimit, bucketLength, querySize, connObj=False):
     """
     Nasty SQL query to get ideal buckets using grouping by date calculations and adding value contents
@@ -1374,20 +2038,28 @@ class AccountingDB(DB):
         deletedBuckets.extend(bucketsData[bLimit: bLimit + deleteQueryLimit])
     return S_OK(deletedBuckets)
 
-  def __deleteRecordsOlderThanDataTimespan(self, typeName):
+  def __deleteRecordsOlderThanDataTimespan(self, typeName, deadline=None):
     """
     IF types define dataTimespan, then records older than datatimespan seconds will be deleted
     automatically
+
+    :param float deadline: time after which no deletion is started, without pause between the deletions
+    :return: whether the purge is over, False if it stopped at the deadline
     """
     dataTimespan = self.dbCatalog[typeName]['dataTimespan'] + self.dbBucketsLength[typeName][-1][1]
     if dataTimespan < 86400 * 30:
-      return
-    for table, field in ((_getTableName("type", typeName), 'endTime'),
-                         (_getTableName("bucket", typeName), 'startTime')):
+      return True
+    tablesToPurge = [(_getTableName("type", typeName), 'endTime'),
+                     (_getTableName("bucket", typeName), 'startTime')]
+    if typeName in self.__rollupTypes:
+      tablesToPurge.append((_getTableName("rollup", typeName), 'startTime'))
+    for table, field in tablesToPurge:
       self.log.info("[COMPACT] Deleting old records for table %s" % table)
       deleteLimit = 100000
       deleted = deleteLimit
       while deleted >= deleteLimit:
+        if deadline is not None and time.time() > deadline:
+          return False
         sqlCmd = "DELETE FROM `%s` WHERE %s < UNIX_TIMESTAMP()-%d LIMIT %d" % (table, field, dataTimespan, deleteLimit)
         result = self._update(sqlCmd)
         if not result['OK']:
@@ -1399,7 +2071,9 @@ class AccountingDB(DB):
           break
         self.log.info("[COMPACT] Deleted %d records for %s table" % (result['Value'], table))
         deleted = result['Value']
-        time.sleep(1)
+        if deadline is None:
+          time.sleep(1)
+    return True
 
   def regenerateBuckets(self, typeName):
     if self.__readOnly:
@@ -1528,6 +2202,17 @@ class AccountingDB(DB):
           expectedEnd = str(datetime.timedelta(seconds=int((numRecords - rebucketedRecords) / blockAvg)))
           self.log.info("[REBUCKET] Rebucketed %.2f%% %s (%.2f r/s block %.2f r/s query | ETA %s )..." %
                         (perDone, typeName, blockAvg, queryAvg, expectedEnd))
+    if typeName in self.__rollupTypes:
+      self.log.info("[REBUCKET] Regenerating the rollup for %s" % typeName)
+      self.__rollupTypes.discard(typeName)
+      retVal = self._update("DELETE FROM `%s`" % _getTableName("rollup", typeName))
+      if not retVal['OK']:
+        return retVal
+      retVal = self._update("UPDATE `%s` SET `filledUntil`=0, `complete`=0 WHERE `name`='%s'" % (
+          self.rollupCatalogTableName, typeName))
+      if not retVal['OK']:
+        return retVal
+      return self.fillRollup(typeName)
     # return self.__commitTransaction( connObj )
     return S_OK()
 
@@ -1541,6 +2226,41 @@ class AccountingDB(DB):
     return self._query("ROLLBACK", conn=connObj)
 
 
+def _normalizeKeyValue(keyValue):
+  """
+  Key values are strings of no more than 64 chars
+  """
+  # Cast to string just in case
+  if not isinstance(keyValue, basestring):
+    keyValue = str(keyValue)
+  return keyValue[:64]
+
+
+def _sqlNumber(value):
+  """
+  Number as a SQL literal, with all the digits of the floats
+  """
+  if isinstance(value, float):
+    return repr(value)
+  return str(value)
+
+
+def _addToBuckets(buckets, bucketsList, keyIds, values, entries=1):
+  """
+  Add the contribution of a record, or of a bucket of entries records, to aggregated buckets
+
+  :param dict buckets: [ entriesInBucket, value1, value2... ] for each ( startTime, bucketLength, key ids )
+  :param list bucketsList: buckets of the record, as given by calculateBuckets
+  """
+  for bStartTime, bProportion, bLength in bucketsList:
+    bucket = buckets.get((bStartTime, bLength, keyIds))
+    if bucket is None:
+      bucket = buckets[(bStartTime, bLength, keyIds)] = [0] * (len(values) + 1)
+    bucket[0] += entries * bProportion if bProportion != 1 else entries
+    for valPos in xrange(len(values)):
+      bucket[valPos + 1] += values[valPos] * bProportion if bProportion != 1 else values[valPos]
+
+
 def _bucketizeDataField(dataField, bucketLength):
   return "%s - ( %s %% %s )" % (dataField, dataField, bucketLength)
 
@@ -49,14 +49,16 @@ class MultiAccountingDB(object):
                        'calculateBuckets', 'calculateBucketLengthForTime'):
       (lambda closure: setattr(self,
                                closure,
-                               lambda *x: self.__mimeTypeMethod(closure, *x))  # pylint: disable=no-value-for-parameter
+                               lambda *x, **kw: self.__mimeTypeMethod(closure,  # pylint: disable=no-value-for-parameter
+                                                                      *x, **kw))
        )(methodName)
-    for methodName in ('autoCompactDB', 'compactBuckets', 'markAllPendingRecordsAsNotTaken',
-                       'loadPendingRecords', 'getRegisteredTypes'):
+    for methodName in ('autoCompactDB', 'compactBuckets',
+                       'markAllPendingRecordsAsNotTaken', 'loadPendingRecords', 'getRegisteredTypes',
+                       'fillRollups'):
       (lambda closure: setattr(self, closure, lambda *x: self.__mimeMethod(closure, *x)))(methodName)
 
-  def __mimeTypeMethod(self, methodName, setup, acType, *args):
-    return getattr(self.__db(acType), methodName)("%s_%s" % (setup, acType), *args)
+  def __mimeTypeMethod(self, methodName, setup, acType, *args, **kwargs):
+    return getattr(self.__db(acType), methodName)("%s_%s" % (setup, acType), *args, **kwargs)
 
   def __mimeMethod(self, methodName, *args):
     end = S_OK()
@@ -69,6 +71,24 @@ class MultiAccountingDB(object):
   def __db(self, acType):
     return self.__allDBs[self.__dbByType.get(acType, self.__defaultDB)]
 
+  def incrementalCompactBuckets(self, timeBudget=None, sliceSize=None):
+    """
+    Compact the buckets of all the DBs by slices, see AccountingDB.incrementalCompactBuckets
+
+    :return: S_OK with the number of buckets compacted in all the DBs
+    """
+    end = S_OK(0)
+    compacted = 0
+    for dbName in self.__allDBs:
+      res = self.__allDBs[dbName].incrementalCompactBuckets(timeBudget=timeBudget, sliceSize=sliceSize)
+      if not res['OK']:
+        end = res
+      else:
+        compacted += res['Value']
+    if end['OK']:
+      end['Value'] = compacted
+    return end
+
   def insertRecordBundleThroughQueue(self, records):
     recByType = {}
     for record in records:
@@ -4,9 +4,12 @@
 # pylint: disable=protected-access
 
 # imports
+import re
+import time
 import unittest
-from mock import MagicMock
+from mock import MagicMock, patch
 
+from DIRAC import S_OK, S_ERROR
 import DIRAC.AccountingSystem.DB.AccountingDB as moduleTested
 
 
@@ -390,6 +393,384 @@ ORDER BY startTime" % (expectedStartTime, expectedEndTime)
     self.assertTrue(retVal)
     self.assertEqual(retVal, expectedQuery)
 
+
+class BundleInsertion(TestCase):
+  """ testing the insertion of bundles of records
+  """
+
+  def setUp(self):
+    super(BundleInsertion, self).setUp()
+    self.module = self.testClass()
+    self.module.dbCatalog = {'Test': {'keys': ['Site', 'User'],
+                                      'values': ['CPUTime', 'Jobs'],
+                                      'typeFields': ['Site', 'User', 'CPUTime', 'Jobs', 'startTime', 'endTime']}}
+    self.module.dbBucketsLength['Test'] = [(31104000, 3600)]
+    # content of the key tables
+    self.keyTables = {'ac_key_Test_Site': ['Site1'], 'ac_key_Test_User': []}
+    self.inserted = {}
+    self.updates = []
+    self.module._escapeValues = lambda values: S_OK(['"%s"' % value for value in values])
+    self.module._query = self.query
+    self.module._update = self.update
+    self.module.insertMany = self.insertMany
+    self.module.transactionStart = MagicMock(return_value=S_OK())
+    self.module.transactionCommit = MagicMock(return_value=S_OK())
+    self.module.transactionRollback = MagicMock(return_value=S_OK())
+
+  def query(self, cmd, conn=None):  # pylint: disable=unused-argument
+    table, values = re.match(r'SELECT `id`, `value` FROM `(\S+)` WHERE `value` IN \( (.*) \)$', cmd).groups()
+    values = [value.strip('"') for value in values.split(', ')]
+    return S_OK([(iD + 1, value) for iD, value in enumerate(self.keyTables[table]) if value in values])
+
+  def update(self, cmd, conn=None):  # pylint: disable=unused-argument
+    self.updates.append(cmd)
+    return S_OK(1)
+
+  def insertMany(self, tableName, inFields, valuesList, ignore=False):  # pylint: disable=unused-argument
+    if tableName in self.keyTables:
+      self.keyTables[tableName].extend(value for _iD, value in valuesList)
+    else:
+      self.inserted.setdefault(tableName, []).extend(valuesList)
+    return S_OK(len(valuesList))
+
+  def test_insertRecordBundleDirectly(self):
+    """ The contributions of the records to the buckets are added up
+    """
+    now = int(time.time())
+    start = now - now % 3600 - 86400
+    records = [(start, start, ['Site1', 'user1', 10, 1]),
+               (start + 100, start + 100, ['Site1', 'user1', 10, 1]),
+               (start + 3600, start + 3 * 3600, ['Site2', 'user1', 7, 3])]
+    result = self.module.insertRecordBundleDirectly('Test', records)
+    self.assertTrue(result['OK'])
+    self.assertEqual(result['Value'], 3)
+    # the records are not modified, so that they can be inserted again
+    self.assertEqual(records[0][2], ['Site1', 'user1', 10, 1])
+
+    self.assertEqual(self.keyTables, {'ac_key_Test_Site': ['Site1', 'Site2'], 'ac_key_Test_User': ['user1']})
+    self.assertEqual(self.inserted['ac_type_Test'], [[1, 1, 10, 1, start, start],
+                                                     [1, 1, 10, 1, start + 100, start + 100],
+                                                     [2, 1, 7, 3, start + 3600, start + 3 * 3600]])
+    # a single statement for all the buckets, in a transaction
+    self.assertEqual(len(self.updates), 1)
+    self.assertTrue(self.updates[0].startswith("INSERT INTO `ac_bucket_Test` ( `startTime`, `bucketLength`, "
+                                               "`entriesInBucket`, `Site`, `User`, `CPUTime`, `Jobs` ) VALUES "))
+    buckets = sorted(tuple(float(value) for value in group.split(','))
+                     for group in re.findall(r'\( ([^)]*) \)', self.updates[0].split(' VALUES ')[1]))
+    self.assertEqual(buckets, [(start, 3600, 2, 1, 1, 20, 2),
+                               (start + 3600, 3600, 0.5, 2, 1, 3.5, 1.5),
+                               (start + 7200, 3600, 0.5, 2, 1, 3.5, 1.5)])
+    self.assertTrue(self.module.transactionCommit.called)
+    self.assertFalse(self.module.transactionRollback.called)
+
+    # the key ids are cached
+    self.keyTables = {}
+    self.assertTrue(self.module.insertRecordBundleDirectly('Test', records)['OK'])
+
+  def test_insertRecordBundleDirectlyErrors(self):
+    """ The bundle is not inserted if a record or a statement is wrong
+    """
+    self.assertFalse(self.module.insertRecordBundleDirectly('Unknown', [(0, 0, [])])['OK'])
+    self.assertFalse(self.module.insertRecordBundleDirectly('Test', [(0, 0, ['Site1', 'user1', 1])])['OK'])
+    self.assertFalse(self.inserted)
+
+    self.module._update = MagicMock(return_value=S_ERROR("Duplicate entry"))
+    self.assertFalse(self.module.insertRecordBundleDirectly('Test', [(0, 0, ['Site1', 'user1', 1, 1])])['OK'])
+    self.assertTrue(self.module.transactionRollback.called)
+    self.assertFalse(self.module.transactionCommit.called)
+
+  def test_insertFromINTable(self):
+    """ The records of the IN table are inserted as a bundle, or one by one if the bundle fails
+    """
+    records = [(iD, 'Test', 0, 0, ['Site1', 'user1', 1, 1], 0) for iD in (1, 2)]
+    self.module._AccountingDB__insertFromINTable(records)  # pylint: disable=no-member
+    self.assertEqual(self.updates[-1], "DELETE FROM `ac_in_Test` WHERE id in (1, 2)")
+
+    self.updates = []
+    self.module.insertRecordBundleDirectly = MagicMock(return_value=S_ERROR("Deadlock"))
+    self.module.insertRecordDirectly = MagicMock(side_effect=[S_ERROR("Wrong record"), S_OK()])
+    self.module._AccountingDB__insertFromINTable(records)  # pylint: disable=no-member
+    self.assertEqual(self.module.insertRecordDirectly.call_count, 2)
+    self.assertEqual(self.updates, ["UPDATE `ac_in_Test` SET taken=0 WHERE id=1",
+                                    "DELETE FROM `ac_in_Test` WHERE id=2"])
+
+  def test_insertRecordBundleInRollup(self):
+    """ The records are also added up in the daily buckets of the rollup
+    """
+    self.module._AccountingDB__rollupTypes.add('Test')
+    now = int(time.time())
+    start = now - now % 86400 - 86400
+    records = [(start, start, ['Site1', 'user1', 10, 1]),
+               (start + 100, start + 100, ['Site1', 'user1', 10, 1]),
+               (start + 3600, start + 3 * 3600, ['Site2', 'user1', 7, 3])]
+    self.assertTrue(self.module.insertRecordBundleDirectly('Test', records)['OK'])
+    self.assertEqual(len(self.updates), 2)
+    self.assertTrue(self.updates[1].startswith("INSERT INTO `ac_rollup_Test` ( `startTime`, `bucketLength`, "
+                                               "`entriesInBucket`, `Site`, `User`, `CPUTime`, `Jobs` ) VALUES "))
+    buckets = sorted(tuple(float(value) for value in group.split(','))
+                     for group in re.findall(r'\( ([^)]*) \)', self.updates[1].split(' VALUES ')[1]))
+    self.assertEqual(buckets, [(start, 86400, 1, 2, 1, 7, 3),
+                               (start, 86400, 2, 1, 1, 20, 2)])
+
+
+class RollupQuery(TestCase):
+  """ testing the queries reading the rollup
+  """
+
+  DAY = 86400
+  MIDNIGHT = 1500000000 - 1500000000 % 86400
+  NOW = MIDNIGHT + 12 * 3600
+
+  def setUp(self):
+    super(RollupQuery, self).setUp()
+    self.module = self.testClass()
+    self.module.dbCatalog = {'Test': {'keys': ['Site'],
+                                      'values': ['CPUTime'],
+                                      'bucketFields': ['Site', 'CPUTime', 'entriesInBucket',
+                                                       'startTime', 'bucketLength']}}
+    self.module.dbBucketsLength['Test'] = [(259200, 900), (691200, 3600), (15552000, 86400), (31104000, 604800)]
+    self.module._AccountingDB__rollupTypes.add('Test')
+    # the query of a table returns the table and the time range
+    self.module._AccountingDB__queryType = MagicMock(
+        side_effect=lambda typeName, startTime, endTime, *args, **kwargs: S_OK(((args[-1], startTime, endTime),)))
+    self.timePatch = patch('DIRAC.AccountingSystem.DB.AccountingDB.Time.toEpoch', return_value=self.NOW)
+    self.timePatch.start()
+
+  def tearDown(self):
+    self.timePatch.stop()
+
+  def retrieve(self, startTime, endTime, useRollup=True):
+    result = self.module.retrieveBucketedData('Test', startTime, endTime, ('%s, %s, SUM(%s)',
+                                                                           ['startTime', 'bucketLength', 'CPUTime']),
+                                              {}, ('%s', ['startTime']), ('%s', ['startTime']), useRollup=useRollup)
+    self.assertTrue(result['OK'])
+    return list(result['Value'])
+
+  def test_calculateRollupBuckets(self):
+    """ The rollup buckets are at least one day long
+    """
+    self.assertEqual(self.module.calculateBuckets('Test', self.NOW - 3600, self.NOW + 3600, self.NOW),
+                     [(self.NOW - 3600 + 900 * i, 0.125, 900) for i in range(8)])
+    self.assertEqual(self.module.calculateBuckets('Test', self.NOW - 3600, self.NOW + 3600, self.NOW, self.DAY),
+                     [(self.MIDNIGHT, 1, self.DAY)])
+    self.assertEqual(self.module.calculateBuckets('Test', self.NOW - 300 * self.DAY, self.NOW - 300 * self.DAY,
+                                                  self.NOW, self.DAY)[0][2], 604800)
+
+  def test_retrieveFromRollup(self):
+    """ The days of the time range are read from the rollup, the hours of today from the buckets
+    """
+    self.assertEqual(self.retrieve(self.NOW - 30 * self.DAY, self.NOW),
+                     [('rollup', self.MIDNIGHT - 30 * self.DAY, self.MIDNIGHT - 1),
+                      ('bucket', self.MIDNIGHT - 3600, self.NOW)])
+    # only days
+    self.assertEqual(self.retrieve(self.NOW - 100 * self.DAY, self.NOW - 30 * self.DAY),
+                     [('rollup', self.MIDNIGHT - 100 * self.DAY, self.MIDNIGHT - 30 * self.DAY)])
+    # the buckets are shorter than one day at the start of the time range
+    self.assertEqual(self.retrieve(self.NOW - 2 * self.DAY, self.NOW),
+                     [('bucket', self.NOW - 2 * self.DAY, self.NOW)])
+    self.assertEqual(self.retrieve(self.NOW - 30 * self.DAY, self.NOW, useRollup=False),
+                     [('bucket', self.MIDNIGHT - 30 * self.DAY, self.NOW)])
+
+
+class IncrementalCompaction(TestCase):
+  """ testing the compaction of the buckets by slices
+  """
+
+  HOUR = 3600
+  DAY = 86400
+  MIDNIGHT = 1500000000 - 1500000000 % 86400
+  NOW = MIDNIGHT + 12 * 3600
+
+  def setUp(self):
+    super(IncrementalCompaction, self).setUp()
+    self.module = self.testClass()
+    self.module.dbCatalog = {'Test': {'keys': ['Site'], 'values': ['CPUTime']}}
+    self.module.dbBucketsLength['Test'] = [(self.DAY, self.HOUR), (31104000, self.DAY)]
+    # content of the bucket table: Site, CPUTime, entriesInBucket, startTime, for hourly buckets of the 3 last days
+    self.buckets = [(site, 1, 2, startTime)
+                    for startTime in xrange(self.NOW - 3 * self.DAY, self.NOW, self.HOUR) for site in (1, 2)]
+    self.marks = {}
+    self.written = {}
+    self.module._query = self.query
+    self.module._update = self.update
+    self.module._AccountingDB__writeBucketsBundle = self.writeBucketsBundle
+    self.module.transactionStart = MagicMock(return_value=S_OK())
+    self.module.transactionCommit = MagicMock(return_value=S_OK())
+    self.module.transactionRollback = MagicMock(return_value=S_OK())
+    self.timePatch = patch('DIRAC.AccountingSystem.DB.AccountingDB.Time.toEpoch', return_value=self.NOW)
+    self.timePatch.start()
+
+  def tearDown(self):
+    self.timePatch.stop()
+
+  def getRange(self, cmd):
+    start, end = re.search(r"`startTime` >= (\d+) AND `ac_bucket_Test`.`startTime` < (\d+)", cmd).groups()
+    return sorted(row for row in self.buckets if int(start) <= row[3] < int(end))
+
+  def query(self, cmd, conn=None):  # pylint: disable=unused-argument
+    if cmd.startswith("SELECT `highWaterMark`"):
+      bucketLength = int(re.search(r"`bucketLength`=(\d+)", cmd).group(1))
+      return S_OK(((self.marks[bucketLength],),) if bucketLength in self.marks else ())
+    rows = sorted(self.getRange(cmd), key=lambda row: row[3])
+    offset = re.search(r"LIMIT 1 OFFSET (\d+)$", cmd)
+    if offset:
+      return S_OK([(row[3],) for row in rows[int(offset.group(1)):int(offset.group(1)) + 1]])
+    self.assertTrue(cmd.endswith("FOR UPDATE"))
+    return S_OK(rows)
+
+  def update(self, cmd, conn=None):  # pylint: disable=unused-argument
+    if cmd.startswith("INSERT INTO `ac_catalog_Compaction`"):
+      bucketLength, mark = re.search(r"VALUES \( 'Test', (\d+), (\d+) \)", cmd).groups()
+      self.marks[int(bucketLength)] = int(mark)
+      return S_OK(1)
+    deleted = self.getRange(cmd)
+    self.buckets = [row for row in self.buckets if row not in deleted]
+    return S_OK(len(deleted))
+
+  def writeBucketsBundle(self, typeName, buckets):  # pylint: disable=unused-argument
+    for bucketKey, bucket in buckets.iteritems():
+      written = self.written.setdefault(bucketKey, [0] * len(bucket))
+      for pos, value in enumerate(bucket):
+        written[pos] += value
+    return S_OK()
+
+  def test_slices(self):
+    """ The hourly buckets older than one day are compacted in daily buckets, by slices
+    """
+    result = self.module.incrementalCompactBuckets(timeBudget=60, sliceSize=30)
+    self.assertTrue(result['OK'])
+    self.assertEqual(result['Value'], 96)
+    # 4 slices of at most 30 buckets
+    self.assertEqual(self.module.transactionCommit.call_count, 4)
+    self.assertEqual(self.written, {(self.MIDNIGHT - 3 * self.DAY, self.DAY, (1,)): [24, 12],
+                                    (self.MIDNIGHT - 3 * self.DAY, self.DAY, (2,)): [24, 12],
+                                    (self.MIDNIGHT - 2 * self.DAY, self.DAY, (1,)): [48, 24],
+                                    (self.MIDNIGHT - 2 * self.DAY, self.DAY, (2,)): [48, 24],
+                                    (self.MIDNIGHT - self.DAY, self.DAY, (1,)): [24, 12],
+                                    (self.MIDNIGHT - self.DAY, self.DAY, (2,)): [24, 12]})
+    self.assertEqual(min(row[3] for row in self.buckets), self.NOW - self.DAY)
+    self.assertEqual(self.marks, {self.HOUR: self.NOW - self.DAY})
+
+    # nothing more to do
+    self.assertEqual(self.module.incrementalCompactBuckets(timeBudget=60, sliceSize=30)['Value'], 0)
+    self.assertEqual(self.module.transactionCommit.call_count, 4)
+
+  def test_persistedMark(self):
+    """ The compaction goes on from the start time kept in the DB, within its time budget
+    """
+    self.marks[self.HOUR] = self.NOW - 2 * self.DAY
+    self.assertEqual(self.module.incrementalCompactBuckets(timeBudget=0, sliceSize=30)['Value'], 0)
+    self.assertFalse(self.module.transactionStart.called)
+
+    result = self.module.incrementalCompactBuckets(timeBudget=60, sliceSize=30)
+    self.assertEqual(result['Value'], 48)
+    self.assertEqual(min(row[3] for row in self.buckets), self.NOW - 3 * self.DAY)
+    self.assertEqual(sorted(self.written), [(self.MIDNIGHT - 2 * self.DAY, self.DAY, (1,)),
+                                            (self.MIDNIGHT - 2 * self.DAY, self.DAY, (2,)),
+                                            (self.MIDNIGHT - self.DAY, self.DAY, (1,)),
+                                            (self.MIDNIGHT - self.DAY, self.DAY, (2,))])
+
+  def test_dailyPurgeBudget(self):
+    """ The daily purge stops when the time budget is spent, and the next compaction goes on with it
+    """
+    self.module.dbCatalog['Test']['dataTimespan'] = 365 * self.DAY
+    self.module._AccountingDB__rollupTypes.add('Test')
+    self.module._AccountingDB__compactRollupForType = MagicMock(return_value=S_OK(True))
+    self.buckets = []
+    toDelete = [10 ** 9]
+
+    def update(cmd, conn=None):
+      if "UNIX_TIMESTAMP()" not in cmd:
+        return self.update(cmd, conn)
+      time.sleep(0.01)
+      deleted = min(toDelete[0], int(re.search(r"LIMIT (\d+)$", cmd).group(1)))
+      toDelete[0] -= deleted
+      return S_OK(deleted)
+    self.module._update = update
+
+    self.assertTrue(self.module.incrementalCompactBuckets(timeBudget=0.05, sliceSize=30)['OK'])
+    self.assertFalse(self.module._AccountingDB__compactRollupForType.called)
+    self.assertEqual(self.module._AccountingDB__compactionPurges, {})
+
+    toDelete[0] = 250000
+    self.assertTrue(self.module.incrementalCompactBuckets(timeBudget=60, sliceSize=30)['OK'])
+    self.assertEqual(self.module._AccountingDB__compactRollupForType.call_count, 1)
+    self.assertEqual(self.module._AccountingDB__compactionPurges, {'Test': self.NOW})
+
+    # Done once a day
+    self.assertTrue(self.module.incrementalCompactBuckets(timeBudget=60, sliceSize=30)['OK'])
+    self.assertEqual(self.module._AccountingDB__compactRollupForType.call_count, 1)
+
+
+class FillRollup(TestCase):
+  """ testing the filling of a rollup by slices
+  """
+
+  DAY = 86400
+
+  def setUp(self):
+    super(FillRollup, self).setUp()
+    self.module = self.testClass()
+    self.module.dbCatalog = {'Test': {'keys': ['Site'], 'values': ['CPUTime']}}
+    # start times of the buckets, the first one in the middle of a day
+    self.bucketTimes = [10 * self.DAY + 3600, 11 * self.DAY, 25 * self.DAY, 26 * self.DAY]
+    self.mark = None
+    self.slices = []
+    self.module._query = self.query
+    self.module._update = self.update
+    self.module.transactionStart = MagicMock(return_value=S_OK())
+    self.module.transactionCommit = MagicMock(return_value=S_OK())
+    self.module.transactionRollback = MagicMock(return_value=S_OK())
+
+  def query(self, cmd, conn=None):  # pylint: disable=unused-argument
+    if cmd.startswith("SELECT `filledUntil`"):
+      self.assertTrue(cmd.endswith("FOR UPDATE"))
+      return S_OK((tuple(self.mark),))
+    start = int(re.match(r"SELECT MIN\(`startTime`\) FROM `ac_bucket_Test` WHERE `startTime` >= (\d+)$", cmd).group(1))
+    return S_OK(((min([bucketTime for bucketTime in self.bucketTimes if bucketTime >= start] or [None]),),))
+
+  def update(self, cmd, conn=None):  # pylint: disable=unused-argument
+    if cmd.startswith("INSERT IGNORE INTO `ac_catalog_Rollup`"):
+      if self.mark is None:
+        self.mark = [0, 0]
+    elif cmd.startswith("UPDATE `ac_catalog_Rollup` SET `filledUntil`="):
+      self.mark[0] = int(re.search(r"`filledUntil`=(\d+)", cmd).group(1))
+    elif cmd.startswith("UPDATE `ac_catalog_Rollup` SET `complete`=1"):
+      self.mark[1] = 1
+    elif cmd.startswith("INSERT INTO `ac_rollup_Test`"):
+      self.slices.append(tuple(int(value) for value in re.search(
+          r"WHERE `ac_bucket_Test`.`startTime` >= (\d+) AND `ac_bucket_Test`.`startTime` < (\d+)", cmd).groups()))
+    return S_OK(1)
+
+  def test_slices(self):
+    """ The buckets are added by slices starting with a day, and the rollup is used once complete
+    """
+    result = self.module.fillRollups(sliceLength=10 * self.DAY)
+    self.assertTrue(result['OK'])
+    self.assertEqual(self.slices, [(10 * self.DAY, 20 * self.DAY), (25 * self.DAY, 35 * self.DAY)])
+    self.assertEqual(self.mark, [35 * self.DAY, 1])
+    self.assertEqual(self.module.transactionCommit.call_count, 3)
+    self.assertIn('Test', self.module._AccountingDB__rollupTypes)
+
+    # The slices are not added again
+    self.assertTrue(self.module.fillRollup('Test', sliceLength=10 * self.DAY)['OK'])
+    self.assertEqual(len(self.slices), 2)
+
+  def test_resumed(self):
+    """ The filling goes on from the start time kept in the DB
+    """
+    self.mark = [20 * self.DAY, 0]
+    self.assertTrue(self.module.fillRollup('Test', sliceLength=10 * self.DAY)['OK'])
+    self.assertEqual(self.slices, [(25 * self.DAY, 35 * self.DAY)])
+
+  def test_error(self):
+    """ A slice failing is rolled back, and the rollup is not used
+    """
+    self.module.transactionCommit.return_value = S_ERROR("Deadlock")
+    self.assertFalse(self.module.fillRollups(sliceLength=10 * self.DAY)['OK'])
+    self.assertEqual(self.module.transactionRollback.call_count, 1)
+    self.assertNotIn('Test', self.module._AccountingDB__rollupTypes)
+
 #############################################################################
 # Test Suite run
 #############################################################################
@@ -398,4 +779,8 @@ ORDER BY startTime" % (expectedStartTime, expectedEndTime)
 if __name__ == '__main__':
   suite = unittest.defaultTestLoader.loadTestsFromTestCase(TestCase)
   suite.addTest(unittest.defaultTestLoader.loadTestsFromTestCase(MakeQuery))
+  suite.addTest(unittest.defaultTestLoader.loadTestsFromTestCase(BundleInsertion))
+  suite.addTest(unittest.defaultTestLoader.loadTestsFromTestCase(RollupQuery))
+  suite.addTest(unittest.defaultTestLoader.loadTestsFromTestCase(IncrementalCompaction))
+  suite.addTest(unittest.defaultTestLoader.loadTestsFromTestCase(FillRollup))
   testResult = unittest.TextTestRunner(verbosity=2).run(suite)
@@ -0,0 +1,50 @@
+""" Unit tests for the MultiAccountingDB
+"""
+# pylint: disable=protected-access, missing-docstring, invalid-name
+
+import unittest
+
+from mock import MagicMock, patch
+
+from DIRAC import S_OK, S_ERROR
+from DIRAC.AccountingSystem.DB import MultiAccountingDB
+
+
+class IncrementalCompaction(unittest.TestCase):
+
+  def setUp(self):
+    self.dbs = {}
+
+    def getDB(dbName='AccountingDB/AccountingDB', readOnly=False):
+      self.dbs[dbName] = MagicMock()
+      self.dbs[dbName].getRegisteredTypes.return_value = S_OK([])
+      return self.dbs[dbName]
+
+    with patch.object(MultiAccountingDB, 'AccountingDB', side_effect=getDB), \
+            patch.object(MultiAccountingDB, 'TypeLoader') as typeLoader, \
+            patch.object(MultiAccountingDB, 'gConfig') as gConfig:
+      typeLoader.return_value.getTypes.return_value = {'Job': None}
+      gConfig.getOptionsDict.return_value = S_OK({'Job': 'JobAccountingDB'})
+      self.multiDB = MultiAccountingDB.MultiAccountingDB('/Systems/Accounting/Production/Databases/MultiDB')
+
+  def test_sum(self):
+    self.assertEqual(sorted(self.dbs), ['Accounting/JobAccountingDB', 'AccountingDB/AccountingDB'])
+    self.dbs['AccountingDB/AccountingDB'].incrementalCompactBuckets.return_value = S_OK(3)
+    self.dbs['Accounting/JobAccountingDB'].incrementalCompactBuckets.return_value = S_OK(4)
+    result = self.multiDB.incrementalCompactBuckets(timeBudget=5)
+    self.assertEqual(result['Value'], 7)
+    self.dbs['AccountingDB/AccountingDB'].incrementalCompactBuckets.assert_called_once_with(timeBudget=5,
+                                                                                          sliceSize=None)
+
+  def test_error(self):
+    self.dbs['AccountingDB/AccountingDB'].incrementalCompactBuckets.return_value = S_ERROR("Lost connection")
+    self.dbs['Accounting/JobAccountingDB'].incrementalCompactBuckets.return_value = S_OK(4)
+    result = self.multiDB.incrementalCompactBuckets()
+    self.assertFalse(result['OK'])
+    # the other DBs are compacted anyway
+    self.assertTrue(self.dbs['Accounting/JobAccountingDB'].incrementalCompactBuckets.called)
+
+
+if __name__ == '__main__':
+  suite = unittest.defaultTestLoader.loadTestsFromTestCase(IncrementalCompaction)
+  unittest.TextTestRunner(verbosity=2).run(suite)
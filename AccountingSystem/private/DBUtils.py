@@ -2,6 +2,7 @@
 """
 
 from DIRAC.Core.Utilities import Time
+from DIRAC.Core.Utilities.TimeSeries import TimeSeriesArray
 
 
 class DBUtils(object):
@@ -17,7 +18,8 @@ class DBUtils(object):
                             selectFields,
                             condDict=None,
                             groupFields=None,
-                            orderFields=None):
+                            orderFields=None,
+                            useRollup=False):
     """
     Get data from the DB
     Parameters:
@@ -32,6 +34,7 @@ class DBUtils(object):
                        ( "%s, %s", ( "field1name", "field2name", "field3name" ) )
       - orderFields -> list of fields to order by, can be in form
                        ( "%s, %s", ( "field1name", "field2name", "field3name" )
+      - useRollup -> read the daily and weekly buckets from the rollup of the type
     """
     validCondDict = {}
     if isinstance(condDict, dict):
@@ -40,7 +43,7 @@ class DBUtils(object):
           validCondDict[key] = condDict[key]
     return self._acDB.retrieveBucketedData(self._setup, typeName, startTime,
                                            endTime, selectFields,
-                                           condDict, groupFields, orderFields)
+                                           condDict, groupFields, orderFields, useRollup=useRollup)
 
   def _getUniqueValues(self, typeName, startTime, endTime, condDict, fieldList):
     stringList = ["%s" for _field in fieldList]
@@ -83,44 +86,7 @@ class DBUtils(object):
       - field 1: bucketLength
       - fields 2-n: numericalFields
     """
-    normData = {}
-
-    def addToNormData(bucketDate, data, proportion=1.0):
-      if bucketDate in normData:
-        for iP in range(len(data)):
-          val = data[iP]
-          if val is None:
-            val = 0
-          normData[bucketDate][iP] += float(val) * proportion
-        normData[bucketDate][-1] += proportion
-      else:
-        normData[bucketDate] = []
-        for fD in data:
-          if fD is None:
-            fD = 0
-          normData[bucketDate].append(float(fD) * proportion)
-        normData[bucketDate].append(proportion)
-
-    for bucketData in bucketsData:
-      bucketDate = bucketData[0]
-      originalBucketLength = bucketData[1]
-      bucketValues = bucketData[2:]
-      if originalBucketLength == granularity:
-        addToNormData(bucketDate, bucketValues)
-      else:
-        startEpoch = bucketDate
-        endEpoch = bucketDate + originalBucketLength
-        newBucketEpoch = startEpoch - startEpoch % granularity
-        if startEpoch == endEpoch:
-          addToNormData(newBucketEpoch, bucketValues)
-        else:
-          while newBucketEpoch < endEpoch:
-            start = max(newBucketEpoch, startEpoch)
-            end = min(newBucketEpoch + granularity, endEpoch)
-            proportion = float(end - start) / originalBucketLength
-            addToNormData(newBucketEpoch, bucketValues, proportion)
-            newBucketEpoch += granularity
-    return normData
+    return TimeSeriesArray.fromBuckets(granularity, {None: bucketsData}).toDict()[None]
 
   def _sumToGranularity(self, granularity, bucketsData):
     """
@@ -129,10 +95,7 @@ class DBUtils(object):
       - field 1: bucketLength
       - fields 2-n: numericalFields
     """
-    normData = self._spanToGranularity(granularity, bucketsData)
-    for bDate in normData:
-      del(normData[bDate][-1])
-    return normData
+    return self._convertToGranularity(granularity, {None: bucketsData}, "sum")[None]
 
   def _averageToGranularity(self, granularity, bucketsData):
     """
@@ -141,12 +104,18 @@ class DBUtils(object):
       - field 1: bucketLength
       - fields 2-n: numericalFields
     """
-    normData = self._spanToGranularity(granularity, bucketsData)
-    for bDate in normData:
-      for iP in range(len(normData[bDate])):
-        normData[bDate][iP] = float(normData[bDate][iP]) / normData[bDate][-1]
-      del(normData[bDate][-1])
-    return normData
+    return self._convertToGranularity(granularity, {None: bucketsData}, "average")[None]
+
+  def _convertToGranularity(self, granularity, bucketsDict, conversion):
+    """
+    Sum or average the buckets of all the keys to the granularity at once
+      - bucketsDict = { 'key' : bucketsData, 'key2'.. }, bucketsData as for _sumToGranularity
+      - conversion = "sum" or "average"
+    """
+    series = TimeSeriesArray.fromBuckets(granularity, bucketsDict)
+    if conversion == "average":
+      return series.averageToGranularity().toDict()
+    return series.sumToGranularity().toDict()
 
   def _convertNoneToZero(self, bucketsData):
     """
@@ -181,17 +150,8 @@ class DBUtils(object):
     Divide by factor the values and get the maximum value
       - dataDict = { 'key' : { time1 : value,  time2 : value... }, 'key2'.. }
     """
-    maxValue = 0
-    maxEpoch = 0
-    for key in dataDict:
-      currentDict = dataDict[key]
-      for timeEpoch in currentDict:
-        if timeEpoch > maxEpoch:
-          maxEpoch = timeEpoch
-          maxValue = 0
-        if timeEpoch == maxEpoch:
-          maxValue += currentDict[timeEpoch]
-    return maxValue
+    maxEpoch = max([max(currentDict) for currentDict in dataDict.itervalues() if currentDict] or [0])
+    return sum(currentDict.get(maxEpoch, 0) for currentDict in dataDict.itervalues())
 
   def _getMaxValue(self, dataDict):
     """
@@ -296,33 +256,7 @@ class DBUtils(object):
     """
     Get a dict with more than one entry per bucket and list
     """
-    bucketSums = {}
-    # Calculate total sums in buckets
-    for key in dataDict:
-      for timeKey in dataDict[key]:
-        timeData = dataDict[key][timeKey]
-        if len(timeData) < 2:
-          raise Exception(
-              "DataDict must be of the type { <key>:{ <timeKey> : [ field1, field2, ..] } }. With at least two fields")
-        if timeKey not in bucketSums:
-          bucketSums[timeKey] = [0, 0, 0]
-        bucketSums[timeKey][0] += timeData[0]
-        bucketSums[timeKey][1] += timeData[1]
-        bucketSums[timeKey][2] += timeData[0] / timeData[1]
-    # Calculate proportionalFactor
-    for timeKey in bucketSums:
-      timeData = bucketSums[timeKey]
-      if bucketSums[timeKey][0] == 0:
-        bucketSums[timeKey] = 0
-      else:
-        bucketSums[timeKey] = (timeData[0] / timeData[1]) / timeData[2]
-    # Calculate proportional Gauges
-    for key in dataDict:
-      for timeKey in dataDict[key]:
-        timeData = dataDict[key][timeKey]
-        dataDict[key][timeKey] = [(timeData[0] / timeData[1]) * bucketSums[timeKey]]
-
-    return dataDict
+    return TimeSeriesArray.fromDict(dataDict).proportionalGauges().toDict()
 
   def _getBucketTotals(self, dataDict):
     """
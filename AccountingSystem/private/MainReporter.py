@@ -37,13 +37,25 @@ class MainReporter(object):
     self.plotterList = PlottersList()
 
   def __calculateReportHash(self, reportRequest):
+    """
+    Hash of the normalized request: equivalent requests share the cached data and plots
+    """
     requestToHash = dict(reportRequest)
+    # The same data is used whether the plot is generated or not
+    requestToHash.pop('generatePlot', None)
     granularity = gConfig.getValue("%s/CacheTimeGranularity" % self.csSection, 300)
     for key in ('startTime', 'endTime'):
       epoch = requestToHash[key]
       requestToHash[key] = epoch - epoch % granularity
+    condDict = {}
+    for key, values in requestToHash.get('condDict', {}).iteritems():
+      if not isinstance(values, (list, tuple)):
+        values = [values]
+      if values:
+        condDict[key] = sorted(values)
+    requestToHash['condDict'] = condDict
     md5Hash = hashlib.md5()
-    md5Hash.update(repr(requestToHash))
+    md5Hash.update(_stableRepr(requestToHash))
     md5Hash.update(self.setup)
     return md5Hash.hexdigest()
 
@@ -69,3 +81,14 @@ class MainReporter(object):
       return S_ERROR("There's no plotter registered for type %s" % typeName)
     plotter = plotterClass(self._db, self.setup)
     return S_OK(plotter.plotsList())
+
+
+def _stableRepr(obj):
+  """
+  repr of an object with the dictionaries sorted by key
+  """
+  if isinstance(obj, dict):
+    return "{%s}" % ", ".join("%s: %s" % (_stableRepr(key), _stableRepr(obj[key])) for key in sorted(obj))
+  if isinstance(obj, (list, tuple)):
+    return "%s(%s)" % (type(obj).__name__, ", ".join(_stableRepr(item) for item in obj))
+  return repr(obj)
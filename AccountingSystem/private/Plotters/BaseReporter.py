@@ -1,7 +1,9 @@
+import re
 import time
 import copy
 import types
 from DIRAC import S_OK, S_ERROR, gLogger
+from DIRAC.Core.Utilities import Time
 from DIRAC.AccountingSystem.private.DBUtils import DBUtils
 from DIRAC.Core.Utilities.Plotting import gDataCache
 from DIRAC.Core.Utilities.Plotting.Plots import generateNoDataPlot,\
@@ -20,6 +22,13 @@ class BaseReporter(DBUtils):
   _VALID_PARAM_CONVERT_TO_GRANULARITY = ('sum', 'average')
   _PARAM_CONSOLIDATION_FUNCTION = "consolidationFunction"
 
+  # Selected values which can be added over time, and then read from the rollup of the type
+  _ADDITIVE_SELECTION_RE = re.compile(r"^\s*(%s|'[^']*'|SUM\(\s*%s\s*\)(\s*/\s*[\d.]+)?)\s*$")
+  # Life time of the report data, when the report does not include the latest bucket:
+  # records keep arriving late into the past buckets
+  _PAST_DATA_LIFETIME = 600
+  _LATEST_DATA_LIFETIME = 600
+
   _EA_THUMBNAIL = 'thumbnail'
   _EA_WIDTH = 'width'
   _EA_HEIGHT = 'height'
@@ -196,7 +205,20 @@ class BaseReporter(DBUtils):
       funcObj = getattr(self, funcName)
     except BaseException:
       return S_ERROR("Report %s is not defined" % reportRequest['reportName'])
-    return gDataCache.getReportData(reportRequest, reportHash, funcObj)
+    return gDataCache.getReportData(reportRequest, reportHash, funcObj,
+                                    lifeTime=self.__getDataLifeTime(reportRequest))
+
+  def __getDataLifeTime(self, reportRequest):
+    """
+    The data of a report including the latest bucket is valid until the end of this bucket,
+    older data is kept as long as before, since late records may still be added to it
+    """
+    nowEpoch = Time.toEpoch()
+    bucketLength = self._getBucketLengthForTime(self._typeName, nowEpoch)
+    latestBucketStart = nowEpoch - nowEpoch % bucketLength
+    if reportRequest['endTime'] < latestBucketStart:
+      return self._PAST_DATA_LIFETIME
+    return max(1, min(self._LATEST_DATA_LIFETIME, latestBucketStart + bucketLength - nowEpoch))
 
   def __generatePlotForReport(self, reportRequest, reportHash, reportData):
     funcName = "_plot%s" % reportRequest['reportName']
@@ -227,33 +249,51 @@ class BaseReporter(DBUtils):
         condDict[keyword] = preCondDict[keyword]
     # Query!
     timeGrouping = ("%%s, %s" % groupingFields[0], ['startTime'] + groupingFields[1])
+    # Sums over time do not depend on the length of the buckets
+    useRollup = metadataDict[self._PARAM_CONVERT_TO_GRANULARITY] == "sum" and \
+        self._isAdditiveSelection(selectFields, groupingFields)
     retVal = self._retrieveBucketedData(self._typeName,
                                         startTime,
                                         endTime,
                                         selectFields,
                                         condDict,
                                         timeGrouping,
-                                        ('%s', ['startTime'])
+                                        ('%s', ['startTime']),
+                                        useRollup=useRollup
                                         )
     if not retVal['OK']:
       return retVal
     dataDict = self._groupByField(0, retVal['Value'])
     coarsestGranularity = self._getBucketLengthForTime(self._typeName, startTime)
     # Transform!
-    for keyField in dataDict:
-      if metadataDict[self._PARAM_CHECK_FOR_NONE]:
+    if metadataDict[self._PARAM_CHECK_FOR_NONE]:
+      for keyField in dataDict:
         dataDict[keyField] = self._convertNoneToZero(dataDict[keyField])
-      if metadataDict[self._PARAM_CONVERT_TO_GRANULARITY] == "average":
-        dataDict[keyField] = self._averageToGranularity(coarsestGranularity, dataDict[keyField])
-      if metadataDict[self._PARAM_CONVERT_TO_GRANULARITY] == "sum":
-        dataDict[keyField] = self._sumToGranularity(coarsestGranularity, dataDict[keyField])
-      if self._PARAM_CONSOLIDATION_FUNCTION in metadataDict:
+    # All the keys at once
+    dataDict = self._convertToGranularity(coarsestGranularity, dataDict,
+                                          metadataDict[self._PARAM_CONVERT_TO_GRANULARITY])
+    if self._PARAM_CONSOLIDATION_FUNCTION in metadataDict:
+      for keyField in dataDict:
         dataDict[keyField] = self._executeConsolidation(
             metadataDict[self._PARAM_CONSOLIDATION_FUNCTION], dataDict[keyField])
     if metadataDict[self._PARAM_CALCULATE_PROPORTIONAL_GAUGES]:
       dataDict = self._calculateProportionalGauges(dataDict)
     return S_OK((dataDict, coarsestGranularity))
 
+  def _isAdditiveSelection(self, selectFields, groupingFields):
+    """
+    Check that the selected values are only fields, constants or sums of fields, which give
+    the same result once added over time whatever the length of the buckets
+    """
+    selectString = selectFields[0]
+    groupingString = self._getSelectStringForGrouping(groupingFields)
+    if selectString.startswith(groupingString):
+      selectString = selectString[len(groupingString):].lstrip(" ,")
+    for selection in selectString.split(","):
+      if not self._ADDITIVE_SELECTION_RE.match(selection):
+        return False
+    return True
+
   def _executeConsolidation(self, functor, dataDict):
     for timeKey in dataDict:
       dataDict[timeKey] = [functor(*dataDict[timeKey])]
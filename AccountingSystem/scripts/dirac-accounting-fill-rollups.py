@@ -0,0 +1,39 @@
+#!/usr/bin/env python
+########################################################################
+# File :    dirac-accounting-fill-rollups
+########################################################################
+"""
+  Fill the rollups of the accounting types created before them, from their buckets
+"""
+__RCSID__ = "$Id$"
+
+from DIRAC.Core.Base import Script
+from DIRAC import gLogger, exit as DIRACExit
+
+Script.registerSwitch("D:", "days=", "Days of buckets added at once (30 by default)")
+Script.setUsageMessage('\n'.join([__doc__.split('\n')[1],
+                                  'Usage:',
+                                  '  %s [option|cfgfile]' % Script.scriptName,
+                                  '',
+                                  'To run on a host with access to the Accounting databases, while the DataStore',
+                                  'services are stopped: the records inserted meanwhile may be missing from the',
+                                  'rollups.',
+                                  'It can be interrupted and run again, the filling goes on where it stopped.']))
+Script.parseCommandLine()
+
+# pylint: disable=wrong-import-position
+from DIRAC.AccountingSystem.DB.MultiAccountingDB import MultiAccountingDB
+from DIRAC.ConfigurationSystem.Client import PathFinder
+
+sliceLength = None
+for switch, value in Script.getUnprocessedSwitches():
+  if switch in ("D", "days"):
+    sliceLength = int(value) * 86400
+
+acDB = MultiAccountingDB(PathFinder.getDatabaseSection("Accounting/MultiDB"))
+result = acDB.fillRollups(sliceLength)  # pylint: disable=no-member
+if not result['OK']:
+  gLogger.error("Could not fill the rollups", result['Message'])
+  DIRACExit(1)
+gLogger.notice("The rollups are filled")
+DIRACExit(0)
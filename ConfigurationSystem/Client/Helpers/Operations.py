@@ -86,26 +86,32 @@ class Operations(object):
       The /Operations CFG section is maintained in a cache by an Operations object
   """
 
+  # Merged /Operations views shared by all the instances, per (vo, setup), for one merged CFG
   __cache = {}
-  __cacheVersion = 0
+  __cacheCFG = None
+  __cacheHits = 0
+  __cacheMisses = 0
   __cacheLock = LockRing.LockRing().getLock()
 
   def __init__(self, vo=False, group=False, setup=False):
     """ c'tor
 
-        Setting some defaults
+        Setting some defaults. The vo and the setup are only discovered when first needed,
+        so that creating an Operations object is cheap
     """
     self.__uVO = vo
     self.__uGroup = group
     self.__uSetup = setup
     self.__vo = False
     self.__setup = False
-    self.__discoverSettings()
+    self.__discovered = False
 
   def __discoverSettings(self):
     """ Discovers the vo and the setup
     """
+    self.__discovered = True
     # Set the VO
+    self.__vo = False
     globalVO = CSGlobals.getVO()
     if globalVO:
       self.__vo = globalVO
@@ -127,23 +133,29 @@ class Operations(object):
       self.__setup = CSGlobals.getSetup()
 
   def __getCache(self):
+    if not self.__discovered:
+      self.__discoverSettings()
     Operations.__cacheLock.acquire()
     try:
-      currentVersion = gConfigurationData.getVersion()
-      if currentVersion != Operations.__cacheVersion:
+      # A new merged CFG is built for each new version of the configuration, local changes included
+      currentCFG = gConfigurationData.mergedCFG
+      if currentCFG is not Operations.__cacheCFG:
         Operations.__cache = {}
-        Operations.__cacheVersion = currentVersion
+        Operations.__cacheCFG = currentCFG
 
       cacheKey = (self.__vo, self.__setup)
       if cacheKey in Operations.__cache:
+        Operations.__cacheHits += 1
         return Operations.__cache[cacheKey]
+      Operations.__cacheMisses += 1
 
       mergedCFG = CFG.CFG()
 
       for path in self.__getSearchPaths():
-        pathCFG = gConfigurationData.mergedCFG[path]
+        pathCFG = currentCFG[path]
         if pathCFG:
-          mergedCFG = mergedCFG.mergeWith(pathCFG)
+          # The merged view is only read, it can share the sections of the configuration
+          mergedCFG = mergedCFG.mergeWith(pathCFG, shareSections=True)
 
       Operations.__cache[cacheKey] = mergedCFG
 
@@ -154,6 +166,16 @@ class Operations(object):
       except thread.error:
         pass
 
+  @classmethod
+  def getCacheStats(cls):
+    """ Statistics of the cache of the merged /Operations views shared by the Operations objects
+
+        :return: dict with the number of Hits and Misses, and the number of cached Entries
+    """
+    return {'Hits': cls.__cacheHits,
+            'Misses': cls.__cacheMisses,
+            'Entries': len(cls.__cache)}
+
   @deprecated("unused")
   def setVO(self, vo):
     """ False to auto detect VO
@@ -176,6 +198,8 @@ class Operations(object):
     self.__discoverSettings()
 
   def __getSearchPaths(self):
+    if not self.__discovered:
+      self.__discoverSettings()
     paths = ["/Operations/Defaults", "/Operations/%s" % self.__setup]
     if not self.__vo:
       globalVO = CSGlobals.getVO()
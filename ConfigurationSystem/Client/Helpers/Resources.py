@@ -4,11 +4,14 @@
 __RCSID__ = "$Id$"
 
 import re
+import threading
 import urlparse
 from distutils.version import LooseVersion  # pylint: disable=no-name-in-module,import-error
 
 from DIRAC import S_OK, S_ERROR, gConfig
+from DIRAC.ConfigurationSystem.Client.ConfigurationData import gConfigurationData
 from DIRAC.ConfigurationSystem.Client.Helpers.Path import cfgPath
+from DIRAC.Core.Utilities.CFG import CFG
 from DIRAC.Core.Utilities.List import uniqueElements, fromChar
 from DIRAC.Core.Utilities.Decorators import deprecated
 
@@ -16,38 +19,165 @@ from DIRAC.Core.Utilities.Decorators import deprecated
 gBaseResourcesSection = "/Resources"
 
 
+class ResourcesTopology(object):
+  """ Index of the sites of /Resources/Sites, with their computing elements, queues and storage elements,
+      and of the storage elements of /Resources/StorageElements.
+
+      It is built once for each version of the configuration and shared by the helpers
+      that would otherwise walk the /Resources/Sites section at each call
+  """
+
+  __cache = None
+  __cacheCFG = None
+  __cacheLock = threading.Lock()
+
+  def __init__(self, sitesCFG, storageElementsCFG):
+    """ c'tor
+
+        :param sitesCFG: CFG of the /Resources/Sites section
+        :param storageElementsCFG: CFG of the /Resources/StorageElements section, or None
+    """
+    # Grids and sites in the order of the configuration
+    self.grids = []
+    self.sites = []
+    self.gridSites = {}
+    self.siteGrid = {}
+    # Values of the VO, CE and SE options of the sites
+    self.siteVOs = {}
+    self.siteCEs = {}
+    self.siteSEs = {}
+    # Sites having a CE in their CE option, in the order of the configuration
+    self.ceSites = {}
+    # Computing elements of the sites having queues, see __indexCEs
+    self.siteQueues = {}
+    # Storage elements of /Resources/StorageElements (None without the section),
+    # and the ones defined with a BaseSE or an Alias for each of them
+    self.storageElements = None
+    self.equivalentSEs = {}
+    # SEs of the SE option of the sites, with their equivalent SEs
+    self.siteLocalSEs = {}
+
+    if storageElementsCFG is not None:
+      self.storageElements = storageElementsCFG.listSections()
+      for se in self.storageElements:
+        seCFG = storageElementsCFG[se]
+        for option in ('BaseSE', 'Alias'):
+          if seCFG.isOption(option) and seCFG[option]:
+            self.equivalentSEs.setdefault(seCFG[option], []).append(se)
+            break
+
+    for grid in sitesCFG.listSections():
+      gridCFG = sitesCFG[grid]
+      sites = gridCFG.listSections()
+      self.grids.append(grid)
+      self.gridSites[grid] = sites
+      self.sites.extend(sites)
+      for site in sites:
+        siteCFG = gridCFG[site]
+        self.siteGrid[site] = grid
+        self.siteVOs[site] = self.__listOption(siteCFG, 'VO')
+        self.siteCEs[site] = self.__listOption(siteCFG, 'CE')
+        self.siteSEs[site] = self.__listOption(siteCFG, 'SE')
+        for ce in self.siteCEs[site]:
+          self.ceSites.setdefault(ce, []).append(site)
+        self.siteQueues[site] = self.__indexCEs(siteCFG)
+        if self.siteSEs[site]:
+          localSEs = self.siteLocalSEs.setdefault(site, set())
+          localSEs.update(self.siteSEs[site])
+          localSEs.update(eqSE for se in self.siteSEs[site] for eqSE in self.equivalentSEs.get(se, []))
+
+  @staticmethod
+  def __listOption(cfg, option):
+    """ Same as gConfig.getValue( path, [] )
+    """
+    if cfg.isOption(option):
+      return fromChar(cfg[option], ',')
+    return []
+
+  @staticmethod
+  def __optionsDict(cfg):
+    """ Same as gConfig.getOptionsDict( path )[ 'Value' ]
+    """
+    return dict((option, cfg[option]) for option in cfg.listOptions())
+
+  def __indexCEs(self, siteCFG):
+    """ Index the CEs section of a site
+
+        :return: list of dict for the CEs having a Queues section, with the options getQueues selects on,
+                 the options of the CE including the ones defined for all the CEs of the site,
+                 and a list of ( queue name, VO option of the queue, options of the queue )
+    """
+    if not siteCFG.isSection('CEs'):
+      return []
+    cesCFG = siteCFG['CEs']
+    siteCEOptions = self.__optionsDict(cesCFG)
+    ces = []
+    for ce in cesCFG.listSections():
+      ceCFG = cesCFG[ce]
+      if not ceCFG.isSection('Queues'):
+        continue
+      ceOptions = dict(siteCEOptions)
+      ceOptions.update(self.__optionsDict(ceCFG))
+      queuesCFG = ceCFG['Queues']
+      ces.append({'Name': ce,
+                  'SubmissionMode': ceCFG['SubmissionMode'] if ceCFG.isOption('SubmissionMode') else 'Direct',
+                  'CEType': ceCFG['CEType'] if ceCFG.isOption('CEType') else '',
+                  'VO': self.__listOption(ceCFG, 'VO'),
+                  'Options': ceOptions,
+                  'Queues': [(queue, self.__listOption(queuesCFG[queue], 'VO'), self.__optionsDict(queuesCFG[queue]))
+                             for queue in queuesCFG.listSections()]})
+    return ces
+
+  @classmethod
+  def getTopology(cls):
+    """ Get the index of the current version of the configuration
+
+        :return: S_OK( ResourcesTopology ) or S_ERROR if there is no /Resources/Sites section
+    """
+    sitesPath = cfgPath(gBaseResourcesSection, 'Sites')
+    # Also refreshes the configuration if needed
+    result = gConfig.getSections(sitesPath)
+    if not result['OK']:
+      return result
+    with cls.__cacheLock:
+      # A new merged CFG is built for each new version of the configuration
+      mergedCFG = gConfigurationData.mergedCFG
+      if mergedCFG is not cls.__cacheCFG:
+        sitesCFG = mergedCFG[sitesPath]
+        if not isinstance(sitesCFG, CFG):
+          return S_ERROR("Path %s does not exist or it's not a section" % sitesPath)
+        storageElementsCFG = mergedCFG[cfgPath(gBaseResourcesSection, 'StorageElements')]
+        if not isinstance(storageElementsCFG, CFG):
+          storageElementsCFG = None
+        cls.__cache = cls(sitesCFG, storageElementsCFG)
+        cls.__cacheCFG = mergedCFG
+      return S_OK(cls.__cache)
+
+
 def getSites():
   """ Get the list of all the sites defined in the CS
   """
-  result = gConfig.getSections(cfgPath(gBaseResourcesSection, 'Sites'))
+  result = ResourcesTopology.getTopology()
   if not result['OK']:
     return result
-  grids = result['Value']
-  sites = []
-  for grid in grids:
-    result = gConfig.getSections(cfgPath(gBaseResourcesSection, 'Sites', grid))
-    if not result['OK']:
-      return result
-    sites += result['Value']
-
-  return S_OK(sites)
+  return S_OK(list(result['Value'].sites))
 
 
 @deprecated("Only for FTS2")
 def getStorageElementSiteMapping(siteList=None):
   """ Get Storage Element belonging to the given sites
   """
+  result = ResourcesTopology.getTopology()
+  if not result['OK']:
+    return result
+  topology = result['Value']
   if not siteList:
-    result = getSites()
-    if not result['OK']:
-      return result
-    siteList = result['Value']
+    siteList = topology.sites
   siteDict = {}
   for site in siteList:
-    grid = site.split('.')[0]
-    ses = gConfig.getValue(cfgPath(gBaseResourcesSection, 'Sites', grid, site, 'SE'), [])
+    ses = topology.siteSEs.get(site)
     if ses:
-      siteDict[site] = ses
+      siteDict[site] = list(ses)
 
   return S_OK(siteDict)
 
@@ -201,70 +331,44 @@ def getQueues(siteList=None, ceList=None, ceTypeList=None, community=None, mode=
   """ Get CE/queue options according to the specified selection
   """
 
-  result = gConfig.getSections('/Resources/Sites')
+  result = ResourcesTopology.getTopology()
   if not result['OK']:
     return result
+  topology = result['Value']
 
   resultDict = {}
 
-  grids = result['Value']
-  for grid in grids:
-    result = gConfig.getSections('/Resources/Sites/%s' % grid)
-    if not result['OK']:
+  for site in topology.sites:
+    if siteList is not None and site not in siteList:
       continue
-    sites = result['Value']
-    for site in sites:
-      if siteList is not None and site not in siteList:
+    if community:
+      comList = topology.siteVOs[site]
+      if comList and community not in comList:
         continue
-      if community:
-        comList = gConfig.getValue('/Resources/Sites/%s/%s/VO' % (grid, site), [])
-        if comList and community not in comList:
+    for ceDict in topology.siteQueues[site]:
+      ce = ceDict['Name']
+      if mode:
+        ceMode = ceDict['SubmissionMode']
+        if not ceMode or ceMode != mode:
           continue
-      siteCEParameters = {}
-      result = gConfig.getOptionsDict('/Resources/Sites/%s/%s/CEs' % (grid, site))
-      if result['OK']:
-        siteCEParameters = result['Value']
-      result = gConfig.getSections('/Resources/Sites/%s/%s/CEs' % (grid, site))
-      if not result['OK']:
-        continue
-      ces = result['Value']
-      for ce in ces:
-        if mode:
-          ceMode = gConfig.getValue('/Resources/Sites/%s/%s/CEs/%s/SubmissionMode' % (grid, site, ce), 'Direct')
-          if not ceMode or ceMode != mode:
-            continue
-        if ceTypeList:
-          ceType = gConfig.getValue('/Resources/Sites/%s/%s/CEs/%s/CEType' % (grid, site, ce), '')
-          if not ceType or ceType not in ceTypeList:
-            continue
-        if ceList is not None and ce not in ceList:
+      if ceTypeList:
+        ceType = ceDict['CEType']
+        if not ceType or ceType not in ceTypeList:
           continue
-        if community:
-          comList = gConfig.getValue('/Resources/Sites/%s/%s/CEs/%s/VO' % (grid, site, ce), [])
-          if comList and community not in comList:
-            continue
-        ceOptionsDict = dict(siteCEParameters)
-        result = gConfig.getOptionsDict('/Resources/Sites/%s/%s/CEs/%s' % (grid, site, ce))
-        if not result['OK']:
+      if ceList is not None and ce not in ceList:
+        continue
+      if community:
+        comList = ceDict['VO']
+        if comList and community not in comList:
           continue
-        ceOptionsDict.update(result['Value'])
-        result = gConfig.getSections('/Resources/Sites/%s/%s/CEs/%s/Queues' % (grid, site, ce))
-        if not result['OK']:
+      for queue, comList, queueOptionsDict in ceDict['Queues']:
+        if community and comList and community not in comList:
           continue
-        queues = result['Value']
-        for queue in queues:
-          if community:
-            comList = gConfig.getValue('/Resources/Sites/%s/%s/CEs/%s/Queues/%s/VO' % (grid, site, ce, queue), [])
-            if comList and community not in comList:
-              continue
-          resultDict.setdefault(site, {})
-          resultDict[site].setdefault(ce, ceOptionsDict)
-          resultDict[site][ce].setdefault('Queues', {})
-          result = gConfig.getOptionsDict('/Resources/Sites/%s/%s/CEs/%s/Queues/%s' % (grid, site, ce, queue))
-          if not result['OK']:
-            continue
-          queueOptionsDict = result['Value']
-          resultDict[site][ce]['Queues'][queue] = queueOptionsDict
+        resultDict.setdefault(site, {})
+        # Copies, the callers may modify them
+        resultDict[site].setdefault(ce, dict(ceDict['Options']))
+        resultDict[site][ce].setdefault('Queues', {})
+        resultDict[site][ce]['Queues'][queue] = dict(queueOptionsDict)
 
   return S_OK(resultDict)
 
@@ -10,10 +10,12 @@ class HelpersTestCase( unittest.TestCase ):
   def setUp( self ):
     self.gConfigMock = Mock()
     self.resourcesHelper = importlib.import_module( 'DIRAC.ConfigurationSystem.Client.Helpers.Resources' )
+    self.gConfig = self.resourcesHelper.gConfig
     self.resourcesHelper.gConfig = self.gConfigMock
 
   def tearDown( self ):
 
+    self.resourcesHelper.gConfig = self.gConfig
     del self.resourcesHelper
 
 
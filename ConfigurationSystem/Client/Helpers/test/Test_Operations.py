@@ -0,0 +1,103 @@
+""" Unit tests for the cache of the /Operations views shared by the Operations helpers
+"""
+# pylint: disable=protected-access, missing-docstring, invalid-name
+
+import unittest
+
+from mock import patch
+
+from DIRAC.ConfigurationSystem.Client.ConfigurationData import gConfigurationData
+from DIRAC.ConfigurationSystem.Client.Helpers import Operations as OperationsModule
+from DIRAC.ConfigurationSystem.Client.Helpers.Operations import Operations
+from DIRAC.Core.Utilities.CFG import CFG
+
+OPERATIONS_CFG = """
+DIRAC
+{
+  Setup = Production
+}
+Operations
+{
+  Defaults
+  {
+    Matching
+    {
+      Option = default
+      DefaultOnly = yes
+    }
+  }
+  Production
+  {
+    Matching
+    {
+      Option = production
+    }
+  }
+  myVO
+  {
+    Defaults
+    {
+      Matching
+      {
+        VOOption = vo
+      }
+    }
+  }
+}
+"""
+
+
+class OperationsCacheTestCase(unittest.TestCase):
+
+  def setUp(self):
+    self.cfg = CFG().loadFromBuffer(OPERATIONS_CFG)
+    gConfigurationData.remoteCFG = CFG()
+    gConfigurationData.localCFG = self.cfg
+    gConfigurationData.sync()
+    patcher = patch.object(OperationsModule, 'getVOfromProxyGroup', return_value={'OK': False, 'Message': ''})
+    self.proxyMock = patcher.start()
+    self.addCleanup(patcher.stop)
+
+  def tearDown(self):
+    gConfigurationData.localCFG = CFG()
+    gConfigurationData.remoteCFG = CFG()
+    gConfigurationData.mergedCFG = CFG()
+    gConfigurationData.generateNewVersion()
+
+  def test_sharedCache(self):
+    stats = Operations.getCacheStats()
+    ops = [Operations() for _ in xrange(10)]
+    # Nothing is discovered nor merged before the first lookup
+    self.assertFalse(self.proxyMock.called)
+    self.assertEqual(Operations.getCacheStats(), stats)
+
+    for op in ops:
+      self.assertEqual(op.getValue('Matching/Option'), 'production')
+      self.assertEqual(op.getValue('Matching/DefaultOnly'), 'yes')
+      self.assertIsNone(op.getValue('Matching/VOOption'))
+    voOps = Operations(vo='myVO')
+    self.assertEqual(voOps.getValue('Matching/VOOption'), 'vo')
+    self.assertEqual(voOps.getOptionsDict('Matching')['Value'],
+                     {'Option': 'production', 'DefaultOnly': 'yes', 'VOOption': 'vo'})
+
+    newStats = Operations.getCacheStats()
+    # One merge per (vo, setup)
+    self.assertEqual(newStats['Misses'] - stats['Misses'], 2)
+    self.assertEqual(newStats['Hits'] - stats['Hits'], 30)
+    self.assertEqual(newStats['Entries'], 2)
+
+  def test_invalidatedOnChange(self):
+    op = Operations()
+    self.assertEqual(op.getValue('Matching/Option'), 'production')
+    # Local changes also give a new merged configuration
+    gConfigurationData.setOptionInCFG('/Operations/Production/Matching/Option', 'changed')
+    self.assertEqual(op.getValue('Matching/Option'), 'changed')
+    self.assertEqual(Operations.getCacheStats()['Entries'], 1)
+    self.assertEqual(Operations(setup='Certification').getValue('Matching/Option'), 'default')
+    # The merged views do not modify the configuration
+    self.assertEqual(gConfigurationData.extractOptionFromCFG('/Operations/Defaults/Matching/Option'), 'default')
+
+
+if __name__ == '__main__':
+  suite = unittest.defaultTestLoader.loadTestsFromTestCase(OperationsCacheTestCase)
+  unittest.TextTestRunner(verbosity=2).run(suite)
@@ -0,0 +1,173 @@
+""" Unit tests for the index of /Resources/Sites used by the resources helpers
+"""
+# pylint: disable=protected-access, missing-docstring, invalid-name
+
+import unittest
+
+from DIRAC.ConfigurationSystem.Client.ConfigurationData import gConfigurationData
+from DIRAC.ConfigurationSystem.Client.Helpers.Resources import ResourcesTopology, getQueues, getSites
+from DIRAC.Core.Utilities.CFG import CFG
+from DIRAC.Core.Utilities.SiteCEMapping import getSiteForCE, getCESiteMapping, getSiteCEMapping
+from DIRAC.DataManagementSystem.Utilities.DMSHelpers import DMSHelpers, LOCAL
+
+RESOURCES_CFG = """
+Resources
+{
+  Sites
+  {
+    LCG
+    {
+      LCG.CERN.ch
+      {
+        CE = ce1.cern.ch, ce2.cern.ch
+        SE = CERN-DISK
+        CEs
+        {
+          GridEnv = /etc/profile
+          ce1.cern.ch
+          {
+            CEType = HTCondorCE
+            Queues
+            {
+              short
+              {
+                maxCPUTime = 60
+              }
+              vo2only
+              {
+                VO = vo2
+              }
+            }
+          }
+          ce2.cern.ch
+          {
+            CEType = ARC
+            SubmissionMode = Indirect
+            VO = vo2
+            Queues
+            {
+              long
+              {
+                maxCPUTime = 2880
+              }
+            }
+          }
+          ce3.cern.ch
+          {
+            CEType = ARC
+          }
+        }
+      }
+    }
+    ARC
+    {
+      ARC.Nordic.se
+      {
+        CE = ce1.nordic.se
+        SE = NORDIC-DISK
+        VO = vo2
+        CEs
+        {
+          ce1.nordic.se
+          {
+            CEType = ARC
+            Queues
+            {
+              default
+              {
+              }
+            }
+          }
+        }
+      }
+    }
+  }
+  StorageElements
+  {
+    CERN-DISK
+    {
+    }
+    CERN-USER
+    {
+      BaseSE = CERN-DISK
+    }
+    NORDIC-DISK
+    {
+    }
+  }
+}
+"""
+
+
+class ResourcesTopologyTestCase(unittest.TestCase):
+
+  def setUp(self):
+    gConfigurationData.remoteCFG = CFG()
+    gConfigurationData.localCFG = CFG().loadFromBuffer(RESOURCES_CFG)
+    gConfigurationData.sync()
+
+  def tearDown(self):
+    gConfigurationData.localCFG = CFG()
+    gConfigurationData.remoteCFG = CFG()
+    gConfigurationData.mergedCFG = CFG()
+    gConfigurationData.generateNewVersion()
+
+  def test_index(self):
+    topology = ResourcesTopology.getTopology()['Value']
+    self.assertTrue(ResourcesTopology.getTopology()['Value'] is topology)
+    self.assertEqual(topology.sites, ['LCG.CERN.ch', 'ARC.Nordic.se'])
+    self.assertEqual(topology.gridSites, {'LCG': ['LCG.CERN.ch'], 'ARC': ['ARC.Nordic.se']})
+    self.assertEqual(topology.ceSites['ce1.nordic.se'], ['ARC.Nordic.se'])
+    self.assertEqual(topology.equivalentSEs, {'CERN-DISK': ['CERN-USER']})
+    self.assertEqual(topology.siteLocalSEs['LCG.CERN.ch'], set(['CERN-DISK', 'CERN-USER']))
+    # The CEs without queues are not indexed
+    self.assertEqual([ceDict['Name'] for ceDict in topology.siteQueues['LCG.CERN.ch']], ['ce1.cern.ch', 'ce2.cern.ch'])
+
+  def test_getQueues(self):
+    queues = getQueues()['Value']
+    self.assertEqual(sorted(queues), ['ARC.Nordic.se', 'LCG.CERN.ch'])
+    self.assertEqual(queues['LCG.CERN.ch']['ce1.cern.ch'],
+                     {'GridEnv': '/etc/profile', 'CEType': 'HTCondorCE',
+                      'Queues': {'short': {'maxCPUTime': '60'}, 'vo2only': {'VO': 'vo2'}}})
+    self.assertEqual(getQueues(community='vo1')['Value'].keys(), ['LCG.CERN.ch'])
+    self.assertEqual(getQueues(community='vo1')['Value']['LCG.CERN.ch'].keys(), ['ce1.cern.ch'])
+    self.assertEqual(getQueues(community='vo1')['Value']['LCG.CERN.ch']['ce1.cern.ch']['Queues'].keys(), ['short'])
+    self.assertEqual(getQueues(mode='Indirect')['Value'].keys(), ['LCG.CERN.ch'])
+    self.assertEqual(getQueues(ceTypeList=['ARC'])['Value']['LCG.CERN.ch'].keys(), ['ce2.cern.ch'])
+    self.assertEqual(getQueues(siteList=['ARC.Nordic.se'], ceList=['ce1.nordic.se'])['Value'].keys(),
+                     ['ARC.Nordic.se'])
+
+    # The results are copies
+    queues['LCG.CERN.ch']['ce1.cern.ch']['Queues']['short']['maxCPUTime'] = '0'
+    self.assertEqual(getQueues()['Value']['LCG.CERN.ch']['ce1.cern.ch']['Queues']['short']['maxCPUTime'], '60')
+
+  def test_siteCEMapping(self):
+    self.assertEqual(getSites()['Value'], ['LCG.CERN.ch', 'ARC.Nordic.se'])
+    self.assertEqual(getSiteCEMapping('ARC')['Value'], {'ARC.Nordic.se': ['ce1.nordic.se']})
+    self.assertEqual(getCESiteMapping()['Value']['ce2.cern.ch'], 'LCG.CERN.ch')
+    self.assertFalse(getCESiteMapping('Unknown')['OK'])
+    self.assertEqual(getSiteForCE('ce1.nordic.se')['Value'], 'ARC.Nordic.se')
+    self.assertEqual(getSiteForCE('unknown.ce')['Value'], '')
+
+  def test_dmsHelpers(self):
+    helper = DMSHelpers()
+    self.assertEqual(helper.getSiteSEMapping()['Value'][LOCAL],
+                     {'LCG.CERN.ch': set(['CERN-DISK', 'CERN-USER']), 'ARC.Nordic.se': set(['NORDIC-DISK'])})
+    self.assertEqual(helper.getSitesForSE('CERN-USER')['Value'], ['LCG.CERN.ch'])
+
+  def test_newVersion(self):
+    topology = ResourcesTopology.getTopology()['Value']
+    gConfigurationData.setOptionInCFG('/Resources/Sites/ARC/ARC.Nordic.se/CE', 'ce2.nordic.se')
+    self.assertFalse(ResourcesTopology.getTopology()['Value'] is topology)
+    self.assertEqual(getSiteForCE('ce2.nordic.se')['Value'], 'ARC.Nordic.se')
+    self.assertEqual(getSiteForCE('ce1.nordic.se')['Value'], '')
+
+    gConfigurationData.localCFG = CFG()
+    gConfigurationData.sync()
+    self.assertFalse(ResourcesTopology.getTopology()['OK'])
+    self.assertFalse(getQueues()['OK'])
+
+
+if __name__ == '__main__':
+  suite = unittest.defaultTestLoader.loadTestsFromTestCase(ResourcesTopologyTestCase)
+  unittest.TextTestRunner(verbosity=2).run(suite)
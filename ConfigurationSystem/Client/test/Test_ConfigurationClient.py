@@ -0,0 +1,88 @@
+""" Unit tests for the cache of the values returned by ConfigurationClient.getOption
+"""
+# pylint: disable=protected-access, missing-docstring, invalid-name
+
+import unittest
+
+from mock import patch
+
+from DIRAC.ConfigurationSystem.private.ConfigurationClient import ConfigurationClient
+from DIRAC.ConfigurationSystem.Client.ConfigurationData import gConfigurationData
+from DIRAC.ConfigurationSystem.private.Refresher import gRefresher
+from DIRAC.Core.Utilities.CFG import CFG
+
+
+class TestOptionCache(unittest.TestCase):
+
+  def setUp(self):
+    cfg = CFG()
+    cfg.loadFromBuffer("""
+    Test
+    {
+      Number = 5
+      Sites = LCG.CERN.ch, LCG.CNAF.it
+      Enabled = yes
+    }
+    """)
+    self.gConfig = ConfigurationClient()
+    self.gConfig.loadCFG(cfg)
+
+  def tearDown(self):
+    gConfigurationData.localCFG = CFG()
+    gConfigurationData.remoteCFG = CFG()
+    gConfigurationData.mergedCFG = CFG()
+    gConfigurationData.generateNewVersion()
+
+  def test_cachedByType(self):
+    with patch.object(gConfigurationData, 'extractOptionFromCFG',
+                      wraps=gConfigurationData.extractOptionFromCFG) as extractMock:
+      for _ in xrange(3):
+        self.assertEqual(self.gConfig.getValue('/Test/Number', 0), 5)
+        self.assertEqual(self.gConfig.getValue('/Test/Number'), '5')
+        self.assertEqual(self.gConfig.getValue('/Test/Enabled', False), True)
+        self.assertEqual(self.gConfig.getValue('/Test/Missing', 'default'), 'default')
+        self.assertFalse(self.gConfig.getOption('/Test/Missing')['OK'])
+      # Once per path and type
+      self.assertEqual(extractMock.call_count, 5)
+
+  def test_refreshedOnce(self):
+    with patch.object(gRefresher, 'refreshConfigurationIfNeeded') as refreshMock:
+      self.assertEqual(self.gConfig.getValue('/Test/Number', 0), 5)
+      self.assertEqual(self.gConfig.getValue('/Test/Number', 0), 5)
+      self.assertEqual(self.gConfig.getValue('/Test/Missing', 0), 0)
+      self.assertEqual(refreshMock.call_count, 3)
+
+  def test_castErrorsNotCached(self):
+    result = self.gConfig.getOption('/Test/Sites', 0)
+    self.assertFalse(result['OK'])
+    self.assertIn('Type mismatch', result['Message'])
+    self.assertEqual(self.gConfig.getValue('/Test/Sites', 3), 3)
+
+  def test_containersAreCopies(self):
+    sites = self.gConfig.getValue('/Test/Sites', [])
+    self.assertEqual(sites, ['LCG.CERN.ch', 'LCG.CNAF.it'])
+    sites.append('LCG.PIC.es')
+    self.assertEqual(self.gConfig.getValue('/Test/Sites', []), ['LCG.CERN.ch', 'LCG.CNAF.it'])
+    self.assertEqual(self.gConfig.getValue('/Test/Sites', ()), ('LCG.CERN.ch', 'LCG.CNAF.it'))
+
+  def test_invalidatedOnChange(self):
+    self.assertEqual(self.gConfig.getValue('/Test/Number', 0), 5)
+    self.assertEqual(self.gConfig.getValue('/Test/New', 0), 0)
+    self.gConfig.setOptionValue('/Test/Number', '6')
+    self.gConfig.setOptionValue('/Test/New', '1')
+    self.assertEqual(self.gConfig.getValue('/Test/Number', 0), 6)
+    self.assertEqual(self.gConfig.getValue('/Test/New', 0), 1)
+
+    # A new remote configuration, as loaded by the Refresher
+    remoteCFG = CFG()
+    remoteCFG.loadFromBuffer("Test\n{\n  Remote = 7\n}\n")
+    gConfigurationData.loadRemoteCFGFromMem(str(remoteCFG))
+    self.assertEqual(self.gConfig.getValue('/Test/Remote', 0), 7)
+
+    gConfigurationData.mergedCFG = CFG()
+    self.assertEqual(self.gConfig.getValue('/Test/Number', 0), 0)
+
+
+if __name__ == '__main__':
+  suite = unittest.defaultTestLoader.loadTestsFromTestCase(TestOptionCache)
+  unittest.TextTestRunner(verbosity=2).run(suite)
@@ -0,0 +1,133 @@
+""" Unit tests for the propagation of the configuration modifications instead of the whole configuration
+"""
+# pylint: disable=protected-access, missing-docstring, invalid-name
+
+import unittest
+import zlib
+
+from mock import MagicMock, patch
+
+from DIRAC import S_OK, S_ERROR
+from DIRAC.Core.Utilities.CFG import CFG
+from DIRAC.ConfigurationSystem.Client.ConfigurationData import gConfigurationData
+from DIRAC.ConfigurationSystem.private.ModificationsHistory import ModificationsHistory
+from DIRAC.ConfigurationSystem.private.Refresher import _updateFromRemoteLocation
+
+
+def versionCFG(version, extra=''):
+  cfg = CFG()
+  cfg.loadFromBuffer("""
+  DIRAC
+  {
+    Configuration
+    {
+      Name = Test
+      Version = %s
+    }
+  }
+  Resources
+  {
+    Sites
+    {
+      LCG.CERN.ch
+      {
+        CE = ce1.cern.ch, ce2.cern.ch
+      }
+    }
+  }
+  %s
+  """ % (version, extra))
+  return cfg
+
+
+class ModificationsTestCase(unittest.TestCase):
+
+  def setUp(self):
+    self.cfgs = {'v1': versionCFG('v1'),
+                 'v2': versionCFG('v2', "Operations\n{\n  Defaults\n  {\n    Option = 1\n  }\n}\n"),
+                 'v3': versionCFG('v3', "Operations\n{\n  Defaults\n  {\n    # Changed\n    Option = 2\n  }\n}\n")}
+    self.cfgs['v3']['Resources']['Sites'].deleteKey('LCG.CERN.ch')
+    self.history = ModificationsHistory(maxVersions=2)
+    for version in ('v1', 'v2', 'v3'):
+      self.history.update(self.cfgs[version])
+
+  def tearDown(self):
+    gConfigurationData.localCFG = CFG()
+    gConfigurationData.remoteCFG = CFG()
+    gConfigurationData.mergedCFG = CFG()
+    gConfigurationData.generateNewVersion()
+
+
+class ModificationsHistoryTestCase(ModificationsTestCase):
+
+  def test_getModificationsSince(self):
+    self.assertEqual(self.history.getLastVersion(), 'v3')
+    # Same version: recorded once, without copying the CFG
+    with patch.object(self.cfgs['v3'], 'clone') as cloneMock:
+      self.history.update(self.cfgs['v3'])
+    self.assertFalse(cloneMock.called)
+    modifications, version = self.history.getModificationsSince('v2')
+    self.assertEqual((len(modifications), version), (1, 'v3'))
+
+    modifications, version = self.history.getModificationsSince('v1')
+    self.assertEqual((len(modifications), version), (2, 'v3'))
+    cfg = self.cfgs['v1'].clone()
+    for modList in modifications:
+      self.assertTrue(cfg.applyModifications(modList)['OK'])
+    self.assertEqual(str(cfg), str(self.cfgs['v3']))
+
+    self.assertIsNone(self.history.getModificationsSince('v0'))
+    self.assertIsNone(self.history.getModificationsSince('v3'))
+    # Only the modifications of the last 2 versions are kept
+    self.history.update(versionCFG('v4'))
+    self.assertIsNone(self.history.getModificationsSince('v1'))
+    self.assertEqual(len(self.history.getModificationsSince('v2')[0]), 2)
+
+
+class UpdateFromRemoteLocationTestCase(ModificationsTestCase):
+
+  def setUp(self):
+    super(UpdateFromRemoteLocationTestCase, self).setUp()
+    gConfigurationData.loadRemoteCFGFromMem(str(self.cfgs['v1']))
+    self.serviceClient = MagicMock()
+    self.serviceClient.getCompressedDataIfNewer.return_value = S_OK({'newestVersion': 'v3',
+                                                                     'data': zlib.compress(str(self.cfgs['v3']))})
+
+  def test_modifications(self):
+    modifications, version = self.history.getModificationsSince('v1')
+    self.serviceClient.getModificationsIfNewer.return_value = S_OK({'newestVersion': version,
+                                                                    'modifications': modifications})
+    self.assertTrue(_updateFromRemoteLocation(self.serviceClient)['OK'])
+    self.serviceClient.getModificationsIfNewer.assert_called_once_with('v1')
+    self.assertFalse(self.serviceClient.getCompressedDataIfNewer.called)
+    self.assertEqual(gConfigurationData.getVersion(), 'v3')
+    self.assertEqual(gConfigurationData.extractOptionFromCFG('/Operations/Defaults/Option'), '2')
+    self.assertIsNone(gConfigurationData.extractOptionFromCFG('/Resources/Sites/LCG.CERN.ch/CE'))
+
+  def test_upToDate(self):
+    self.serviceClient.getModificationsIfNewer.return_value = S_OK({'newestVersion': 'v1'})
+    self.assertTrue(_updateFromRemoteLocation(self.serviceClient)['OK'])
+    self.assertEqual(gConfigurationData.getVersion(), 'v1')
+
+  def test_fullData(self):
+    # Old server, too old version, or modifications that cannot be applied
+    for retVal in (S_ERROR("Unknown method getModificationsIfNewer"),
+                   S_OK({'newestVersion': 'v3', 'data': zlib.compress(str(self.cfgs['v3']))}),
+                   S_OK({'newestVersion': 'v3', 'modifications': [[('delSec', 'Unknown', -1, '')]]})):
+      gConfigurationData.loadRemoteCFGFromMem(str(self.cfgs['v1']))
+      self.serviceClient.getModificationsIfNewer.return_value = retVal
+      self.assertTrue(_updateFromRemoteLocation(self.serviceClient)['OK'])
+      self.assertEqual(gConfigurationData.getVersion(), 'v3')
+      self.assertIsNone(gConfigurationData.extractOptionFromCFG('/Resources/Sites/LCG.CERN.ch/CE'))
+
+  def test_error(self):
+    self.serviceClient.getModificationsIfNewer.return_value = S_ERROR("Can't connect")
+    self.assertFalse(_updateFromRemoteLocation(self.serviceClient)['OK'])
+    self.assertFalse(self.serviceClient.getCompressedDataIfNewer.called)
+    self.assertEqual(gConfigurationData.getVersion(), 'v1')
+
+
+if __name__ == '__main__':
+  suite = unittest.defaultTestLoader.loadTestsFromTestCase(ModificationsHistoryTestCase)
+  suite.addTest(unittest.defaultTestLoader.loadTestsFromTestCase(UpdateFromRemoteLocationTestCase))
+  unittest.TextTestRunner(verbosity=2).run(suite)
@@ -42,6 +42,14 @@ class ConfigurationHandler(RequestHandler):
       retDict['data'] = gServiceInterface.getCompressedConfigurationData()
     return S_OK(retDict)
 
+  types_getModificationsIfNewer = [basestring]
+
+  def export_getModificationsIfNewer(self, sClientVersion):
+    """ Like getCompressedDataIfNewer, but the modifications since the client version are sent
+        instead of all the data, if the server still has them
+    """
+    return S_OK(gServiceInterface.getModificationsIfNewer(sClientVersion))
+
   types_publishSlaveServer = [basestring]
 
   def export_publishSlaveServer(self, sURL):
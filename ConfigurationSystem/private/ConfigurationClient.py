@@ -65,27 +65,75 @@ class ConfigurationClient(object):
     return gConfigurationData.useServerCertificate()
 
   def getValue(self, optionPath, defaultValue=None):
-    retVal = self.getOption(optionPath, defaultValue)
+    gRefresher.refreshConfigurationIfNeeded()
+    # Cached values are returned without building the S_ERROR of the options not defined
+    cached = self.__getCachedOption(optionPath, self.__getRequestedType(defaultValue))
+    if cached:
+      return defaultValue if cached[0] is None else cached[0]
+    retVal = self.__readOption(optionPath, defaultValue)
     return retVal['Value'] if retVal['OK'] else defaultValue
 
+  @staticmethod
+  def __getRequestedType(typeValue):
+    if typeValue is None or isinstance(typeValue, type):
+      return typeValue
+    # typeValue is not a type but a default object
+    return type(typeValue)
+
+  @staticmethod
+  def __getCachedOption(optionPath, requestedType):
+    """ Values are cached once cast, by path and type. The cache is replaced when the configuration changes
+
+        :returns: None if not cached, ( value, ) otherwise, value being None if the option does not exist
+    """
+    optionCache = gConfigurationData.getOptionCache()
+    try:
+      optionValue = optionCache[(optionPath, requestedType)]
+    except KeyError:
+      return None
+    # Do not let the callers modify the cached containers
+    if optionValue is not None and requestedType in (list, set, dict):
+      optionValue = requestedType(optionValue)
+    return (optionValue, )
+
   def getOption(self, optionPath, typeValue=None):
     gRefresher.refreshConfigurationIfNeeded()
+    requestedType = self.__getRequestedType(typeValue)
+    cached = self.__getCachedOption(optionPath, requestedType)
+    if cached:
+      if cached[0] is None:
+        return S_ERROR("Path %s does not exist or it's not an option" % optionPath)
+      return S_OK(cached[0])
+    return self.__readOption(optionPath, typeValue)
+
+  def __readOption(self, optionPath, typeValue):
+    """ Read an option not cached from the configuration, and cache it
+    """
+    requestedType = self.__getRequestedType(typeValue)
+    # Taken before reading the configuration, so that nothing read from an older version is cached
+    optionCache = gConfigurationData.getOptionCache()
+    cacheKey = (optionPath, requestedType)
     optionValue = gConfigurationData.extractOptionFromCFG(optionPath)
 
     if optionValue is None:
+      optionCache[cacheKey] = None
       return S_ERROR("Path %s does not exist or it's not an option" % optionPath)
 
     # Value has been returned from the configuration
-    if typeValue is None:
+    if requestedType is None:
+      optionCache[cacheKey] = optionValue
       return S_OK(optionValue)
 
     # Casting to typeValue's type
-    if not isinstance(typeValue, type):
-      # typeValue is not a type but a default object
-      requestedType = type(typeValue)
-    else:
-      requestedType = typeValue
-
+    result = self.__castOption(optionValue, typeValue, requestedType)
+    if result['OK']:
+      optionCache[cacheKey] = result['Value']
+      if requestedType in (list, set, dict):
+        return S_OK(requestedType(result['Value']))
+    return result
+
+  @staticmethod
+  def __castOption(optionValue, typeValue, requestedType):
     if requestedType in (list, tuple, set):
       try:
         return S_OK(requestedType(List.fromChar(optionValue, ',')))
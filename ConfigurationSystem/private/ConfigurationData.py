@@ -30,6 +30,8 @@ class ConfigurationData(object):
     self.configurationPath = "/DIRAC/Configuration"
     self.backupsDir = os.path.join(DIRAC.rootPath, "etc", "csbackup")
     self._isService = False
+    self.__optionCache = {}
+    self.__mergedCFG = None
     self.localCFG = CFG()
     self.remoteCFG = CFG()
     self.mergedCFG = CFG()
@@ -45,9 +47,31 @@ class ConfigurationData(object):
   def getBackupDir(self):
     return self.backupsDir
 
+  @property
+  def mergedCFG(self):
+    return self.__mergedCFG
+
+  @mergedCFG.setter
+  def mergedCFG(self, cfg):
+    """
+    Replacing the merged CFG also replaces the option cache, after the CFG,
+    so that a value read from the previous CFG can only end up in the previous cache
+    """
+    self.__mergedCFG = cfg
+    self.__optionCache = {}
+
+  def getOptionCache(self):
+    """
+    Cache of the values already extracted from the merged CFG, for ConfigurationClient.
+    A new one is used for each version of the merged CFG.
+    """
+    return self.__optionCache
+
   def sync(self):
     gLogger.debug("Updating configuration internals")
-    self.mergedCFG = self.remoteCFG.mergeWith(self.localCFG)
+    # The merged CFG is only read, and merged again when the local or the remote one changes:
+    # there is no need to copy the sections it would share with them
+    self.mergedCFG = self.remoteCFG.mergeWith(self.localCFG, shareSections=True)
     self.remoteServerList = []
     localServers = self.extractOptionFromCFG("%s/Servers" % self.configurationPath,
                                              self.localCFG,
@@ -93,6 +117,28 @@ class ConfigurationData(object):
     self.unlock()
     self.sync()
 
+  def applyRemoteModifications(self, modificationsList, newVersion):
+    """
+    Update the remote CFG with the modifications since its version, as given by
+    ServiceInterface.getModificationsIfNewer, instead of loading all of it
+
+    :param list modificationsList: modification lists, as returned by CFG.getModifications, to apply in order
+    :param str newVersion: version of the remote CFG once all the modifications are applied
+    """
+    remoteCFG = self.remoteCFG.clone()
+    for modList in modificationsList:
+      result = remoteCFG.applyModifications(modList)
+      if not result['OK']:
+        return result
+    version = self.getVersion(remoteCFG)
+    if version != newVersion:
+      return S_ERROR("Version %s obtained instead of %s" % (version, newVersion))
+    self.lock()
+    self.remoteCFG = remoteCFG
+    self.unlock()
+    self.sync()
+    return S_OK()
+
   def loadConfigurationData(self, fileName=False):
     name = self.getName()
     self.lock()
@@ -236,6 +282,12 @@ class ConfigurationData(object):
     except BaseException:
       return 600
 
+  def getModificationsHistorySize(self):
+    try:
+      return int(self.extractOptionFromCFG("%s/ModificationsHistorySize" % self.configurationPath, self.mergedCFG))
+    except BaseException:
+      return 20
+
   def mergingEnabled(self):
     try:
       val = self.extractOptionFromCFG("%s/EnableAutoMerge" % self.configurationPath, self.mergedCFG)
@@ -0,0 +1,60 @@
+""" Modifications between the last versions of the configuration served by a CS server,
+    so that the clients can get only the changes since the version they have
+"""
+
+import threading
+
+from DIRAC.ConfigurationSystem.Client.ConfigurationData import gConfigurationData
+
+__RCSID__ = "$Id$"
+
+
+class ModificationsHistory(object):
+
+  def __init__(self, maxVersions=20):
+    """
+    :param int maxVersions: number of versions for which the modifications are kept
+    """
+    self.__lock = threading.Lock()
+    self.__maxVersions = maxVersions
+    self.__lastCFG = None
+    self.__lastVersion = None
+    # ( previous version, version, modifications from the previous version ), the oldest first
+    self.__history = []
+
+  def getLastVersion(self):
+    return self.__lastVersion
+
+  def update(self, remoteCFG):
+    """
+    Record the modifications since the last version, if the version of the CFG is a new one
+
+    :param remoteCFG: CFG served by the server
+    """
+    # The CFG is only copied when its version changes
+    if gConfigurationData.getVersion(remoteCFG) == self.__lastVersion:
+      return
+    cfg = remoteCFG.clone()
+    version = gConfigurationData.getVersion(cfg)
+    with self.__lock:
+      if version == self.__lastVersion:
+        return
+      if self.__lastCFG is not None and self.__maxVersions > 0:
+        self.__history.append((self.__lastVersion, version, self.__lastCFG.getModifications(cfg)))
+        del self.__history[:-self.__maxVersions]
+      self.__lastCFG = cfg
+      self.__lastVersion = version
+
+  def getModificationsSince(self, version):
+    """
+    Get the modifications to apply to a version to get the last one
+
+    :param str version: version the client has
+    :return: ( list of modification lists to apply in order, last version ),
+             or None if the version is too old or unknown
+    """
+    with self.__lock:
+      for pos, versionModifications in enumerate(self.__history):
+        if versionModifications[0] == version:
+          return [modList for _, _, modList in self.__history[pos:]], self.__lastVersion
+    return None
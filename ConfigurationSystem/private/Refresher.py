@@ -19,12 +19,24 @@ from DIRAC.Core.Utilities.ReturnValues import S_OK, S_ERROR
 def _updateFromRemoteLocation(serviceClient):
   gLogger.debug("", "Trying to refresh from %s" % serviceClient.serviceURL)
   localVersion = gConfigurationData.getVersion()
-  retVal = serviceClient.getCompressedDataIfNewer(localVersion)
+  # Only the modifications since the local version are sent, if the server still has them
+  retVal = serviceClient.getModificationsIfNewer(localVersion)
+  if not retVal['OK'] and "Unknown method" in retVal['Message']:
+    retVal = serviceClient.getCompressedDataIfNewer(localVersion)
   if retVal['OK']:
     dataDict = retVal['Value']
     if localVersion < dataDict['newestVersion']:
       gLogger.debug("New version available", "Updating to version %s..." % dataDict['newestVersion'])
-      gConfigurationData.loadRemoteCFGFromCompressedMem(dataDict['data'])
+      if 'modifications' in dataDict:
+        result = gConfigurationData.applyRemoteModifications(dataDict['modifications'], dataDict['newestVersion'])
+        if not result['OK']:
+          gLogger.warn("Cannot apply the configuration modifications, getting all the data", result['Message'])
+          retVal = serviceClient.getCompressedDataIfNewer(localVersion)
+          if not retVal['OK']:
+            return retVal
+          dataDict = retVal['Value']
+      if 'data' in dataDict:
+        gConfigurationData.loadRemoteCFGFromCompressedMem(dataDict['data'])
       gLogger.debug("Updated to version %s" % gConfigurationData.getVersion())
       gEventDispatcher.triggerEvent("CSNewVersion", dataDict['newestVersion'], threaded=True)
     return S_OK()
@@ -14,6 +14,7 @@ import DIRAC
 from DIRAC.Core.Utilities.File import mkDir
 from DIRAC.ConfigurationSystem.Client.ConfigurationData import gConfigurationData, ConfigurationData
 from DIRAC.ConfigurationSystem.private.Refresher import gRefresher
+from DIRAC.ConfigurationSystem.private.ModificationsHistory import ModificationsHistory
 from DIRAC.FrameworkSystem.Client.Logger import gLogger
 from DIRAC.Core.Utilities.ReturnValues import S_OK, S_ERROR
 from DIRAC.Core.DISET.RPCClient import RPCClient
@@ -26,14 +27,17 @@ class ServiceInterface(threading.Thread):
     self.sURL = sURL
     gLogger.info("Initializing Configuration Service", "URL is %s" % sURL)
     self.__modificationsIgnoreMask = ['/DIRAC/Configuration/Servers', '/DIRAC/Configuration/Version']
+    self.__modificationsHistory = ModificationsHistory(gConfigurationData.getModificationsHistorySize())
     gConfigurationData.setAsService()
     if not gConfigurationData.isMaster():
       gLogger.info("Starting configuration service as slave")
+      gRefresher.addListenerToNewVersionEvent(self.__onNewVersion)
       gRefresher.autoRefreshAndPublish(self.sURL)
     else:
       gLogger.info("Starting configuration service as master")
       gRefresher.disable()
       self.__loadConfigurationData()
+      self.__modificationsHistory.update(gConfigurationData.getRemoteCFG())
       self.dAliveSlaveServers = {}
       self.__launchCheckSlaves()
 
@@ -71,8 +75,15 @@ class ServiceInterface(threading.Thread):
   def __generateNewVersion(self):
     if gConfigurationData.isMaster():
       gConfigurationData.generateNewVersion()
+      self.__modificationsHistory.update(gConfigurationData.getRemoteCFG())
       gConfigurationData.writeRemoteConfigurationToDisk()
 
+  def __onNewVersion(self, eventName, params):
+    """ A slave records the modifications of each version it gets
+    """
+    self.__modificationsHistory.update(gConfigurationData.getRemoteCFG())
+    return S_OK()
+
   def publishSlaveServer(self, sSlaveURL):
     if not gConfigurationData.isMaster():
       return S_ERROR("Configuration modification is not allowed in this server")
@@ -148,6 +159,7 @@ class ServiceInterface(threading.Thread):
     gConfigurationData.unlock()
     gLogger.info("Generating new version")
     gConfigurationData.generateNewVersion()
+    self.__modificationsHistory.update(gConfigurationData.getRemoteCFG())
     # self.__checkSlavesStatus( forceWriteConfiguration = True )
     gLogger.info("Writing new version to disk!")
     retVal = gConfigurationData.writeRemoteConfigurationToDisk("%s@%s" % (commiter, gConfigurationData.getVersion()))
@@ -157,6 +169,24 @@ class ServiceInterface(threading.Thread):
   def getCompressedConfigurationData(self):
     return gConfigurationData.getCompressedData()
 
+  def getModificationsIfNewer(self, clientVersion):
+    """ The modifications to apply to the version of a client to get the current one,
+        or all the data if the version of the client is too old
+
+        :return: dict with the newestVersion, and either the modifications or the compressed data
+                 if the client version is older
+    """
+    retDict = {'newestVersion': gConfigurationData.getVersion()}
+    if clientVersion >= retDict['newestVersion']:
+      return retDict
+    self.__modificationsHistory.update(gConfigurationData.getRemoteCFG())
+    result = self.__modificationsHistory.getModificationsSince(clientVersion)
+    if result is None:
+      retDict['data'] = gConfigurationData.getCompressedData()
+    else:
+      retDict['modifications'], retDict['newestVersion'] = result
+    return retDict
+
   def getVersion(self):
     return gConfigurationData.getVersion()
 
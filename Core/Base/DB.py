@@ -2,8 +2,12 @@
     It uniforms the way the database objects are constructed
 """
 
+import threading
+
 from DIRAC import gLogger, gConfig
 from DIRAC.Core.Utilities.MySQL import MySQL
+from DIRAC.Core.Utilities.ThreadScheduler import gThreadScheduler
+from DIRAC.FrameworkSystem.Client.MonitoringClient import gMonitor
 from DIRAC.ConfigurationSystem.Client.Utilities import getDBParameters
 from DIRAC.ConfigurationSystem.Client.PathFinder import getDatabaseSection
 
@@ -14,6 +18,14 @@ class DB(MySQL):
   """ All DIRAC DB classes should inherit from this one (unless using sqlalchemy)
   """
 
+  # Last statistics reported for each connection pool
+  __lastPoolStats = {}
+  __poolStatsLock = threading.Lock()
+  __poolActivities = (('InUse', "connections in use", 'connections'),
+                      ('Open', "open connections", 'connections'),
+                      ('Waiting', "threads waiting for a connection", 'threads'),
+                      ('WaitTime', "time waiting for a connection", 'seconds'))
+
   def __init__(self, dbname, fullname, debug=False):
 
     self.fullname = fullname
@@ -30,13 +42,19 @@ class DB(MySQL):
     self.dbUser = dbParameters['User']
     self.dbPass = dbParameters['Password']
     self.dbName = dbParameters['DBName']
+    maxConnections = self.getCSOption('MaxConnections', 0)
+    waitTimeout = self.getCSOption('ConnectionWaitTimeout', 30)
+    pingIdleTime = self.getCSOption('PingIdleTime', 0)
 
     super(DB, self).__init__(hostName=self.dbHost,
                              userName=self.dbUser,
                              passwd=self.dbPass,
                              dbName=self.dbName,
                              port=self.dbPort,
-                             debug=debug)
+                             debug=debug,
+                             maxConnections=maxConnections,
+                             waitTimeout=waitTimeout,
+                             pingIdleTime=pingIdleTime)
 
     if not self._connected:
       raise RuntimeError("Can not connect to DB '%s', exiting..." % self.dbName)
@@ -47,8 +65,41 @@ class DB(MySQL):
     self.log.info("Port:           " + str(self.dbPort))
     #self.log.info("Password:       "+self.dbPass)
     self.log.info("DBName:         " + self.dbName)
+    if maxConnections:
+      self.log.info("MaxConnections: " + str(maxConnections))
     self.log.info("==================================================")
 
+    if maxConnections:
+      self.__registerPoolStats()
+
+  def __registerPoolStats(self):
+    """ Register the activities reporting the usage of the connection pool to the component monitoring,
+        once per pool: the pool is shared by all the databases of the server
+    """
+    poolName = self.getConnectionPoolName()
+    with DB.__poolStatsLock:
+      if poolName in DB.__lastPoolStats:
+        return
+      DB.__lastPoolStats[poolName] = self.getConnectionPoolStats()
+    for key, description, unit in self.__poolActivities:
+      gMonitor.registerActivity('%sConn%s' % (poolName, key), "%s %s" % (poolName, description),
+                                'Databases', unit, gMonitor.OP_MEAN)
+    gThreadScheduler.addPeriodicTask(60, self.__reportPoolStats)
+
+  def __reportPoolStats(self):
+    """ Report the usage of the connection pool to the component monitoring
+    """
+    poolName = self.getConnectionPoolName()
+    stats = self.getConnectionPoolStats()
+    for key in ('InUse', 'Open', 'Waiting'):
+      gMonitor.addMark('%sConn%s' % (poolName, key), stats[key])
+    lastStats = DB.__lastPoolStats[poolName]
+    checkouts = stats['Checkouts'] - lastStats['Checkouts']
+    if checkouts:
+      waitTime = stats['WaitTime'] - lastStats['WaitTime']
+      gMonitor.addMark('%sConnWaitTime' % poolName, waitTime / checkouts)
+    DB.__lastPoolStats[poolName] = stats
+
 #############################################################################
   def getCSOption(self, optionName, defaultValue=None):
     cs_path = getDatabaseSection(self.fullname)
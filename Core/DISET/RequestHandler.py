@@ -2,6 +2,7 @@
 """
 
 import os
+import sys
 import types
 import time
 
@@ -130,6 +131,11 @@ class RequestHandler(object):
     except RequestHandler.ConnectionError, excp:
       gLogger.error("ConnectionError", str(excp))
       return S_ERROR(excp)
+    finally:
+      # Give back the database connections used by the action, if the service uses any
+      mysqlModule = sys.modules.get('DIRAC.Core.Utilities.MySQL')
+      if mysqlModule:
+        mysqlModule.MySQL.releaseThreadConnections()
     if not isReturnStructure(retVal):
       message = "Method %s for action %s does not return a S_OK/S_ERROR!" % (actionTuple[1], actionTuple[0])
       gLogger.error(message)
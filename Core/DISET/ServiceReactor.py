@@ -41,6 +41,7 @@ class ServiceReactor(object):
                               'IgnoreCRLs': False,
                               'PacketTimeout': 'timeout',
                               'SocketBacklog': False,
+                              'IncrementalDecode': 'incrementalDecode',
                               }
 
   def __init__(self):
@@ -58,6 +58,7 @@ class BaseClient(object):
       :param proxyChain: Specify the proxy chain
       :param skipCACheck: Do not check the CA
       :param keepAliveLapse: Duration for keepAliveLapse (heartbeat like)
+      :param incrementalDecode: Decode large replies while they are received
     """
 
     if not isinstance(serviceName, basestring):
@@ -505,6 +506,7 @@ and this is thread %s
           * VO
           * action
           * extraCredentials
+          * capabilities of the client (compression algorithms)
 
         It is kind of a handshake.
 
@@ -523,7 +525,8 @@ and this is thread %s
       return self.__initStatus
     stConnectionInfo = ((self.__URLTuple[3], self.setup, self.vo),
                         action,
-                        self.__extraCredentials)
+                        self.__extraCredentials,
+                        {'Compression': ['zlib']})
 
     # Send the connection info and get the answer back
     retVal = transport.sendData(S_OK(stConnectionInfo))
@@ -531,6 +534,10 @@ and this is thread %s
       return retVal
     serverReturn = transport.receiveData()
 
+    # The service asks to compress the big messages
+    if serverReturn['OK'] and 'Compression' in serverReturn:
+      transport.setCompression(serverReturn['Compression']['Threshold'], serverReturn['Compression']['Level'])
+
     # TODO: Check if delegation is required. This seems to be used only for the GatewayService
     if serverReturn['OK'] and 'Value' in serverReturn and isinstance(serverReturn['Value'], dict):
       gLogger.debug("There is a server requirement")
@@ -248,6 +248,9 @@ class Service( object ):
     self._monitor.registerActivity( 'ActiveQueries', "Active queries", 'Framework', 'threads', MonitoringClient.OP_MEAN )
     self._monitor.registerActivity( 'RunningThreads', "Running threads", 'Framework', 'threads', MonitoringClient.OP_MEAN )
     self._monitor.registerActivity( 'MaxFD', "Max File Descriptors", 'Framework', 'fd', MonitoringClient.OP_MEAN )
+    self._monitor.registerActivity( 'SentBytes', "Bytes sent", 'Framework', 'bytes', MonitoringClient.OP_SUM )
+    self._monitor.registerActivity( 'SendTime', "Time sending a message", 'Framework', 'seconds',
+                                    MonitoringClient.OP_MEAN )
 
     self._monitor.setComponentExtraParam( 'DIRACVersion', DIRAC.version )
     self._monitor.setComponentExtraParam( 'platform', DIRAC.getPlatform() )
@@ -323,6 +326,8 @@ class Service( object ):
       monReport = self.__startReportToMonitoring()
     except Exception:
       monReport = False
+    # the transport may already have sent messages: only the ones of this request are reported
+    initialSendStats = clientTransport.getSendStats()
     try:
       #Handshake
       try:
@@ -360,6 +365,7 @@ class Service( object ):
       self._lockManager.unlockGlobal()
       if monReport:
         self.__endReportToMonitoring( *monReport )
+        self.__reportSendStats( clientTransport, initialSendStats )
 
 
   def _createIdentityString( self, credDict, clientTransport = None ):
@@ -486,11 +492,34 @@ class Service( object ):
       return S_ERROR( "Server error while loading handler" )
     return S_OK( handlerInstance )
 
+  def _negotiateCompression( self, proposalTuple ):
+    """ Compression to use with a client, if both the client and the service support it
+
+    :param tuple proposalTuple: action proposal of the client. Clients supporting compression
+                                add a 4th element: { 'Compression' : [ supported algorithms ] }
+
+    :return: dict with the compression 'Threshold' and 'Level', or None
+    """
+    threshold = self._cfg.getCompressionThreshold()
+    if not threshold or len( proposalTuple ) < 4 or not isinstance( proposalTuple[3], dict ):
+      return None
+    if 'zlib' not in proposalTuple[3].get( 'Compression', [] ):
+      return None
+    return { 'Threshold' : threshold, 'Level' : self._cfg.getCompressionLevel() }
+
   def _processProposal( self, trid, proposalTuple, handlerObj ):
     #Notify the client we're ready to execute the action
-    retVal = self._transportPool.send( trid, S_OK() )
+    proposalResult = S_OK()
+    compression = self._negotiateCompression( proposalTuple )
+    if compression:
+      proposalResult[ 'Compression' ] = compression
+    retVal = self._transportPool.send( trid, proposalResult )
     if not retVal[ 'OK' ]:
       return retVal
+    #The client knows about the compression from now on
+    clientTransport = self._transportPool.get( trid )
+    if compression and clientTransport:
+      clientTransport.setCompression( compression[ 'Threshold' ], compression[ 'Level' ] )
 
     messageConnection = False
     if proposalTuple[1] == ( 'Connection', 'new' ):
@@ -571,6 +600,17 @@ class Service( object ):
       self._monitor.addMark( 'MEM', mem )
     return ( now, cpuTime )
 
+  def __reportSendStats( self, clientTransport, initialSendStats ):
+    """ Mark the bytes and the time of the messages sent since initialSendStats were taken
+    """
+    sendStats = clientTransport.getSendStats()
+    messages = sendStats[ 'Messages' ] - initialSendStats[ 'Messages' ]
+    if messages:
+      self._monitor.addMark( 'SentBytes', sendStats[ 'Bytes' ] - initialSendStats[ 'Bytes' ] )
+      sendTime = sendStats[ 'EncodingTime' ] + sendStats[ 'SendingTime' ] - \
+          initialSendStats[ 'EncodingTime' ] - initialSendStats[ 'SendingTime' ]
+      self._monitor.addMark( 'SendTime', sendTime / messages )
+
   def __endReportToMonitoring( self, initialWallTime, initialCPUTime ):
     wallTime = time.time() - initialWallTime
     stats = os.times()
@@ -86,6 +86,18 @@ class ServiceConfiguration:
     except:
       return 1
 
+  def getCompressionThreshold( self ):
+    try:
+      return int( self.getOption( "CompressionThreshold" ) )
+    except:
+      return 0
+
+  def getCompressionLevel( self ):
+    try:
+      return int( self.getOption( "CompressionLevel" ) )
+    except:
+      return 1
+
   def getPort( self ):
     try:
       return int( self.getOption( "Port" ) )
@@ -22,12 +22,14 @@ __RCSID__ = "$Id$"
 
 import time
 import select
+import zlib
 import cStringIO
 from hashlib import md5
 
 from DIRAC.Core.Utilities.ReturnValues import S_ERROR, S_OK
 from DIRAC.FrameworkSystem.Client.Logger import gLogger
 from DIRAC.Core.Utilities import DEncode
+from DIRAC.Core.Utilities.DEncodeStream import StreamDecoder
 
 class BaseTransport( object ):
   """ Invokes DEncode for marshaling/unmarshaling of data calls in transit
@@ -40,12 +42,16 @@ class BaseTransport( object ):
   iListenQueueSize = 128
   iReadTimeout = 600
   keepAliveMagic = "dka"
+  # Compressed messages start with this character, which never starts a DEncode string
+  compressedMagic = "Z"
 
   def __init__( self, stServerAddress, bServerMode = False, **kwargs ):
     self.bServerMode = bServerMode
     self.extraArgsDict = kwargs
     self.byteStream = ""
     self.packetSize = 1048576 #1MiB
+    #Number of encoded fragments joined in one packet by sendData (~1MiB for usual payloads)
+    self.fragmentsPerPacket = 131072
     self.stServerAddress = stServerAddress
     self.peerCredentials = {}
     self.remoteAddress = False
@@ -63,6 +69,13 @@ class BaseTransport( object ):
       except:
         pass
     self.iListenQueueSize = max(self.iListenQueueSize, int(kwargs.get('SocketBacklog', 0)))
+    # Decode big messages while they are received instead of once they are complete
+    self.__incrementalDecode = str(kwargs.get('incrementalDecode', False)).lower() in ('true', 'yes', '1')
+    # Messages bigger than this are compressed, 0 means no compression (see setCompression)
+    self.__compressionThreshold = 0
+    self.__compressionLevel = 1
+    self.__sendStats = { 'Messages' : 0, 'Bytes' : 0, 'EncodedBytes' : 0, 'EncodingTime' : 0., 'SendingTime' : 0.,
+                         'LastMessage' : {} }
     self.__lastActionTimestamp = time.time()
     self.__lastServerRenewTimestamp = self.__lastActionTimestamp
 
@@ -118,6 +131,21 @@ class BaseTransport( object ):
   def setExtraCredentials( self, group ):
     self.peerCredentials[ 'extraCredentials' ] = group
 
+  def setCompression( self, threshold, level = 1 ):
+    """ Compress the messages sent from now on when they are bigger than a threshold.
+        It must only be enabled once the peer has agreed on it during the action proposal
+
+    :param int threshold: minimum size in bytes of the encoded message to compress it, 0 to disable
+    :param int level: zlib compression level
+    """
+    self.__compressionThreshold = max( 0, int( threshold ) )
+    self.__compressionLevel = int( level )
+
+  def getCompression( self ):
+    """ Compression threshold in use, 0 if the messages are not compressed
+    """
+    return self.__compressionThreshold
+
   def serverMode( self ):
     return self.bServerMode
 
@@ -156,17 +184,109 @@ class BaseTransport( object ):
 
   def sendData( self, uData, prefix = False ):
     self.__updateLastActionTimestamp()
-    sCodedData = DEncode.encode( uData )
+    startTime = time.time()
+    #The encoded fragments are sent in groups, the whole message is never concatenated
+    fragments = DEncode.encodeFragments( uData )
+    encodedSize = sum( map( len, fragments ) )
+    payloadSize = encodedSize
+    if self.__compressionThreshold and encodedSize >= self.__compressionThreshold:
+      fragments = self.__compress( fragments, encodedSize )
+      payloadSize = sum( map( len, fragments ) )
     if prefix:
-      dataToSend = "%s%s:%s" % ( prefix, len( sCodedData ), sCodedData )
+      header = "%s%s:" % ( prefix, payloadSize )
     else:
-      dataToSend = "%s:%s" % ( len( sCodedData ), sCodedData )
-    for index in range( 0, len( dataToSend ), self.packetSize ):
-      bytesToSend = min( self.packetSize, len( dataToSend ) - index )
+      header = "%s:" % payloadSize
+    encodedTime = time.time()
+    result = self.__writePacket( header )
+    for index in xrange( 0, len( fragments ), self.fragmentsPerPacket ):
+      if not result[ 'OK' ]:
+        return result
+      result = self.__writePacket( "".join( fragments[ index : index + self.fragmentsPerPacket ] ) )
+    if not result[ 'OK' ]:
+      return result
+    del fragments
+    endTime = time.time()
+    self.__sendStats[ 'Messages' ] += 1
+    self.__sendStats[ 'Bytes' ] += len( header ) + payloadSize
+    self.__sendStats[ 'EncodedBytes' ] += encodedSize
+    self.__sendStats[ 'EncodingTime' ] += encodedTime - startTime
+    self.__sendStats[ 'SendingTime' ] += endTime - encodedTime
+    self.__sendStats[ 'LastMessage' ] = { 'Bytes' : len( header ) + payloadSize,
+                                          'EncodedBytes' : encodedSize,
+                                          'EncodingTime' : encodedTime - startTime,
+                                          'SendingTime' : endTime - encodedTime }
+    return S_OK()
+
+  def __compress( self, fragments, encodedSize ):
+    """ Compress the encoded fragments of a message
+
+        :param list fragments: encoded message
+        :param int encodedSize: total size of the fragments
+
+        :return: list of strings forming the compressed message
+    """
+    compressor = zlib.compressobj( self.__compressionLevel )
+    #The size of the encoded message goes first, it is needed to decode incrementally
+    compressed = [ "%s%s:" % ( self.compressedMagic, encodedSize ) ]
+    for index in xrange( 0, len( fragments ), self.fragmentsPerPacket ):
+      compressed.append( compressor.compress( "".join( fragments[ index : index + self.fragmentsPerPacket ] ) ) )
+    compressed.append( compressor.flush() )
+    return compressed
+
+  def __decompress( self, data, maxBufferSize = 0 ):
+    """ Decompress a message sent compressed by the peer
+
+        :param str data: compressed message, starting with the compression magic
+        :param int maxBufferSize: maximum size of the decompressed message (0 for no limit)
+
+        :return: encoded message
+    """
+    iSeparatorPosition = data.index( ":" )
+    decompressor = zlib.decompressobj()
+    return self.__inflate( decompressor, buffer( data, iSeparatorPosition + 1 ), maxBufferSize, 0, True )
+
+  @staticmethod
+  def __inflate( decompressor, data, maxBufferSize, decodedSize, last = False ):
+    """ Decompress a chunk of a message, without going over the read limit for the decompressed
+        data, so that a small compressed message can not exhaust the memory
+
+        :param decompressor: zlib decompression object of the message
+        :param str data: compressed chunk
+        :param int maxBufferSize: maximum size of the decompressed message (0 for no limit)
+        :param int decodedSize: size of the message decompressed so far
+        :param bool last: True for the last chunk of the message
+
+        :return: decompressed chunk
+    """
+    if not maxBufferSize:
+      decoded = decompressor.decompress( data )
+      return decoded + decompressor.flush() if last else decoded
+    # Ask for one byte more than allowed, to tell an exceeded limit from a reached one
+    decoded = decompressor.decompress( data, max( maxBufferSize - decodedSize, 0 ) + 1 )
+    if decompressor.unconsumed_tail or decodedSize + len( decoded ) > maxBufferSize:
+      raise ValueError( "Read limit exceeded (%s chars)" % maxBufferSize )
+    if last:
+      decoded += decompressor.flush()
+      if decodedSize + len( decoded ) > maxBufferSize:
+        raise ValueError( "Read limit exceeded (%s chars)" % maxBufferSize )
+    return decoded
+
+  def __writePacket( self, packet ):
+    """ Write a string to the peer, in pieces of at most packetSize bytes
+
+        :param str packet: data to send
+
+        :return: S_OK / S_ERROR
+    """
+    for index in xrange( 0, len( packet ), self.packetSize ):
+      if len( packet ) <= self.packetSize:
+        bytesToSend = packet
+      else:
+        bytesToSend = packet[ index : index + self.packetSize ]
       packSentBytes = 0
-      while packSentBytes < bytesToSend:
+      while packSentBytes < len( bytesToSend ):
         try:
-          result = self._write( dataToSend[ index + packSentBytes : index + bytesToSend ] )
+          result = self._write( bytesToSend[ packSentBytes: ] if packSentBytes else bytesToSend )
           if not result[ 'OK' ]:
             return result
           sentBytes = result[ 'Value' ]
@@ -175,10 +295,16 @@ class BaseTransport( object ):
         if sentBytes == 0:
           return S_ERROR( "Connection closed by peer" )
         packSentBytes += sentBytes
-    del sCodedData
-    sCodedData=None
     return S_OK()
 
+  def getSendStats( self ):
+    """ Statistics about the messages sent through this transport
+
+    :return: dictionary with the number of messages ('Messages'), the total number of bytes ('Bytes'),
+             the time spent encoding ('EncodingTime') and writing ('SendingTime'), and the same
+             figures for the last message only ('LastMessage')
+    """
+    return dict( self.__sendStats )
 
   def receiveData( self, maxBufferSize = 0, blockAfterKeepAlive = True, idleReceive = False ):
     self.__updateLastActionTimestamp()
@@ -219,10 +345,19 @@ class BaseTransport( object ):
       pkgSize = int( self.byteStream[ :iSeparatorPosition ] )
       pkgData = self.byteStream[ iSeparatorPosition + 1: ]
       readSize = len( pkgData )
+      isDecoded = False
       if readSize >= pkgSize:
         #If we already have all the data we need
         data = pkgData[ :pkgSize ]
         self.byteStream = pkgData[ pkgSize: ]
+      elif self.__incrementalDecode:
+        #Decode the chunks as they arrive, the message is never held in one piece
+        retVal = self.__receiveAndDecode( pkgData, pkgSize, maxBufferSize )
+        if not retVal[ 'OK' ]:
+          return retVal
+        data = retVal[ 'Value' ]
+        self.byteStream = ""
+        isDecoded = True
       else:
         #If we still need to read stuff
         pkgMem = cStringIO.StringIO()
@@ -247,10 +382,13 @@ class BaseTransport( object ):
           pkgMem.seek( 0, 0 )
           data = pkgMem.read( pkgSize )
           self.byteStream = pkgMem.read()
-      try:
-        data = DEncode.decode( data )[0]
-      except Exception as e:
-        return S_ERROR( "Could not decode received data: %s" % str( e ) )
+      if not isDecoded:
+        try:
+          if data[ :1 ] == BaseTransport.compressedMagic:
+            data = self.__decompress( data, maxBufferSize )
+          data = DEncode.decode( data )[0]
+        except Exception as e:
+          return S_ERROR( "Could not decode received data: %s" % str( e ) )
       if idleReceive:
         self.receivedMessages.append( data )
         return S_OK()
@@ -259,6 +397,66 @@ class BaseTransport( object ):
       gLogger.exception( "Network error while receiving data" )
       return S_ERROR( "Network error while receiving data: %s" % str( e ) )
 
+  def __receiveAndDecode( self, pkgData, pkgSize, maxBufferSize ):
+    """ Receive the rest of a message, decoding it while it arrives
+
+        :param str pkgData: beginning of the message, already received
+        :param int pkgSize: total size of the message
+        :param int maxBufferSize: maximum size accepted (0 for no limit)
+
+        :return: S_OK( decoded message ) / S_ERROR
+    """
+    decoder = None
+    decompressor = None
+    decodedSize = 0
+    readSize = len( pkgData )
+    rcvData = pkgData
+    while True:
+      try:
+        if decoder is None:
+          #Find out if the message is compressed, and the size of the encoded message
+          if not rcvData:
+            pass
+          elif rcvData[ :1 ] != BaseTransport.compressedMagic:
+            decoder = StreamDecoder( pkgSize )
+          elif rcvData.find( ":" ) > -1:
+            iSeparatorPosition = rcvData.find( ":" )
+            encodedSize = int( rcvData[ 1:iSeparatorPosition ] )
+            if maxBufferSize and encodedSize > maxBufferSize:
+              return S_ERROR( "Read limit exceeded (%s chars)" % maxBufferSize )
+            decoder = StreamDecoder( encodedSize )
+            decompressor = zlib.decompressobj()
+            rcvData = rcvData[ iSeparatorPosition + 1: ]
+        if decompressor:
+          #The limit also applies to the decompressed data
+          decoded = self.__inflate( decompressor, rcvData, maxBufferSize, decodedSize, readSize >= pkgSize )
+          decodedSize += len( decoded )
+          decoder.feed( decoded )
+        elif decoder is not None:
+          decoder.feed( rcvData )
+        if readSize >= pkgSize:
+          break
+      except Exception as e:
+        return S_ERROR( "Could not decode received data: %s" % str( e ) )
+      #Read by packets, so that no buffer of the size of the message is allocated
+      retVal = self._read( min( pkgSize - readSize, self.packetSize ), skipReadyCheck = True )
+      if not retVal[ 'OK' ]:
+        return retVal
+      if not retVal[ 'Value' ]:
+        return S_ERROR( "Peer closed connection" )
+      if decoder is None:
+        #Still looking for the size of the compressed message
+        rcvData += retVal[ 'Value' ]
+      else:
+        rcvData = retVal[ 'Value' ]
+      readSize += len( retVal[ 'Value' ] )
+      if maxBufferSize and readSize > maxBufferSize:
+        return S_ERROR( "Read limit exceeded (%s chars)" % maxBufferSize )
+    try:
+      return S_OK( decoder.getResult() )
+    except Exception as e:
+      return S_ERROR( "Could not decode received data: %s" % str( e ) )
+
   def __processKeepAlive( self, maxBufferSize, blockAfterKeepAlive = True ):
     gLogger.debug( "Received Keep Alive" )
     #Next message down the stream will be the ka data
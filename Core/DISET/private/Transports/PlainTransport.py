@@ -94,12 +94,14 @@ class PlainTransport( BaseTransport ):
       timeout = self.extraArgsDict[ 'timeout' ]
     if timeout:
       start = time.time()
+    #Partial sends go on from a view of the buffer instead of a copy of its tail
+    view = memoryview( buffer )
     while sentBytes < len( buffer ):
       try:
         if timeout:
           if time.time() - start > timeout:
             return S_ERROR( "Socket write timeout exceeded" )
-        sent = self.oSocket.send( buffer[ sentBytes: ] )
+        sent = self.oSocket.send( view[ sentBytes: ] )
         if sent == 0:
           return S_ERROR( "Connection closed by peer" )
         if sent > 0:
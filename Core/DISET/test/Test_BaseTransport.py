@@ -0,0 +1,111 @@
+""" Unit tests for the data exchange of BaseTransport, using PlainTransport over a socket pair
+"""
+
+import socket
+import threading
+
+import pytest
+
+from DIRAC.Core.DISET.private.Transports.PlainTransport import PlainTransport
+
+__RCSID__ = "$Id$"
+
+bigPayload = {'OK': True,
+              'Value': [{'LFN': '/vo/data/file_%s' % i, 'Size': i * 1000, 'Replicas': ('SE1', 'SE2')}
+                        for i in xrange(20000)]}
+
+
+def transportPair(**kwargs):
+  """ Two transports connected to each other
+
+      :param kwargs: extra arguments of the receiving transport
+  """
+  sender, receiver = socket.socketpair()
+  senderTransport = PlainTransport(None)
+  senderTransport.oSocket = sender
+  receiverTransport = PlainTransport(None, **kwargs)
+  receiverTransport.oSocket = receiver
+  return senderTransport, receiverTransport
+
+
+def exchange(senderTransport, receiverTransport, payload):
+  """ Send the payload from one transport and receive it on the other one
+  """
+  sendResults = []
+  sender = threading.Thread(target=lambda: sendResults.append(senderTransport.sendData(payload)))
+  sender.start()
+  received = receiverTransport.receiveData()
+  sender.join()
+  assert sendResults[0]['OK']
+  return received
+
+
+@pytest.mark.parametrize('kwargs', [{}, {'incrementalDecode': 'true'}])
+@pytest.mark.parametrize('payload', [{'OK': True, 'Value': 'small'}, bigPayload])
+def test_sendReceive(kwargs, payload):
+  """ Messages are received identical, with or without incremental decoding
+  """
+  senderTransport, receiverTransport = transportPair(**kwargs)
+  assert exchange(senderTransport, receiverTransport, payload) == payload
+  # The connection is still usable afterwards
+  assert exchange(senderTransport, receiverTransport, {'OK': True, 'Value': 1}) == {'OK': True, 'Value': 1}
+
+
+@pytest.mark.parametrize('kwargs', [{}, {'incrementalDecode': 'true'}])
+def test_readLimit(kwargs):
+  """ The read limit is enforced in both modes
+  """
+  senderTransport, receiverTransport = transportPair(**kwargs)
+  sender = threading.Thread(target=senderTransport.sendData, args=(bigPayload,))
+  sender.start()
+  result = receiverTransport.receiveData(maxBufferSize=100000)
+  receiverTransport.close()
+  sender.join()
+  assert not result['OK']
+  assert 'Read limit exceeded' in result['Message']
+
+
+def test_sendStats():
+  """ Every message sent is accounted for
+  """
+  senderTransport, receiverTransport = transportPair()
+  assert senderTransport.getSendStats()['Messages'] == 0
+  exchange(senderTransport, receiverTransport, bigPayload)
+  firstSize = senderTransport.getSendStats()['LastMessage']['Bytes']
+  exchange(senderTransport, receiverTransport, {'OK': True, 'Value': 1})
+  sendStats = senderTransport.getSendStats()
+  assert sendStats['Messages'] == 2
+  assert sendStats['LastMessage']['Bytes'] == len('20:ds2:OKb1s5:Valuei1ee')
+  assert sendStats['Bytes'] == firstSize + sendStats['LastMessage']['Bytes']
+  assert sendStats['SendingTime'] >= sendStats['LastMessage']['SendingTime'] > 0
+
+
+@pytest.mark.parametrize('kwargs', [{}, {'incrementalDecode': 'true'}])
+def test_compression(kwargs):
+  """ Messages above the threshold are compressed, and decompressed transparently
+  """
+  senderTransport, receiverTransport = transportPair(**kwargs)
+  senderTransport.setCompression(1000)
+  assert exchange(senderTransport, receiverTransport, bigPayload) == bigPayload
+  lastMessage = senderTransport.getSendStats()['LastMessage']
+  assert lastMessage['Bytes'] < lastMessage['EncodedBytes'] / 5
+  # Small messages are left as they are
+  assert exchange(senderTransport, receiverTransport, {'OK': True, 'Value': 1}) == {'OK': True, 'Value': 1}
+  lastMessage = senderTransport.getSendStats()['LastMessage']
+  assert lastMessage['Bytes'] == lastMessage['EncodedBytes'] + len('20:')
+
+
+@pytest.mark.parametrize('kwargs', [{}, {'incrementalDecode': 'true'}])
+def test_decompressionLimit(kwargs):
+  """ The read limit applies to the decompressed messages, not only to what is read
+  """
+  senderTransport, receiverTransport = transportPair(**kwargs)
+  senderTransport.setCompression(1000)
+  sender = threading.Thread(target=senderTransport.sendData, args=({'OK': True, 'Value': 'a' * 10000000},))
+  sender.start()
+  result = receiverTransport.receiveData(maxBufferSize=100000)
+  receiverTransport.close()
+  sender.join()
+  assert senderTransport.getSendStats()['LastMessage']['Bytes'] < 100000
+  assert not result['OK']
+  assert 'Read limit exceeded' in result['Message']
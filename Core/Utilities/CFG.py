@@ -2,7 +2,6 @@
 """
 
 import types
-import copy
 import os
 import re
 import zipfile
@@ -65,6 +64,9 @@ except Exception:
 
 #START OF CFG MODULE
 
+# What loadFromBuffer looks for in a line
+gTokenRE = re.compile( r"[{}=]|\+=" )
+
 class CFG( object ):
 
   def __init__( self ):
@@ -74,7 +76,6 @@ class CFG( object ):
     self.__orderedList = []
     self.__commentDict = {}
     self.__dataDict = {}
-    self.reset()
 
   @gCFGSynchro
   def reset( self ):
@@ -164,7 +165,7 @@ class CFG( object ):
     :type comment: string
     :param comment: Comment for the entry
     """
-    if not entryName in self.__orderedList:
+    if not entryName in self.__dataDict:
       self.__orderedList.append( entryName )
     self.__commentDict[ entryName ] = comment
 
@@ -665,27 +666,39 @@ class CFG( object ):
     :param tabLevelString: Tab string to apply to entries before representing them
     :return: String with the contents of the CFG
     """
+    cfgLines = []
+    self.__serialize( tabLevelString, cfgLines )
+    return "".join( cfgLines )
+
+  def __serialize( self, tabLevelString, cfgLines ):
+    """
+    Append the lines of the serialization of the CFG to a list, joined only once by serialize
+
+    :type tabLevelString: string
+    :param tabLevelString: Tab string to apply to entries before representing them
+    :type cfgLines: list
+    :param cfgLines: List of lines to fill
+    """
     indentation = "  "
-    cfgString = ""
     for entryName in self.__orderedList:
       if entryName in self.__commentDict:
         for commentLine in List.fromChar( self.__commentDict[ entryName ], "\n" ):
-          cfgString += "%s#%s\n" % ( tabLevelString, commentLine )
-      if entryName in self.listSections():
-        cfgString += "%s%s\n%s{\n" % ( tabLevelString, entryName, tabLevelString )
-        cfgString += self.__dataDict[ entryName ].serialize( "%s%s" % ( tabLevelString, indentation ) )
-        cfgString += "%s}\n" % tabLevelString
-      elif entryName in self.listOptions():
-        valueList = List.fromChar( self.__dataDict[ entryName ] )
+          cfgLines.append( "%s#%s\n" % ( tabLevelString, commentLine ) )
+      if entryName not in self.__dataDict:
+        raise ValueError( "Oops. There is an entry in the order which is not a section nor an option" )
+      value = self.__dataDict[ entryName ]
+      if not isinstance( value, basestring ):
+        cfgLines.append( "%s%s\n%s{\n" % ( tabLevelString, entryName, tabLevelString ) )
+        value.__serialize( "%s%s" % ( tabLevelString, indentation ), cfgLines )
+        cfgLines.append( "%s}\n" % tabLevelString )
+      else:
+        valueList = List.fromChar( value )
         if len( valueList ) == 0:
-          cfgString += "%s%s = \n" % ( tabLevelString, entryName )
+          cfgLines.append( "%s%s = \n" % ( tabLevelString, entryName ) )
         else:
-          cfgString += "%s%s = %s\n" % ( tabLevelString, entryName, valueList[0] )
+          cfgLines.append( "%s%s = %s\n" % ( tabLevelString, entryName, valueList[0] ) )
           for value in valueList[1:]:
-            cfgString += "%s%s += %s\n" % ( tabLevelString, entryName, value )
-      else:
-        raise ValueError( "Oops. There is an entry in the order which is not a section nor an option" )
-    return cfgString
+            cfgLines.append( "%s%s += %s\n" % ( tabLevelString, entryName, value ) )
 
   @gCFGSynchro
   def clone( self ):
@@ -695,22 +708,29 @@ class CFG( object ):
     :return: CFG copy
     """
     clonedCFG = CFG()
-    clonedCFG.__orderedList = copy.deepcopy( self.__orderedList )
-    clonedCFG.__commentDict = copy.deepcopy( self.__commentDict )
-    for option in self.listOptions():
-      clonedCFG.__dataDict[ option ] = self[ option ]
-    for section in self.listSections():
-      clonedCFG.__dataDict[ section ] = self[ section ].clone()
+    # Names and comments are strings, only the sections need to be copied
+    clonedCFG.__orderedList = list( self.__orderedList )
+    clonedCFG.__commentDict = dict( self.__commentDict )
+    for key in self.__orderedList:
+      value = self.__dataDict[ key ]
+      if isinstance( value, basestring ):
+        clonedCFG.__dataDict[ key ] = value
+      else:
+        clonedCFG.__dataDict[ key ] = value.clone()
     return clonedCFG
 
   @gCFGSynchro
-  def mergeWith( self, cfgToMergeWith ):
+  def mergeWith( self, cfgToMergeWith, shareSections = False ):
     """
     Generate a CFG by merging with the contents of another CFG.
 
     :type cfgToMergeWith: CFG
     :param cfgToMergeWith: CFG with the contents to merge with. This contents are more
                             preemtive than this CFG ones
+    :type shareSections: boolean
+    :param shareSections: Use the sections that exist only in this CFG instead of copies of them,
+                          like the ones existing only in cfgToMergeWith. The result must then be
+                          used read only, and merged again instead of being modified.
     :return: CFG with the result of the merge
     """
     mergedCFG = CFG()
@@ -722,18 +742,22 @@ class CFG( object ):
       mergedCFG.setOption( option,
                            cfgToMergeWith[ option ],
                            cfgToMergeWith.getComment( option ) )
-    for section in self.listSections():
-      if section in cfgToMergeWith.listSections():
-        oSectionCFG = self[ section ].mergeWith( cfgToMergeWith[ section ] )
+    sections = self.listSections()
+    sectionsToMergeWith = cfgToMergeWith.listSections()
+    sectionsToMergeWithSet = set( sectionsToMergeWith )
+    for section in sections:
+      if section in sectionsToMergeWithSet:
+        oSectionCFG = self[ section ].mergeWith( cfgToMergeWith[ section ], shareSections )
         mergedCFG.createNewSection( section,
                                     cfgToMergeWith.getComment( section ),
                                     oSectionCFG )
       else:
         mergedCFG.createNewSection( section,
                                     self.getComment( section ),
-                                    self[ section ].clone() )
-    for section in cfgToMergeWith.listSections():
-      if section not in self.listSections():
+                                    self[ section ] if shareSections else self[ section ].clone() )
+    sectionsSet = set( sections )
+    for section in sectionsToMergeWith:
+      if section not in sectionsSet:
         mergedCFG.createNewSection( section,
                                     cfgToMergeWith.getComment( section ),
                                     cfgToMergeWith[ section ] )
@@ -753,21 +777,26 @@ class CFG( object ):
     :return: A list of modifications
     """
     modList = []
+    # Positions of the entries, and sets of the names, not to look for them in the lists
+    oldPositions = self.__getPositions()
+    newPositions = newerCfg.__getPositions()
     #Options
     oldOptions = self.listOptions( True )
     newOptions = newerCfg.listOptions( True )
+    oldOptionsSet = set( oldOptions )
+    newOptionsSet = set( newOptions )
     for newOption in newOptions:
-      iPos = newerCfg.__orderedList.index( newOption )
+      iPos = newPositions[ newOption ]
       newOptPath = "%s/%s" % ( parentPath, newOption )
       if ignoreMask and newOptPath in ignoreMask:
         continue
-      if newOption not in oldOptions:
+      if newOption not in oldOptionsSet:
         modList.append( ( 'addOpt', newOption, iPos,
                           newerCfg[ newOption ],
                           newerCfg.getComment( newOption ) ) )
       else:
         modified = False
-        if iPos != self.__orderedList.index(newOption) and not ignoreOrder:
+        if iPos != oldPositions[ newOption ] and not ignoreOrder:
           modified = True
         elif newerCfg[ newOption ] != self[ newOption ]:
           modified = True
@@ -781,23 +810,25 @@ class CFG( object ):
       oldOptPath = "%s/%s" % ( parentPath, oldOption )
       if ignoreMask and oldOptPath in ignoreMask:
         continue
-      if oldOption not in newOptions:
+      if oldOption not in newOptionsSet:
         modList.append( ( 'delOpt', oldOption, -1, '' ) )
     #Sections
     oldSections = self.listSections( True )
     newSections = newerCfg.listSections( True )
+    oldSectionsSet = set( oldSections )
+    newSectionsSet = set( newSections )
     for newSection in newSections:
-      iPos = newerCfg.__orderedList.index( newSection )
+      iPos = newPositions[ newSection ]
       newSecPath = "%s/%s" % ( parentPath, newSection )
       if ignoreMask and newSecPath in ignoreMask:
         continue
-      if newSection not in oldSections:
+      if newSection not in oldSectionsSet:
         modList.append( ( 'addSec', newSection, iPos,
                           str( newerCfg[ newSection ] ),
                           newerCfg.getComment( newSection ) ) )
       else:
         modified = False
-        if iPos != self.__orderedList.index( newSection ):
+        if iPos != oldPositions[ newSection ]:
           modified = True
         elif newerCfg.getComment( newSection ) != self.getComment( newSection ):
           modified = True
@@ -814,10 +845,21 @@ class CFG( object ):
       oldSecPath = "%s/%s" % ( parentPath, oldSection )
       if ignoreMask and oldSecPath in ignoreMask:
         continue
-      if oldSection not in newSections:
+      if oldSection not in newSectionsSet:
         modList.append( ( 'delSec', oldSection, -1, '' ) )
     return modList
 
+  def __getPositions( self ):
+    """
+    Get the position of each entry, the first one as list.index if an entry is there twice
+
+    :return: Dictionary with the entry names as keys
+    """
+    positions = {}
+    for iPos, key in enumerate( self.__orderedList ):
+      positions.setdefault( key, iPos )
+    return positions
+
   def applyModifications( self, modList, parentSection = "" ):
     """
     Apply modifications to a CFG
@@ -915,7 +957,6 @@ class CFG( object ):
     :param data: Contents of the CFG
     :return: This CFG
     """
-    commentRE = re.compile( r"^\s*#" )
     self.reset()
     levelList = []
     currentLevel = self
@@ -923,37 +964,72 @@ class CFG( object ):
     currentComment = ""
     for line in data.split( "\n" ):
       line = line.strip()
-      if len( line ) < 1:
+      if not line:
         continue
-      if commentRE.match( line ):
+      if line[0] == "#":
         currentComment += "%s\n" % line.replace( "#", "" )
         continue
-      for index in range( len( line ) ):
-        if line[ index ] == "{":
-          currentlyParsedString = currentlyParsedString.strip()
-          currentLevel.createNewSection( currentlyParsedString, currentComment )
-          levelList.append( currentLevel )
-          currentLevel = currentLevel[ currentlyParsedString ]
+      # Jump from one of { } = += to the next one, what is in between is part of a section name
+      index = 0
+      while True:
+        match = gTokenRE.search( line, index )
+        if not match:
+          currentlyParsedString += line[ index: ]
+          break
+        token = match.group()
+        tokenPos = match.start()
+        if token == "{":
+          sectionName = ( currentlyParsedString + line[ index:tokenPos ] ).strip()
+          currentLevel = currentLevel.__parsedSection( sectionName, currentComment, levelList )
           currentlyParsedString = ""
           currentComment = ""
-        elif line[ index ] == "}":
+        elif token == "}":
+          currentlyParsedString += line[ index:tokenPos ]
           currentLevel = levelList.pop()
-        elif line[ index ] == "=":
-          lFields = line.split( "=" )
-          currentLevel.setOption( lFields[0].strip(), "=".join( lFields[1:] ).strip(), currentComment )
+        elif token == "=":
+          currentLevel.__parsedOption( line[ :tokenPos ].strip(), line[ tokenPos + 1: ].strip(), currentComment )
           currentlyParsedString = ""
           currentComment = ""
           break
-        elif line[ index: index + 2 ] == "+=":
-          valueList = line.split( "+=" )
-          currentLevel.appendToOption( valueList[0].strip(), ", %s" % "+=".join( valueList[1:] ).strip() )
+        else:
+          currentLevel.appendToOption( line[ :tokenPos ].strip(), ", %s" % line[ tokenPos + 2: ].strip() )
           currentlyParsedString = ""
           currentComment = ""
           break
-        else:
-          currentlyParsedString += line[ index ]
+        index = match.end()
     return self
 
+  def __parsedSection( self, sectionName, comment, levelList ):
+    """
+    Create a section read by loadFromBuffer, without the checks createNewSection does if the name is a plain one
+
+    :return: The new section, levelList gets this CFG
+    """
+    if sectionName and "/" not in sectionName and sectionName not in self.__dataDict:
+      if isinstance( sectionName, str ):
+        sectionName = intern( sectionName )
+      self.__orderedList.append( sectionName )
+      self.__commentDict[ sectionName ] = comment
+      section = CFG()
+      self.__dataDict[ sectionName ] = section
+    else:
+      self.createNewSection( sectionName, comment )
+      section = self[ sectionName ]
+    levelList.append( self )
+    return section
+
+  def __parsedOption( self, optionName, value, comment ):
+    """
+    Set an option read by loadFromBuffer, without the checks setOption does if the name is a plain one
+    """
+    if optionName and "/" not in optionName:
+      if isinstance( optionName, str ):
+        optionName = intern( optionName )
+      self.__addEntry( optionName, comment )
+      self.__dataDict[ optionName ] = str( value )
+    else:
+      self.setOption( optionName, value, comment )
+
   @gCFGSynchro
   def loadFromDict( self, data ):
     for k in data:
@@ -27,6 +27,11 @@ from pprint import pprint
 # call stack
 DIRAC_DEBUG_DENCODE_CALLSTACK = bool(os.environ.get('DIRAC_DEBUG_DENCODE_CALLSTACK', False))
 
+# Setting this environment variable to "stream" replaces the encode and decode functions
+# by the buffer based ones of DEncodeStream (same wire format). It is ignored when
+# DIRAC_DEBUG_DENCODE_CALLSTACK is set, since only this module has the debugging hooks.
+DIRAC_DENCODE_ENGINE = os.environ.get('DIRAC_DENCODE_ENGINE', 'python')
+
 # Depth of the stack to look for with inspect
 CONTEXT_DEPTH = 100
 
@@ -388,6 +393,16 @@ def encode(uObject):
     raise
 
 
+def encodeFragments(uObject):
+  """ Encoding function that does not join the result
+
+      :returns: list of strings whose concatenation is the encoded object
+  """
+  eList = []
+  g_dEncodeFunctions[type(uObject)](uObject, eList)
+  return eList
+
+
 def decode(data):
   """ Generic decoding function """
   if not data:
@@ -399,6 +414,15 @@ def decode(data):
     raise
 
 
+# Keep a reference to the pure python implementation, whatever engine is selected
+pythonEncode = encode
+pythonDecode = decode
+
+if DIRAC_DENCODE_ENGINE == 'stream' and not DIRAC_DEBUG_DENCODE_CALLSTACK:
+  # pylint: disable=wrong-import-position
+  from DIRAC.Core.Utilities.DEncodeStream import encode, decode, encodeFragments
+
+
 if __name__ == "__main__":
   gObject = {2: "3", True: (3, None), 2.0 * 10 ** 20: 2.0 * 10 ** -10}
   print "Initial: %s" % gObject
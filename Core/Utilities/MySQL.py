@@ -90,6 +90,14 @@
       String type values will be appropriately escaped.
 
 
+    insertMany( self, tableName, inFields, valuesList, ignore = False, chunkSize = 1000, conn = None ):
+
+      Insert many rows in "tableName" with multi-row INSERT statements of at most
+      chunkSize rows, that fit in the max_allowed_packet of the server.
+      upsertMany( self, tableName, inFields, valuesList, updateFields = None, chunkSize = 1000, conn = None )
+      does the same, updating the rows with duplicated keys.
+
+
     updateFields( self, tableName, updateFields = None, updateValues = None,
                   condDict = None,
                   limit = False, conn = None,
@@ -169,6 +177,10 @@ __RCSID__ = "$Id$"
 
 MAXCONNECTRETRY = 10
 
+# Client error when the server has gone away before the statement is sent. Only then is it safe to
+# execute it again: CR_SERVER_LOST (2013) can happen after the server executed the statement
+CR_SERVER_GONE_ERROR = 2006
+
 
 def _checkFields(inFields, inValues):
   """
@@ -216,9 +228,26 @@ class MySQL(object):
   class ConnectionPool(object):
     """
     Management of connections per thread
+
+    By default every thread gets its own connection and the number of open connections is not
+    limited. When maxConnections is set, at most that many connections are open at the same time:
+    a thread that needs one when they are all taken waits its turn in a FIFO queue, for up to
+    waitTimeout seconds, until a thread gives its connection back (see giveBack) or dies.
+    The connection of a live thread is never taken away from it, so that its session state
+    (transaction, LOCK TABLES, LAST_INSERT_ID()) is kept between its statements.
+
+    Connections are pinged when they are taken, unless pingIdleTime is set: then only the
+    connections unused for more than pingIdleTime seconds are, and MySQL retries the statements
+    that fail because the server has gone away.
     """
 
-    def __init__(self, host, user, passwd, port=3306, graceTime=600):
+    # Seconds between two checks for the connections of dead threads, by the waiting threads
+    deadThreadCheckInterval = 0.5
+    # Seconds between two cleanings of the connections of dead or inactive threads
+    cleanInterval = 10
+
+    def __init__(self, host, user, passwd, port=3306, graceTime=600, maxConnections=0, waitTimeout=30,
+                 pingIdleTime=0):
       self.__host = host
       self.__user = user
       self.__passwd = passwd
@@ -227,12 +256,61 @@ class MySQL(object):
       self.__spares = collections.deque()
       self.__maxSpares = 10
       self.__lastClean = 0
+      # thread -> [ connection, dbName, lastUse, inUse, inTransaction ]
       self.__assigned = {}
+      self.__maxConnections = max(0, maxConnections)
+      self.__waitTimeout = waitTimeout
+      self.__pingIdleTime = pingIdleTime
+      self.__lock = threading.Condition()
+      self.__waiting = collections.deque()
+      self.__opening = 0
+      self.__stats = {'Created': 0, 'Recycled': 0, 'Closed': 0, 'Checkouts': 0,
+                      'Waits': 0, 'Timeouts': 0, 'WaitTime': 0., 'MaxWaitTime': 0.}
 
     @property
     def __thid(self):
       return threading.current_thread()
 
+    def setLimits(self, maxConnections, waitTimeout=None):
+      """ Change the maximum number of open connections (0 for unlimited) and the waiting timeout
+      """
+      with self.__lock:
+        self.__maxConnections = max(0, maxConnections)
+        if waitTimeout is not None:
+          self.__waitTimeout = waitTimeout
+        self.__lock.notify_all()
+
+    def getLimits(self):
+      """ :return: tuple ( maximum number of open connections, waiting timeout )
+      """
+      return self.__maxConnections, self.__waitTimeout
+
+    def setPingIdleTime(self, pingIdleTime):
+      """ Only ping the connections unused for more than pingIdleTime seconds (0 to always ping)
+      """
+      self.__pingIdleTime = pingIdleTime
+
+    def getPingIdleTime(self):
+      return self.__pingIdleTime
+
+    def getStats(self):
+      """ Get the checkout statistics of the pool, and the current number of connections
+
+          :return: dictionary with the cumulative counters Created, Recycled, Closed, Checkouts, Waits,
+                   Timeouts, WaitTime and MaxWaitTime, and the current values Open, InUse, Spare and Waiting
+      """
+      with self.__lock:
+        stats = dict(self.__stats)
+        stats['Open'] = self.__openConnections()
+        stats['InUse'] = len([True for data in self.__assigned.itervalues() if data[3]])
+        stats['Spare'] = len(self.__spares)
+        stats['Waiting'] = len(self.__waiting)
+        stats['MaxConnections'] = self.__maxConnections
+      return stats
+
+    def __openConnections(self):
+      return len(self.__assigned) + len(self.__spares) + self.__opening
+
     def __newConn(self):
       conn = MySQLdb.connect(host=self.__host,
                              port=self.__port,
@@ -251,7 +329,8 @@ class MySQL(object):
 
     def get(self, dbName, retries=10):
       retries = max(0, min(MAXCONNECTRETRY, retries))
-      self.clean()
+      if time.time() - self.__lastClean > self.cleanInterval:
+        self.clean()
       return self.__getWithRetry(dbName, retries, retries)
 
     def __getWithRetry(self, dbName, totalRetries, retriesLeft):
@@ -259,17 +338,16 @@ class MySQL(object):
       if sleepTime > 0:
         time.sleep(sleepTime)
       try:
-        conn, lastName, thid = self.__innerGet()
+        conn, lastName, thid, idleTime = self.__innerGet()
       except MySQLdb.MySQLError as excp:
         if retriesLeft >= 0:
           return self.__getWithRetry(dbName, totalRetries, retriesLeft - 1)
         return S_ERROR(DErrno.EMYSQL, "Could not connect: %s" % excp)
+      if not conn:
+        return S_ERROR(DErrno.EMYSQL, "Timeout waiting for a free connection (%s open)" % self.__maxConnections)
 
-      if not self.__ping(conn):
-        try:
-          self.__assigned.pop(thid)
-        except KeyError:
-          pass
+      if idleTime >= self.__pingIdleTime and not self.__ping(conn):
+        self.__discard(thid)
         if retriesLeft >= 0:
           return self.__getWithRetry(dbName, totalRetries, retriesLeft)
         return S_ERROR(DErrno.EMYSQL, "Could not connect")
@@ -297,37 +375,159 @@ class MySQL(object):
         return False
 
     def __innerGet(self):
+      """ Get the connection of the current thread
+
+          :return: tuple ( connection, dbName, thread, seconds since the connection was last used )
+      """
       thid = self.__thid
       now = time.time()
-      if thid in self.__assigned:
-        data = self.__assigned[thid]
-        conn = data[0]
-        data[2] = now
-        return data[0], data[1], thid
-      # Not cached
+      with self.__lock:
+        self.__stats['Checkouts'] += 1
+        data = self.__assigned.get(thid)
+        if data:
+          idleTime = now - data[2]
+          data[2] = now
+          data[3] = True
+          return data[0], data[1], thid, idleTime
+        # Not cached
+        conn, dbName, lastUse = self.__acquire(thid)
+        if conn is False:
+          return None, None, thid, 0
+        if conn is not None:
+          self.__assigned[thid] = [conn, dbName, now, True, False]
+          return conn, dbName, thid, now - lastUse
+        self.__opening += 1
+
       try:
-        conn, dbName = self.__spares.pop()
-      except IndexError:
         conn = self.__newConn()
-        dbName = ""
+      finally:
+        with self.__lock:
+          self.__opening -= 1
+          self.__lock.notify_all()
+      with self.__lock:
+        self.__stats['Created'] += 1
+        self.__assigned[thid] = [conn, "", time.time(), True, False]
+      return conn, "", thid, 0
+
+    def __acquire(self, thid):
+      """ Find a connection for a thread that does not have one. The lock must be held
+
+          :return: ( connection, dbName, lastUse ), with None as connection if a new one can be opened,
+                   and False if the waiting timed out
+      """
+      if not self.__maxConnections:
+        if self.__spares:
+          self.__stats['Recycled'] += 1
+          return self.__spares.pop()
+        return None, "", 0
+
+      self.__waiting.append(thid)
+      startTime = time.time()
+      waited = False
+      try:
+        while True:
+          if self.__waiting[0] is thid:
+            if self.__spares:
+              self.__stats['Recycled'] += 1
+              return self.__spares.pop()
+            if self.__openConnections() < self.__maxConnections:
+              return None, "", 0
+            reclaimed = self.__reclaim()
+            if reclaimed:
+              self.__stats['Recycled'] += 1
+              return reclaimed
+          remaining = startTime + self.__waitTimeout - time.time()
+          if remaining <= 0:
+            self.__stats['Timeouts'] += 1
+            return False, "", 0
+          waited = True
+          # Wake up regularly as the threads die without notification
+          self.__lock.wait(min(remaining, self.deadThreadCheckInterval))
+      finally:
+        self.__waiting.remove(thid)
+        if waited:
+          waitTime = time.time() - startTime
+          self.__stats['Waits'] += 1
+          self.__stats['WaitTime'] += waitTime
+          self.__stats['MaxWaitTime'] = max(self.__stats['MaxWaitTime'], waitTime)
+        self.__lock.notify_all()
+
+    def __reclaim(self):
+      """ Take the connection of a dead thread. The lock must be held
+      """
+      for thid in self.__assigned.keys():
+        if not thid.isAlive():
+          data = self.__assigned.pop(thid)
+          return data[0], data[1], data[2]
+      return None
+
+    def release(self):
+      """ Mark the connection of the current thread as not in use, after a statement.
+          The thread keeps it until it gives it back or dies
+      """
+      with self.__lock:
+        data = self.__assigned.get(self.__thid)
+        if data:
+          data[2] = time.time()
+          data[3] = False
+
+    def giveBack(self):
+      """ The current thread is done with its connection: put it with the spare ones, for the
+          other threads. The connection of a transaction is kept until the transaction is over
+
+          :return: True if the connection was given back
+      """
+      thid = self.__thid
+      with self.__lock:
+        data = self.__assigned.get(thid)
+        if not data or data[4]:
+          return False
+        data[3] = False
+        self.__pop(thid)
+      return True
 
-      self.__assigned[thid] = [conn, dbName, now]
-      return conn, dbName, thid
+    def isBounded(self):
+      return bool(self.__maxConnections)
 
-    def __pop(self, thid):
+    def __close(self, conn):
+      self.__stats['Closed'] += 1
       try:
-        data = self.__assigned.pop(thid)
+        conn.close()
+      except MySQLdb.ProgrammingError as exc:
+        gLogger.warn("ProgrammingError exception while closing MySQL connection: %s" % exc)
+      except BaseException as exc:
+        gLogger.warn("Exception while closing MySQL connection: %s" % exc)
+
+    def discard(self):
+      """ Close the connection of the current thread, ie because the server has gone away
+
+          :return: False if the connection was in a transaction, that is lost with it
+      """
+      thid = self.__thid
+      with self.__lock:
+        data = self.__assigned.get(thid)
+        inTransaction = bool(data and data[4])
+        self.__discard(thid)
+      return not inTransaction
+
+    def __discard(self, thid):
+      with self.__lock:
+        data = self.__assigned.pop(thid, None)
+        if data:
+          self.__close(data[0])
+          self.__lock.notify_all()
+
+    def __pop(self, thid):
+      with self.__lock:
+        try:
+          data = self.__assigned.pop(thid)
+        except KeyError:
+          return
         if len(self.__spares) < self.__maxSpares:
-          self.__spares.append((data[0], data[1]))
+          self.__spares.append((data[0], data[1], data[2]))
         else:
-          try:
-            data[0].close()
-          except MySQLdb.ProgrammingError as exc:
-            gLogger.warn("ProgrammingError exception while closing MySQL connection: %s" % exc)
-          except BaseException as exc:
-            gLogger.warn("Exception while closing MySQL connection: %s" % exc)
-      except KeyError:
-        pass
+          self.__close(data[0])
+        self.__lock.notify_all()
 
     def clean(self, now=False):
       if not now:
@@ -343,15 +543,26 @@ class MySQL(object):
         if now - data[2] > self.__graceTime:
           self.__pop(thid)
 
+    def __setTransaction(self, inTransaction):
+      """ A connection in a transaction can not be given back
+      """
+      data = self.__assigned.get(self.__thid)
+      if data:
+        data[4] = inTransaction
+
     def transactionStart(self, dbName):
       result = self.get(dbName)
       if not result['OK']:
         return result
       conn = result['Value']
       try:
-        return S_OK(self.__execute(conn, "START TRANSACTION WITH CONSISTENT SNAPSHOT"))
+        result = S_OK(self.__execute(conn, "START TRANSACTION WITH CONSISTENT SNAPSHOT"))
+        self.__setTransaction(True)
+        return result
       except MySQLdb.MySQLError as excp:
         return S_ERROR(DErrno.EMYSQL, "Could not begin transaction: %s" % excp)
+      finally:
+        self.release()
 
     def transactionCommit(self, dbName):
       result = self.get(dbName)
@@ -363,6 +574,9 @@ class MySQL(object):
         return S_OK(result)
       except MySQLdb.MySQLError as excp:
         return S_ERROR(DErrno.EMYSQL, "Could not commit transaction: %s" % excp)
+      finally:
+        self.__setTransaction(False)
+        self.release()
 
     def transactionRollback(self, dbName):
       result = self.get(dbName)
@@ -374,14 +588,24 @@ class MySQL(object):
         return S_OK(result)
       except MySQLdb.MySQLError as excp:
         return S_ERROR(DErrno.EMYSQL, "Could not rollback transaction: %s" % excp)
+      finally:
+        self.__setTransaction(False)
+        self.release()
 
   __connectionPools = {}
+  __maxPacketSize = 0
 
-  def __init__(self, hostName='localhost', userName='dirac', passwd='dirac', dbName='', port=3306, debug=False):
+  def __init__(self, hostName='localhost', userName='dirac', passwd='dirac', dbName='', port=3306, debug=False,
+               maxConnections=0, waitTimeout=30, pingIdleTime=0):
     """
     set MySQL connection parameters and try to connect
 
     :param debug: unused
+    :param int maxConnections: maximum number of connections open to the server at the same time
+                               by all the instances sharing this host, user and port (0 for unlimited)
+    :param int waitTimeout: seconds to wait for a free connection when maxConnections are in use
+    :param int pingIdleTime: only ping the connections unused for more than this number of seconds,
+                             instead of before every statement (0)
     """
     global gInstancesCount
     gInstancesCount += 1
@@ -403,7 +627,20 @@ class MySQL(object):
     self.__port = port
     cKey = (self.__hostName, self.__userName, self.__passwd, self.__port)
     if cKey not in MySQL.__connectionPools:
-      MySQL.__connectionPools[cKey] = MySQL.ConnectionPool(*cKey)
+      MySQL.__connectionPools[cKey] = MySQL.ConnectionPool(*cKey, maxConnections=maxConnections,
+                                                           waitTimeout=waitTimeout, pingIdleTime=pingIdleTime)
+    else:
+      connectionPool = MySQL.__connectionPools[cKey]
+      if maxConnections and not connectionPool.isBounded():
+        connectionPool.setLimits(maxConnections, waitTimeout)
+      elif maxConnections and connectionPool.getLimits() != (maxConnections, waitTimeout):
+        # The pool is shared by all the databases of the server: the first limits set are kept
+        gLogger.warn("Conflicting limits of the connection pool, keeping the first ones",
+                     "%s@%s:%s: maxConnections=%s, waitTimeout=%s, not %s, %s" %
+                     ((self.__userName, self.__hostName, self.__port) + connectionPool.getLimits() +
+                      (maxConnections, waitTimeout)))
+      if pingIdleTime:
+        MySQL.__connectionPools[cKey].setPingIdleTime(pingIdleTime)
     self.__connectionPool = MySQL.__connectionPools[cKey]
 
     self.__initialized = True
@@ -447,17 +684,20 @@ class MySQL(object):
     except BaseException:
       return False
 
-  def __escapeString(self, myString):
+  def __escapeString(self, myString, connection=None):
     """
     To be used for escaping any MySQL string before passing it to the DB
     this should prevent passing non-MySQL accepted characters to the DB
     It also includes quotation marks " around the given string
     """
 
-    retDict = self._getConnection()
-    if not retDict['OK']:
-      return retDict
-    connection = retDict['Value']
+    if connection is None:
+      retDict = self._getConnection()
+      if not retDict['OK']:
+        return retDict
+      connection = retDict['Value']
+      # Escaping only needs the character set of the connection, the thread does not keep it busy
+      self.__connectionPool.release()
 
     try:
       myString = str(myString)
@@ -519,9 +759,11 @@ class MySQL(object):
 
     return self.__escapeString(myString)
 
-  def _escapeValues(self, inValues=None):
+  def _escapeValues(self, inValues=None, connection=None):
     """
     Escapes all strings in the list of values provided
+
+    :param connection: connection to use for escaping, instead of getting it for every value
     """
     # self.log.debug('_escapeValues:', inValues)
 
@@ -532,22 +774,22 @@ class MySQL(object):
 
     for value in inValues:
       if isinstance(value, basestring):
-        retDict = self.__escapeString(value)
+        retDict = self.__escapeString(value, connection)
         if not retDict['OK']:
           return retDict
         inEscapeValues.append(retDict['Value'])
       elif isinstance(value, (tuple, list)):
         tupleValues = []
         for val in value:
-          retDict = self.__escapeString(val)
+          retDict = self.__escapeString(val, connection)
           if not retDict['OK']:
             return retDict
           tupleValues.append(retDict['Value'])
         inEscapeValues.append('(' + ', '.join(tupleValues) + ')')
       elif isinstance(value, bool):
-        inEscapeValues = [str(value)]
+        inEscapeValues.append(str(value))
       else:
-        retDict = self.__escapeString(str(value))
+        retDict = self.__escapeString(str(value), connection)
         if not retDict['OK']:
           return retDict
         inEscapeValues.append(retDict['Value'])
@@ -583,11 +825,12 @@ class MySQL(object):
     except Exception as x:
       return self._except('_connect', x, 'Could not connect to DB.')
 
-  def _query(self, cmd, conn=None, debug=False):
+  def _query(self, cmd, conn=None, debug=False, retry=True):
     """
     execute MySQL query command
 
     :param debug: unused
+    :param bool retry: execute the command again on a new connection if it could not be sent
 
     return S_OK structure with fetchall result as tuple
     it returns an empty tuple if no matching rows are found
@@ -619,18 +862,68 @@ class MySQL(object):
     except BaseException as x:
       # self.log.debug('_query: %s' % self._safeCmd(cmd))
       retDict = self._except('_query', x, 'Execution failed.')
+      if retry and self.__serverGoneAway(x, (CR_SERVER_GONE_ERROR,)):
+        return self._query(cmd, conn, retry=False)
 
     try:
       cursor.close()
     except BaseException:
       pass
+    self.__connectionPool.release()
 
     return retDict
 
-  def _update(self, cmd, conn=None, debug=False):
+  def _streamQuery(self, cmd, batchSize=1000, conn=None):
+    """
+    execute MySQL query command, fetching the result from the server in batches
+    with a server side cursor, so that the memory used does not depend on its size
+
+    No other statement can be executed on the connection until the iteration is over:
+    it is busy with the result.
+
+    :param str cmd: query command
+    :param int batchSize: number of rows fetched at once
+    :param conn: connection to use, which is then left to the caller; by default the one of the thread
+
+    :return: generator of S_OK structures with tuples of at most batchSize rows,
+             or of one S_ERROR upon error, that ends the iteration
+    """
+    connection = conn
+    if not connection:
+      retDict = self._getConnection()
+      if not retDict['OK']:
+        yield retDict
+        return
+      connection = retDict['Value']
+
+    cursor = None
+    try:
+      cursor = connection.cursor(MySQLdb.cursors.SSCursor)
+      cursor.execute(cmd)
+      rows = cursor.fetchmany(batchSize)
+      while rows:
+        yield S_OK(rows)
+        rows = cursor.fetchmany(batchSize)
+    except GeneratorExit:
+      # The consumer stopped the iteration
+      raise
+    except BaseException as x:
+      yield self._except('_streamQuery', x, 'Execution failed.')
+    finally:
+      # The rows not read have to be consumed before the connection can be used again
+      try:
+        cursor.close()
+      except BaseException:
+        pass
+      if not conn:
+        self.__connectionPool.release()
+
+  def _update(self, cmd, conn=None, debug=False, retry=True):
     """ execute MySQL update command
 
         :param debug: unused
+        :param bool retry: execute the command again on a new connection if it could not be sent
+                           because the server has gone away
 
         return S_OK with number of updated registers upon success
         return S_ERROR upon error
@@ -654,14 +947,28 @@ class MySQL(object):
     except Exception as x:
       # self.log.debug('_update: %s: %s' % (self._safeCmd(cmd), str(x)))
       retDict = self._except('_update', x, 'Execution failed.')
+      # The update may have been done if the connection was lost while executing it
+      if retry and self.__serverGoneAway(x, (CR_SERVER_GONE_ERROR,)):
+        return self._update(cmd, conn, retry=False)
 
     try:
       cursor.close()
     except Exception:
       pass
+    self.__connectionPool.release()
 
     return retDict
 
+  def __serverGoneAway(self, excp, errorCodes):
+    """ Whether a statement failed with one of the errorCodes, meaning that the server has gone away.
+        The connection is then dropped, so that the statement can be executed again on a new one,
+        unless it was in a transaction
+    """
+    if not isinstance(excp, MySQLdb.Error) or not excp.args or excp.args[0] not in errorCodes:
+      return False
+    self.log.warn("MySQL server has gone away, reconnecting", str(excp))
+    return self.__connectionPool.discard()
+
   def _transaction(self, cmdList, conn=None):
     """ dummy transaction support
 
@@ -693,9 +1000,11 @@ class MySQL(object):
       self.logger.exception(error)
       # # rollback, put back connection to the pool
       connection.rollback()
+      self.__connectionPool.release()
       return S_ERROR(DErrno.EMYSQL, error)
     # # close cursor, put back connection to the pool
     cursor.close()
+    self.__connectionPool.release()
     return S_OK(cmdRet)
 
   def _createViews(self, viewsDict, force=False):
@@ -954,6 +1263,33 @@ class MySQL(object):
 
     return self.__connectionPool.get(self.__dbName)
 
+  def releaseConnection(self):
+    """ Give back the connection of the current thread to the pool of this instance, when the
+        thread is done with its session, see :py:meth:`MySQL.ConnectionPool.giveBack`
+    """
+    return self.__connectionPool.giveBack()
+
+  @staticmethod
+  def releaseThreadConnections():
+    """ Give back the connections of the current thread to all the pools limited in connections,
+        ie at the end of the requests of the services
+    """
+    for connectionPool in MySQL.__connectionPools.values():
+      if connectionPool.isBounded():
+        connectionPool.giveBack()
+
+  def getConnectionPoolStats(self):
+    """ Get the statistics of the pool of connections used by this instance,
+        see :py:meth:`MySQL.ConnectionPool.getStats`
+    """
+    return self.__connectionPool.getStats()
+
+  def getConnectionPoolName(self):
+    """ Name of the pool of connections used by this instance, shared by all the instances
+        connecting to the same server as the same user
+    """
+    return "%s@%s:%s" % (self.__userName, self.__hostName, self.__port)
+
 ########################################################################################
 #
 #  Transaction functions
@@ -1438,6 +1774,107 @@ class MySQL(object):
     return self._update('INSERT INTO %s %s VALUES %s' %
                         (table, inFieldString, inValueString), conn)
 
+  def insertMany(self, tableName, inFields, valuesList, ignore=False, chunkSize=1000, conn=None):
+    """
+      Insert many rows in "tableName" with multi-row INSERT statements, each of them
+      with at most chunkSize rows and within the max_allowed_packet of the server.
+      The rows are not inserted atomically: if a statement fails, the rows of the
+      previous ones stay inserted.
+
+      :param list inFields: names of the fields
+      :param list valuesList: rows to insert, each of them a list of values in the order of inFields.
+                              String type values will be appropriately escaped.
+      :param bool ignore: use INSERT IGNORE, to skip the rows with duplicated keys
+      :param int chunkSize: maximum number of rows per statement
+      :param conn: connection to use, like for insertFields
+
+      :return: S_OK( number of inserted rows )
+    """
+    return self.__insertMany('INSERT IGNORE' if ignore else 'INSERT', tableName, inFields, valuesList,
+                             '', chunkSize, conn)
+
+  def upsertMany(self, tableName, inFields, valuesList, updateFields=None, chunkSize=1000, conn=None):
+    """
+      Insert many rows in "tableName", updating the existing rows with the same keys,
+      like insertMany, with INSERT ... ON DUPLICATE KEY UPDATE statements.
+
+      :param list updateFields: fields to update in the existing rows, all the inFields by default
+
+      :return: S_OK( number of affected rows ), which counts the updated rows twice as MySQL does
+    """
+    if updateFields is None:
+      updateFields = inFields
+    updateString = _quotedList(updateFields)
+    if updateString is None:
+      return S_ERROR(DErrno.EMYSQL, 'Invalid updateFields argument')
+    updateString = ' ON DUPLICATE KEY UPDATE %s' % ', '.join('%s = VALUES(%s)' % (field, field)
+                                                              for field in updateString.split(', '))
+    return self.__insertMany('INSERT', tableName, inFields, valuesList, updateString, chunkSize, conn)
+
+  def __insertMany(self, command, tableName, inFields, valuesList, suffix, chunkSize, conn):
+    """ Build and execute the chunked multi-row statements of insertMany and upsertMany,
+        with the connection conn if given
+    """
+    table = _quotedList([tableName])
+    if not table:
+      return S_ERROR(DErrno.EMYSQL, 'Invalid tableName argument')
+    inFieldString = _quotedList(inFields)
+    if inFieldString is None:
+      return S_ERROR(DErrno.EMYSQL, 'Invalid inFields arguments')
+    prefix = '%s INTO %s ( %s ) VALUES ' % (command, table, inFieldString)
+    if not valuesList:
+      return S_OK(0)
+
+    connection = conn
+    if connection is None:
+      retDict = self._getConnection()
+      if not retDict['OK']:
+        return retDict
+      # The connection is only used to escape the values
+      connection = retDict['Value']
+      self.__connectionPool.release()
+    retDict = self.__getMaxPacketSize()
+    if not retDict['OK']:
+      return retDict
+    maxLength = retDict['Value'] - len(prefix) - len(suffix)
+
+    rows = []
+    length = 0
+    inserted = 0
+    for values in valuesList:
+      if len(values) != len(inFields):
+        return S_ERROR(DErrno.EMYSQL, 'Mismatch between inFields and inValues.')
+      retDict = self._escapeValues(values, connection)
+      if not retDict['OK']:
+        return retDict
+      row = '( %s )' % ', '.join(retDict['Value'])
+      if rows and (len(rows) >= chunkSize or length + len(row) > maxLength):
+        retDict = self._update(prefix + ','.join(rows) + suffix, conn)
+        if not retDict['OK']:
+          return retDict
+        inserted += retDict['Value']
+        rows = []
+        length = 0
+      rows.append(row)
+      length += len(row) + 1
+
+    if rows:
+      retDict = self._update(prefix + ','.join(rows) + suffix, conn)
+      if not retDict['OK']:
+        return retDict
+      inserted += retDict['Value']
+    return S_OK(inserted)
+
+  def __getMaxPacketSize(self):
+    """ Get the max_allowed_packet of the server, with a margin for the protocol overhead
+    """
+    if not self.__maxPacketSize:
+      retDict = self._query('SELECT @@max_allowed_packet')
+      if not retDict['OK']:
+        return retDict
+      self.__maxPacketSize = int(retDict['Value'][0][0]) * 9 / 10
+    return S_OK(self.__maxPacketSize)
+
   def executeStoredProcedure(self, packageName, parameters, outputIds):
     conDict = self._getConnection()
     if not conDict['OK']:
@@ -1461,6 +1898,7 @@ class MySQL(object):
       cursor.close()
     except Exception:
       pass
+    self.__connectionPool.release()
     return retDict
 
   # For the procedures that execute a select without storing the result
@@ -1485,5 +1923,6 @@ class MySQL(object):
       cursor.close()
     except Exception:
       pass
+    self.__connectionPool.release()
 
     return retDict
@@ -39,17 +39,21 @@ class DataCache( object ):
       self.__graphCache.purgeExpired()
       self.__dataCache.purgeExpired()
 
-  def getReportData( self, reportRequest, reportHash, dataFunc ):
+  def getReportData( self, reportRequest, reportHash, dataFunc, lifeTime = None ):
     """
     Get report data from cache if exists, else generate it
+
+    :param int lifeTime: seconds the generated data is kept, the default data life time if not given
     """
-    reportData = self.__dataCache.get( reportHash )   
+    reportData = self.__dataCache.get( reportHash )
     if not reportData:
       retVal = dataFunc( reportRequest )
       if not retVal[ 'OK' ]:
         return retVal
       reportData = retVal[ 'Value' ]
-      self.__dataCache.add( reportHash, self.__dataLifeTime, reportData )
+      if lifeTime is None:
+        lifeTime = self.__dataLifeTime
+      self.__dataCache.add( reportHash, lifeTime, reportData )
     return S_OK( reportData )
 
   def getReportPlot( self, reportRequest, reportHash, reportData, plotFunc ):
@@ -10,39 +10,33 @@ __RCSID__ = "$Id$"
 import re
 
 from DIRAC import gConfig, gLogger, S_OK, S_ERROR
+from DIRAC.ConfigurationSystem.Client.Helpers.Resources import ResourcesTopology
 
 
-def __getGridTypes(gridName=None):
-  gridTypes = gConfig.getSections('Resources/Sites/', [])
-  if not gridTypes['OK']:
+def __getTopologySites(gridName=None):
+  """ Get the index of /Resources/Sites and the sites of a grid, or all of them
+  """
+  result = ResourcesTopology.getTopology()
+  if not result['OK']:
     gLogger.error('Problem retrieving sections in /Resources/Sites')
-    return gridTypes
-  gridTypes = gridTypes['Value']
-  if gridName:
-    if gridName not in gridTypes:
-      errMsg = 'Could not get sections for /Resources/Sites/%s' % gridName
-      gLogger.error(errMsg)
-      return S_ERROR(errMsg)
-    gridTypes = [gridName]
-  return S_OK(gridTypes)
+    return result
+  topology = result['Value']
+  if not gridName:
+    return S_OK((topology, topology.sites))
+  if gridName not in topology.gridSites:
+    errMsg = 'Could not get sections for /Resources/Sites/%s' % gridName
+    gLogger.error(errMsg)
+    return S_ERROR(errMsg)
+  return S_OK((topology, topology.gridSites[gridName]))
 
 #############################################################################
 
 
 def getSites(gridName=None):
-  gridTypes = __getGridTypes(gridName)
-  if not gridTypes['OK']:
-    return gridTypes
-  gridTypes = gridTypes['Value']
-
-  siteList = []
-  for grid in gridTypes:
-    sites = gConfig.getSections('/Resources/Sites/%s' % grid, [])
-    if not sites['OK']:
-      gLogger.error('Problem retrieving /Resources/Sites/%s section' % grid, sites['Message'])
-      return sites
-    siteList += sites['Value']
-  return S_OK(siteList)
+  result = __getTopologySites(gridName)
+  if not result['OK']:
+    return result
+  return S_OK(list(result['Value'][1]))
 
 #############################################################################
 
@@ -52,16 +46,16 @@ def getSiteCEMapping(gridName=None):
       {'LCG.CERN.ch':['ce101.cern.ch',...]}
       If gridName is specified, result is restricted to that Grid type.
   """
-  sites = getSites(gridName=gridName)
-  if not sites['OK']:
-    return sites
+  result = __getTopologySites(gridName)
+  if not result['OK']:
+    return result
+  topology, sites = result['Value']
 
   siteCEMapping = {}
-  for candidate in sites['Value']:
-    grid = candidate.split('.')[0]
-    candidateCEs = gConfig.getValue('/Resources/Sites/%s/%s/CE' % (grid, candidate), [])
+  for candidate in sites:
+    candidateCEs = topology.siteCEs[candidate]
     if candidateCEs:
-      siteCEMapping[candidate] = candidateCEs
+      siteCEMapping[candidate] = list(candidateCEs)
     else:
       gLogger.debug('No CEs defined for site %s' % candidate)
 
@@ -75,15 +69,14 @@ def getCESiteMapping(gridName=None):
       {'ce101.cern.ch':'LCG.CERN.ch', ...]}
       Assumes CS structure of: /Resources/Sites/<GRIDNAME>/<SITENAME>
   """
-  sites = getSites(gridName=gridName)
-  if not sites['OK']:
-    return sites
+  result = __getTopologySites(gridName)
+  if not result['OK']:
+    return result
+  topology, sites = result['Value']
 
   ceSiteMapping = {}
-  for candidate in sites['Value']:
-    grid = candidate.split('.')[0]
-    siteCEs = gConfig.getValue('/Resources/Sites/%s/%s/CE' % (grid, candidate), [])
-    for ce in siteCEs:
+  for candidate in sites:
+    for ce in topology.siteCEs[candidate]:
       if ce in ceSiteMapping:
         current = ceSiteMapping[ce]
         gLogger.error('CE %s already has a defined site %s but it is also defined for %s' % (ce, current, candidate))
@@ -100,16 +93,12 @@ def getSiteForCE(computingElement):
 
       WARNING: if two or more sites happen to have the same ceName/queueName, then only the first found is returned
   """
-  sites = getSites()
-  if not sites['OK']:
-    return sites
-
-  for candidate in sites['Value']:
-    grid = candidate.split('.')[0]
-    siteCEs = gConfig.getValue('/Resources/Sites/%s/%s/CE' % (grid, candidate), [])
-    if computingElement in siteCEs:
-      finalSite = candidate
-      return S_OK(finalSite)
+  result = ResourcesTopology.getTopology()
+  if not result['OK']:
+    return result
+  ceSites = result['Value'].ceSites.get(computingElement)
+  if ceSites:
+    return S_OK(ceSites[0])
   # FIXME: this is strange but this was how it was coded
   return S_OK('')
 
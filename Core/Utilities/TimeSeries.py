@@ -0,0 +1,163 @@
+""" Array representation of the time series of the Accounting and Monitoring reports
+
+    The series of all the keys of a report are binned in time: each field is a 2D array
+    keys x time bins, and a mask tells which bins hold data for each key, so that the
+    dictionaries given to the plotters only contain the bins they would have had otherwise.
+"""
+
+import itertools
+
+import numpy
+
+__RCSID__ = "$Id$"
+
+
+class TimeSeriesArray(object):
+  """
+  Time series of several keys, binned in time
+
+  :param list keys: keys of the series, the rows of the arrays
+  :param times: 1D array with the epochs of the time bins, the columns of the arrays
+  :param values: 3D array fields x keys x time bins
+  :param present: 2D boolean array keys x time bins, True for the bins with data
+  """
+
+  def __init__(self, keys, times, values, present):
+    self.keys = keys
+    self.times = times
+    self.values = values
+    self.present = present
+
+  @classmethod
+  def fromBuckets(cls, granularity, bucketsDict):
+    """
+    Span the buckets of each key to time bins of granularity seconds, adding up the proportional
+    part of the values of each bucket in each bin. The last field of the result is the sum of these proportions.
+
+    :param int granularity: length of the time bins
+    :param dict bucketsDict: { key : bucketsData }, bucketsData is a list of lists where each list contains
+                               - field 0: datetime
+                               - field 1: bucketLength
+                               - fields 2-n: numericalFields, None is taken as 0
+    :return: TimeSeriesArray
+    """
+    keys = []
+    rows = []
+    keyIndexes = []
+    for key, bucketsData in bucketsDict.iteritems():
+      keys.append(key)
+      rows.extend(bucketsData)
+      keyIndexes.append(numpy.repeat(len(keys) - 1, len(bucketsData)))
+    if not rows:
+      return cls(keys, numpy.zeros(0, dtype=numpy.int64), numpy.zeros((1, len(keys), 0)),
+                 numpy.zeros((len(keys), 0), dtype=bool))
+    rowLength = len(rows[0])
+    nFields = rowLength - 2
+
+    data = numpy.fromiter(itertools.chain.from_iterable(rows), dtype=numpy.float64,
+                          count=len(rows) * rowLength).reshape(len(rows), rowLength)
+    # None values are converted to NaN
+    data[numpy.isnan(data)] = 0
+    keyIndexes = numpy.concatenate(keyIndexes)
+    startTimes = data[:, 0].astype(numpy.int64)
+    bucketLengths = data[:, 1].astype(numpy.int64)
+    endTimes = startTimes + bucketLengths
+
+    # First bin and number of bins of each bucket: the buckets of the granularity keep their start time
+    firstBins = numpy.where(bucketLengths == granularity, startTimes, startTimes - startTimes % granularity)
+    binsCount = numpy.where((bucketLengths == granularity) | (bucketLengths == 0), 1,
+                            (endTimes - firstBins + granularity - 1) // granularity)
+    bucketIndexes = numpy.repeat(numpy.arange(len(rows)), binsCount)
+    # Position of each bin within its bucket
+    binOffsets = numpy.arange(len(bucketIndexes)) - numpy.repeat(numpy.cumsum(binsCount) - binsCount, binsCount)
+    binTimes = firstBins[bucketIndexes] + binOffsets * granularity
+
+    proportions = numpy.ones(len(bucketIndexes))
+    spanned = (bucketLengths[bucketIndexes] != granularity) & (bucketLengths[bucketIndexes] != 0)
+    spannedIndexes = bucketIndexes[spanned]
+    spannedTimes = binTimes[spanned]
+    proportions[spanned] = ((numpy.minimum(spannedTimes + granularity, endTimes[spannedIndexes]) -
+                             numpy.maximum(spannedTimes, startTimes[spannedIndexes])) /
+                            bucketLengths[spannedIndexes].astype(numpy.float64))
+
+    times, binIndexes = numpy.unique(binTimes, return_inverse=True)
+    cells = keyIndexes[bucketIndexes] * len(times) + binIndexes
+    nCells = len(keys) * len(times)
+    values = numpy.empty((nFields + 1, len(keys), len(times)))
+    for iField in xrange(nFields):
+      values[iField] = numpy.bincount(cells, weights=data[bucketIndexes, iField + 2] * proportions,
+                                      minlength=nCells).reshape(len(keys), len(times))
+    values[nFields] = numpy.bincount(cells, weights=proportions, minlength=nCells).reshape(len(keys), len(times))
+    present = (numpy.bincount(cells, minlength=nCells) > 0).reshape(len(keys), len(times))
+    return cls(keys, times, values, present)
+
+  @classmethod
+  def fromDict(cls, dataDict):
+    """
+    :param dict dataDict: { key : { time : [ value1, value2... ] } }
+    :return: TimeSeriesArray
+    """
+    keys = list(dataDict)
+    times = numpy.unique(numpy.fromiter((timeKey for key in keys for timeKey in dataDict[key]), dtype=numpy.int64))
+    nFields = 0
+    for key in keys:
+      for timeKey in dataDict[key]:
+        nFields = len(dataDict[key][timeKey])
+        break
+      if nFields:
+        break
+    values = numpy.zeros((nFields, len(keys), len(times)))
+    present = numpy.zeros((len(keys), len(times)), dtype=bool)
+    if not nFields:
+      # No value in any series
+      return cls(keys, times, values, present)
+    for iKey, key in enumerate(keys):
+      keyTimes = numpy.fromiter(dataDict[key], dtype=numpy.int64, count=len(dataDict[key]))
+      binIndexes = numpy.searchsorted(times, keyTimes)
+      present[iKey, binIndexes] = True
+      values[:, iKey, binIndexes] = numpy.array(dataDict[key].values(), dtype=numpy.float64).reshape(-1, nFields).T
+    return cls(keys, times, values, present)
+
+  def toDict(self):
+    """
+    :return: { key : { time : [ value1, value2... ] } } for the bins with data
+    """
+    dataDict = {}
+    times = self.times.tolist()
+    for iKey, key in enumerate(self.keys):
+      binIndexes = numpy.flatnonzero(self.present[iKey])
+      keyValues = self.values[:, iKey, binIndexes].T.tolist()
+      dataDict[key] = dict(zip([times[iBin] for iBin in binIndexes], keyValues))
+    return dataDict
+
+  def sumToGranularity(self):
+    """
+    :return: TimeSeriesArray of the values spanned by fromBuckets, without the proportions
+    """
+    return TimeSeriesArray(self.keys, self.times, self.values[:-1], self.present)
+
+  def averageToGranularity(self):
+    """
+    :return: TimeSeriesArray of the values spanned by fromBuckets, divided by the proportions
+    """
+    with numpy.errstate(divide='ignore', invalid='ignore'):
+      values = self.values[:-1] / self.values[-1]
+    return TimeSeriesArray(self.keys, self.times, values, self.present)
+
+  def proportionalGauges(self):
+    """
+    Proportional gauges of two fields, total and count: for each bin, the ratio total / count of each key,
+    scaled so that their sum is the ratio of the sums of the totals and of the counts of the bin
+
+    :return: TimeSeriesArray with the gauges as single field
+    """
+    if self.values.shape[0] < 2:
+      raise Exception(
+          "DataDict must be of the type { <key>:{ <timeKey> : [ field1, field2, ..] } }. With at least two fields")
+    totals = numpy.where(self.present, self.values[0], 0)
+    counts = numpy.where(self.present, self.values[1], 0)
+    with numpy.errstate(divide='ignore', invalid='ignore'):
+      ratios = numpy.where(self.present, self.values[0] / self.values[1], 0)
+      factors = numpy.where(totals.sum(axis=0) == 0, 0,
+                            (totals.sum(axis=0) / counts.sum(axis=0)) / ratios.sum(axis=0))
+    return TimeSeriesArray(self.keys, self.times, (ratios * factors)[numpy.newaxis], self.present)
@@ -0,0 +1,123 @@
+""" Unit tests for the parsing, serialization, copy and merge of CFG objects
+"""
+# pylint: disable=protected-access, missing-docstring, invalid-name
+
+import unittest
+
+from DIRAC.Core.Utilities.CFG import CFG
+
+CFG_DATA = """
+# The setup
+Setup = Production
+Systems {
+  WorkloadManagement
+  {
+    #Comment on
+    #two lines
+    Agents
+    {
+      SiteDirector {
+        Sites = LCG.CERN.ch, LCG.CNAF.it
+        Sites += LCG.PIC.es
+        Expression = a=b
+        Empty =
+      }
+    }
+  }
+}
+"""
+
+# The serialization leaves a space after the = of the empty options
+SERIALIZED = """#The setup
+Setup = Production
+Systems
+{
+  WorkloadManagement
+  {
+    #Comment on
+    #two lines
+    Agents
+    {
+      SiteDirector
+      {
+        Sites = LCG.CERN.ch
+        Sites += LCG.CNAF.it
+        Sites += LCG.PIC.es
+        Expression = a=b
+        Empty =%s
+      }
+    }
+  }
+}
+""" % " "
+
+
+class CFGTestCase(unittest.TestCase):
+
+  def setUp(self):
+    self.cfg = CFG().loadFromBuffer(CFG_DATA)
+
+  def test_load(self):
+    self.assertEqual(self.cfg.listOptions(), ['Setup'])
+    self.assertEqual(self.cfg.listSections(), ['Systems'])
+    self.assertEqual(self.cfg.getComment('Setup'), ' The setup\n')
+    self.assertEqual(self.cfg.getComment('Systems'), '')
+    self.assertEqual(self.cfg['Systems/WorkloadManagement'].getComment('Agents'), 'Comment on\ntwo lines\n')
+    agent = self.cfg['Systems/WorkloadManagement/Agents/SiteDirector']
+    self.assertEqual(agent.listOptions(), ['Sites', 'Expression', 'Empty'])
+    self.assertEqual(agent['Sites'], 'LCG.CERN.ch, LCG.CNAF.it, LCG.PIC.es')
+    self.assertEqual(agent['Expression'], 'a=b')
+    self.assertEqual(agent['Empty'], '')
+    self.assertEqual(self.cfg.getOption('/Systems/WorkloadManagement/Agents/SiteDirector/Sites', []),
+                     ['LCG.CERN.ch', 'LCG.CNAF.it', 'LCG.PIC.es'])
+
+  def test_loadErrors(self):
+    self.assertRaises(KeyError, CFG().loadFromBuffer, "A\n{\n}\nA\n{\n}\n")
+    self.assertRaises(ValueError, CFG().loadFromBuffer, "{\n}\n")
+    self.assertRaises(KeyError, CFG().loadFromBuffer, "A += 1\n")
+
+  def test_serialize(self):
+    self.assertEqual(str(self.cfg), SERIALIZED)
+    reloaded = CFG().loadFromBuffer(SERIALIZED)
+    self.assertTrue(reloaded == self.cfg)
+    self.assertEqual(str(reloaded), SERIALIZED)
+    self.assertEqual(str(CFG()), "")
+
+  def test_clone(self):
+    cloned = self.cfg.clone()
+    self.assertEqual(str(cloned), SERIALIZED)
+    cloned.setOption('Systems/WorkloadManagement/Agents/SiteDirector/Sites', 'LCG.RAL.uk')
+    cloned.setComment('Setup', 'Changed')
+    self.assertEqual(str(self.cfg), SERIALIZED)
+
+  def test_mergeWith(self):
+    other = CFG().loadFromBuffer("Setup = Certification\nOther\n{\n  Option = 1\n}\nSystems\n{\n  New = 2\n}\n")
+    for shareSections in (False, True):
+      merged = self.cfg.mergeWith(other, shareSections=shareSections)
+      self.assertEqual(merged['Setup'], 'Certification')
+      self.assertEqual(merged.listSections(), ['Systems', 'Other'])
+      self.assertEqual(merged['Systems'].listAll(), ['New', 'WorkloadManagement'])
+      self.assertEqual(merged.getOption('/Systems/WorkloadManagement/Agents/SiteDirector/Expression'), 'a=b')
+      # The sections of cfgToMergeWith only are always shared
+      self.assertTrue(merged['Other'] is other['Other'])
+      self.assertEqual(merged['Systems/WorkloadManagement'] is self.cfg['Systems/WorkloadManagement'],
+                       shareSections)
+
+  def test_modifications(self):
+    newer = self.cfg.clone()
+    newer.setOption('Systems/WorkloadManagement/Agents/SiteDirector/Sites', 'LCG.RAL.uk')
+    newer.deleteKey('Systems/WorkloadManagement/Agents/SiteDirector/Empty')
+    newer.createNewSection('Systems/Framework', 'New system')
+    newer.setOption('Systems/Framework/Option', '1')
+    newer.setComment('Setup', ' Production setup\n')
+    modList = self.cfg.getModifications(newer)
+    self.assertEqual([modAction[:2] for modAction in modList], [('modOpt', 'Setup'), ('modSec', 'Systems')])
+    updated = self.cfg.clone()
+    self.assertTrue(updated.applyModifications(modList)['OK'])
+    self.assertEqual(str(updated), str(newer))
+    self.assertEqual(self.cfg.getModifications(self.cfg.clone()), [])
+
+
+if __name__ == '__main__':
+  suite = unittest.defaultTestLoader.loadTestsFromTestCase(CFGTestCase)
+  unittest.TextTestRunner(verbosity=2).run(suite)
@@ -13,7 +13,8 @@ import datetime
 import sys
 
 
-from DIRAC.Core.Utilities.DEncode import encode as disetEncode, decode as disetDecode, g_dEncodeFunctions
+from DIRAC.Core.Utilities.DEncode import pythonEncode as disetEncode, pythonDecode as disetDecode, g_dEncodeFunctions
+from DIRAC.Core.Utilities.DEncodeStream import encode as streamEncode, decode as streamDecode, StreamDecoder
 from DIRAC.Core.Utilities.JEncode import encode as jsonEncode, decode as jsonDecode, JSerializable
 
 from hypothesis import given
@@ -29,9 +30,10 @@ parametrize = mark.parametrize
 # function, and add the tuple here
 
 disetTuple = (disetEncode, disetDecode)
+streamTuple = (streamEncode, streamDecode)
 jsonTuple = (jsonEncode, jsonDecode)
 
-enc_dec_imp = (disetTuple, jsonTuple)
+enc_dec_imp = (disetTuple, streamTuple, jsonTuple)
 
 
 def myDatetimes():
@@ -120,7 +122,7 @@ def test_BaseType_DateTime(enc_dec, data):
 
 
 # Json does not serialize keys as integers but as string
-@parametrize('enc_dec', [disetTuple])
+@parametrize('enc_dec', [disetTuple, streamTuple])
 @given(data=dictionaries(integers(), integers()))
 def test_BaseType_Dict(enc_dec, data):
   """ Test for basic dict"""
@@ -177,7 +179,7 @@ def test_BaseType_String(enc_dec, data):
 
 
 # Tuple are not serialized in JSON
-@parametrize('enc_dec', [disetTuple])
+@parametrize('enc_dec', [disetTuple, streamTuple])
 @given(data=tuples(integers()))
 def test_BaseType_Tuple(enc_dec, data):
   """ Test basic tuple """
@@ -192,7 +194,7 @@ def test_BaseType_Unicode(enc_dec, data):
 
 
 # Json will not pass this because of tuples and integers as dict keys
-@parametrize('enc_dec', [disetTuple])
+@parametrize('enc_dec', [disetTuple, streamTuple])
 @given(data=nestedStrategy)
 def test_nestedStructure(enc_dec, data):
   """ Test nested structure """
@@ -278,3 +280,40 @@ def test_nestedSerializable(data):
   subObj = Serializable(instAttr=data)
   objData = Serializable(instAttr=subObj)
   agnosticTestFunction(jsonTuple, objData)
+
+
+@given(data=nestedStrategy)
+def test_streamWireCompatibility(data):
+  """ The stream engine must produce and read exactly the DEncode format """
+  encodedData = disetEncode(data)
+  assert streamEncode(data) == encodedData
+  assert streamDecode(encodedData) == disetDecode(encodedData)
+
+
+@given(data=nestedStrategy)
+def test_streamDecodeBuffer(data):
+  """ The stream engine decodes from memoryview and bytearray """
+  encodedData = disetEncode(data)
+  assert streamDecode(memoryview(encodedData))[0] == data
+  assert streamDecode(bytearray(encodedData))[0] == data
+
+
+@given(data=nestedStrategy | floats(allow_nan=False), chunkSize=integers(min_value=1, max_value=50))
+def test_streamDecoderChunks(data, chunkSize):
+  """ The incremental decoder gives the same result whatever the size of the chunks """
+  encodedData = disetEncode(data)
+  decoder = StreamDecoder(len(encodedData))
+  for index in range(0, len(encodedData), chunkSize):
+    complete = decoder.feed(encodedData[index:index + chunkSize])
+    assert complete == (index + chunkSize >= len(encodedData))
+  assert decoder.getResult() == disetDecode(encodedData)[0]
+
+
+def test_streamDecoderTruncated():
+  """ The incremental decoder refuses data that stops in the middle of an object """
+  encodedData = disetEncode({'a': [1, 2, 3]})
+  decoder = StreamDecoder(len(encodedData) - 1)
+  with raises(ValueError):
+    decoder.feed(encodedData[:-1])
+  with raises(ValueError):
+    decoder.getResult()
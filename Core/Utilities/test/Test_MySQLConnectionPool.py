@@ -0,0 +1,381 @@
+""" Stress tests of the MySQL connection pool, and tests of the statements built by the MySQL class,
+    against a stand-in of MySQLdb that keeps track of how many connections are open at the same time
+"""
+
+import itertools
+import sys
+import threading
+import time
+import types
+
+import mock
+import pytest
+
+__RCSID__ = "$Id$"
+
+
+class FakeServer(object):
+  """ Counts the connections, like the max_connections of a MySQL server
+  """
+
+  def __init__(self):
+    self.lock = threading.Lock()
+    self.open = 0
+    self.maxOpen = 0
+    self.created = 0
+    self.generation = 0
+    self.pings = 0
+    self.statements = []
+    self.maxAllowedPacket = 1024 * 1024
+
+  def restart(self):
+    """ All the connections open are lost
+    """
+    self.generation += 1
+
+  def connect(self, **kwargs):
+    with self.lock:
+      self.open += 1
+      self.created += 1
+      self.maxOpen = max(self.maxOpen, self.open)
+    return FakeConnection(self)
+
+
+class FakeConnection(object):
+
+  def __init__(self, server):
+    self.server = server
+    self.closed = False
+    self.user = None
+    self.generation = server.generation
+
+  def checkAlive(self):
+    if self.generation != self.server.generation:
+      raise MySQLError(2006, 'MySQL server has gone away')
+
+  def cursor(self, cursorClass=None):
+    return FakeCursor(self)
+
+  def commit(self):
+    pass
+
+  def rollback(self):
+    pass
+
+  def ping(self, reconnect=False):
+    self.server.pings += 1
+    self.checkAlive()
+
+  def select_db(self, dbName):
+    pass
+
+  def escape_string(self, string):
+    return string.replace('"', '\\"')
+
+  def close(self):
+    with self.server.lock:
+      self.server.open -= 1
+    self.closed = True
+
+
+class FakeCursor(object):
+
+  lastrowid = None
+
+  def __init__(self, conn):
+    self.conn = conn
+    self.result = ((1,),)
+
+  def execute(self, cmd):
+    self.conn.checkAlive()
+    if cmd.startswith('INSERT'):
+      self.conn.server.statements.append(cmd)
+      return cmd.count('),(') + 1
+    if cmd == 'SELECT @@max_allowed_packet':
+      self.result = ((self.conn.server.maxAllowedPacket,),)
+    if cmd.startswith('LOCK TABLES'):
+      self.conn.server.statements.append(cmd)
+      raise MySQLError(2013, 'Lost connection to MySQL server during query')
+    if cmd == 'SELECT * FROM Missing':
+      raise MySQLError(1146, "Table 'test.Missing' doesn't exist")
+    if cmd.startswith('SELECT * FROM Big'):
+      self.result = iter([(i, 'row_%s' % i) for i in xrange(int(cmd.split()[-1]))])
+    if cmd.startswith('SLEEP'):
+      # Check that no other thread uses the connection meanwhile
+      assert self.conn.user is None
+      self.conn.user = threading.current_thread()
+      time.sleep(float(cmd.split()[1]))
+      self.conn.user = None
+    return 1
+
+  def fetchall(self):
+    return self.result
+
+  def fetchmany(self, size):
+    return tuple(itertools.islice(self.result, size))
+
+  def close(self):
+    pass
+
+
+class MySQLError(Exception):
+  pass
+
+
+class ProgrammingError(MySQLError):
+  pass
+
+
+fakeMySQLdb = types.ModuleType('MySQLdb')
+fakeMySQLdb.Error = MySQLError
+fakeMySQLdb.MySQLError = MySQLError
+fakeMySQLdb.ProgrammingError = ProgrammingError
+fakeMySQLdb.thread_safe = lambda: 1
+fakeMySQLdb.cursors = types.ModuleType('MySQLdb.cursors')
+fakeMySQLdb.cursors.SSCursor = FakeCursor
+
+
+def serverInit(*args):
+  raise ProgrammingError()
+
+
+fakeMySQLdb.server_init = serverInit
+
+# Only MySQLdb is replaced while importing: patch.dict would also unload the modules imported meanwhile
+realMySQLdb = sys.modules.get('MySQLdb')
+sys.modules['MySQLdb'] = fakeMySQLdb
+try:
+  from DIRAC.Core.Utilities import MySQL as MySQLModule
+finally:
+  if realMySQLdb:
+    sys.modules['MySQLdb'] = realMySQLdb
+  else:
+    del sys.modules['MySQLdb']
+
+
+@pytest.fixture
+def server():
+  """ A fresh server, used by fresh pools that take back the connections of dead threads quickly
+  """
+  fakeServer = FakeServer()
+  fakeMySQLdb.connect = fakeServer.connect
+  with mock.patch.object(MySQLModule, 'MySQLdb', fakeMySQLdb):
+    with mock.patch.dict(MySQLModule.MySQL._MySQL__connectionPools, clear=True):
+      with mock.patch.object(MySQLModule.MySQL.ConnectionPool, 'deadThreadCheckInterval', 0.01):
+        yield fakeServer
+
+
+def runThreads(nThreads, target):
+  errors = []
+
+  def wrapper():
+    try:
+      target()
+    except BaseException as excp:  # pylint: disable=broad-except
+      errors.append(excp)
+
+  threads = [threading.Thread(target=wrapper) for _ in xrange(nThreads)]
+  for thread in threads:
+    thread.start()
+  for thread in threads:
+    thread.join()
+  assert not errors
+
+
+def test_unbounded(server):
+  """ Without limit, every thread has its own connection
+  """
+  db = MySQLModule.MySQL(dbName='test')
+  runThreads(20, lambda: db._query('SLEEP 0.1'))
+  stats = db.getConnectionPoolStats()
+  assert server.maxOpen == 20
+  assert stats['Created'] == 20
+  assert stats['Waits'] == 0
+  assert stats['MaxConnections'] == 0
+
+
+def test_bounded(server):
+  """ Many threads share a few connections, never using the same one at the same time
+  """
+  db = MySQLModule.MySQL(dbName='test', maxConnections=4, waitTimeout=60)
+
+  def work():
+    for _ in xrange(5):
+      result = db._query('SLEEP 0.01')
+      assert result['OK'], result['Message']
+
+  runThreads(40, work)
+  stats = db.getConnectionPoolStats()
+  assert server.maxOpen <= 4
+  assert stats['Open'] == server.open <= 4
+  assert stats['Checkouts'] == 200
+  assert stats['Created'] == server.created
+  assert stats['Waits'] > 0
+  assert stats['WaitTime'] > 0
+  assert stats['MaxWaitTime'] <= stats['WaitTime']
+  assert stats['Recycled'] > 0
+  assert stats['InUse'] == 0
+  assert stats['Waiting'] == 0
+  assert stats['Timeouts'] == 0
+
+
+def test_timeout(server):
+  """ Threads give up after the waiting timeout, and connections in a transaction are never taken away
+  """
+  db = MySQLModule.MySQL(dbName='test', maxConnections=1, waitTimeout=0.2)
+  assert db.transactionStart()['OK']
+
+  results = []
+  runThreads(3, lambda: results.append(db._query('SELECT 1')))
+  assert [result['OK'] for result in results] == [False] * 3
+  assert 'Timeout' in results[0]['Message']
+  assert db.getConnectionPoolStats()['Timeouts'] == 3
+
+  # Once the transaction is over, the connection can be given back to the other threads
+  assert not db.releaseConnection()
+  assert db.transactionCommit()['OK']
+  assert db.releaseConnection()
+  results = []
+  runThreads(3, lambda: results.append(db._query('SELECT 1')))
+  assert [result['OK'] for result in results] == [True] * 3
+  assert server.created == 1
+
+
+def test_sharedLimits(server):
+  """ The pool is shared by the instances connecting to the same server, with the first limits set
+  """
+  db = MySQLModule.MySQL(dbName='test')
+  assert db.getConnectionPoolStats()['MaxConnections'] == 0
+  db = MySQLModule.MySQL(dbName='test', maxConnections=4)
+  otherDB = MySQLModule.MySQL(dbName='other', maxConnections=10)
+  assert otherDB.getConnectionPoolName() == db.getConnectionPoolName() == 'dirac@localhost:3306'
+  assert otherDB.getConnectionPoolStats()['MaxConnections'] == 4
+
+
+def test_pinnedConnection(server):
+  """ The connection of a live thread is never taken away, even when unused for a while
+  """
+  db = MySQLModule.MySQL(dbName='test', maxConnections=1, waitTimeout=0.1)
+  assert db._query('SELECT 1')['OK']
+  time.sleep(0.05)
+  results = []
+  runThreads(1, lambda: results.append(db._query('SELECT LAST_INSERT_ID()')))
+  assert not results[0]['OK']
+  assert 'Timeout' in results[0]['Message']
+
+  # Until the thread is done with it
+  MySQLModule.MySQL.releaseThreadConnections()
+  runThreads(2, lambda: results.append(db._query('SELECT LAST_INSERT_ID()')))
+  assert [result['OK'] for result in results[1:]] == [True] * 2
+  assert server.created == 1
+
+
+def test_pingIdleTime(server):
+  """ Connections are only pinged when they have not been used for a while
+  """
+  db = MySQLModule.MySQL(dbName='test')
+  for _ in xrange(10):
+    assert db._query('SELECT 1')['OK']
+  assert server.pings == 10
+
+  server.pings = 0
+  db = MySQLModule.MySQL(dbName='test', pingIdleTime=0.1)
+  for _ in xrange(10):
+    assert db._query('SELECT 1')['OK']
+  assert server.pings == 0
+  time.sleep(0.15)
+  assert db._query('SELECT 1')['OK']
+  assert server.pings == 1
+
+
+def test_goneAway(server):
+  """ Statements are executed again on a new connection when the server has gone away
+  """
+  db = MySQLModule.MySQL(dbName='test', pingIdleTime=60)
+  assert db._query('SELECT 1')['OK']
+  server.restart()
+  assert db._query('SELECT 1')['OK']
+  server.restart()
+  assert db._update('UPDATE 1')['OK']
+  assert server.created == 3
+
+  # Nor when the connection was lost while the statement was executed, that may have been run
+  result = db._query('LOCK TABLES Files WRITE')
+  assert not result['OK']
+  assert server.statements == ['LOCK TABLES Files WRITE']
+
+  # Not within a transaction, that is lost with the connection
+  assert db.transactionStart()['OK']
+  server.restart()
+  result = db._query('SELECT 1')
+  assert not result['OK']
+  assert 'gone away' in result['Message']
+
+
+def test_insertMany(server):
+  """ Rows are inserted in chunks, limited in rows and in size
+  """
+  db = MySQLModule.MySQL(dbName='test')
+  assert db.insertMany('Files', ['LFN', 'Size'], [])['Value'] == 0
+  assert not server.statements
+
+  rows = [('/vo/file_%s' % i, i) for i in xrange(2500)]
+  result = db.insertMany('Files', ['LFN', 'Size'], rows)
+  assert result['OK'], result['Message']
+  assert result['Value'] == 2500
+  assert len(server.statements) == 3
+  assert server.statements[0].startswith('INSERT INTO `Files` ( `LFN`, `Size` ) VALUES ( "/vo/file_0", "0" ),')
+  assert server.statements[2].count('/vo/file_') == 500
+
+  server.statements = []
+  # The max_allowed_packet of the server is read once per instance
+  server.maxAllowedPacket = 10000
+  db = MySQLModule.MySQL(dbName='test')
+  result = db.insertMany('Files', ['LFN', 'Size'], rows, ignore=True)
+  assert result['Value'] == 2500
+  assert len(server.statements) > 3
+  assert all(len(statement) < 10000 for statement in server.statements)
+  assert server.statements[0].startswith('INSERT IGNORE INTO')
+
+  assert not db.insertMany('Files', ['LFN', 'Size'], [('/vo/file',)])['OK']
+
+  # The connection given is passed on
+  with mock.patch.object(db, '_update', return_value={'OK': True, 'Value': 1}) as updateMock:
+    connection = FakeConnection(server)
+    assert db.insertMany('Files', ['LFN', 'Size'], rows[:10], conn=connection)['OK']
+    assert updateMock.call_args[0][1] is connection
+
+
+def test_upsertMany(server):
+  """ Existing rows are updated
+  """
+  db = MySQLModule.MySQL(dbName='test')
+  result = db.upsertMany('Files', ['LFN', 'Size'], [('/vo/file_1', 1), ('/vo/file_"2', 2)], updateFields=['Size'])
+  assert result['OK'], result['Message']
+  assert server.statements == ['INSERT INTO `Files` ( `LFN`, `Size` ) VALUES ( "/vo/file_1", "1" ),'
+                               '( "/vo/file_\\"2", "2" ) ON DUPLICATE KEY UPDATE `Size` = VALUES(`Size`)']
+
+
+def test_streamQuery(server):
+  """ Results are fetched in batches, and the connection is given back when the iteration is over
+  """
+  db = MySQLModule.MySQL(dbName='test', maxConnections=1)
+  batches = [result['Value'] for result in db._streamQuery('SELECT * FROM Big 2500', batchSize=1000)]
+  assert [len(batch) for batch in batches] == [1000, 1000, 500]
+  assert batches[2][-1] == (2499, 'row_2499')
+  assert db.getConnectionPoolStats()['InUse'] == 0
+
+  # Also when stopped early
+  for result in db._streamQuery('SELECT * FROM Big 2500', batchSize=1000):
+    assert db.getConnectionPoolStats()['InUse'] == 1
+    break
+  assert db.getConnectionPoolStats()['InUse'] == 0
+
+  results = list(db._streamQuery('SELECT * FROM Missing'))
+  assert len(results) == 1
+  assert not results[0]['OK']
+
+  # A connection given is left to the caller
+  connection = db._getConnection()['Value']
+  assert len(list(db._streamQuery('SELECT * FROM Big 10', conn=connection))) == 1
+  assert db.getConnectionPoolStats()['InUse'] == 1
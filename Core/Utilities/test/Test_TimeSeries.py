@@ -0,0 +1,79 @@
+""" Unit tests for the array representation of the time series of the reports
+"""
+
+# pylint: disable=protected-access, missing-docstring, invalid-name
+
+import unittest
+from decimal import Decimal
+
+from DIRAC.Core.Utilities.TimeSeries import TimeSeriesArray
+
+START = 1500000000 - 1500000000 % 3600
+
+
+class TimeSeriesArrayTestCase(unittest.TestCase):
+
+  def assertDictAlmostEqual(self, first, second):
+    self.assertEqual(sorted(first), sorted(second))
+    for key in first:
+      self.assertEqual(sorted(first[key]), sorted(second[key]))
+      for timeKey in first[key]:
+        self.assertEqual(len(first[key][timeKey]), len(second[key][timeKey]))
+        for value, expected in zip(first[key][timeKey], second[key][timeKey]):
+          self.assertAlmostEqual(value, expected)
+
+  def test_fromBuckets(self):
+    buckets = {'Site1': [[START, 3600, 10, 1],
+                         # a bucket shorter than the granularity
+                         [START + 900, 900, 2, None],
+                         # a longer one, over 3 bins
+                         [START + 7200, 10800, 30, Decimal('3')]],
+               'Site2': [[START + 5400, 0, 5, 1]],
+               'Site3': []}
+    series = TimeSeriesArray.fromBuckets(3600, buckets)
+    self.assertEqual(series.values.shape, (3, 3, 5))
+    # the last field is the sum of the proportions
+    self.assertDictAlmostEqual(series.toDict(), {'Site1': {START: [12, 1, 2],
+                                                           START + 7200: [10, 1, 1. / 3],
+                                                           START + 10800: [10, 1, 1. / 3],
+                                                           START + 14400: [10, 1, 1. / 3]},
+                                                 'Site2': {START + 3600: [5, 1, 1]},
+                                                 'Site3': {}})
+    self.assertDictAlmostEqual(series.sumToGranularity().toDict(), {'Site1': {START: [12, 1],
+                                                                              START + 7200: [10, 1],
+                                                                              START + 10800: [10, 1],
+                                                                              START + 14400: [10, 1]},
+                                                                    'Site2': {START + 3600: [5, 1]},
+                                                                    'Site3': {}})
+    self.assertDictAlmostEqual(series.averageToGranularity().toDict(), {'Site1': {START: [6, 0.5],
+                                                                                  START + 7200: [30, 3],
+                                                                                  START + 10800: [30, 3],
+                                                                                  START + 14400: [30, 3]},
+                                                                        'Site2': {START + 3600: [5, 1]},
+                                                                        'Site3': {}})
+    self.assertEqual(TimeSeriesArray.fromBuckets(3600, {}).toDict(), {})
+    self.assertEqual(TimeSeriesArray.fromBuckets(3600, {'Site1': []}).toDict(), {'Site1': {}})
+
+  def test_proportionalGauges(self):
+    dataDict = {'Site1': {START: [10, 2], START + 3600: [0, 1]},
+                'Site2': {START: [30, 2]}}
+    series = TimeSeriesArray.fromDict(dataDict)
+    self.assertEqual(series.times.tolist(), [START, START + 3600])
+    self.assertEqual(series.toDict(), dataDict)
+    # ratios 5 and 15 scaled to a sum of 40 / 4
+    self.assertDictAlmostEqual(series.proportionalGauges().toDict(), {'Site1': {START: [2.5], START + 3600: [0]},
+                                                                      'Site2': {START: [7.5]}})
+    self.assertRaises(Exception, TimeSeriesArray.fromDict({'Site1': {START: [1]}}).proportionalGauges)
+
+  def test_fromDictEmpty(self):
+    self.assertEqual(TimeSeriesArray.fromDict({}).toDict(), {})
+    series = TimeSeriesArray.fromDict({'Site1': {}, 'Site2': {}})
+    self.assertEqual(series.values.shape, (0, 2, 0))
+    self.assertEqual(series.toDict(), {'Site1': {}, 'Site2': {}})
+    self.assertEqual(TimeSeriesArray.fromDict({'Site1': {START: [1]}, 'Site2': {}}).toDict(),
+                     {'Site1': {START: [1]}, 'Site2': {}})
+
+
+if __name__ == '__main__':
+  suite = unittest.defaultTestLoader.loadTestsFromTestCase(TimeSeriesArrayTestCase)
+  unittest.TextTestRunner(verbosity=2).run(suite)
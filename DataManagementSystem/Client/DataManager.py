@@ -367,7 +367,7 @@ class DataManager(object):
       errStr = "Supplied lfn must be string or list of strings."
       log.debug(errStr)
       return S_ERROR(errStr)
-    log.debug("Attempting to get %s files." % len(lfns))
+    log.debug("Attempting to get", "%s files.", len(lfns))
     res = self.getActiveReplicas(lfns, getUrl=False)
     if not res['OK']:
       return res
@@ -635,7 +635,7 @@ class DataManager(object):
     log = self.log.getSubLogger('replicateAndRegister')
     successful = {}
     failed = {}
-    log.debug("Attempting to replicate %s to %s." % (lfn, destSE))
+    log.debug("Attempting to replicate", "%s to %s.", lfn, destSE)
     startReplication = time.time()
     res = self.__replicate(lfn, destSE, sourceSE, destPath, localCache)
     replicationTime = time.time() - startReplication
@@ -645,7 +645,7 @@ class DataManager(object):
       return S_ERROR("%s %s" % (errStr, res['Message']))
     if not res['Value']:
       # The file was already present at the destination SE
-      log.debug("%s already present at %s." % (lfn, destSE))
+      log.debug("File already present at", "%s %s", lfn, destSE)
       successful[lfn] = {'replicate': 0, 'register': 0}
       resDict = {'Successful': successful, 'Failed': failed}
       return S_OK(resDict)
@@ -653,7 +653,7 @@ class DataManager(object):
 
     destPfn = res['Value']['DestPfn']
     destSE = res['Value']['DestSE']
-    log.debug("Attempting to register %s at %s." % (destPfn, destSE))
+    log.debug("Attempting to register", "%s at %s.", destPfn, destSE)
     replicaTuple = (lfn, destPfn, destSE)
     startRegistration = time.time()
     res = self.registerReplica(replicaTuple, catalog=catalog)
@@ -686,15 +686,15 @@ class DataManager(object):
         'localCache' is the local file system location to be used as a temporary cache
     """
     log = self.log.getSubLogger('replicate')
-    log.debug("Attempting to replicate %s to %s." % (lfn, destSE))
+    log.debug("Attempting to replicate", "%s to %s.", lfn, destSE)
     res = self.__replicate(lfn, destSE, sourceSE, destPath, localCache)
     if not res['OK']:
       errStr = "Replication failed."
-      log.debug(errStr, "%s %s" % (lfn, destSE))
+      log.debug(errStr, "%s %s", lfn, destSE)
       return res
     if not res['Value']:
       # The file was already present at the destination SE
-      log.debug("%s already present at %s." % (lfn, destSE))
+      log.debug("File already present at", "%s %s", lfn, destSE)
       return res
     return S_OK(lfn)
 
@@ -776,11 +776,11 @@ class DataManager(object):
       return S_ERROR(infoStr)
 
     # Get the LFN replicas from the file catalog
-    log.debug("Attempting to obtain replicas for %s." % (lfn))
+    log.debug("Attempting to obtain replicas for", "%s.", lfn)
     res = returnSingleResult(self.getReplicas(lfn, getUrl=False))
     if not res['OK']:
       errStr = "Failed to get replicas for LFN."
-      log.debug(errStr, "%s %s" % (lfn, res['Message']))
+      log.debug(errStr, "%s %s", lfn, res['Message'])
       return S_ERROR("%s %s" % (errStr, res['Message']))
 
     log.debug("Successfully obtained replicas for LFN.")
@@ -788,11 +788,11 @@ class DataManager(object):
 
     ###########################################################
     # If the file catalog size is zero fail the transfer
-    log.debug("Attempting to obtain size for %s." % lfn)
+    log.debug("Attempting to obtain size for", "%s.", lfn)
     res = returnSingleResult(self.fileCatalog.getFileSize(lfn))
     if not res['OK']:
       errStr = "Failed to get size for LFN."
-      log.debug(errStr, "%s %s" % (lfn, res['Message']))
+      log.debug(errStr, "%s %s", lfn, res['Message'])
       return S_ERROR("%s %s" % (errStr, res['Message']))
 
     catalogSize = res['Value']
@@ -802,12 +802,12 @@ class DataManager(object):
       log.debug(errStr, lfn)
       return S_ERROR(errStr)
 
-    log.debug("File size determined to be %s." % catalogSize)
+    log.debug("File size determined to be", "%s.", catalogSize)
 
     ###########################################################
     # If the LFN already exists at the destination we have nothing to do
     if self.__isSEInList(destSEName, lfnReplicas):
-      log.debug("__replicate: LFN is already registered at %s." % destSEName)
+      log.debug("__replicate: LFN is already registered at", "%s.", destSEName)
       return S_OK()
 
     ###########################################################
@@ -845,14 +845,14 @@ class DataManager(object):
 
     for candidateSEName in possibleSourceSEs:
 
-      log.debug("Consider %s as a source" % candidateSEName)
+      log.debug("Consider", "%s as a source", candidateSEName)
 
       # Check that the candidate is active
       if not self.__checkSEStatus(candidateSEName, status='Read'):
-        log.debug("%s is currently not allowed as a source." % candidateSEName)
+        log.debug("Source SE not allowed", "%s", candidateSEName)
         continue
       else:
-        log.debug("%s is available for use." % candidateSEName)
+        log.debug("Source SE available", "%s", candidateSEName)
 
       candidateSE = StorageElement(candidateSEName, vo=self.voName)
 
@@ -1033,7 +1033,7 @@ class DataManager(object):
         return S_ERROR(errStr)
     if not fileTuples:
       return S_OK({'Successful': [], 'Failed': {}})
-    log.debug("Attempting to register %s files." % len(fileTuples))
+    log.debug("Attempting to register", "%s files.", len(fileTuples))
     res = self.__registerFile(fileTuples, catalog)
     if not res['OK']:
       errStr = "Completely failed to register files."
@@ -1084,7 +1084,7 @@ class DataManager(object):
         return S_ERROR(errStr)
     if not replicaTuples:
       return S_OK({'Successful': [], 'Failed': {}})
-    log.debug("Attempting to register %s replicas." % len(replicaTuples))
+    log.debug("Attempting to register", "%s replicas.", len(replicaTuples))
     res = self.__registerReplica(replicaTuples, catalog)
     if not res['OK']:
       errStr = "Completely failed to register replicas."
@@ -1351,3 +1351,15 @@ class FileManagerBase(object):
         :returns: S_OK with list of tuples (lfn, checksum, size)
     """
     return S_ERROR("To be implemented on derived class")
+
+  def streamSEDump(self, seName, batchSize=10000):
+    """
+         Same as getSEDump, fetching the files from the DB while they are iterated on,
+         when the derived class supports it
+
+        :param seName: name of the StorageElement
+        :param int batchSize: number of files fetched at once
+
+        :returns: generator of S_OK with tuples of (lfn, checksum, size), or of one S_ERROR
+    """
+    yield self.getSEDump(seName)
@@ -937,3 +937,23 @@ class FileManagerPs(FileManagerBase):
     seID = res['Value']
 
     return self.db.executeStoredProcedureWithCursor('ps_get_se_dump', (seID,))
+
+  def streamSEDump(self, seName, batchSize=10000):
+    """
+         Return all the files at a given SE, together with checksum and size,
+         fetching them from the DB while they are iterated on
+
+        :param seName: name of the StorageElement
+        :param int batchSize: number of files fetched at once
+
+        :returns: generator of S_OK with tuples of (lfn, checksum, size), or of one S_ERROR
+    """
+
+    res = self.db.seManager.findSE(seName)
+    if not res['OK']:
+      yield res
+      return
+    seID = res['Value']
+
+    for res in self.db._streamQuery("call ps_get_se_dump(%d)" % seID, batchSize):
+      yield res
@@ -1179,3 +1179,13 @@ class FileCatalogDB(DB):
         :returns: S_OK with list of tuples (lfn, checksum, size)
     """
     return self.fileManager.getSEDump(seName)
+
+  def streamSEDump(self, seName):
+    """
+         Same as getSEDump, with the files fetched from the DB while they are iterated on
+
+        :param seName: name of the StorageElement
+
+        :returns: generator of S_OK with tuples of (lfn, checksum, size), or of one S_ERROR
+    """
+    return self.fileManager.streamSEDump(seName)
@@ -27,6 +27,37 @@ from DIRAC.DataManagementSystem.DB.FileCatalogDB import FileCatalogDB
 gFileCatalogDB = None
 
 
+class SEDumpSource(object):
+  """ File-like object reading an SE dump formatted as CSV with '|' separation,
+      while the files are fetched from the DB
+  """
+
+  def __init__(self, batches):
+    """
+        :param batches: generator of S_OK with tuples of (lfn, checksum, size), as FileCatalogDB.streamSEDump
+    """
+    self.__batches = batches
+    self.__data = ''
+
+  def read(self, size):
+    """ Read at most size bytes, an empty string meaning that the dump is over
+    """
+    csvOutput = cStringIO.StringIO()
+    csvOutput.write(self.__data)
+    writer = csv.writer(csvOutput, delimiter='|')
+    while csvOutput.tell() < size:
+      try:
+        result = next(self.__batches)
+      except StopIteration:
+        break
+      if not result['OK']:
+        raise RuntimeError(result['Message'])
+      writer.writerows(result['Value'])
+    data = csvOutput.getvalue()
+    self.__data = data[size:]
+    return data[:size]
+
+
 def initializeFileCatalogHandler(serviceInfo):
   """ handler initialisation """
 
@@ -752,21 +783,12 @@ class FileCatalogHandler(RequestHandler):
 
     """
 
-    retVal = self.getSEDump(seName)
-
+    # The dump is sent while it is read from the DB, so that it is never held in memory
+    batches = gFileCatalogDB.streamSEDump(seName)
     try:
-      csvOutput = cStringIO.StringIO()
-      writer = csv.writer(csvOutput, delimiter='|')
-      for lfn in retVal:
-        writer.writerow(lfn)
-
-      csvOutput.seek(0)
-
-      ret = fileHelper.DataSourceToNetwork(csvOutput)
-      return ret
-
+      return fileHelper.DataSourceToNetwork(SEDumpSource(batches))
     except Exception as e:
       gLogger.exception("Exception while sending seDump", repr(e))
       return S_ERROR("Exception while sendind seDump: %s" % repr(e))
     finally:
-      csvOutput.close()
+      batches.close()
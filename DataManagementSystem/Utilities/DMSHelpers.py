@@ -6,6 +6,7 @@
 from DIRAC import gConfig, gLogger, S_OK, S_ERROR
 from DIRAC.ConfigurationSystem.Client.Helpers.Path import cfgPath
 from DIRAC.ConfigurationSystem.Client.Helpers.Operations import Operations
+from DIRAC.ConfigurationSystem.Client.Helpers.Resources import ResourcesTopology
 
 LOCAL = 1
 PROTOCOL = LOCAL + 1
@@ -109,52 +110,24 @@ class DMSHelpers(object):
     if self.siteSEMapping:
       return S_OK(self.siteSEMapping)
 
-    # Get the list of SEs and keep a mapping of those using an Alias or a
-    # BaseSE
-    storageElements = gConfig.getSections('Resources/StorageElements')
-    if not storageElements['OK']:
-      gLogger.warn('Problem retrieving storage elements',
-                   storageElements['Message'])
-      return storageElements
-    storageElements = storageElements['Value']
-    equivalentSEs = {}
-    for se in storageElements:
-      for option in ('BaseSE', 'Alias'):
-        originalSE = gConfig.getValue(
-            'Resources/StorageElements/%s/%s' % (se, option))
-        if originalSE:
-          equivalentSEs.setdefault(originalSE, []).append(se)
-          break
-
-    siteSEMapping = {}
-    gridTypes = gConfig.getSections('Resources/Sites/')
-    if not gridTypes['OK']:
+    # The sites, their local SEs and the SEs using an Alias or a BaseSE are
+    # indexed once for each version of the CS
+    result = ResourcesTopology.getTopology()
+    if not result['OK']:
       gLogger.warn(
-          'Problem retrieving sections in /Resources/Sites', gridTypes['Message'])
-      return gridTypes
-
-    gridTypes = gridTypes['Value']
+          'Problem retrieving sections in /Resources/Sites', result['Message'])
+      return result
+    topology = result['Value']
+    if topology.storageElements is None:
+      gLogger.warn('Problem retrieving storage elements',
+                   'No /Resources/StorageElements section')
+      return S_ERROR("Path /Resources/StorageElements does not exist or it's not a section")
 
-    gLogger.debug('Grid Types are: %s' % (', '.join(gridTypes)))
+    gLogger.debug('Grid Types are: %s' % (', '.join(topology.grids)))
     # Get a list of sites and their local SEs
-    siteSet = set()
-    storageElementSet = set()
-    siteSEMapping[LOCAL] = {}
-    for grid in gridTypes:
-      result = gConfig.getSections('/Resources/Sites/%s' % grid)
-      if not result['OK']:
-        gLogger.warn('Problem retrieving /Resources/Sites/%s section' % grid)
-        return result
-      sites = result['Value']
-      siteSet.update(sites)
-      for site in sites:
-        candidateSEs = gConfig.getValue(
-            '/Resources/Sites/%s/%s/SE' % (grid, site), [])
-        if candidateSEs:
-          candidateSEs += [
-              eqSE for se in candidateSEs for eqSE in equivalentSEs.get(se, [])]
-          siteSEMapping[LOCAL].setdefault(site, set()).update(candidateSEs)
-          storageElementSet.update(candidateSEs)
+    siteSet = set(topology.sites)
+    siteSEMapping = {}
+    siteSEMapping[LOCAL] = dict((site, set(ses)) for site, ses in topology.siteLocalSEs.iteritems())
 
     # Add Sites from the SiteSEMappingByProtocol in the CS
     siteSEMapping[PROTOCOL] = {}
@@ -196,12 +169,7 @@ class DMSHelpers(object):
 
     self.siteSEMapping = siteSEMapping
     # Add storage elements that may not be associated with a site
-    result = gConfig.getSections('/Resources/StorageElements')
-    if not result['OK']:
-      gLogger.warn(
-          'Problem retrieving /Resources/StorageElements section', result['Message'])
-      return result
-    self.storageElementSet = storageElementSet | set(result['Value'])
+    self.storageElementSet = set(topology.storageElements).union(*topology.siteLocalSEs.itervalues())
     self.siteSet = siteSet
     return S_OK(siteSEMapping)
 
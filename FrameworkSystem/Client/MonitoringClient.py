@@ -7,6 +7,7 @@ __RCSID__ = "$Id"
 
 import time
 import types
+import threading
 
 import DIRAC
 from DIRAC import gConfig, gLogger, S_OK, S_ERROR
@@ -53,6 +54,18 @@ class MonitoringFlusher( object ):
 
 gMonitoringFlusher = MonitoringFlusher()
 
+class ThreadMarks( object ):
+  """
+  Marks added by a thread, aggregated per activity and bucket as [ sum of the values, number of marks ].
+  Only the thread and the flush use the lock, so that the threads adding marks do not wait for each other
+  """
+  __slots__ = ( 'marks', 'lock', 'thread' )
+
+  def __init__( self ):
+    self.marks = {}
+    self.lock = threading.Lock()
+    self.thread = threading.currentThread()
+
 class MonitoringClient( object ):
   """ It accumulates monitoring info from components before flushing using gMonitoringFlusher
   """
@@ -78,7 +91,8 @@ class MonitoringClient( object ):
     self.sourceDict[ 'componentName' ] = "unknown"
     self.sourceDict[ 'componentLocation' ] = "unknown"
     self.activitiesDefinitions = {}
-    self.activitiesMarks = {}
+    self.__threadLocal = threading.local()
+    self.__threadsMarks = []
     self.definitionsToSend = {}
     self.marksToSend = {}
     self.__compRegistrationExtraDict = {}
@@ -200,7 +214,6 @@ class MonitoringClient( object ):
                                                "type" : operation,
                                                "bucketLength" : bucketLength
                                               }
-        self.activitiesMarks[ name ] = {}
         self.definitionsToSend[ name ] = dict( self.activitiesDefinitions[ name ] )
     finally:
       self.activitiesLock.release()
@@ -229,47 +242,75 @@ class MonitoringClient( object ):
     if type( value ) not in self.__validMonitoringValues:
       raise MonitoringClientActivityValueTypeError( "Activity '%s' value's type (%s) is not valid" % ( name, type( value ) ) )
       # raise Exception( "Value's type %s is not valid" % value )
-    self.activitiesLock.acquire()
+    self.logger.debug( "Adding mark to", name )
+    markTime = self.__UTCStepTime( name )
+    threadMarks = self.__getThreadMarks()
+    threadMarks.lock.acquire()
     try:
-      self.logger.debug( "Adding mark to %s" % name )
-      markTime = self.__UTCStepTime( name )
-      if markTime in self.activitiesMarks[ name ]:
-        self.activitiesMarks[ name ][ markTime ].append( value )
+      acMarks = threadMarks.marks.get( name )
+      if acMarks is None:
+        acMarks = threadMarks.marks[ name ] = {}
+      bucketMarks = acMarks.get( markTime )
+      if bucketMarks is None:
+        acMarks[ markTime ] = [ value, 1 ]
       else:
-        self.activitiesMarks[ name ][ markTime ] = [ value ]
+        bucketMarks[0] += value
+        bucketMarks[1] += 1
     finally:
-      self.activitiesLock.release()
+      threadMarks.lock.release()
+
+  def __getThreadMarks( self ):
+    """
+    Get the marks of the current thread, registered for the flush at its first mark
+    """
+    try:
+      return self.__threadLocal.marks
+    except AttributeError:
+      threadMarks = ThreadMarks()
+      self.activitiesLock.acquire()
+      try:
+        self.__threadsMarks.append( threadMarks )
+      finally:
+        self.activitiesLock.release()
+      self.__threadLocal.marks = threadMarks
+      return threadMarks
 
   def __consolidateMarks( self, allData ):
     """
-      Copies all marks except last step ones
+      Takes the marks of all threads except last step ones
       and consolidates them
     """
+    if allData:
+      now = int( Time.toEpoch() )
+    aggregatedMarks = {}
+    for threadMarks in list( self.__threadsMarks ):
+      threadMarks.lock.acquire()
+      try:
+        for key, acMarks in threadMarks.marks.items():
+          if allData:
+            lastStepToSend = now
+          else:
+            lastStepToSend = self.__UTCStepTime( key )
+          for markTime in [ markTime for markTime in acMarks if markTime < lastStepToSend ]:
+            markSum, markCount = acMarks.pop( markTime )
+            bucketMarks = aggregatedMarks.setdefault( key, {} ).setdefault( markTime, [ 0, 0 ] )
+            bucketMarks[0] += markSum
+            bucketMarks[1] += markCount
+          if not acMarks:
+            del threadMarks.marks[ key ]
+      finally:
+        threadMarks.lock.release()
+      # the marks of the finished threads are not needed anymore
+      if not threadMarks.marks and not threadMarks.thread.isAlive():
+        self.__threadsMarks.remove( threadMarks )
+
     consolidatedMarks = {}
-    remainderMarks = {}
-    for key in self.activitiesMarks:
-      if allData:
-        lastStepToSend = int( Time.toEpoch() )
-      else:
-        lastStepToSend = self.__UTCStepTime( key )
+    for key, acMarks in aggregatedMarks.items():
       consolidatedMarks[ key ] = {}
-      remainderMarks [ key ] = {}
-      for markTime in self.activitiesMarks[ key ]:
-        markValue = self.activitiesMarks[ key ][ markTime ]
-        if markTime >= lastStepToSend:
-          remainderMarks[ key ][ markTime ] = markValue
-        else:
-          consolidatedMarks[ key ][ markTime ] = markValue
-          # Consolidate the copied ones
-          totalValue = 0
-          for mark in consolidatedMarks[ key ][ markTime ]:
-            totalValue += mark
-          if self.activitiesDefinitions[ key ][ 'type' ] == self.OP_MEAN:
-            totalValue /= len( consolidatedMarks[ key ][ markTime ] )
-          consolidatedMarks[ key ][ markTime ] = totalValue
-      if len( consolidatedMarks[ key ] ) == 0:
-        del( consolidatedMarks[ key ] )
-    self.activitiesMarks = remainderMarks
+      for markTime, ( totalValue, markCount ) in acMarks.items():
+        if self.activitiesDefinitions[ key ][ 'type' ] == self.OP_MEAN:
+          totalValue /= markCount
+        consolidatedMarks[ key ][ markTime ] = totalValue
     return consolidatedMarks
 
   def flush( self, allData = False ):
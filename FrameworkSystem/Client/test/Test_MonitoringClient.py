@@ -0,0 +1,70 @@
+""" Unit tests for the aggregation of the marks of the MonitoringClient
+"""
+# pylint: disable=protected-access, missing-docstring, invalid-name
+
+import threading
+import unittest
+
+from mock import patch
+
+from DIRAC.FrameworkSystem.Client.MonitoringClient import MonitoringClient
+
+START = 1500000000 - 1500000000 % 60
+
+
+class MonitoringClientTestCase(unittest.TestCase):
+
+  def setUp(self):
+    self.timePatch = patch('DIRAC.FrameworkSystem.Client.MonitoringClient.Time.toEpoch', return_value=START)
+    self.toEpoch = self.timePatch.start()
+    self.client = MonitoringClient()
+    self.client.setComponentType(MonitoringClient.COMPONENT_SCRIPT)
+    self.client.initialize()
+    self.client.registerActivity('Queries', 'Queries', 'Framework', 'queries', MonitoringClient.OP_SUM)
+    self.client.registerActivity('Memory', 'Memory', 'Framework', 'MB', MonitoringClient.OP_MEAN)
+
+  def tearDown(self):
+    self.timePatch.stop()
+
+  def consolidate(self, allData=False):
+    return self.client._MonitoringClient__consolidateMarks(allData)
+
+  def test_threads(self):
+    def addMarks():
+      for _ in xrange(1000):
+        self.client.addMark('Queries')
+      self.client.addMark('Memory', 3)
+
+    threads = [threading.Thread(target=addMarks) for _ in xrange(8)]
+    for thread in threads:
+      thread.start()
+    for thread in threads:
+      thread.join()
+    self.client.addMark('Memory', 4)
+    self.client.addMark('Memory', 4)
+    self.assertEqual(len(self.client._MonitoringClient__threadsMarks), 9)
+
+    # the marks of the current bucket are kept
+    self.assertEqual(self.consolidate(), {})
+    self.toEpoch.return_value = START + 60
+    self.client.addMark('Queries', 5)
+    # integer mean, as before
+    self.assertEqual(self.consolidate(), {'Queries': {START: 8000}, 'Memory': {START: 3}})
+    # the finished threads are forgotten
+    self.assertEqual(len(self.client._MonitoringClient__threadsMarks), 1)
+
+    self.assertEqual(self.consolidate(), {})
+    self.toEpoch.return_value = START + 61
+    self.assertEqual(self.consolidate(allData=True), {'Queries': {START + 60: 5}})
+
+  def test_invalidMarks(self):
+    self.assertRaises(Exception, self.client.addMark, 'Unknown')
+    self.assertRaises(Exception, self.client.addMark, 'Queries', '1')
+    self.client.disable()
+    self.client.addMark('Queries')
+    self.assertEqual(self.consolidate(allData=True), {})
+
+
+if __name__ == '__main__':
+  suite = unittest.defaultTestLoader.loadTestsFromTestCase(MonitoringClientTestCase)
+  unittest.TextTestRunner(verbosity=2).run(suite)
@@ -256,6 +256,22 @@ class MonitoringCatalog( object ):
     else:
       return retList[0]
 
+  def findActivities( self, sourceId, acNames ):
+    """
+    Find several activities of a source
+
+    :return: dictionary { activity name : activity fields, as returned by findActivity }
+    """
+    fields = "id, name, category, unit, type, description, filename, bucketLength, lastUpdate"
+    acNames = list( acNames )
+    activities = {}
+    # keep the number of parameters of the queries under the limit of sqlite
+    for index in range( 0, len( acNames ), 500 ):
+      queryDict = { 'sourceId' : sourceId, "name" : acNames[ index : index + 500 ] }
+      for acData in self.__select( fields, "activities", queryDict ):
+        activities[ acData[1] ] = acData
+    return activities
+
   def activitiesQuery( self, selDict, sortList, start, limit ):
     fields = [ 'sources.id', 'sources.site', 'sources.componentType', 'sources.componentLocation',
                'sources.componentName', 'activities.id', 'activities.name', 'activities.category',
@@ -282,6 +298,23 @@ class MonitoringCatalog( object ):
     queryDict = { 'sourceId' : sourceId, "name" : acName }
     return self.__update( { 'lastUpdate' : lastUpdateTime }, "activities", queryDict )
 
+  def setLastUpdates( self, sourceId, lastUpdatesDict ):
+    """
+    Set the last update time of several activities of a source, in a single transaction
+
+    :params lastUpdatesDict: dictionary { activity name : last update time }
+    """
+    if not lastUpdatesDict:
+      return 0
+    self.__dbExecute( "BEGIN;" )
+    try:
+      updated = 0
+      for acName, lastUpdateTime in lastUpdatesDict.items():
+        updated += self.setLastUpdate( sourceId, acName, lastUpdateTime )
+    finally:
+      self.__dbExecute( "COMMIT;" )
+    return updated
+
   def getLastUpdate( self, sourceId, acName ):
     queryDict = { 'sourceId' : sourceId, "name" : acName }
     retList = self.__update( 'lastUpdate', "activities", queryDict )
@@ -154,6 +154,19 @@ class RRDManager( object ):
         self.log.warn( "Error updating rrd file", "%s rrd: %s" % ( rrdFile, retVal[ 'Message' ] ) )
     return S_OK( valuesList[-1][0] )
 
+  def updateActivities( self, updatesList ):
+    """
+    Add the marks of several activities
+
+    :params updatesList: list of the arguments of update: ( type, rrdFile, bucketLength, valuesList, lastUpdate )
+
+    :return: dictionary with the result for each file
+    """
+    results = {}
+    for updateArgs in updatesList:
+      results[ updateArgs[1] ] = self.update( *updateArgs )
+    return results
+
   def __generateName( self, *args, **kwargs ):
     """
     Generate a random name
@@ -1,6 +1,7 @@
 """ This module exposes singleton gServiceInterface as istance of ServiceInterface (also in this module)
 
-    Interacts with RRD (rrdtool), with ComponentMonitoringDB (mysql) and with MonitoringCatalog (sqlite3)
+    Interacts with the activity files (TimeSeriesManager or RRDManager), with ComponentMonitoringDB (mysql)
+    and with MonitoringCatalog (sqlite3)
 
     Main clients are the monitoring handler (what's called by gMonitor object), and the web portal.
 """
@@ -12,7 +13,9 @@ from DIRAC import S_OK, S_ERROR
 from DIRAC import gLogger, rootPath, gConfig
 from DIRAC.Core.Utilities import DEncode, List
 
+from DIRAC.ConfigurationSystem.Client.PathFinder import getServiceSection
 from DIRAC.FrameworkSystem.private.monitoring.RRDManager import RRDManager
+from DIRAC.FrameworkSystem.private.monitoring.TimeSeriesManager import TimeSeriesManager
 from DIRAC.FrameworkSystem.private.monitoring.PlotCache import PlotCache
 from DIRAC.FrameworkSystem.DB.ComponentMonitoringDB import ComponentMonitoringDB
 from DIRAC.FrameworkSystem.private.monitoring.MonitoringCatalog import MonitoringCatalog
@@ -30,9 +33,13 @@ class ServiceInterface( object ):
 
   def __createRRDManager( self ):
     """
-    Generate an RRDManager
+    Generate the manager of the activity files: a TimeSeriesManager, or an RRDManager calling rrdtool
+    if the Storage option of the service is RRD
     """
-    return RRDManager( self.rrdPath, self.plotsPath )
+    storage = gConfig.getValue( "%s/Storage" % getServiceSection( "Framework/Monitoring" ), "TimeSeries" )
+    if storage == "RRD":
+      return RRDManager( self.rrdPath, self.plotsPath )
+    return TimeSeriesManager( self.rrdPath, self.plotsPath )
 
   def __createCatalog( self ):
     """
@@ -46,7 +53,7 @@ class ServiceInterface( object ):
     """
 
     self.dataPath = dataPath
-    self.plotCache = PlotCache( RRDManager( self.rrdPath, self.plotsPath ) )
+    self.plotCache = PlotCache( self.__createRRDManager() )
     self.srvUp = True
     try:
       self.compmonDB = ComponentMonitoringDB()
@@ -129,9 +136,12 @@ class ServiceInterface( object ):
     acCatalog = self.__createCatalog()
     rrdManager = self.__createRRDManager()
     unregisteredActivities = []
+    activitiesInfo = acCatalog.findActivities( sourceId, activitiesDict.keys() )
+    updatesList = []
+    updatedActivities = {}
     for acName in activitiesDict:
       acData = activitiesDict[ acName ]
-      acInfo = acCatalog.findActivity( sourceId, acName )
+      acInfo = activitiesInfo.get( acName )
       if not acInfo:
         unregisteredActivities.append( acName )
         gLogger.warn( "Cant find rrd filename", "%s:%s activity" % ( sourceId, acName ) )
@@ -149,11 +159,18 @@ class ServiceInterface( object ):
         entries.append( ( instant , acData[ instant ] ) )
       if len( entries ) > 0:
         gLogger.verbose( "There are %s entries for %s" % ( len( entries ), acName ) )
-        retDict = rrdManager.update( acInfo[4], rrdFile, acInfo[7], entries, long( acInfo[8] ) )
-        if not retDict[ 'OK' ]:
-          gLogger.error( "There was an error updating", "%s:%s activity [%s]" % ( sourceId, acName, rrdFile ) )
-        else:
-          acCatalog.setLastUpdate( sourceId, acName, retDict[ 'Value' ] )
+        updatesList.append( ( acInfo[4], rrdFile, acInfo[7], entries, long( acInfo[8] ) ) )
+        updatedActivities[ rrdFile ] = acName
+    # all the activities of the bundle are updated at once
+    results = rrdManager.updateActivities( updatesList )
+    lastUpdatesDict = {}
+    for rrdFile, retDict in results.items():
+      acName = updatedActivities[ rrdFile ]
+      if not retDict[ 'OK' ]:
+        gLogger.error( "There was an error updating", "%s:%s activity [%s]" % ( sourceId, acName, rrdFile ) )
+      else:
+        lastUpdatesDict[ acName ] = retDict[ 'Value' ]
+    acCatalog.setLastUpdates( sourceId, lastUpdatesDict )
     if not self.__cmdb_heartbeatComponent( sourceId, componentExtraInfo ):
       for acName in activitiesDict:
         if acName not in unregisteredActivities:
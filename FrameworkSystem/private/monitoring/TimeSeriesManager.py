@@ -0,0 +1,412 @@
+""" In-process storage of the activities of the Framework/Monitoring service
+
+    TimeSeriesManager offers the interface of the RRDManager without forking rrdtool:
+    the values of each activity are kept in a TimeSeriesFile, a ring buffer of one value per bucket
+    in a memory-mapped file, covering one year like the RRA of the rrd files.
+    The buckets without value are worth 0, as in the rrd graphs.
+    The consolidation of the buckets and the operation of the activity are applied when plotting.
+    When the file of an activity is created next to its rrd file, the values of the rrd file are imported
+    with rrdtool fetch, so that the history is kept when switching from the RRDManager.
+"""
+
+import os
+import mmap
+import struct
+import hashlib
+from array import array
+
+from DIRAC import gLogger, gConfig, S_OK, S_ERROR
+from DIRAC.ConfigurationSystem.Client.PathFinder import getServiceSection
+from DIRAC.Core.Utilities import Subprocess, Time
+from DIRAC.Core.Utilities.File import mkDir
+from DIRAC.Core.Utilities.ThreadSafe import Synchronizer
+
+__RCSID__ = "$Id$"
+
+gSynchro = Synchronizer()
+
+
+class TimeSeriesFile( object ):
+  """
+  Ring buffer of the values of an activity in a memory-mapped file:
+  a header (magic, bucket length, number of buckets, last update time) followed by one double per bucket.
+  The bucket starting at time t is at index ( t / bucketLength ) % nBuckets.
+  """
+
+  MAGIC = "DIRACTS1"
+  HEADER = struct.Struct( "=8sIIq" )
+  VALUE = struct.Struct( "=d" )
+
+  def __init__( self, filePath ):
+    """
+    Map an existing file
+
+    :params filePath: path of the file
+    """
+    self.filePath = filePath
+    self.__fd = open( filePath, "r+b" )
+    try:
+      self.__map = mmap.mmap( self.__fd.fileno(), 0 )
+    except:
+      self.__fd.close()
+      raise
+    magic, self.bucketLength, self.nBuckets, self.lastUpdate = self.HEADER.unpack_from( self.__map, 0 )
+    if magic != self.MAGIC or len( self.__map ) != self.HEADER.size + self.nBuckets * self.VALUE.size:
+      self.close()
+      raise ValueError( "%s is not a time series file" % filePath )
+
+  @classmethod
+  def create( cls, filePath, bucketLength, nBuckets, lastUpdate ):
+    """
+    Create a file without values: its buckets are holes of the file, read as zeros
+
+    :params filePath: path of the file
+    :params bucketLength: integer, length of the buckets in seconds
+    :params nBuckets: integer, number of buckets kept
+    :params lastUpdate: integer, time before which the updates are ignored
+    """
+    tmpPath = "%s.tmp" % filePath
+    with open( tmpPath, "wb" ) as fd:
+      fd.write( cls.HEADER.pack( cls.MAGIC, bucketLength, nBuckets, lastUpdate ) )
+      fd.truncate( cls.HEADER.size + nBuckets * cls.VALUE.size )
+    os.rename( tmpPath, filePath )
+
+  def close( self ):
+    self.__map.close()
+    self.__fd.close()
+
+  def __offset( self, index ):
+    return self.HEADER.size + index * self.VALUE.size
+
+  def __index( self, bucketTime ):
+    return ( bucketTime / self.bucketLength ) % self.nBuckets
+
+  def __clear( self, fromTime, toTime ):
+    """
+    Set to zero the buckets from fromTime to toTime, excluded
+    """
+    count = min( ( toTime - fromTime ) / self.bucketLength, self.nBuckets )
+    if count <= 0:
+      return
+    first = self.__index( fromTime )
+    for start, end in ( ( first, min( first + count, self.nBuckets ) ),
+                        ( 0, max( first + count - self.nBuckets, 0 ) ) ):
+      if end > start:
+        self.__map[ self.__offset( start ) : self.__offset( end ) ] = "\0" * ( ( end - start ) * self.VALUE.size )
+
+  def update( self, valuesList ):
+    """
+    Write the values of the buckets. The buckets since the last update without value are set to zero.
+
+    :params valuesList: list of ( time, value ) sorted by time. The values older than the last update are ignored
+
+    :return: number of values written
+    """
+    written = 0
+    lastUpdate = self.lastUpdate
+    for instant, value in valuesList:
+      instant = int( instant )
+      instant -= instant % self.bucketLength
+      if instant <= lastUpdate:
+        continue
+      self.__clear( lastUpdate + self.bucketLength, instant )
+      self.VALUE.pack_into( self.__map, self.__offset( self.__index( instant ) ), value )
+      lastUpdate = instant
+      written += 1
+    if written:
+      self.lastUpdate = lastUpdate
+      self.HEADER.pack_into( self.__map, 0, self.MAGIC, self.bucketLength, self.nBuckets, lastUpdate )
+    return written
+
+  def fetch( self, fromSecs, toSecs ):
+    """
+    Read the values of the buckets from fromSecs to toSecs
+
+    :return: tuple ( time of the first bucket, array of the values )
+    """
+    firstTime = int( fromSecs ) - int( fromSecs ) % self.bucketLength
+    values = array( "d", [ 0 ] ) * max( ( int( toSecs ) - firstTime ) / self.bucketLength + 1, 0 )
+    # only the buckets of the last year until the last update hold values
+    fromTime = max( firstTime, self.lastUpdate - ( self.nBuckets - 1 ) * self.bucketLength )
+    toTime = min( firstTime + ( len( values ) - 1 ) * self.bucketLength, self.lastUpdate )
+    count = ( toTime - fromTime ) / self.bucketLength + 1
+    if count > 0:
+      data = array( "d" )
+      first = self.__index( fromTime )
+      end = min( first + count, self.nBuckets )
+      data.fromstring( self.__map[ self.__offset( first ) : self.__offset( end ) ] )
+      if first + count > self.nBuckets:
+        data.fromstring( self.__map[ self.__offset( 0 ) : self.__offset( first + count - self.nBuckets ) ] )
+      position = ( fromTime - firstTime ) / self.bucketLength
+      values[ position : position + count ] = data
+    return firstTime, values
+
+
+class TimeSeriesManager( object ):
+
+  __sizesList = [ [ 300, 200 ], [ 500, 300 ], [ 700, 400 ], [ 900, 500 ] ]
+  # one year of buckets, like the rrd files
+  __keptTime = 31536000
+
+  def __init__( self, rrdLocation, graphLocation ):
+    """
+    Initialize TimeSeriesManager
+    """
+    self.rrdLocation = rrdLocation
+    self.graphLocation = graphLocation
+    self.log = gLogger.getSubLogger( "TimeSeriesManager" )
+    for path in ( self.rrdLocation, self.graphLocation ):
+      mkDir( path )
+
+  def __getFilePath( self, rrdFile ):
+    """
+    The activities keep the name of their rrd file in the catalog: use another extension
+    """
+    return "%s/%s.ts" % ( self.rrdLocation, os.path.splitext( rrdFile )[0] )
+
+  def existsRRDFile( self, rrdFile ):
+    return os.path.isfile( self.__getFilePath( rrdFile ) )
+
+  def getGraphLocation( self ):
+    """
+    Set the location for graph files
+    """
+    return self.graphLocation
+
+  def getCurrentBucketTime( self, bucketLength ):
+    """
+    Get current time "bucketized"
+    """
+    return self.bucketize( Time.toEpoch(), bucketLength )
+
+  def bucketize( self, secs, bucketLength ):
+    """
+    Bucketize a time (in secs)
+    """
+    secs = int( secs )
+    return secs - secs % bucketLength
+
+  @gSynchro
+  def create( self, type, rrdFile, bucketLength ):
+    """
+    Create the file of an activity
+    """
+    filePath = self.__getFilePath( rrdFile )
+    if os.path.isfile( filePath ):
+      return S_OK()
+    mkDir( os.path.dirname( filePath ) )
+    self.log.info( "Creating time series file %s" % rrdFile )
+    currentTime = self.getCurrentBucketTime( bucketLength )
+    valuesList = []
+    if os.path.isfile( "%s/%s" % ( self.rrdLocation, rrdFile ) ):
+      retVal = self.__fetchRRDFile( type, rrdFile, bucketLength, currentTime - self.__keptTime, currentTime )
+      if retVal[ 'OK' ]:
+        valuesList = retVal[ 'Value' ]
+        self.log.info( "Importing the values of the rrd file", "%s: %s values" % ( rrdFile, len( valuesList ) ) )
+      else:
+        self.log.warn( "Can not import the rrd file", "%s: %s" % ( rrdFile, retVal[ 'Message' ] ) )
+    try:
+      if valuesList:
+        TimeSeriesFile.create( filePath, bucketLength, self.__keptTime / bucketLength,
+                               valuesList[0][0] - bucketLength )
+        tsFile = TimeSeriesFile( filePath )
+        try:
+          tsFile.update( valuesList )
+        finally:
+          tsFile.close()
+      else:
+        TimeSeriesFile.create( filePath, bucketLength, self.__keptTime / bucketLength, currentTime - 86400 )
+    except ( IOError, OSError, ValueError, mmap.error ) as e:
+      return S_ERROR( "Failed to create time series file %s: %s" % ( rrdFile, e ) )
+    return S_OK()
+
+  def __fetchRRDFile( self, type, rrdFile, bucketLength, fromSecs, toSecs ):
+    """
+    Read the values of an rrd file written by the RRDManager, as they are stored in the time series files:
+    the ABSOLUTE data sources of the sum, acum and rate activities hold rates per second
+
+    :return: S_OK( list of ( time, value ) sorted by time ), without the unknown values
+    """
+    rrdExec = gConfig.getValue( "%s/RRDExec" % getServiceSection( "Framework/Monitoring" ), "rrdtool" )
+    cmd = "%s fetch '%s/%s' AVERAGE -r %s -s %s -e %s" % ( rrdExec, self.rrdLocation, rrdFile,
+                                                          bucketLength, fromSecs, toSecs )
+    retVal = Subprocess.shellCall( 0, cmd )
+    if not retVal[ 'OK' ]:
+      return retVal
+    retTuple = retVal[ 'Value' ]
+    if retTuple[0]:
+      return S_ERROR( "Failed to execute rrdtool: %s" % retTuple[2] )
+    factor = 1 if type == "mean" else bucketLength
+    valuesList = []
+    for line in retTuple[1].splitlines():
+      instant, _sep, value = line.partition( ":" )
+      try:
+        instant = int( instant )
+        value = float( value )
+      except ValueError:
+        # header, or unknown value
+        continue
+      if value == value:
+        valuesList.append( ( instant, value * factor ) )
+    return S_OK( valuesList )
+
+  def update( self, type, rrdFile, bucketLength, valuesList, lastUpdate = 0 ):
+    """
+    Add marks to an activity
+    """
+    return self.updateActivities( [ ( type, rrdFile, bucketLength, valuesList, lastUpdate ) ] )[ rrdFile ]
+
+  @gSynchro
+  def updateActivities( self, updatesList ):
+    """
+    Add the marks of several activities, like the ones of a bundle sent by a component
+
+    :params updatesList: list of the arguments of update: ( type, rrdFile, bucketLength, valuesList, lastUpdate ),
+                         valuesList being a list of ( time, value ) sorted by time
+
+    :return: dictionary with the result for each file: S_OK( time of the last value )
+    """
+    results = {}
+    for _type, rrdFile, _bucketLength, valuesList, _lastUpdate in updatesList:
+      if not valuesList:
+        results[ rrdFile ] = S_OK( 0 )
+        continue
+      self.log.verbose( "Updating time series file", rrdFile )
+      try:
+        tsFile = TimeSeriesFile( self.__getFilePath( rrdFile ) )
+      except ( IOError, ValueError, mmap.error ) as e:
+        self.log.warn( "Error updating time series file", "%s: %s" % ( rrdFile, e ) )
+        results[ rrdFile ] = S_ERROR( "Can not open time series file %s: %s" % ( rrdFile, e ) )
+        continue
+      try:
+        if tsFile.update( valuesList ) < len( valuesList ):
+          self.log.verbose( "Values older than the last update ignored", rrdFile )
+      finally:
+        tsFile.close()
+      results[ rrdFile ] = S_OK( valuesList[-1][0] )
+    return results
+
+  def __generateName( self, *args, **kwargs ):
+    """
+    Generate a random name
+    """
+    m = hashlib.md5()
+    m.update( str( args ) )
+    m.update( str( kwargs ) )
+    return m.hexdigest()
+
+  def __getBucketsPerPoint( self, timeSpan, bucketLength, plotWidth ):
+    """
+    Number of buckets consolidated in each point of a plot, so that there is at most a point per pixel
+    """
+    expectedTimeSpan = plotWidth * bucketLength
+    return max( 1, ( timeSpan + expectedTimeSpan - 1 ) / expectedTimeSpan )
+
+  def __getActivityData( self, fromSecs, toSecs, activity, plotWidth ):
+    """
+    Get the points to plot for an activity: the buckets are consolidated by average,
+    and the operation of the activity is applied as in the rrd graphs
+
+    :return: dictionary { time : value }
+    """
+    bucketLength = activity.getBucketLength()
+    scale = self.__getBucketsPerPoint( toSecs - fromSecs, bucketLength, plotWidth )
+    activity.setBucketScaleFactor( scale )
+    try:
+      tsFile = TimeSeriesFile( self.__getFilePath( activity.getFile() ) )
+    except ( IOError, ValueError, mmap.error ) as e:
+      self.log.warn( "Can not read time series file", "%s: %s" % ( activity.getFile(), e ) )
+      return {}
+    try:
+      firstTime, values = tsFile.fetch( fromSecs, toSecs )
+    finally:
+      tsFile.close()
+
+    acType = activity.getType()
+    if acType == "rate":
+      factor = 1.0 / ( scale * bucketLength )
+    elif acType in ( "sum", "acum" ):
+      factor = 1
+    else:
+      factor = 1.0 / scale
+    data = {}
+    total = 0
+    for index in xrange( 0, len( values ), scale ):
+      points = values[ index : index + scale ]
+      value = sum( points ) * factor
+      if len( points ) < scale and acType != "sum" and acType != "acum":
+        value = value * scale / len( points )
+      if acType == "acum":
+        total += value
+        value = total
+      data[ firstTime + index * bucketLength ] = value
+    return data
+
+  def __graph( self, graphFilename, data, fromSecs, toSecs, span, stackActivities, size, title, unit = "" ):
+    """
+    Draw a plot in the graph location
+    """
+    # matplotlib is only needed to draw the plots
+    from DIRAC.Core.Utilities.Graphs import curveGraph, lineGraph
+    metadata = { 'title' : title,
+                 'ylabel' : unit,
+                 'starttime' : fromSecs,
+                 'endtime' : toSecs,
+                 'span' : span,
+                 'width' : self.__sizesList[ size ][0],
+                 'height' : self.__sizesList[ size ][1],
+                 'legend' : len( data ) > 1 }
+    try:
+      with open( "%s/%s" % ( self.graphLocation, graphFilename ), "wb" ) as fd:
+        if stackActivities:
+          lineGraph( data, fd, **metadata )
+        else:
+          curveGraph( data, fd, **metadata )
+    except Exception as e:
+      self.log.exception( "Failed to generate plot", graphFilename )
+      return S_ERROR( "Failed to generate plot %s: %s" % ( graphFilename, e ) )
+    return S_OK( graphFilename )
+
+  def groupPlot( self, fromSecs, toSecs, activitiesList, stackActivities, size, graphFilename = "" ):
+    """
+    Generate a group plot
+    """
+    if not graphFilename:
+      graphFilename = "%s.png" % self.__generateName( fromSecs,
+                                                    toSecs,
+                                                    activitiesList,
+                                                    stackActivities
+                                                    )
+    plotWidth = self.__sizesList[ size ][0]
+    activitiesList.sort()
+    data = {}
+    span = 0
+    for activity in activitiesList:
+      label = activity.getLabel()
+      while label in data:
+        label += " "
+      data[ label ] = self.__getActivityData( fromSecs, toSecs, activity, plotWidth )
+      span = max( span, activity.getBucketLength() * activity.scaleFactor )
+    return self.__graph( graphFilename, data, fromSecs, toSecs, span, stackActivities, size,
+                         activitiesList[ 0 ].getGroupLabel() )
+
+  def plot( self, fromSecs, toSecs, activity, stackActivities, size, graphFilename = "" ):
+    """
+    Generate a non grouped plot
+    """
+    if not graphFilename:
+      graphFilename = "%s.png" % self.__generateName( fromSecs,
+                                                    toSecs,
+                                                    activity,
+                                                    stackActivities
+                                                    )
+    data = { activity.getLabel() : self.__getActivityData( fromSecs, toSecs, activity,
+                                                           self.__sizesList[ size ][0] ) }
+    return self.__graph( graphFilename, data, fromSecs, toSecs, activity.getBucketLength() * activity.scaleFactor,
+                         stackActivities, size, activity.getLabel(), activity.getUnit() )
+
+  def deleteRRD( self, rrdFile ):
+    try:
+      os.unlink( self.__getFilePath( rrdFile ) )
+    except Exception as e:
+      self.log.error( "Could not delete time series file", "%s: %s" % ( rrdFile, str( e ) ) )
@@ -0,0 +1,205 @@
+""" Unit tests for the in-process storage of the monitoring activities
+"""
+# pylint: disable=protected-access, missing-docstring, invalid-name
+
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+from mock import MagicMock, patch
+
+from DIRAC.FrameworkSystem.private.monitoring.Activity import Activity
+from DIRAC.FrameworkSystem.private.monitoring.MonitoringCatalog import MonitoringCatalog
+from DIRAC.FrameworkSystem.private.monitoring.TimeSeriesManager import TimeSeriesFile, TimeSeriesManager
+
+START = 1500000000 - 1500000000 % 60
+
+
+class TimeSeriesFileTestCase(unittest.TestCase):
+
+  def setUp(self):
+    self.tmpDir = tempfile.mkdtemp()
+    self.filePath = os.path.join(self.tmpDir, 'activity.ts')
+    TimeSeriesFile.create(self.filePath, 60, 10, START)
+
+  def tearDown(self):
+    shutil.rmtree(self.tmpDir)
+
+  def fetch(self, fromSecs, toSecs):
+    tsFile = TimeSeriesFile(self.filePath)
+    try:
+      firstTime, values = tsFile.fetch(fromSecs, toSecs)
+    finally:
+      tsFile.close()
+    return firstTime, list(values)
+
+  def update(self, valuesList):
+    tsFile = TimeSeriesFile(self.filePath)
+    try:
+      return tsFile.update(valuesList)
+    finally:
+      tsFile.close()
+
+  def test_update(self):
+    # the file is sparse, without values
+    self.assertEqual(self.fetch(START, START + 120), (START, [0, 0, 0]))
+    # values in the same bucket, the ones before the last update are ignored
+    self.assertEqual(self.update([(START, 1), (START + 60, 2), (START + 65, 3), (START + 180, 4.5)]), 2)
+    self.assertEqual(TimeSeriesFile(self.filePath).lastUpdate, START + 180)
+    self.assertEqual(self.fetch(START + 10, START + 240), (START, [0, 2, 0, 4.5, 0]))
+    self.assertEqual(self.fetch(START - 120, START - 60), (START - 120, [0, 0]))
+
+  def test_ringBuffer(self):
+    self.update([(START + 60 * i, i) for i in xrange(1, 16)])
+    # only the 10 last buckets are kept
+    self.assertEqual(self.fetch(START, START + 60 * 15), (START, [0] * 6 + range(6, 16)))
+    # the buckets without values since the last update are set to zero
+    self.update([(START + 60 * 18, 18)])
+    self.assertEqual(self.fetch(START + 60 * 14, START + 60 * 19), (START + 60 * 14, [14, 15, 0, 0, 18, 0]))
+    # more than the whole buffer
+    self.update([(START + 60 * 40, 40)])
+    self.assertEqual(self.fetch(START + 60 * 30, START + 60 * 40), (START + 60 * 30, [0] * 10 + [40]))
+
+  def test_invalidFile(self):
+    with open(self.filePath, 'r+b') as fd:
+      fd.write('NOTATSFILE')
+    self.assertRaises(ValueError, TimeSeriesFile, self.filePath)
+
+
+class TimeSeriesManagerTestCase(unittest.TestCase):
+
+  def setUp(self):
+    self.tmpDir = tempfile.mkdtemp()
+    self.manager = TimeSeriesManager(os.path.join(self.tmpDir, 'rrd'), os.path.join(self.tmpDir, 'plots'))
+    self.graphs = MagicMock()
+    self.modulesPatch = patch.dict(sys.modules, {'DIRAC.Core.Utilities.Graphs': self.graphs})
+    self.modulesPatch.start()
+    self.timePatch = patch('DIRAC.FrameworkSystem.private.monitoring.TimeSeriesManager.Time.toEpoch',
+                           return_value=START)
+    self.timePatch.start()
+
+  def tearDown(self):
+    self.timePatch.stop()
+    self.modulesPatch.stop()
+    shutil.rmtree(self.tmpDir)
+
+  def getActivity(self, acType, rrdFile):
+    activity = Activity(['jobs', acType, 'description', rrdFile, 60, 'Site', 'agent', 'host', 'Component'])
+    activity.setLabel('$DESCRIPTION')
+    return activity
+
+  def test_updateActivities(self):
+    for rrdFile in ('ab/ab1.rrd', 'cd/cd1.rrd'):
+      self.assertTrue(self.manager.create('sum', rrdFile, 60)['OK'])
+      self.assertTrue(self.manager.existsRRDFile(rrdFile))
+    self.assertTrue(os.path.isfile(os.path.join(self.tmpDir, 'rrd', 'ab', 'ab1.ts')))
+    self.assertFalse(self.manager.existsRRDFile('ef/ef1.rrd'))
+
+    results = self.manager.updateActivities([('sum', 'ab/ab1.rrd', 60, [(START, 1), (START + 60, 2)], 0),
+                                             ('sum', 'ef/ef1.rrd', 60, [(START, 1)], 0)])
+    self.assertEqual(results['ab/ab1.rrd'], {'OK': True, 'Value': START + 60})
+    self.assertFalse(results['ef/ef1.rrd']['OK'])
+    self.assertEqual(self.manager.update('sum', 'cd/cd1.rrd', 60, [(START, 3)])['Value'], START)
+
+    self.manager.deleteRRD('ab/ab1.rrd')
+    self.assertFalse(self.manager.existsRRDFile('ab/ab1.rrd'))
+
+  @patch('DIRAC.FrameworkSystem.private.monitoring.TimeSeriesManager.getServiceSection',
+         return_value='/Systems/Framework/Production/Services/Monitoring')
+  def test_importRRDFile(self, _getServiceSection):
+    rrdDir = os.path.join(self.tmpDir, 'rrd', 'ab')
+    os.makedirs(rrdDir)
+    for name in ('ab1.rrd', 'ab2.rrd'):
+      open(os.path.join(rrdDir, name), 'w').close()
+    output = "                          value\n\n%s: 5.0000000000e-02\n%s: -nan\n%s: 1.0000000000e-01\n%s: -nan\n" % (
+        START - 180, START - 120, START - 60, START)
+    with patch('DIRAC.FrameworkSystem.private.monitoring.TimeSeriesManager.Subprocess.shellCall',
+               return_value={'OK': True, 'Value': (0, output, '')}) as shellCall:
+      self.assertTrue(self.manager.create('sum', 'ab/ab1.rrd', 60)['OK'])
+      self.assertTrue(self.manager.create('mean', 'ab/ab2.rrd', 60)['OK'])
+    self.assertEqual(shellCall.call_args[0][1], "rrdtool fetch '%s/ab2.rrd' AVERAGE -r 60 -s %s -e %s" % (
+        rrdDir, START - 31536000, START))
+    # the rates per second of the ABSOLUTE data sources are stored as values per bucket
+    tsFile = TimeSeriesFile(os.path.join(rrdDir, 'ab1.ts'))
+    self.assertEqual(tsFile.lastUpdate, START - 60)
+    self.assertEqual(list(tsFile.fetch(START - 240, START)[1]), [0, 3, 0, 6, 0])
+    tsFile.close()
+    tsFile = TimeSeriesFile(os.path.join(rrdDir, 'ab2.ts'))
+    self.assertEqual(list(tsFile.fetch(START - 180, START - 60)[1]), [0.05, 0, 0.1])
+    tsFile.close()
+
+    # without rrdtool, the history is lost but the file is created
+    with patch('DIRAC.FrameworkSystem.private.monitoring.TimeSeriesManager.Subprocess.shellCall',
+               return_value={'OK': True, 'Value': (127, '', 'rrdtool: command not found')}):
+      open(os.path.join(rrdDir, 'ab3.rrd'), 'w').close()
+      self.assertTrue(self.manager.create('sum', 'ab/ab3.rrd', 60)['OK'])
+    self.assertTrue(self.manager.existsRRDFile('ab/ab3.rrd'))
+
+  def test_plot(self):
+    results = {}
+    for acType in ('mean', 'sum', 'acum', 'rate'):
+      rrdFile = '%s.rrd' % acType
+      self.manager.create(acType, rrdFile, 60)
+      self.manager.update(acType, rrdFile, 60, [(START + 60 * i, 6 * i) for i in xrange(1, 5)])
+      activity = self.getActivity(acType, rrdFile)
+      # 300 pixels for 5 buckets: no consolidation
+      self.assertEqual(self.manager.plot(START, START + 240, activity, True, 0, 'plot.png')['Value'], 'plot.png')
+      if acType in ('mean', 'sum'):
+        self.assertEqual(self.graphs.lineGraph.call_args[0][0], {'description': {START: 0, START + 60: 6,
+                                                                                 START + 120: 12, START + 180: 18,
+                                                                                 START + 240: 24}})
+      # consolidation of 2 buckets
+      self.manager.plot(START, START + 60 * 599, activity, False, 0, 'plot.png')
+      data = self.graphs.curveGraph.call_args[0][0]['description']
+      results[acType] = [data[START + 120 * i] for i in xrange(4)]
+      self.assertEqual(self.graphs.curveGraph.call_args[1]['span'], 120)
+    self.assertEqual(results['mean'], [3, 15, 12, 0])
+    self.assertEqual(results['sum'], [6, 30, 24, 0])
+    self.assertEqual(results['acum'], [6, 36, 60, 60])
+    self.assertEqual(results['rate'], [0.05, 0.25, 0.2, 0])
+
+  def test_groupPlot(self):
+    activities = []
+    for name in ('a', 'b'):
+      self.manager.create('sum', '%s.rrd' % name, 60)
+      self.manager.update('sum', '%s.rrd' % name, 60, [(START, 1)])
+      activities.append(self.getActivity('sum', '%s.rrd' % name))
+    activities[0].setGroup(['site'])
+    self.assertTrue(self.manager.groupPlot(START, START + 60, activities, True, 1, 'group.png')['OK'])
+    data = self.graphs.lineGraph.call_args[0][0]
+    # same labels for both activities
+    self.assertEqual(sorted(data), ['description', 'description '])
+    self.assertEqual(data['description'], {START: 1, START + 60: 0})
+
+
+class MonitoringCatalogTestCase(unittest.TestCase):
+
+  def setUp(self):
+    self.tmpDir = tempfile.mkdtemp()
+    self.catalog = MonitoringCatalog(self.tmpDir)
+    self.sourceId = self.catalog.registerSource({'setup': 'Test', 'site': 'Site', 'componentType': 'agent',
+                                                 'componentLocation': 'host', 'componentName': 'Component'})
+    for name in ('ac1', 'ac2', 'ac3'):
+      self.catalog.registerActivity(self.sourceId, name, {'category': 'c', 'description': name, 'bucketLength': 60,
+                                                          'type': 'sum', 'unit': 'u'})
+
+  def tearDown(self):
+    shutil.rmtree(self.tmpDir)
+
+  def test_batches(self):
+    activities = self.catalog.findActivities(self.sourceId, ['ac1', 'ac3', 'unknown'])
+    self.assertEqual(sorted(activities), ['ac1', 'ac3'])
+    self.assertEqual(activities['ac1'], self.catalog.findActivity(self.sourceId, 'ac1'))
+
+    self.assertEqual(self.catalog.setLastUpdates(self.sourceId, {'ac1': START, 'ac2': START + 60}), 2)
+    self.assertEqual(long(self.catalog.findActivity(self.sourceId, 'ac2')[8]), START + 60)
+    self.assertEqual(self.catalog.setLastUpdates(self.sourceId, {}), 0)
+
+
+if __name__ == '__main__':
+  suite = unittest.defaultTestLoader.loadTestsFromTestCase(TimeSeriesFileTestCase)
+  suite.addTest(unittest.defaultTestLoader.loadTestsFromTestCase(TimeSeriesManagerTestCase))
+  suite.addTest(unittest.defaultTestLoader.loadTestsFromTestCase(MonitoringCatalogTestCase))
+  unittest.TextTestRunner(verbosity=2).run(suite)
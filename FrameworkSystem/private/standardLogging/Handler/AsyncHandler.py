@@ -0,0 +1,125 @@
+"""
+Asynchronous Logging Handler
+"""
+
+__RCSID__ = "$Id$"
+
+import logging
+import Queue
+import threading
+
+
+class AsyncHandler(logging.Handler):
+  """
+  AsyncHandler is a custom handler from logging, wrapping the handler of a backend.
+
+  It is useful for the handlers which can be slow to emit a log record, like the ElasticSearch or the
+  MessageQueue ones: the calling thread only puts the log record in a bounded queue,
+  and a thread of the handler gets them by batches and gives them to the wrapped handler.
+
+  When the queue is full, the log record is dropped, or the calling thread waits for some room in the queue
+  if the handler is blocking. The numbers of queued and dropped log records are counted.
+  """
+
+  def __init__(self, handler, queueSize=10000, blocking=False, batchSize=100):
+    """
+    Initialization of the AsyncHandler and start of its thread.
+
+    :params handler: handler object from 'logging', emitting the log records
+    :params queueSize: integer, maximum number of log records waiting in the queue
+    :params blocking: boolean, wait for some room in the queue when it is full instead of dropping the log record
+    :params batchSize: integer, maximum number of log records given to the handler before flushing it
+    """
+    super(AsyncHandler, self).__init__(handler.level)
+    self.__handler = handler
+    self.__queue = Queue.Queue(max(int(queueSize), 1))
+    self.__blocking = blocking
+    self.__batchSize = max(int(batchSize), 1)
+    # counters are only modified under the lock of the handler, in emit
+    self.__queued = 0
+    self.__dropped = 0
+
+    self.__thread = threading.Thread(target=self.__run, name="AsyncLogHandler")
+    self.__thread.setDaemon(True)
+    self.__thread.start()
+
+  def getWrappedHandler(self):
+    """
+    :return: the handler emitting the log records
+    """
+    return self.__handler
+
+  def setFormatter(self, fmt):
+    """
+    The log records are formatted by the wrapped handler, in the thread of the AsyncHandler.
+
+    :params fmt: formatter object from 'logging'
+    """
+    self.__handler.setFormatter(fmt)
+
+  def emit(self, record):
+    """
+    Add the record to the queue, or drop it if the queue is full and the handler is not blocking.
+
+    :params record: log record object
+    """
+    try:
+      self.__queue.put(record, self.__blocking)
+      self.__queued += 1
+    except Queue.Full:
+      self.__dropped += 1
+
+  def getCounters(self):
+    """
+    :return: dictionary with the numbers of log records Queued and Dropped since the creation of the handler,
+             and Waiting in the queue
+    """
+    return {'Queued': self.__queued,
+            'Dropped': self.__dropped,
+            'Waiting': self.__queue.qsize()}
+
+  def __run(self):
+    """
+    Give the log records of the queue to the wrapped handler, by batches
+    """
+    while True:
+      self.__emitBatch(self.__queue.get())
+
+  def __emitBatch(self, record):
+    """
+    Give a record and the ones following it in the queue to the wrapped handler, then flush it
+
+    :params record: first log record object of the batch
+    """
+    nbRecords = 1
+    try:
+      while True:
+        self.__handler.handle(record)
+        self.__queue.task_done()
+        if nbRecords >= self.__batchSize:
+          break
+        record = self.__queue.get_nowait()
+        nbRecords += 1
+    except Queue.Empty:
+      pass
+    except Exception:  # pylint: disable=broad-except
+      # like logging.Handler.handleError, the log record is lost but the thread keeps going
+      self.__queue.task_done()
+      self.__handler.handleError(record)
+    self.__handler.flush()
+
+  def flush(self):
+    """
+    Wait until the log records of the queue are emitted, and flush the wrapped handler
+    """
+    if self.__thread.isAlive():
+      self.__queue.join()
+    self.__handler.flush()
+
+  def close(self):
+    """
+    Emit the waiting log records, then close the wrapped handler
+    """
+    self.flush()
+    self.__handler.close()
+    super(AsyncHandler, self).close()
@@ -0,0 +1,229 @@
+"""
+ElasticSearch Bulk Logging Handler
+"""
+
+__RCSID__ = "$Id$"
+
+import base64
+import json
+import logging
+import Queue
+import socket
+import sys
+import threading
+import time
+import urllib2
+
+from DIRAC.Core.Utilities import Network
+
+# attributes of the log records which are not sent, like in cmreslogging
+SKIPPED_FIELDS = ('args', 'asctime', 'created', 'exc_info', 'exc_text', 'filename', 'levelno', 'module', 'msecs',
+                  'message', 'msg', 'relativeCreated')
+
+
+class ElasticSearchHandler(logging.Handler):
+  """
+  ElasticSearchHandler is a custom handler from logging, sending the log records to an ElasticSearch DB
+  with the bulk API, in a thread of its own.
+
+  The calling thread only puts the log record in a bounded queue: when it is full, the log record is dropped.
+  The thread of the handler sends a bulk request when 'bufferSize' log records are waiting,
+  or when the oldest one waits for 'flushTime' seconds.
+  A request failing because ElasticSearch can not be reached or is overloaded is retried
+  after 'retryTime' seconds, a time doubled at each new attempt, before dropping the log records.
+  A request without answer after 'timeout' seconds is not retried, as the log records may have been indexed:
+  they are dropped, with an error on the standard error.
+  The log records are indexed in the order of their creation in 'index'-YYYY.MM.DD, as cmreslogging does.
+  """
+
+  def __init__(self, url, index, user=None, passwd=None, bufferSize=1000, flushTime=1,
+               queueSize=10000, maxRetries=3, retryTime=1, timeout=10):
+    """
+    Initialization of the ElasticSearchHandler and start of its thread.
+
+    :params url: string, url of the ElasticSearch DB. ex: https://host:9203
+    :params index: string, prefix of the indexes receiving the log records
+    :params user: string, username of the ElasticSearch DB (optional)
+    :params passwd: string, password of the ElasticSearch DB (optional)
+    :params bufferSize: integer, maximum number of log records sent in a bulk request
+    :params flushTime: float, maximum time in seconds a log record waits before being sent
+    :params queueSize: integer, maximum number of log records waiting in the queue
+    :params maxRetries: integer, number of retries of a failed bulk request
+    :params retryTime: float, time in seconds before the first retry
+    :params timeout: float, time in seconds waited for the answer to a bulk request
+    """
+    super(ElasticSearchHandler, self).__init__()
+    self.__url = '%s/_bulk' % url.rstrip('/')
+    self.__index = index
+    self.__headers = {'Content-Type': 'application/x-ndjson'}
+    if user is not None and passwd is not None:
+      self.__headers['Authorization'] = 'Basic %s' % base64.b64encode('%s:%s' % (user, passwd))
+    self.__bufferSize = max(int(bufferSize), 1)
+    self.__flushTime = float(flushTime)
+    self.__maxRetries = int(maxRetries)
+    self.__retryTime = float(retryTime)
+    self.__timeout = float(timeout)
+    self.__hostname = Network.getFQDN()
+    self.__queue = Queue.Queue(max(int(queueSize), 1))
+
+    # counters: queued and dropped are modified under the lock of the handler, in emit,
+    # sent, rejected and requests by the thread of the handler
+    self.__queued = 0
+    self.__dropped = 0
+    self.__sent = 0
+    self.__rejected = 0
+    self.__requests = 0
+
+    self.__thread = threading.Thread(target=self.__run, name="ElasticSearchLogHandler")
+    self.__thread.setDaemon(True)
+    self.__thread.start()
+
+  def emit(self, record):
+    """
+    Add the record to the queue, or drop it if the queue is full.
+
+    :params record: log record object
+    """
+    try:
+      self.__queue.put_nowait(record)
+      self.__queued += 1
+    except Queue.Full:
+      self.__dropped += 1
+
+  def getCounters(self):
+    """
+    :return: dictionary with the numbers of log records Queued, Dropped because the queue was full,
+             Sent to ElasticSearch, Rejected by ElasticSearch or after the retries, and Waiting in the queue,
+             and the number of bulk Requests
+    """
+    return {'Queued': self.__queued,
+            'Dropped': self.__dropped,
+            'Sent': self.__sent,
+            'Rejected': self.__rejected,
+            'Waiting': self.__queue.qsize(),
+            'Requests': self.__requests}
+
+  def __run(self):
+    """
+    Send the log records of the queue to ElasticSearch, by batches
+    """
+    while True:
+      batch = self.__getBatch()
+      try:
+        self.__sendBatch([self.__getDocument(record) for record in batch])
+      except Exception:  # pylint: disable=broad-except
+        # the batch is lost but the thread keeps going
+        self.__rejected += len(batch)
+      for _ in batch:
+        self.__queue.task_done()
+
+  def __getBatch(self):
+    """
+    Wait for a log record, then for the ones following it until the batch is full or the flush time is over
+
+    :return: list of log records
+    """
+    batch = [self.__queue.get()]
+    deadline = time.time() + self.__flushTime
+    while len(batch) < self.__bufferSize:
+      timeout = deadline - time.time()
+      try:
+        if timeout > 0:
+          batch.append(self.__queue.get(True, timeout))
+        else:
+          batch.append(self.__queue.get_nowait())
+      except Queue.Empty:
+        break
+    return batch
+
+  def __getDocument(self, record):
+    """
+    Build the ElasticSearch document of a log record
+
+    :params record: log record object
+
+    :return: tuple (index, document)
+    """
+    # the formatter gives asctime to the record
+    self.format(record)
+    document = dict((key, value) for key, value in record.__dict__.iteritems() if key not in SKIPPED_FIELDS)
+    document['message'] = record.getMessage()
+    document['timestamp'] = '%s.%03dZ' % (time.strftime('%Y-%m-%dT%H:%M:%S', time.gmtime(record.created)),
+                                          record.msecs)
+    document['host'] = self.__hostname
+    index = '%s-%s' % (self.__index, time.strftime('%Y.%m.%d', time.gmtime(record.created)))
+    return index, document
+
+  def __sendBatch(self, documents):
+    """
+    Send documents with a bulk request, and retry the ones failing because of ElasticSearch
+
+    :params documents: list of tuples (index, document)
+    """
+    retryTime = self.__retryTime
+    for attempt in xrange(self.__maxRetries + 1):
+      if attempt:
+        time.sleep(retryTime)
+        retryTime *= 2
+      documents = self.__bulk(documents)
+      if not documents:
+        return
+    self.__rejected += len(documents)
+
+  def __bulk(self, documents):
+    """
+    Send documents with a bulk request
+
+    :params documents: list of tuples (index, document)
+
+    :return: list of the documents to retry
+    """
+    body = ''.join('%s\n%s\n' % (json.dumps({'index': {'_index': index, '_type': 'python_log'}}),
+                                 json.dumps(document, default=str))
+                   for index, document in documents)
+    self.__requests += 1
+    try:
+      response = json.load(urllib2.urlopen(urllib2.Request(self.__url, body, self.__headers), timeout=self.__timeout))
+    except urllib2.HTTPError as e:
+      # the request itself is wrong
+      if e.code != 429 and e.code < 500:
+        self.__rejected += len(documents)
+        return []
+      return documents
+    except (urllib2.URLError, IOError, ValueError) as e:
+      if isinstance(e, socket.timeout) or isinstance(getattr(e, 'reason', None), socket.timeout):
+        # the documents may have been indexed: they are not sent again
+        sys.stderr.write("ElasticSearchHandler: no answer after %s seconds, %d log records dropped\n" %
+                         (self.__timeout, len(documents)))
+        self.__rejected += len(documents)
+        return []
+      return documents
+
+    if not response.get('errors'):
+      self.__sent += len(documents)
+      return []
+
+    toRetry = []
+    for document, item in zip(documents, response.get('items', [])):
+      status = item.get('index', {}).get('status', 500)
+      if status < 300:
+        self.__sent += 1
+      elif status == 429 or status >= 500:
+        toRetry.append(document)
+      else:
+        self.__rejected += 1
+    return toRetry
+
+  def flush(self):
+    """
+    Wait until the log records of the queue are sent, or dropped after the retries
+    """
+    if self.__thread.isAlive():
+      self.__queue.join()
+
+  def close(self):
+    """
+    Send the waiting log records before closing the handler
+    """
+    self.flush()
+    super(ElasticSearchHandler, self).close()
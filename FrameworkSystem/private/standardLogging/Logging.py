@@ -192,6 +192,7 @@ class Logging(object):
                             example: {'FileName': '/tmp/log.txt'}
     """
     backend.createHandler(backendOptions)
+    self.__setAsynchronous(backend, backendOptions)
 
     # lock to prevent that the level change before adding the new backend in the backendsList
     # and to prevent a change of the backendsList during the reading of the
@@ -333,47 +334,47 @@ class Logging(object):
     """
     return LogLevels.getLevelNames()
 
-  def always(self, sMsg, sVarMsg=''):
+  def always(self, sMsg, sVarMsg='', *args):
     """
     Always level
     """
-    return self._createLogRecord(LogLevels.ALWAYS, sMsg, sVarMsg)
+    return self._createLogRecord(LogLevels.ALWAYS, sMsg, sVarMsg, args=args)
 
-  def notice(self, sMsg, sVarMsg=''):
+  def notice(self, sMsg, sVarMsg='', *args):
     """
     Notice level
     """
-    return self._createLogRecord(LogLevels.NOTICE, sMsg, sVarMsg)
+    return self._createLogRecord(LogLevels.NOTICE, sMsg, sVarMsg, args=args)
 
-  def info(self, sMsg, sVarMsg=''):
+  def info(self, sMsg, sVarMsg='', *args):
     """
     Info level
     """
-    return self._createLogRecord(LogLevels.INFO, sMsg, sVarMsg)
+    return self._createLogRecord(LogLevels.INFO, sMsg, sVarMsg, args=args)
 
-  def verbose(self, sMsg, sVarMsg=''):
+  def verbose(self, sMsg, sVarMsg='', *args):
     """
     Verbose level
     """
-    return self._createLogRecord(LogLevels.VERBOSE, sMsg, sVarMsg)
+    return self._createLogRecord(LogLevels.VERBOSE, sMsg, sVarMsg, args=args)
 
-  def debug(self, sMsg, sVarMsg=''):
+  def debug(self, sMsg, sVarMsg='', *args):
     """
     Debug level
     """
-    return self._createLogRecord(LogLevels.DEBUG, sMsg, sVarMsg)
+    return self._createLogRecord(LogLevels.DEBUG, sMsg, sVarMsg, args=args)
 
-  def warn(self, sMsg, sVarMsg=''):
+  def warn(self, sMsg, sVarMsg='', *args):
     """
     Warn
     """
-    return self._createLogRecord(LogLevels.WARN, sMsg, sVarMsg)
+    return self._createLogRecord(LogLevels.WARN, sMsg, sVarMsg, args=args)
 
-  def error(self, sMsg, sVarMsg=''):
+  def error(self, sMsg, sVarMsg='', *args):
     """
     Error level
     """
-    return self._createLogRecord(LogLevels.ERROR, sMsg, sVarMsg)
+    return self._createLogRecord(LogLevels.ERROR, sMsg, sVarMsg, args=args)
 
   def exception(self, sMsg="", sVarMsg='', lException=False, lExcInfo=False):
     """
@@ -383,26 +384,42 @@ class Logging(object):
     _ = lExcInfo
     return self._createLogRecord(LogLevels.ERROR, sMsg, sVarMsg, exc_info=True)
 
-  def fatal(self, sMsg, sVarMsg=''):
+  def fatal(self, sMsg, sVarMsg='', *args):
     """
     Fatal level
     """
-    return self._createLogRecord(LogLevels.FATAL, sMsg, sVarMsg)
+    return self._createLogRecord(LogLevels.FATAL, sMsg, sVarMsg, args=args)
 
-  def _createLogRecord(self, level, sMsg, sVarMsg, exc_info=False):
+  def _createLogRecord(self, level, sMsg, sVarMsg, exc_info=False, args=()):
     """
     Create a log record according to the level of the message. The log record is always sent to the different backends
     Backends have their own levels and can manage the display of the message or not according to the level.
     Nevertheless, backends and the logger have the same level value,
     so we can test if the message will be displayed or not.
 
+    The messages are only built if a backend can emit them, so that the disabled levels cost almost nothing:
+    sMsg and sVarMsg can be callables returning the messages, and sVarMsg can be formatted with args, like in
+    gLogger.debug("Matched jobs", "%s in %s", nbJobs, lambda: printDict(resourceDict))
+
     :params level: positive integer representing the level of the log record
-    :params sMsg: string representing the message
-    :params sVarMsg: string representing an optional message
+    :params sMsg: string representing the message, or callable returning it
+    :params sVarMsg: string representing an optional message, or callable returning it
     :params exc_info: boolean representing the stacktrace for the exception
+    :params args: tuple of the arguments formatting sVarMsg, which can also be callables
 
     :return: boolean representing the result of the log record creation
     """
+    # test to know if the message is displayed or not
+    isSent = self._level <= level
+    if not self.__isEmitted(level):
+      return isSent
+
+    if callable(sMsg):
+      sMsg = sMsg()
+    if callable(sVarMsg):
+      sVarMsg = sVarMsg()
+    if args:
+      sVarMsg = sVarMsg % tuple(arg() if callable(arg) else arg for arg in args)
 
     # lock to prevent a level change after that the log is sent.
     self._lockLevel.acquire()
@@ -419,12 +436,32 @@ class Logging(object):
                'spacer': '' if not sVarMsg else ' ',
                'customname': self._customName}
       self._logger.log(level, "%s", sMsg, exc_info=exc_info, extra=extra)
-      # test to know if the message is displayed or not
-      isSent = self._level <= level
       return isSent
     finally:
       self._lockLevel.release()
 
+  def __isEmitted(self, level):
+    """
+    Check, without creating a log record, if a handler of the logger or of its parents would emit
+    a log record of this level: as the backends can have levels lower than the one of their Logging,
+    like the ElasticSearch one, it is not enough to check the level of the Logging.
+
+    :params level: positive integer representing the level of the log record
+
+    :return: boolean, False if the log record would be discarded
+    """
+    logger = self._logger
+    if logger.disabled or not logger.isEnabledFor(level):
+      return False
+    while logger is not None:
+      for handler in logger.handlers:
+        if level >= handler.level:
+          return True
+      if not logger.propagate:
+        break
+      logger = logger.parent
+    return False
+
   def showStack(self):
     """
     Display a debug message without any content.
@@ -461,6 +498,26 @@ class Logging(object):
       else:
         self.warn("%r is not a valid Filter name." % filterName)
 
+  @staticmethod
+  def __setAsynchronous(backend, backendOptions):
+    """
+    Make the backend asynchronous if its options ask for it:
+    - Asynchronous = yes: the log records are emitted in a thread of the backend
+    - QueueSize: maximum number of log records waiting to be emitted, 10000 by default
+    - OverflowPolicy: Drop (default) or Block, what happens to a log record when the queue is full
+    - BatchSize: maximum number of log records emitted at once, 100 by default
+
+    :params backend: Backend object
+    :params backendOptions: dictionary of the backend options
+    """
+    if not isinstance(backendOptions, dict):
+      return
+    if str(backendOptions.get('Asynchronous', '')).lower() not in ('y', 'yes', 'true', '1'):
+      return
+    backend.setAsynchronous(queueSize=int(backendOptions.get('QueueSize', 10000)),
+                            blocking=str(backendOptions.get('OverflowPolicy', 'Drop')).lower() == 'block',
+                            batchSize=int(backendOptions.get('BatchSize', 100)))
+
   def __getFilterList(self, backendOptions):
     """Return list of defined filters."""
     if not (isinstance(backendOptions, dict) and 'Filter' in backendOptions):
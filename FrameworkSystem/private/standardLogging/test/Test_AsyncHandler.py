@@ -0,0 +1,119 @@
+"""
+Test the asynchronous backends
+"""
+
+__RCSID__ = "$Id$"
+
+import logging
+import threading
+import unittest
+from StringIO import StringIO
+
+from DIRAC.FrameworkSystem.private.standardLogging.Handler.AsyncHandler import AsyncHandler
+from DIRAC.FrameworkSystem.private.standardLogging.test.TestLoggingBase import Test_Logging, gLogger
+from DIRAC.Resources.LogBackends.StdoutBackend import StdoutBackend
+
+
+class SlowHandler(logging.Handler):
+  """
+  Handler emitting the log records only when it is allowed to
+  """
+
+  def __init__(self):
+    super(SlowHandler, self).__init__()
+    self.allowed = threading.Event()
+    self.messages = []
+
+  def emit(self, record):
+    self.allowed.wait()
+    self.messages.append(record.getMessage())
+
+
+class Test_AsyncHandler(Test_Logging):
+  """
+  Test the AsyncHandler and the Asynchronous backend option
+  """
+
+  def test_00asyncBackend(self):
+    """
+    Backend with the Asynchronous option
+    """
+    log = gLogger.getSubLogger('asyncBackend')
+    backend = StdoutBackend()
+    log._addBackend(backend, {'Asynchronous': 'yes', 'QueueSize': '10'})
+    self.assertTrue(isinstance(backend.getHandler(), AsyncHandler))
+    buf = StringIO()
+    backend.getHandler().getWrappedHandler().stream = buf
+    log._generateBackendFormat()
+
+    log.always('message', 'async')
+    log.debug('debug message')
+    backend.getHandler().flush()
+    self.assertIn('always:messageasync', buf.getvalue().replace(' ', '').lower())
+    self.assertIn('debugmessage', buf.getvalue().replace(' ', ''))
+    # also displayed by the backend of gLogger
+    self.assertIn('message', self.buffer.getvalue())
+
+    log.setLevel('error')
+    log.always('message')
+    log.info('not displayed')
+    backend.getHandler().flush()
+    self.assertNotIn('not displayed', buf.getvalue())
+    self.assertEqual(backend.getHandler().getCounters(), {'Queued': 3, 'Dropped': 0, 'Waiting': 0})
+
+  def test_01synchronousBackend(self):
+    """
+    Backends are synchronous by default
+    """
+    log = gLogger.getSubLogger('syncBackend')
+    backend = StdoutBackend()
+    log._addBackend(backend, {'Asynchronous': 'no'})
+    self.assertFalse(isinstance(backend.getHandler(), AsyncHandler))
+
+  def test_02drop(self):
+    """
+    Log records are dropped when the queue is full
+    """
+    slowHandler = SlowHandler()
+    handler = AsyncHandler(slowHandler, queueSize=2, batchSize=2)
+    logger = logging.getLogger('asyncDrop')
+    logger.propagate = False
+    logger.addHandler(handler)
+
+    for i in xrange(10):
+      logger.error('message %s', i)
+    counters = handler.getCounters()
+    # one record can be waiting in the slow handler, out of the queue
+    self.assertIn(counters['Queued'], (2, 3))
+    self.assertEqual(counters['Queued'] + counters['Dropped'], 10)
+
+    slowHandler.allowed.set()
+    handler.flush()
+    self.assertEqual(slowHandler.messages, ['message %s' % i for i in xrange(counters['Queued'])])
+    self.assertEqual(handler.getCounters()['Waiting'], 0)
+
+  def test_03block(self):
+    """
+    The calling thread waits when the queue is full and the handler is blocking
+    """
+    slowHandler = SlowHandler()
+    handler = AsyncHandler(slowHandler, queueSize=2, blocking=True)
+    logger = logging.getLogger('asyncBlock')
+    logger.propagate = False
+    logger.addHandler(handler)
+
+    thread = threading.Thread(target=lambda: [logger.error('message %s', i) for i in xrange(10)])
+    thread.start()
+    thread.join(0.2)
+    self.assertTrue(thread.isAlive())
+
+    slowHandler.allowed.set()
+    thread.join()
+    handler.close()
+    self.assertEqual(slowHandler.messages, ['message %s' % i for i in xrange(10)])
+    self.assertEqual(handler.getCounters(), {'Queued': 10, 'Dropped': 0, 'Waiting': 0})
+
+
+if __name__ == '__main__':
+  suite = unittest.defaultTestLoader.loadTestsFromTestCase(Test_AsyncHandler)
+  unittest.TextTestRunner(verbosity=2).run(suite)
@@ -0,0 +1,176 @@
+"""
+Test the ElasticSearchHandler with a local fake ElasticSearch
+"""
+
+__RCSID__ = "$Id$"
+
+import json
+import logging
+import threading
+import time
+import unittest
+from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+
+from DIRAC.FrameworkSystem.private.standardLogging.Handler.ElasticSearchHandler import ElasticSearchHandler
+
+
+class FakeElasticSearch(HTTPServer):
+  """
+  HTTP server answering to the bulk requests like ElasticSearch
+  """
+
+  def __init__(self):
+    HTTPServer.__init__(self, ('127.0.0.1', 0), FakeBulkHandler)
+    self.requests = []
+    self.documents = []
+    # list of answers to give before indexing: HTTP code, list of item statuses, or time to wait before indexing
+    self.failures = []
+    self.thread = threading.Thread(target=self.serve_forever)
+    self.thread.setDaemon(True)
+    self.thread.start()
+
+  def getURL(self):
+    return 'http://127.0.0.1:%d' % self.server_port
+
+
+class FakeBulkHandler(BaseHTTPRequestHandler):
+  """
+  Handler of the bulk requests of the FakeElasticSearch
+  """
+
+  def log_message(self, *args):
+    pass
+
+  def do_POST(self):
+    lines = self.rfile.read(int(self.headers['Content-Length'])).splitlines()
+    actions = [json.loads(line) for line in lines[0::2]]
+    documents = [json.loads(line) for line in lines[1::2]]
+    self.server.requests.append((self.path, actions))
+
+    failure = self.server.failures.pop(0) if self.server.failures else None
+    if isinstance(failure, float):
+      time.sleep(failure)
+      failure = None
+    if isinstance(failure, int):
+      self.send_response(failure)
+      self.end_headers()
+      return
+    statuses = failure or [201] * len(documents)
+    for document, status in zip(documents, statuses):
+      if status < 300:
+        self.server.documents.append(document)
+    self.send_response(200)
+    self.end_headers()
+    self.wfile.write(json.dumps({'errors': failure is not None,
+                                 'items': [{'index': {'status': status}} for status in statuses]}))
+
+
+class Test_ElasticSearchHandler(unittest.TestCase):
+  """
+  Test the bulk requests of the ElasticSearchHandler
+  """
+
+  def setUp(self):
+    self.server = FakeElasticSearch()
+    self.logger = logging.getLogger('esBulk%s' % id(self))
+    self.logger.propagate = False
+    self.logger.setLevel(logging.DEBUG)
+
+  def tearDown(self):
+    self.server.shutdown()
+    self.server.server_close()
+
+  def getHandler(self, **kwargs):
+    handler = ElasticSearchHandler(self.server.getURL(), 'dirac-logs', **kwargs)
+    self.logger.addHandler(handler)
+    return handler
+
+  def test_00batches(self):
+    """
+    The log records are sent in order, by batches of bufferSize
+    """
+    handler = self.getHandler(bufferSize=100, flushTime=10)
+    for i in xrange(1050):
+      self.logger.info('message %s', i, extra={'varmessage': 'var'})
+    handler.flush()
+
+    self.assertEqual([document['message'] for document in self.server.documents],
+                     ['message %s' % i for i in xrange(1050)])
+    self.assertEqual(len(self.server.requests), 11)
+    self.assertEqual(self.server.requests[0][0], '/_bulk')
+    action = self.server.requests[0][1][0]['index']
+    self.assertEqual(action['_index'], 'dirac-logs-%s' % time.strftime('%Y.%m.%d', time.gmtime()))
+    document = self.server.documents[0]
+    self.assertEqual((document['levelname'], document['varmessage']), ('INFO', 'var'))
+    self.assertIn('timestamp', document)
+    self.assertNotIn('msg', document)
+    self.assertEqual(handler.getCounters(), {'Queued': 1050, 'Dropped': 0, 'Sent': 1050, 'Rejected': 0,
+                                             'Waiting': 0, 'Requests': 11})
+
+  def test_01flushTime(self):
+    """
+    A log record is sent after flushTime seconds without flushing the handler
+    """
+    handler = self.getHandler(bufferSize=100, flushTime=0.1)
+    self.logger.error('message')
+    for _ in xrange(50):
+      if self.server.documents:
+        break
+      time.sleep(0.1)
+    self.assertEqual([document['message'] for document in self.server.documents], ['message'])
+    self.assertEqual(handler.getCounters()['Requests'], 1)
+
+  def test_02retries(self):
+    """
+    The requests failing because of ElasticSearch are retried, then dropped
+    """
+    handler = self.getHandler(bufferSize=3, flushTime=10, maxRetries=2, retryTime=0.01)
+    # ElasticSearch unavailable, then overloaded for one document, then a wrong document
+    self.server.failures = [503, [201, 429, 201], [400]]
+    for i in xrange(4):
+      self.logger.info('message %s', i)
+    handler.flush()
+    self.assertEqual([document['message'] for document in self.server.documents],
+                     ['message 0', 'message 2', 'message 3'])
+    self.assertEqual(handler.getCounters()['Rejected'], 1)
+    self.assertEqual(handler.getCounters()['Requests'], 4)
+
+    self.server.failures = [503] * 3
+    self.logger.info('message')
+    handler.flush()
+    self.assertEqual(handler.getCounters()['Rejected'], 2)
+    self.assertEqual(handler.getCounters()['Requests'], 7)
+
+  def test_03boundedQueue(self):
+    """
+    The log records are dropped when the queue is full
+    """
+    # nothing listens on this port
+    handler = ElasticSearchHandler('http://127.0.0.1:1', 'dirac-logs', bufferSize=10, flushTime=0, queueSize=20,
+                                   maxRetries=0)
+    self.logger.addHandler(handler)
+    for i in xrange(1000):
+      self.logger.info('message %s', i)
+    counters = handler.getCounters()
+    self.assertEqual(counters['Queued'] + counters['Dropped'], 1000)
+    self.assertTrue(counters['Dropped'] > 0)
+    self.assertTrue(counters['Waiting'] <= 20)
+    handler.flush()
+    self.assertEqual(handler.getCounters()['Rejected'], counters['Queued'])
+
+  def test_04timeout(self):
+    """
+    The requests without answer in time are not retried
+    """
+    handler = self.getHandler(bufferSize=2, flushTime=10, retryTime=0.01, timeout=0.2)
+    self.server.failures = [1.]
+    for i in xrange(2):
+      self.logger.info('message %s', i)
+    handler.flush()
+    self.assertEqual(handler.getCounters()['Rejected'], 2)
+    self.assertEqual(handler.getCounters()['Requests'], 1)
+
+
+if __name__ == '__main__':
+  suite = unittest.defaultTestLoader.loadTestsFromTestCase(Test_ElasticSearchHandler)
+  unittest.TextTestRunner(verbosity=2).run(suite)
@@ -0,0 +1,101 @@
+"""
+Test the messages built only when they are emitted
+"""
+
+__RCSID__ = "$Id$"
+
+import logging
+import unittest
+
+from DIRAC.FrameworkSystem.private.standardLogging.test.TestLoggingBase import Test_Logging, gLogger, cleaningLog
+
+
+class CallCounter(object):
+  """
+  Callable counting its calls and returning a message
+  """
+
+  def __init__(self, message):
+    self.message = message
+    self.calls = 0
+
+  def __call__(self):
+    self.calls += 1
+    return self.message
+
+
+class Test_LazyMessages(Test_Logging):
+  """
+  Test the callables and the arguments given to the always, notice, ..., fatal methods.
+  """
+
+  def test_00args(self):
+    """
+    The variable message is formatted with the arguments
+    """
+    self.assertTrue(self.log.info("message", "%s and %d", "var", 3))
+    self.assertEqual("UTCFramework/logINFO:messagevarand3\n", cleaningLog(self.buffer.getvalue()))
+    self.buffer.truncate(0)
+
+    # without arguments, the variable message is not formatted
+    self.log.info("message", "100%")
+    self.assertEqual("UTCFramework/logINFO:message100%\n", cleaningLog(self.buffer.getvalue()))
+
+  def test_01callables(self):
+    """
+    The callables are called only if the message is emitted
+    """
+    sMsg = CallCounter("message")
+    sVarMsg = CallCounter("var")
+    arg = CallCounter("arg")
+
+    gLogger.setLevel('info')
+    self.assertFalse(self.log.debug(sMsg, sVarMsg))
+    self.assertFalse(self.log.verbose("message", "%s", arg))
+    self.assertEqual((sMsg.calls, sVarMsg.calls, arg.calls), (0, 0, 0))
+    self.assertEqual(self.buffer.getvalue(), "")
+
+    self.assertTrue(self.log.info(sMsg, sVarMsg))
+    self.assertTrue(self.log.info("message", "%s", arg))
+    self.assertEqual((sMsg.calls, sVarMsg.calls, arg.calls), (1, 1, 1))
+    self.assertEqual("UTCFramework/logINFO:messagevar\n", cleaningLog(self.buffer.getvalue().splitlines(True)[0]))
+    self.assertIn("INFO: message arg", self.buffer.getvalue())
+
+  def test_02handlerLevel(self):
+    """
+    A handler with a level lower than the one of the Logging still gets the messages
+    """
+    records = []
+    handler = logging.Handler(logging.DEBUG)
+    handler.emit = records.append
+    logger = logging.getLogger('dirac').getChild('log')
+    logger.addHandler(handler)
+    try:
+      # the level of the logger object is the lowest level of the backends
+      logger.setLevel(logging.DEBUG)
+      self.log.setLevel('error')
+      arg = CallCounter("arg")
+      # not displayed by the Logging, but the message is built for the handler
+      self.assertFalse(self.log.debug("message", "%s", arg))
+      self.assertEqual(arg.calls, 1)
+      self.assertEqual([record.getMessage() for record in records], ["message"])
+      self.assertEqual(records[0].varmessage, "arg")
+    finally:
+      logger.removeHandler(handler)
+
+  def test_03disabledLevel(self):
+    """
+    Nothing is built when no handler emits the level
+    """
+    arg = CallCounter("arg")
+    gLogger.setLevel('warn')
+    self.log.info("message", "%s", arg)
+    self.log.debug("message", "%s", arg)
+    self.assertEqual(arg.calls, 0)
+    self.log.warn("message", "%s", arg)
+    self.assertEqual(arg.calls, 1)
+
+
+if __name__ == '__main__':
+  suite = unittest.defaultTestLoader.loadTestsFromTestCase(Test_LazyMessages)
+  unittest.TextTestRunner(verbosity=2).run(suite)
@@ -140,14 +140,5 @@ class DBUtils (object):
     Divide by factor the values and get the maximum value
       - dataDict = { 'key' : { time1 : value,  time2 : value... }, 'key2'.. }
     """
-    maxValue = 0
-    maxEpoch = 0
-    for key in dataDict:
-      currentDict = dataDict[key]
-      for timeEpoch in currentDict:
-        if timeEpoch > maxEpoch:
-          maxEpoch = timeEpoch
-          maxValue = 0
-        if timeEpoch == maxEpoch:
-          maxValue += currentDict[timeEpoch]
-    return maxValue
+    maxEpoch = max([max(currentDict) for currentDict in dataDict.itervalues() if currentDict] or [0])
+    return sum(currentDict.get(maxEpoch, 0) for currentDict in dataDict.itervalues())
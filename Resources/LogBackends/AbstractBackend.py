@@ -4,6 +4,8 @@ Backend wrapper
 
 __RCSID__ = "$Id$"
 
+from DIRAC.FrameworkSystem.private.standardLogging.Handler.AsyncHandler import AsyncHandler
+
 
 class AbstractBackend(object):
   """
@@ -53,6 +55,18 @@ class AbstractBackend(object):
     """
     return self._handler
 
+  def setAsynchronous(self, queueSize=10000, blocking=False, batchSize=100):
+    """
+    Emit the log records in the thread of an AsyncHandler wrapping the handler of the backend,
+    so that a slow handler does not stall the threads creating the log records.
+    It has to be called after createHandler.
+
+    :params queueSize: integer, maximum number of log records waiting to be emitted
+    :params blocking: boolean, wait when the queue is full instead of dropping the log records
+    :params batchSize: integer, maximum number of log records emitted before flushing the handler
+    """
+    self._handler = AsyncHandler(self._handler, queueSize, blocking, batchSize)
+
   def setFormat(self, fmt, datefmt, options):
     """
     Each backend give a format to their formatters and attach them to their handlers.
@@ -7,6 +7,7 @@ __RCSID__ = "$Id$"
 import logging
 from cmreslogging.handlers import CMRESHandler
 
+from DIRAC.FrameworkSystem.private.standardLogging.Handler.ElasticSearchHandler import ElasticSearchHandler
 from DIRAC.Resources.LogBackends.AbstractBackend import AbstractBackend
 
 class ElasticSearchBackend(AbstractBackend):
@@ -15,6 +16,9 @@ class ElasticSearchBackend(AbstractBackend):
   Here, we have a CMRESHandler which is part of an external library named 'cmreslogging' based on 'logging'.
   CMRESHandler is a specific handler created to send log records to an ElasticSearch DB. It does not need a Formatter
   object.
+
+  With the Bulk option, the handler is an ElasticSearchHandler, sending the log records by bulk requests
+  in a thread of its own. You can find it in FrameworkSystem/private/standardLogging/Handler
   """
 
   def __init__(self):
@@ -30,6 +34,11 @@ class ElasticSearchBackend(AbstractBackend):
     self.__index = ''
     self.__bufferSize = 1000
     self.__flushTime = 1
+    self.__bulk = False
+    self.__queueSize = 10000
+    self.__maxRetries = 3
+    self.__retryTime = 1
+    self.__timeout = 10
 
   def createHandler(self, parameters=None):
     """
@@ -45,8 +54,24 @@ class ElasticSearchBackend(AbstractBackend):
       self.__index = parameters.get('Index', self.__index)
       self.__bufferSize = int(parameters.get('BufferSize', self.__bufferSize))
       self.__flushTime = int(parameters.get('FlushTime', self.__flushTime))
+      self.__bulk = str(parameters.get('Bulk', '')).lower() in ('y', 'yes', 'true', '1')
+      self.__queueSize = int(parameters.get('QueueSize', self.__queueSize))
+      self.__maxRetries = int(parameters.get('MaxRetries', self.__maxRetries))
+      self.__retryTime = float(parameters.get('RetryTime', self.__retryTime))
+      self.__timeout = float(parameters.get('Timeout', self.__timeout))
 
-    if self.__user is not None and self.__passwd is not None:
+    if self.__bulk:
+      self._handler = ElasticSearchHandler('https://%s:%d' % (self.__host, self.__port),
+                                           self.__index,
+                                           user=self.__user,
+                                           passwd=self.__passwd,
+                                           bufferSize=self.__bufferSize,
+                                           flushTime=self.__flushTime,
+                                           queueSize=self.__queueSize,
+                                           maxRetries=self.__maxRetries,
+                                           retryTime=self.__retryTime,
+                                           timeout=self.__timeout)
+    elif self.__user is not None and self.__passwd is not None:
       self._handler = CMRESHandler(hosts=[{'host': self.__host, 'port': self.__port}],
                                    auth_type=CMRESHandler.AuthType.BASIC_AUTH,
                                    auth_details=(self.__user, self.__passwd),
@@ -823,12 +823,12 @@ class StorageElementItem(object):
     # Take all the protocols the destination can accept as input
     destProtocols = self._getAllInputProtocols()
 
-    log.debug("Destination input protocols %s" % destProtocols)
+    log.debug("Destination input protocols", "%s", destProtocols)
 
     # Take all the protocols the source can provide
     sourceProtocols = sourceSE._getAllOutputProtocols()
 
-    log.debug("Source output protocols %s" % sourceProtocols)
+    log.debug("Source output protocols", "%s", sourceProtocols)
 
     commonProtocols = destProtocols & sourceProtocols
 
@@ -843,7 +843,7 @@ class StorageElementItem(object):
               x,
               protocolList))
 
-    log.debug("Common protocols %s" % commonProtocols)
+    log.debug("Common protocols", "%s", commonProtocols)
 
     return S_OK(list(commonProtocols))
 
@@ -1052,7 +1052,7 @@ class StorageElementItem(object):
         setProtocol = set(protocols)
         for plugin in self.storages:
           if set(plugin.protocolParameters.get("OutputProtocols", [])) & setProtocol:
-            log.debug("Plugin %s can generate compatible protocol" % plugin.pluginName)
+            log.debug("Plugin", "%s can generate compatible protocol", plugin.pluginName)
             pluginsToUse.append(plugin)
       else:
         pluginsToUse = self.storages
@@ -1062,11 +1062,11 @@ class StorageElementItem(object):
           key=lambda x: getIndexInList(
               x.protocolParameters['Protocol'],
               self.localAccessProtocolList))
-      log.debug("Plugins to be used for %s: %s" %
-                (methodName, [p.pluginName for p in pluginsToUse]))
+      log.debug("Plugins to be used for", "%s: %s",
+                methodName, lambda: [p.pluginName for p in pluginsToUse])
       return pluginsToUse
 
-    log.debug("Allowed protocol: %s" % allowedProtocols)
+    log.debug("Allowed protocol:", "%s", allowedProtocols)
 
     # if a list of protocol is specified, take it into account
     if protocols:
@@ -1074,7 +1074,7 @@ class StorageElementItem(object):
     else:
       potentialProtocols = allowedProtocols
 
-    log.debug('Potential protocols %s' % potentialProtocols)
+    log.debug('Potential protocols', '%s', potentialProtocols)
 
     localSE = self.__isLocalSE()['Value']
 
@@ -1084,16 +1084,16 @@ class StorageElementItem(object):
       pluginName = pluginParameters.get('PluginName')
 
       if not pluginParameters:
-        log.debug("Failed to get storage parameters.", "%s %s" % (self.name, pluginName))
+        log.debug("Failed to get storage parameters.", "%s %s", self.name, pluginName)
         continue
 
       if not (pluginName in self.remotePlugins) and not localSE and not pluginName == "Proxy":
         # If the SE is not local then we can't use local protocols
-        log.debug("Local protocol not appropriate for remote use: %s." % pluginName)
+        log.debug("Local protocol not appropriate for remote use:", "%s.", pluginName)
         continue
 
       if pluginParameters['Protocol'] not in potentialProtocols:
-        log.debug("Plugin %s not allowed for %s." % (pluginName, methodName))
+        log.debug("Plugin", "%s not allowed for %s.", pluginName, methodName)
         continue
 
       # If we are attempting a putFile and we know the inputProtocol
@@ -1112,7 +1112,7 @@ class StorageElementItem(object):
             x.protocolParameters['Protocol'],
             allowedProtocols))
 
-    log.debug("Plugins to be used for %s: %s" % (methodName, [p.pluginName for p in pluginsToUse]))
+    log.debug("Plugins to be used for", "%s: %s", methodName, lambda: [p.pluginName for p in pluginsToUse])
 
     return pluginsToUse
 
@@ -1200,10 +1200,10 @@ class StorageElementItem(object):
       pluginName = storageParameters['PluginName']
 
       if not lfnDict:
-        log.debug("No lfns to be attempted for %s protocol." % pluginName)
+        log.debug("No lfns to be attempted for", "%s protocol.", pluginName)
         continue
 
-      log.verbose("Generating %s protocol URLs for %s." % (len(lfnDict), pluginName))
+      log.verbose("Generating", "%s protocol URLs for %s.", len(lfnDict), pluginName)
       replicaDict = kwargs.pop('replicaDict', {})
       if storage.pluginName != "Proxy":
         res = self.__generateURLDict(lfnDict, storage, replicaDict=replicaDict)
@@ -196,15 +196,10 @@ class TransformationDB(DB):
         return self.deleteTransformation(transID, connection=connection)
       message = 'Creation of the derived transformation (%d)' % transID
       self.__updateTransformationLogging(originalID, message, authorDN, connection=connection)
-      res = self.getTransformationFiles(condDict={'TransformationID': originalID}, connection=connection)
+      res = self.__copyTransformationFiles(originalID, transID, connection=connection)
       if not res['OK']:
-        gLogger.error("Could not get transformation files, now deleting", res['Message'])
+        gLogger.error("Could not copy the transformation files, now deleting", res['Message'])
         return self.deleteTransformation(transID, connection=connection)
-      if res['Records']:
-        res = self.__insertExistingTransformationFiles(transID, res['Records'], connection=connection)
-        if not res['OK']:
-          gLogger.error("Could not insert files, now deleting", res['Message'])
-          return self.deleteTransformation(transID, connection=connection)
 
     ### Add files to the DataFiles table ##################
     catalog = FileCatalog()
@@ -524,10 +519,16 @@ class TransformationDB(DB):
 
   def getTransformationFiles(self, condDict=None, older=None, newer=None, timeStamp='LastUpdate',
                              orderAttribute=None, limit=None, offset=None, connection=False):
-    """ Get files for the supplied transformations with support for the web standard structure """
+    """ Get files for the supplied transformations with support for the web standard structure
+
+        The rows are streamed from the database, but all of them are returned:
+        limit and offset should be used to get a big selection by pages.
+    """
     connection = self.__getConnection(connection)
-    req = "SELECT %s FROM TransformationFiles" % (intListToString(self.TRANSFILEPARAMS))
-    originalFileIDs = {}
+    # The LFNs are selected together with the files, as the result is streamed
+    req = "SELECT %s, (SELECT LFN FROM DataFiles WHERE DataFiles.FileID = TransformationFiles.FileID)" % \
+        intListToString(self.TRANSFILEPARAMS)
+    req += " FROM TransformationFiles"
     if condDict is None:
       condDict = {}
     if condDict or older or newer:
@@ -538,8 +539,7 @@ class TransformationDB(DB):
         res = self.__getFileIDsForLfns(lfns, connection=connection)
         if not res['OK']:
           return res
-        originalFileIDs = res['Value'][0]
-        condDict['FileID'] = originalFileIDs.keys()
+        condDict['FileID'] = res['Value'][0].keys()
 
       for val in condDict.itervalues():
         if not val:
@@ -547,24 +547,15 @@ class TransformationDB(DB):
 
       req = "%s %s" % (req, self.buildCondition(condDict, older, newer, timeStamp, orderAttribute, limit,
                                                 offset=offset))
-    res = self._query(req, connection)
-    if not res['OK']:
-      return res
-
-    transFiles = res['Value']
-    fileIDs = [int(row[1]) for row in transFiles]
     webList = []
     resultList = []
-    if not fileIDs:
-      originalFileIDs = {}
-    else:
-      if not originalFileIDs:
-        res = self.__getLfnsForFileIDs(fileIDs, connection=connection)
-        if not res['OK']:
-          return res
-        originalFileIDs = res['Value'][1]
-      for row in transFiles:
-        lfn = originalFileIDs[row[1]]
+    # Stream the result, so that the rows are only held in memory as the returned structures
+    for res in self._streamQuery(req, conn=connection):
+      if not res['OK']:
+        return res
+      for row in res['Value']:
+        lfn = row[-1]
+        row = row[:-1]
         # Prepare the structure for the web
         fDict = {'LFN': lfn}
         fDict.update(dict(zip(self.TRANSFILEPARAMS, row)))
@@ -665,15 +656,32 @@ class TransformationDB(DB):
       fileIDs.remove(tupleIn[0])
     if not fileIDs:
       return S_OK([])
-    req = "INSERT INTO TransformationFiles (TransformationID,FileID,LastUpdate,InsertedTime) VALUES"
-    for fileID in fileIDs:
-      req = "%s (%d,%d,UTC_TIMESTAMP(),UTC_TIMESTAMP())," % (req, transID, fileID)
-    req = req.rstrip(',')
-    res = self._update(req, connection)
+    res = self.insertMany('TransformationFiles', ['TransformationID', 'FileID', 'LastUpdate', 'InsertedTime'],
+                          [(transID, fileID, 'UTC_TIMESTAMP()', 'UTC_TIMESTAMP()') for fileID in fileIDs],
+                          conn=connection)
     if not res['OK']:
       return res
     return S_OK(fileIDs)
 
+  def __copyTransformationFiles(self, originalID, transID, pageSize=10000, connection=False):
+    """ Insert the files of a transformation in a derived one, by pages of files,
+        so that they are never all held in memory
+    """
+    offset = 0
+    while True:
+      res = self.getTransformationFiles(condDict={'TransformationID': originalID}, orderAttribute='FileID',
+                                        limit=pageSize, offset=offset, connection=connection)
+      if not res['OK']:
+        return res
+      fileTuples = res['Records']
+      if fileTuples:
+        res = self.__insertExistingTransformationFiles(transID, fileTuples, connection=connection)
+        if not res['OK']:
+          return res
+      if len(fileTuples) < pageSize:
+        return S_OK()
+      offset += pageSize
+
   def __insertExistingTransformationFiles(self, transID, fileTuplesList, connection=False):
     """ Inserting already transformation files in TransformationFiles table (e.g. for deriving transformations)
     """
@@ -1179,18 +1187,6 @@ class TransformationDB(DB):
     fids = dict((fileID, lfn) for lfn, fileID in lfns.iteritems())
     return S_OK((fids, lfns))
 
-  def __getLfnsForFileIDs(self, fileIDs, connection=False):
-    """ Get lfns for the given list of fileIDs
-    """
-    req = "SELECT LFN,FileID FROM DataFiles WHERE FileID in (%s);" % stringListToString(fileIDs)
-    res = self._query(req, connection)
-    if not res['OK']:
-      return res
-    fids = dict(res['Value'])
-    # Reverse dictionary
-    lfns = dict((fileID, lfn) for lfn, fileID in fids.iteritems())
-    return S_OK((fids, lfns))
-
   def __addDataFiles(self, lfns, connection=False):
     """ Add a file to the DataFiles table and retrieve the FileIDs
     """
@@ -1199,12 +1195,18 @@ class TransformationDB(DB):
       return res
     # Insert only files not found, and assume the LFN is unique in the table
     lfnFileIDs = res['Value'][1]
-    for lfn in set(lfns) - set(lfnFileIDs):
-      req = "INSERT INTO DataFiles (LFN,Status) VALUES ('%s','New');" % lfn
-      res = self._update(req, connection)
-      # If the LFN is duplicate we get an error and ignore it
-      if res['OK']:
-        lfnFileIDs[lfn] = res['lastRowId']
+    newLfns = list(set(lfns) - set(lfnFileIDs))
+    if not newLfns:
+      return S_OK(lfnFileIDs)
+    # If the LFN is duplicate (ie added meanwhile) it is ignored
+    res = self.insertMany('DataFiles', ['LFN', 'Status'], [(lfn, 'New') for lfn in newLfns],
+                          ignore=True, conn=connection)
+    if not res['OK']:
+      return res
+    res = self.__getFileIDsForLfns(newLfns, connection=connection)
+    if not res['OK']:
+      return res
+    lfnFileIDs.update(res['Value'][1])
     return S_OK(lfnFileIDs)
 
   def __setDataFileStatus(self, fileIDs, status, connection=False):
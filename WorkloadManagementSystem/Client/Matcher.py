@@ -66,20 +66,9 @@ class Matcher(object):
 
     resourceDict = self._getResourceDict(resourceDescription, credDict)
 
-    # Make a nice print of the resource matching parameters
-    toPrintDict = dict(resourceDict)
-    if "MaxRAM" in resourceDescription:
-      toPrintDict['MaxRAM'] = resourceDescription['MaxRAM']
-    if "NumberOfProcessors" in resourceDescription:
-      toPrintDict['NumberOfProcessors'] = resourceDescription['NumberOfProcessors']
-    toPrintDict['Tag'] = []
-    if "Tag" in resourceDict:
-      for tag in resourceDict['Tag']:
-        if not tag.endswith('GB') and not tag.endswith('Processors'):
-          toPrintDict['Tag'].append(tag)
-    if not toPrintDict['Tag']:
-      toPrintDict.pop('Tag')
-    self.log.info('Resource description for matching', printDict(toPrintDict))
+    # Make a nice print of the resource matching parameters, only if it is logged
+    self.log.info('Resource description for matching',
+                  lambda: printDict(self._getResourceDictToPrint(resourceDict, resourceDescription)))
 
     negativeCond = self.limiter.getNegativeCondForSite(resourceDict['Site'])
     result = self.tqDB.matchAndGetJob(resourceDict, negativeCond=negativeCond)
@@ -115,7 +104,7 @@ class Matcher(object):
     resultDict['JobID'] = jobID
 
     matchTime = time.time() - startTime
-    self.log.info("Match time", "[%s]" % str(matchTime))
+    self.log.info("Match time", "[%s]", matchTime)
     gMonitor.addMark("matchTime", matchTime)
 
     # Get some extra stuff into the response returned
@@ -143,6 +132,99 @@ class Matcher(object):
 
     return resultDict
 
+  def selectJobs(self, resourceDescription, credDict, numJobs):
+    """ Select up to numJobs jobs for a resource with several slots, like selectJob but with a single
+        matching of the task queues, and with the job statuses updated in bulk
+
+        :returns: list of dictionaries like the one of selectJob, empty if no job matched
+    """
+    startTime = time.time()
+
+    resourceDict = self._getResourceDict(resourceDescription, credDict)
+    self.log.info('Resource description for matching', '%s jobs: %s', numJobs, lambda: printDict(resourceDict))
+
+    negativeCond = self.limiter.getNegativeCondForSite(resourceDict['Site'])
+    result = self.tqDB.matchAndGetJobs(resourceDict, numJobs, negativeCond=negativeCond)
+    if not result['OK']:
+      raise RuntimeError(result['Message'])
+    jobIDs = [jobID for jobID, _tqID in result['Value']['jobs']]
+    if not jobIDs:
+      self.log.info("No match found")
+      return []
+
+    resAtt = self.jobDB.getAttributesForJobList(jobIDs, ['OwnerDN', 'OwnerGroup', 'Status'])
+    if not resAtt['OK']:
+      raise RuntimeError('Could not retrieve job attributes')
+    jobAttributes = resAtt['Value']
+    matchedIDs = []
+    for jobID in jobIDs:
+      if jobID not in jobAttributes:
+        self.log.error('No attributes returned for job', str(jobID))
+      elif jobAttributes[jobID]['Status'] != 'Waiting':
+        self.log.error('Job matched by the TQ is not in Waiting state', str(jobID))
+        result = self.tqDB.deleteJob(jobID)
+        if not result['OK']:
+          self.log.error('Could not delete job from the TQ', result['Message'])
+      else:
+        matchedIDs.append(jobID)
+    if not matchedIDs:
+      raise RuntimeError("Jobs %s are not in Waiting state" % ','.join(str(jobID) for jobID in jobIDs))
+
+    self._reportStatusForJobs(resourceDict, matchedIDs)
+
+    result = self.jobDB.getJDLsForJobList(matchedIDs)
+    if not result['OK']:
+      raise RuntimeError("Failed to get the job JDLs")
+    jdls = result['Value']
+    resOpt = self.jobDB.getOptParametersForJobList(matchedIDs)
+
+    matchTime = time.time() - startTime
+    self.log.info("Match time", "[%s] for %s jobs", matchTime, len(matchedIDs))
+    gMonitor.addMark("matchTime", matchTime)
+
+    if not resourceDict.get('PilotInfoReportedFlag', False):
+      self._updatePilotInfo(resourceDict)
+    checkMatchingDelay = self.opsHelper.getValue("JobScheduling/CheckMatchingDelay", True)
+
+    resultList = []
+    for jobID in matchedIDs:
+      resultDict = {}
+      if resOpt['OK']:
+        resultDict.update(resOpt['Value'].get(jobID, {}))
+      resultDict['JDL'] = jdls.get(jobID, '')
+      resultDict['JobID'] = jobID
+      resultDict['DN'] = jobAttributes[jobID]['OwnerDN']
+      resultDict['Group'] = jobAttributes[jobID]['OwnerGroup']
+      resultDict['PilotInfoReportedFlag'] = True
+      resultList.append(resultDict)
+      if checkMatchingDelay:
+        self.limiter.updateDelayCounters(resourceDict['Site'], jobID)
+      self._updatePilotJobMapping(resourceDict, jobID)
+
+    return resultList
+
+  @staticmethod
+  def _getResourceDictToPrint(resourceDict, resourceDescription):
+    """ Resource matching parameters as they are logged
+
+        :param dict resourceDict: resource matching parameters
+        :param dict resourceDescription: resource description given by the pilot
+        :returns: dict
+    """
+    toPrintDict = dict(resourceDict)
+    if "MaxRAM" in resourceDescription:
+      toPrintDict['MaxRAM'] = resourceDescription['MaxRAM']
+    if "NumberOfProcessors" in resourceDescription:
+      toPrintDict['NumberOfProcessors'] = resourceDescription['NumberOfProcessors']
+    toPrintDict['Tag'] = []
+    if "Tag" in resourceDict:
+      for tag in resourceDict['Tag']:
+        if not tag.endswith('GB') and not tag.endswith('Processors'):
+          toPrintDict['Tag'].append(tag)
+    if not toPrintDict['Tag']:
+      toPrintDict.pop('Tag')
+    return toPrintDict
+
   def _getResourceDict(self, resourceDescription, credDict):
     """ from resourceDescription to resourceDict (just various mods)
     """
@@ -155,7 +237,7 @@ class Matcher(object):
 
     self.log.verbose("Resource description")
     for key in resourceDict:
-      self.log.debug("%s : %s" % (key.rjust(20), resourceDict[key]))
+      self.log.debug("Resource parameter", "%s : %s", key.rjust(20), resourceDict[key])
 
     return resourceDict
 
@@ -246,6 +328,31 @@ class Matcher(object):
     else:
       self.log.verbose("Added logging record for jobID", jobID)
 
+  def _reportStatusForJobs(self, resourceDict, jobIDs):
+    """ Reports the status of several matched jobs in jobDB and jobLoggingDB, with one statement each
+
+        Do not fail if errors happen here
+    """
+    jobIDsStr = ','.join(str(jobID) for jobID in jobIDs)
+    attNames = ['Status', 'MinorStatus', 'ApplicationStatus', 'Site']
+    attValues = ['Matched', 'Assigned', 'Unknown', resourceDict['Site']]
+    result = self.jobDB.setJobAttributes(jobIDs, attNames, attValues)
+    if not result['OK']:
+      self.log.error("Problem reporting job status",
+                     "setJobAttributes, jobIDs = %s: %s" % (jobIDsStr, result['Message']))
+    else:
+      self.log.verbose("Set job attributes for jobIDs", jobIDsStr)
+
+    result = self.jlDB.addLoggingRecords(jobIDs,
+                                         status='Matched',
+                                         minor='Assigned',
+                                         source='Matcher')
+    if not result['OK']:
+      self.log.error("Problem reporting job status",
+                     "addLoggingRecords, jobIDs = %s: %s" % (jobIDsStr, result['Message']))
+    else:
+      self.log.verbose("Added logging records for jobIDs", jobIDsStr)
+
   def _checkMask(self, resourceDict):
     """ Check the mask: are we allowed to run normal jobs?
 
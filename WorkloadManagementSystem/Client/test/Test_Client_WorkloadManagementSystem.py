@@ -147,6 +147,40 @@ class MatcherTestCase(ClientsTestCase):
 
     self.assertEqual(res, resExpected)
 
+  def test_selectJobs(self):
+
+    self.matcher._getResourceDict = MagicMock(return_value={'Site': 'DIRAC.Jenkins.ch', 'Setup': 'LHCb-Certification',
+                                                            'PilotReference': 'somePilotReference'})
+    self.matcher.limiter = MagicMock()
+    self.matcher.limiter.getNegativeCondForSite.return_value = {}
+    self.tqDBMock.matchAndGetJobs.return_value = S_OK({'matchFound': True, 'jobs': [(1, 10), (2, 10), (3, 11)]})
+    self.tqDBMock.deleteJob.return_value = S_OK(True)
+    self.jobDBMock.getAttributesForJobList.return_value = S_OK({
+        1: {'OwnerDN': '/my/DN', 'OwnerGroup': 'user', 'Status': 'Waiting'},
+        2: {'OwnerDN': '/my/DN', 'OwnerGroup': 'user', 'Status': 'Waiting'},
+        3: {'OwnerDN': '/my/DN', 'OwnerGroup': 'user', 'Status': 'Killed'}})
+    self.jobDBMock.getJDLsForJobList.return_value = S_OK({1: 'JDL1', 2: 'JDL2'})
+    self.jobDBMock.getOptParametersForJobList.return_value = S_OK({1: {'CPUTime': '100'}, 2: {}})
+
+    res = self.matcher.selectJobs({}, {}, 3)
+    self.tqDBMock.matchAndGetJobs.assert_called_once_with(self.matcher._getResourceDict.return_value, 3,
+                                                          negativeCond={})
+    self.assertEqual([resDict['JobID'] for resDict in res], [1, 2])
+    self.assertEqual(res[0]['JDL'], 'JDL1')
+    self.assertEqual(res[0]['CPUTime'], '100')
+    self.assertEqual(res[1]['DN'], '/my/DN')
+    # The job that is not waiting anymore is removed from the task queues, the others are updated at once
+    self.tqDBMock.deleteJob.assert_called_once_with(3)
+    self.jobDBMock.setJobAttributes.assert_called_once_with([1, 2], ['Status', 'MinorStatus', 'ApplicationStatus',
+                                                                     'Site'],
+                                                            ['Matched', 'Assigned', 'Unknown', 'DIRAC.Jenkins.ch'])
+    self.jlDBMock.addLoggingRecords.assert_called_once_with([1, 2], status='Matched', minor='Assigned',
+                                                            source='Matcher')
+    self.assertEqual(self.pilotAgentsDBMock.setJobForPilot.call_count, 2)
+
+    self.tqDBMock.matchAndGetJobs.return_value = S_OK({'matchFound': False, 'jobs': []})
+    self.assertEqual(self.matcher.selectJobs({}, {}, 3), [])
+
 #############################################################################
 
 
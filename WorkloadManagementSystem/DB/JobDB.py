@@ -27,6 +27,7 @@
     setInputData()
 
     insertNewJobIntoDB()
+    insertNewJobsIntoDB()
     removeJobFromDB()
 
     rescheduleJob()
@@ -43,6 +44,7 @@
 __RCSID__ = "$Id$"
 
 import operator
+import uuid
 
 from DIRAC.Core.Utilities import DErrno
 from DIRAC.Core.Utilities.ClassAd.ClassAdLight import ClassAd
@@ -68,6 +70,9 @@ class JobDB(DB):
   """ Interface to MySQL-based JobDB
   """
 
+  # Attributes of the JDL checked by JobManifest.check, besides the number of input data files
+  __manifestCheckedAttributes = ('CPUTime', 'Priority', 'SubmitPools', 'PilotTypes', 'JobType')
+
   def __init__(self):
     """ Standard Constructor
     """
@@ -486,6 +491,28 @@ class JobDB(DB):
     else:
       return S_ERROR('JobDB.getJobOptParameters: failed to retrieve parameters')
 
+#############################################################################
+  def getOptParametersForJobList(self, jobIDList):
+    """ Get all the optimizer parameters of the jobs in the jobIDList.
+        Returns an S_OK structure with a dictionary of dictionaries as its Value:
+        ValueDict[jobID][parameter_name] = parameter_value
+    """
+    resultDict = dict((int(jobID), {}) for jobID in jobIDList)
+    if not resultDict:
+      return S_OK(resultDict)
+    cmd = "SELECT JobID, Name, Value from OptimizerParameters WHERE JobID in ( %s )" % \
+        ','.join(str(jobID) for jobID in resultDict)
+    result = self._query(cmd)
+    if not result['OK']:
+      return S_ERROR('JobDB.getOptParametersForJobList: failed to retrieve parameters')
+    for jobID, name, value in result['Value']:
+      try:
+        value = value.tostring()
+      except BaseException:
+        pass
+      resultDict[int(jobID)][name] = value
+    return S_OK(resultDict)
+
 #############################################################################
 
   def getInputData(self, jobID):
@@ -1003,6 +1030,20 @@ class JobDB(DB):
       return S_OK(result['Value'][0][0])
     return result
 
+#############################################################################
+  def getJDLsForJobList(self, jobIDList, original=False):
+    """ Get the JDLs of the jobs in the jobIDList, as a dictionary
+        with the job IDs as keys. Jobs without JDL are not in the dictionary
+    """
+    if not jobIDList:
+      return S_OK({})
+    cmd = "SELECT JobID, %s FROM JobJDLs WHERE JobID in ( %s )" % ('OriginalJDL' if original else 'JDL',
+                                                                   ','.join(str(int(x)) for x in jobIDList))
+    result = self._query(cmd)
+    if not result['OK']:
+      return result
+    return S_OK(dict((int(jobID), jdl) for jobID, jdl in result['Value']))
+
 #############################################################################
   def insertNewJobIntoDB(self, jdl, owner, ownerDN, ownerGroup, diracSetup,
                          initialStatus="Received",
@@ -1100,35 +1141,7 @@ class JobDB(DB):
     if not result['OK']:
       return result
 
-    priority = classAdJob.getAttributeInt('Priority')
-    if priority is None:
-      priority = 0
-    jobAttrNames.append('UserPriority')
-    jobAttrValues.append(priority)
-
-    for jdlName in self.jdl2DBParameters:
-      # Defaults are set by the DB.
-      jdlValue = classAdJob.getAttributeString(jdlName)
-      if jdlValue:
-        jobAttrNames.append(jdlName)
-        jobAttrValues.append(jdlValue)
-
-    jdlValue = classAdJob.getAttributeString('Site')
-    if jdlValue:
-      jobAttrNames.append('Site')
-      if jdlValue.find(',') != -1:
-        jobAttrValues.append('Multiple')
-      else:
-        jobAttrValues.append(jdlValue)
-
-    jobAttrNames.append('VerifiedFlag')
-    jobAttrValues.append('True')
-
-    jobAttrNames.append('Status')
-    jobAttrValues.append(initialStatus)
-
-    jobAttrNames.append('MinorStatus')
-    jobAttrValues.append(initialMinorStatus)
+    self.__addJDLJobAttributes(classAdJob, jobAttrNames, jobAttrValues, initialStatus, initialMinorStatus)
 
     reqJDL = classAdReq.asJDL()
     classAdJob.insertAttributeInt('JobRequirements', reqJDL)
@@ -1182,6 +1195,198 @@ class JobDB(DB):
 
     return retVal
 
+  def insertNewJobsIntoDB(self, jdlList, owner, ownerDN, ownerGroup, diracSetup,
+                          initialStatus="Received",
+                          initialMinorStatus="Job accepted"):
+    """ Insert several jobs, ie those of a parametric job, like insertNewJobIntoDB
+        but with multi-row statements in a single transaction: either all the jobs are
+        inserted, or none of them. The JobManifest check is done once for all the jobs
+        having the same values of the checked attributes, typically once per submission.
+
+        :param list jdlList: job description JDLs
+        :param str owner: job owner user name
+        :param str ownerDN: job owner DN
+        :param str ownerGroup: job owner group
+        :param str diracSetup: setup in which context the jobs are submitted
+        :param str initialStatus: optional initial job status (Received by default)
+        :param str initialMinorStatus: optional initial minor job status
+        :return : S_OK( list of new job IDs, in the order of jdlList )
+    """
+    if not jdlList:
+      return S_OK([])
+
+    # 1.- Check the manifests
+    # Fix the possible lack of the brackets in the JDLs
+    jdlList = [jdl if jdl.strip().startswith('[') else '[' + jdl + ']' for jdl in jdlList]
+    manifestOptions = {'OwnerName': owner,
+                       'OwnerDN': ownerDN,
+                       'OwnerGroup': ownerGroup,
+                       'DIRACSetup': diracSetup}
+    checkedManifests = {}
+    checkedOptionsList = []
+    for jdl in jdlList:
+      classAdJob = ClassAd(jdl)
+      if not classAdJob.isOK():
+        return S_ERROR(EWMSSUBM, 'Error in JDL syntax')
+      manifestKey = tuple(classAdJob.get_expression(name) for name in self.__manifestCheckedAttributes)
+      manifestKey += (len(classAdJob.getListFromExpression('InputData')),)
+      if manifestKey not in checkedManifests:
+        jobManifest = JobManifest()
+        result = jobManifest.load(jdl)
+        if not result['OK']:
+          return result
+        jobManifest.setOptionsFromDict(manifestOptions)
+        result = jobManifest.check()
+        if not result['OK']:
+          return result
+        # The check sets the default, minimum and maximum CPUTime and Priority
+        checkedManifests[manifestKey] = {'CPUTime': long(jobManifest.getOption('CPUTime')),
+                                         'Priority': long(jobManifest.getOption('Priority'))}
+      checkedOptionsList.append(checkedManifests[manifestKey])
+
+    result = self.transactionStart()
+    if not result['OK']:
+      return result
+    result = self.__insertNewJobs(jdlList, checkedOptionsList, manifestOptions, initialStatus, initialMinorStatus)
+    if not result['OK']:
+      self.transactionRollback()
+      return result
+    jobIDList = result['Value']
+    result = self.transactionCommit()
+    if not result['OK']:
+      self.transactionRollback()
+      return result
+
+    self.log.info('JobDB: New JobIDs served', "%d jobs, %s-%s" % (len(jobIDList), jobIDList[0], jobIDList[-1]))
+    return S_OK(jobIDList)
+
+  def __insertNewJobs(self, jdlList, checkedOptionsList, manifestOptions, initialStatus, initialMinorStatus):
+    """ Insert the checked jobs of insertNewJobsIntoDB, within its transaction
+
+        :param list checkedOptionsList: for each job, the manifest options set by the check of its manifest
+    """
+    # 2.- Get a block of new JobIDs. The values generated for a multi-row INSERT are not always consecutive:
+    # the rows are marked to read them back. They start from its lastRowId, in the order of the rows
+    nJobs = len(jdlList)
+    reservation = 'Reserved %s' % uuid.uuid4()
+    result = self._update("INSERT INTO JobJDLs (JDL, JobRequirements, OriginalJDL) VALUES %s" %
+                          ','.join(["('%s', '', '')" % reservation] * nJobs))
+    if not result['OK']:
+      return S_ERROR(EWMSSUBM, 'Failed to insert JDL in to DB')
+    if 'lastRowId' not in result:
+      return S_ERROR('JobDB.__insertNewJobs: Failed to retrieve new Ids.')
+    result = self._query("SELECT JobID FROM JobJDLs WHERE JobID >= %d AND JDL = '%s' ORDER BY JobID" %
+                         (int(result['lastRowId']), reservation))
+    if not result['OK']:
+      return result
+    jobIDList = [int(row[0]) for row in result['Value']]
+    if len(jobIDList) != nJobs:
+      return S_ERROR('JobDB.__insertNewJobs: Failed to retrieve new Ids.')
+    # The JDLs are then inserted with their JobIDs, so that a JobID already used makes the insertion fail
+    result = self._update("DELETE FROM JobJDLs WHERE JobID IN (%s)" % ','.join(str(jobID) for jobID in jobIDList))
+    if not result['OK']:
+      return result
+
+    # 3.- Check JDLs and Prepare DIRAC JDLs
+    now = Time.toString()
+    jdlRows = []
+    jobRows = {}
+    parameterRows = []
+    inputDataRows = []
+    for jobID, jdl, checkedOptions in zip(jobIDList, jdlList, checkedOptionsList):
+      # The JDL of the manifest, as for a single job, without checking it again
+      jobManifest = JobManifest()
+      result = jobManifest.load(jdl)
+      if not result['OK']:
+        return result
+      jobManifest.setOptionsFromDict(manifestOptions)
+      jobManifest.setOptionsFromDict(checkedOptions)
+      jobManifest.setOption('JobID', jobID)
+      jobJDL = jobManifest.dumpAsJDL()
+
+      # Replace the JobID placeholder if any
+      if jobJDL.find('%j') != -1:
+        jobJDL = jobJDL.replace('%j', str(jobID))
+
+      classAdJob = ClassAd(jobJDL)
+      if not classAdJob.isOK():
+        return S_ERROR(EWMSSUBM, 'Error in JDL syntax')
+      classAdJob.insertAttributeInt('JobID', jobID)
+      classAdReq = ClassAd('[]')
+
+      jobAttrNames = ['JobID', 'LastUpdateTime', 'SubmissionTime', 'Owner', 'OwnerDN', 'OwnerGroup', 'DIRACSetup']
+      jobAttrValues = [jobID, now, now, manifestOptions['OwnerName'], manifestOptions['OwnerDN'],
+                       manifestOptions['OwnerGroup'], manifestOptions['DIRACSetup']]
+      result = self.__checkAndPrepareJob(jobID, classAdJob, classAdReq,
+                                         manifestOptions['OwnerName'], manifestOptions['OwnerDN'],
+                                         manifestOptions['OwnerGroup'], manifestOptions['DIRACSetup'],
+                                         jobAttrNames, jobAttrValues)
+      if not result['OK']:
+        return result
+      self.__addJDLJobAttributes(classAdJob, jobAttrNames, jobAttrValues, initialStatus, initialMinorStatus)
+      # The DB sets the defaults of the missing attributes, so that the rows are inserted by sets of attributes
+      jobRows.setdefault(tuple(jobAttrNames), []).append(jobAttrValues)
+
+      classAdJob.insertAttributeInt('JobRequirements', classAdReq.asJDL())
+      jdlRows.append((jobID, classAdJob.asJDL(), '', jdl))
+
+      if classAdJob.lookupAttribute("Parameters"):
+        parameterRows.extend((jobID, name, value)
+                             for name, value in classAdJob.getDictionaryFromSubJDL("Parameters").iteritems())
+      if classAdJob.lookupAttribute('InputData'):
+        # some jobs are setting empty string as InputData
+        inputDataRows.extend((jobID, lfn.strip()) for lfn in classAdJob.getListFromExpression('InputData') if lfn)
+
+    # 4.- Write the JDLs, attributes, parameters and input data of all the jobs
+    result = self.insertMany('JobJDLs', ['JobID', 'JDL', 'JobRequirements', 'OriginalJDL'], jdlRows)
+    if not result['OK']:
+      return result
+    for jobAttrNames, rows in jobRows.iteritems():
+      result = self.insertMany('Jobs', list(jobAttrNames), rows)
+      if not result['OK']:
+        return result
+    result = self.insertMany('JobParameters', ['JobID', 'Name', 'Value'], parameterRows)
+    if not result['OK']:
+      return S_ERROR('JobDB.insertNewJobsIntoDB: operation failed.')
+    result = self.insertMany('InputData', ['JobID', 'LFN'], inputDataRows)
+    if not result['OK']:
+      return result
+
+    return S_OK(jobIDList)
+
+  def __addJDLJobAttributes(self, classAdJob, jobAttrNames, jobAttrValues, initialStatus, initialMinorStatus):
+    """ Add the job attributes taken from the checked JDL, and the initial status
+    """
+    priority = classAdJob.getAttributeInt('Priority')
+    if priority is None:
+      priority = 0
+    jobAttrNames.append('UserPriority')
+    jobAttrValues.append(priority)
+
+    for jdlName in self.jdl2DBParameters:
+      # Defaults are set by the DB.
+      jdlValue = classAdJob.getAttributeString(jdlName)
+      if jdlValue:
+        jobAttrNames.append(jdlName)
+        jobAttrValues.append(jdlValue)
+
+    jdlValue = classAdJob.getAttributeString('Site')
+    if jdlValue:
+      jobAttrNames.append('Site')
+      if jdlValue.find(',') != -1:
+        jobAttrValues.append('Multiple')
+      else:
+        jobAttrValues.append(jdlValue)
+
+    jobAttrNames.append('VerifiedFlag')
+    jobAttrValues.append('True')
+
+    jobAttrNames.append('Status')
+    jobAttrValues.append(initialStatus)
+
+    jobAttrNames.append('MinorStatus')
+    jobAttrValues.append(initialMinorStatus)
+
   def __checkAndPrepareJob(self, jobID, classAdJob, classAdReq, owner, ownerDN,
                            ownerGroup, diracSetup, jobAttrNames, jobAttrValues):
     """
@@ -2,6 +2,7 @@
     The following methods are provided
 
     addLoggingRecord()
+    addLoggingRecords()
     getJobLoggingInfo()
     deleteJob()
     getWMSTimeStamps()
@@ -84,6 +85,24 @@ class JobLoggingDB(DB):
 
     return self._update(cmd)
 
+#############################################################################
+  def addLoggingRecords(self, jobIDs, status='idem', minor='idem', application='idem', source='Unknown'):
+    """ Add the same entry, with the current UTC time, for several jobs with a single statement
+    """
+    if not jobIDs:
+      return S_OK(0)
+    event = 'status/minor/app=%s/%s/%s' % (status, minor, application)
+    self.log.info("Adding record for jobs", "%d jobs from %s to %s: '%s' from %s" % (len(jobIDs), jobIDs[0], jobIDs[-1],
+                                                                                      event, source))
+    _date = Time.dateTime()
+    epoc = time.mktime(_date.timetuple()) + _date.microsecond / 1000000. - MAGIC_EPOC_NUMBER
+    time_order = round(epoc, 3)
+    return self.insertMany('LoggingInfo',
+                           ['JobId', 'Status', 'MinorStatus', 'ApplicationStatus',
+                            'StatusTime', 'StatusTimeOrder', 'StatusSource'],
+                           [(int(jobID), status, minor, application[:255], str(_date), time_order, source[:32])
+                            for jobID in jobIDs])
+
 #############################################################################
   def getJobLoggingInfo(self, jobID):
     """ Returns a Status,MinorStatus,ApplicationStatus,StatusTime,StatusSource tuple
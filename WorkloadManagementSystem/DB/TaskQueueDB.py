@@ -5,6 +5,8 @@ __RCSID__ = "$Id"
 
 import random
 import string
+import threading
+import time
 
 from DIRAC import gConfig, S_OK, S_ERROR
 from DIRAC.Core.Base.DB import DB
@@ -15,6 +17,7 @@ from DIRAC.Core.Security import Properties
 from DIRAC.ConfigurationSystem.Client.Helpers.Operations import Operations
 from DIRAC.ConfigurationSystem.Client.Helpers import Registry
 from DIRAC.WorkloadManagementSystem.private.SharesCorrector import SharesCorrector
+from DIRAC.WorkloadManagementSystem.private.TaskQueueIndex import TaskQueueIndex
 
 DEFAULT_GROUP_SHARE = 1000
 TQ_MIN_SHARE = 0.001
@@ -60,6 +63,11 @@ class TaskQueueDB(DB):
     self.__opsHelper = Operations()
     self.__ensureInsertionIsSingle = False
     self.__sharesCorrector = SharesCorrector(self.__opsHelper)
+    # In-memory index of the task queues used for matching, refreshed from the DB
+    self.__tqIndex = TaskQueueIndex()
+    self.__tqIndexLock = threading.Lock()
+    self.__tqIndexLoaded = False
+    self.__tqIndexLastRefresh = 0
     result = self.__initializeDB()
     if not result['OK']:
       raise Exception("Can't create tables: %s" % result['Message'])
@@ -86,6 +94,67 @@ class TaskQueueDB(DB):
   def getValidPilotTypes(self):
     return self.__getCSOption("AllPilotTypes", ['private'])
 
+  def isTaskQueueIndexEnabled(self):
+    return self.__getCSOption("UseTaskQueueIndex", False)
+
+  def __getTaskQueueIndex(self, connObj=False):
+    """ Get the in-memory index of the task queues, refreshed when it is too old
+
+        :returns: TaskQueueIndex, or None if the task queues have to be matched in the DB
+    """
+    if not self.isTaskQueueIndexEnabled():
+      return None
+    refreshTime = self.__getCSOption("TaskQueueIndexRefreshTime", 10)
+    if time.time() - self.__tqIndexLastRefresh > refreshTime:
+      # Only one thread refreshes the index, the others go on with it meanwhile once it has been loaded
+      if self.__tqIndexLock.acquire(not self.__tqIndexLoaded):
+        try:
+          if time.time() - self.__tqIndexLastRefresh > refreshTime:
+            result = self.__refreshTaskQueueIndex(connObj=connObj)
+            if result['OK']:
+              self.__tqIndexLoaded = True
+            else:
+              self.log.error("Can't refresh the task queue index", result['Message'])
+            self.__tqIndexLastRefresh = time.time()
+        finally:
+          self.__tqIndexLock.release()
+    if not self.__tqIndexLoaded:
+      return None
+    return self.__tqIndex
+
+  def __refreshTaskQueueIndex(self, connObj=False):
+    """ Bring the index of the task queues up to date with the DB: the deleted task queues are removed,
+        the priorities updated, and only the definitions of the new task queues are read
+    """
+    result = self._query("SELECT TQId, OwnerDN, OwnerGroup, Setup, CPUTime, Priority, Enabled FROM `tq_TaskQueues`",
+                         conn=connObj)
+    if not result['OK']:
+      return result
+    tqRows = dict((row[0], row) for row in result['Value'])
+    indexedTQs = self.__tqIndex.getTaskQueueIds()
+    self.__tqIndex.remove(indexedTQs - set(tqRows))
+    self.__tqIndex.setPriorities(dict((tqId, tqRows[tqId][5]) for tqId in indexedTQs if tqId in tqRows))
+
+    # The requirements of a task queue are all inserted before it is enabled
+    tqDefs = {}
+    for tqId, row in tqRows.iteritems():
+      if tqId not in indexedTQs and row[6] >= 1:
+        tqDefs[tqId] = dict(zip(singleValueDefFields, row[1:5]))
+    if not tqDefs:
+      return S_OK(0)
+    tqIdList = ", ".join(str(tqId) for tqId in tqDefs)
+    for field in multiValueDefFields:
+      result = self._query("SELECT TQId, Value FROM `tq_TQTo%s` WHERE TQId IN ( %s )" % (field, tqIdList),
+                           conn=connObj)
+      if not result['OK']:
+        return result
+      for tqId, value in result['Value']:
+        tqDefs[tqId].setdefault(field, []).append(value)
+    for tqId, tqDefDict in tqDefs.iteritems():
+      self.__tqIndex.add(tqId, tqDefDict, tqRows[tqId][5])
+    self.log.verbose("Task queues added to the index", str(len(tqDefs)))
+    return S_OK(len(tqDefs))
+
   def __initializeDB(self):
     """
     Create the tables
@@ -315,6 +384,7 @@ class TaskQueueDB(DB):
         "DELETE FROM `tq_TaskQueues` WHERE TQId in ( %s )" % ','.join(orphanedTQs), conn=connObj)
     if not result['OK']:
       return result
+    self.__tqIndex.remove([int(tqId) for tqId in orphanedTQs])
     return S_OK()
 
   def __setTaskQueueEnabled(self, tqId, enabled=True, connObj=False):
@@ -393,6 +463,8 @@ class TaskQueueDB(DB):
         self.recalculateTQSharesForEntity(tqDefDict['OwnerDN'], tqDefDict['OwnerGroup'], connObj=connObj)
     finally:
       self.__setTaskQueueEnabled(tqId, True)
+    if newTQ:
+      self.__tqIndexLastRefresh = 0
     return S_OK()
 
   def __insertJobInTaskQueue(self, jobId, tqId, jobPriority, checkTQExists=True, connObj=False):
@@ -515,6 +587,8 @@ ORDER BY COUNT( `tq_Jobs`.JobID ) ASC" % (sqlCmd, result['Value'])
       negativeCond = {}
     # Make a copy to avoid modification of original if escaping needs to be done
     tqMatchDict = dict(tqMatchDict)
+    # The index matches the values as they are
+    rawMatchDict = dict(tqMatchDict)
     retVal = self._checkMatchDefinition(tqMatchDict)
     if not retVal['OK']:
       self.log.error("TQ match request check failed", retVal['Message'])
@@ -528,21 +602,11 @@ FROM `tq_Jobs` WHERE `tq_Jobs`.TQId = %s AND `tq_Jobs`.Priority = %s"
     prioSQL = "SELECT `tq_Jobs`.Priority FROM `tq_Jobs` \
 WHERE `tq_Jobs`.TQId = %s ORDER BY RAND() / `tq_Jobs`.RealPriority ASC LIMIT 1"
     postJobSQL = " ORDER BY `tq_Jobs`.JobId ASC LIMIT %s" % numJobsPerTry
+    if 'JobID' in tqMatchDict:
+      preJobSQL = "%s AND `tq_Jobs`.JobId = %s " % (preJobSQL, tqMatchDict['JobID'])
     for _ in xrange(self.__maxMatchRetry):
       noJobsFound = False
-      if 'JobID' in tqMatchDict:
-        # A certain JobID is required by the resource, so all TQ are to be considered
-        retVal = self.matchAndGetTaskQueue(tqMatchDict,
-                                           numQueuesToGet=0,
-                                           skipMatchDictDef=True,
-                                           connObj=connObj)
-        preJobSQL = "%s AND `tq_Jobs`.JobId = %s " % (preJobSQL, tqMatchDict['JobID'])
-      else:
-        retVal = self.matchAndGetTaskQueue(tqMatchDict,
-                                           numQueuesToGet=numQueuesPerTry,
-                                           skipMatchDictDef=True,
-                                           negativeCond=negativeCond,
-                                           connObj=connObj)
+      retVal = self.__matchTaskQueues(tqMatchDict, rawMatchDict, numQueuesPerTry, negativeCond, connObj=connObj)
       if not retVal['OK']:
         return retVal
       tqList = retVal['Value']
@@ -567,8 +631,7 @@ WHERE `tq_Jobs`.TQId = %s ORDER BY RAND() / `tq_Jobs`.RealPriority ASC LIMIT 1"
           self.__deleteTQWithDelay.add(tqId, 300, (tqId, tqOwnerDN, tqOwnerGroup))
         while jobTQList:
           jobId, tqId = jobTQList.pop(random.randint(0, len(jobTQList) - 1))
-          self.log.info("Trying to extract job from TQ",
-                        "%s : %s" % (jobId, tqId))
+          self.log.info("Trying to extract job from TQ", "%s : %s", jobId, tqId)
           retVal = self.deleteJob(jobId, connObj=connObj)
           if not retVal['OK']:
             msgFix = "Could not take job"
@@ -576,8 +639,7 @@ WHERE `tq_Jobs`.TQId = %s ORDER BY RAND() / `tq_Jobs`.RealPriority ASC LIMIT 1"
             self.log.error(msgFix, msgVar)
             return S_ERROR(msgFix + msgVar)
           if retVal['Value']:
-            self.log.info("Extracted job with prio from TQ",
-                          "(%s : %s : %s)" % (jobId, prio, tqId))
+            self.log.info("Extracted job with prio from TQ", "(%s : %s : %s)", jobId, prio, tqId)
             return S_OK({'matchFound': True, 'jobId': jobId, 'taskQueueId': tqId, 'tqMatch': tqMatchDict})
         self.log.info("No jobs could be extracted from TQ", tqId)
     if noJobsFound:
@@ -586,6 +648,113 @@ WHERE `tq_Jobs`.TQId = %s ORDER BY RAND() / `tq_Jobs`.RealPriority ASC LIMIT 1"
     self.log.info("Could not find a match after %s match retries" % self.__maxMatchRetry)
     return S_ERROR("Could not find a match after %s match retries" % self.__maxMatchRetry)
 
+  def matchAndGetJobs(self, tqMatchDict, numJobs, numJobsPerTry=50, numQueuesPerTry=10, negativeCond=None):
+    """ Match several jobs to a resource, with a single matching of the task queues.
+        As many jobs as possible are taken from a task queue before going to the next one.
+
+        :param dict tqMatchDict: resource description, like for matchAndGetJob
+        :param int numJobs: maximum number of jobs
+        :returns: S_OK( { 'matchFound': bool, 'jobs': [ ( jobId, tqId ) ], 'tqMatch': tqMatchDict } ) / S_ERROR
+    """
+    if negativeCond is None:
+      negativeCond = {}
+    tqMatchDict = dict(tqMatchDict)
+    rawMatchDict = dict(tqMatchDict)
+    retVal = self._checkMatchDefinition(tqMatchDict)
+    if not retVal['OK']:
+      self.log.error("TQ match request check failed", retVal['Message'])
+      return retVal
+    retVal = self._getConnection()
+    if not retVal['OK']:
+      return S_ERROR("Can't connect to DB: %s" % retVal['Message'])
+    connObj = retVal['Value']
+    jobSQL = "SELECT `tq_Jobs`.JobId FROM `tq_Jobs` WHERE `tq_Jobs`.TQId = %s AND `tq_Jobs`.Priority = %s"
+    if 'JobID' in tqMatchDict:
+      jobSQL = "%s AND `tq_Jobs`.JobId = %s" % (jobSQL, tqMatchDict['JobID'])
+    jobSQL = "%s ORDER BY `tq_Jobs`.JobId ASC LIMIT %s" % (jobSQL, numJobsPerTry)
+
+    jobs = []
+    for _ in xrange(self.__maxMatchRetry):
+      retVal = self.__matchTaskQueues(tqMatchDict, rawMatchDict, numQueuesPerTry, negativeCond, connObj=connObj)
+      if not retVal['OK']:
+        return retVal
+      if not retVal['Value']:
+        self.log.info("No TQ matches requirements")
+        break
+      for tqId, tqOwnerDN, tqOwnerGroup in retVal['Value']:
+        retVal = self.__extractJobs(tqId, tqOwnerDN, tqOwnerGroup, numJobs - len(jobs), jobSQL, connObj=connObj)
+        if not retVal['OK']:
+          if not jobs:
+            return retVal
+          # The jobs already taken out of the task queues have to be given to the resource
+          self.log.error("Could not extract more jobs", retVal['Message'])
+          break
+        jobs.extend((jobId, tqId) for jobId in retVal['Value'])
+        if len(jobs) >= numJobs:
+          break
+      if jobs:
+        break
+    self.log.info("Extracted jobs from TQs", "%s out of %s requested" % (len(jobs), numJobs))
+    return S_OK({'matchFound': bool(jobs), 'jobs': jobs, 'tqMatch': tqMatchDict})
+
+  def __extractJobs(self, tqId, tqOwnerDN, tqOwnerGroup, numJobs, jobSQL, connObj=False):
+    """ Take up to numJobs jobs out of a task queue, choosing the job priority like matchAndGetJob
+
+        :returns: S_OK( list of job ids ) / S_ERROR
+    """
+    prioSQL = "SELECT `tq_Jobs`.Priority FROM `tq_Jobs` \
+WHERE `tq_Jobs`.TQId = %s ORDER BY RAND() / `tq_Jobs`.RealPriority ASC LIMIT 1" % tqId
+    jobIds = []
+    while len(jobIds) < numJobs:
+      retVal = self._query(prioSQL, conn=connObj)
+      if not retVal['OK']:
+        return S_ERROR("Can't retrieve winning priority for matching job: %s" % retVal['Message'])
+      if not retVal['Value']:
+        break
+      prio = retVal['Value'][0][0]
+      retVal = self._query(jobSQL % (tqId, prio), conn=connObj)
+      if not retVal['OK']:
+        return S_ERROR("Can't retrieve jobs to match: %s" % retVal['Message'])
+      candidates = [row[0] for row in retVal['Value']]
+      if not candidates:
+        self.log.info("Task queue seems to be empty, triggering a cleaning of", tqId)
+        self.__deleteTQWithDelay.add(tqId, 300, (tqId, tqOwnerDN, tqOwnerGroup))
+        break
+      random.shuffle(candidates)
+      extracted = False
+      for jobId in candidates[:numJobs - len(jobIds)]:
+        retVal = self.deleteJob(jobId, connObj=connObj)
+        if not retVal['OK']:
+          if jobIds:
+            break
+          return S_ERROR("Could not take job %s out from the TQ %s: %s" % (jobId, tqId, retVal['Message']))
+        # Jobs taken meanwhile by another request are skipped
+        if retVal['Value']:
+          jobIds.append(jobId)
+          extracted = True
+      if not extracted:
+        break
+    return S_OK(jobIds)
+
+  def __matchTaskQueues(self, tqMatchDict, rawMatchDict, numQueuesToGet, negativeCond, connObj=False):
+    """ Get the task queues matching a resource, from the in-memory index if it is used, from the DB otherwise
+
+        :param dict tqMatchDict: match definition, checked and escaped
+        :param dict rawMatchDict: the same match definition before escaping, for the index
+    """
+    if 'JobID' in tqMatchDict:
+      # A certain JobID is required by the resource, so all TQ are to be considered
+      numQueuesToGet = 0
+      negativeCond = {}
+    tqIndex = self.__getTaskQueueIndex(connObj=connObj)
+    if tqIndex:
+      return tqIndex.match(rawMatchDict, numQueuesToGet=numQueuesToGet, negativeCond=negativeCond)
+    return self.matchAndGetTaskQueue(tqMatchDict,
+                                     numQueuesToGet=numQueuesToGet,
+                                     skipMatchDictDef=True,
+                                     negativeCond=negativeCond,
+                                     connObj=connObj)
+
   def matchAndGetTaskQueue(self, tqMatchDict, numQueuesToGet=1, skipMatchDictDef=False,
                            negativeCond=None, connObj=False):
     """ Get a queue that matches the requirements
@@ -717,7 +886,7 @@ WHERE `tq_Jobs`.TQId = %s ORDER BY RAND() / `tq_Jobs`.RealPriority ASC LIMIT 1"
 
     # Match multi value fields
     for field in multiValueMatchFields:
-      self.log.debug("Evaluating field %s" % field)
+      self.log.debug("Evaluating field", field)
       # It has to be %ss , with an 's' at the end because the columns names
       # are plural and match options are singular
 
@@ -726,7 +895,7 @@ WHERE `tq_Jobs`.TQId = %s ORDER BY RAND() / `tq_Jobs`.RealPriority ASC LIMIT 1"
         tqMatchDict['Tag'] = []
 
       if field in tqMatchDict:
-        self.log.debug("Evaluating %s with value %s" % (field, tqMatchDict[field]))
+        self.log.debug("Evaluating", "%s with value %s", field, tqMatchDict[field])
 
         _, fullTableN = self.__generateTablesName(sqlTables, field)
 
@@ -736,7 +905,7 @@ WHERE `tq_Jobs`.TQId = %s ORDER BY RAND() / `tq_Jobs`.RealPriority ASC LIMIT 1"
         # Now evaluating Tags
         if field == 'Tag':
           tag_fv = tqMatchDict.get('Tag')
-          self.log.debug("Evaluating tag %s of type %s" % (tag_fv, type(tag_fv)))
+          self.log.debug("Evaluating tag", "%s of type %s", tag_fv, type(tag_fv))
           if isinstance(tag_fv, str):
             tag_fv = [tag_fv]
 
@@ -749,7 +918,7 @@ WHERE `tq_Jobs`.TQId = %s ORDER BY RAND() / `tq_Jobs`.RealPriority ASC LIMIT 1"
         # Now evaluating everything that is not tags
         else:
           fv = tqMatchDict.get(field)
-          self.log.debug("Evaluating field %s of type %s" % (field, type(fv)))
+          self.log.debug("Evaluating field", "%s of type %s", field, type(fv))
 
           # Is there something to consider?
           if not fv \
@@ -796,7 +965,7 @@ WHERE `tq_Jobs`.TQId = %s ORDER BY RAND() / `tq_Jobs`.RealPriority ASC LIMIT 1"
     elif not set(rtag_fv).issubset(set(tag_fv)):
       return S_ERROR('Wrong conditions')
     else:
-      self.log.debug("Evaluating RequiredTag %s" % rtag_fv)
+      self.log.debug("Evaluating RequiredTag", rtag_fv)
       sqlCondList.append(self.__generateRequiredTagSQLSubCond('`tq_TQToTags`', rtag_fv))
 
     # Add possibly Resource banning conditions
@@ -1003,6 +1172,7 @@ WHERE j.JobId = %s AND t.TQId = j.TQId" %
       retVal = self._update("DELETE FROM `tq_TaskQueues` WHERE TQId = %s" % tqId, conn=connObj)
       if not retVal['OK']:
         return retVal
+      self.__tqIndex.remove([int(tqId)])
       self.recalculateTQSharesForEntity(tqOwnerDN, tqOwnerGroup, connObj=connObj)
       self.log.info("Deleted empty and enabled TQ", tqId)
       return S_OK()
@@ -1031,6 +1201,7 @@ WHERE j.JobId = %s AND t.TQId = j.TQId" %
     if not retVal['OK']:
       return S_ERROR("Could not delete task queue %s: %s" % (tqId, retVal['Message']))
     delTQ = retVal['Value']
+    self.__tqIndex.remove([int(tqId)])
     sqlCmd = "DELETE FROM `tq_Jobs` WHERE `tq_Jobs`.TQId = %s" % tqId
     retVal = self._update(sqlCmd, conn=connObj)
     if not retVal['OK']:
@@ -1288,6 +1459,7 @@ FROM `tq_TaskQueues` t, `tq_Jobs` j WHERE "
       tqList = ", ".join([str(tqId) for tqId in prioDict[prio]])
       updateSQL = "UPDATE `tq_TaskQueues` SET Priority=%.4f WHERE TQId in ( %s )" % (prio, tqList)
       self._update(updateSQL, conn=connObj)
+    self.__tqIndex.setPriorities(tqDict)
     return S_OK()
 
   @staticmethod
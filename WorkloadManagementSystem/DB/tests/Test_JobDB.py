@@ -5,7 +5,7 @@
 import unittest
 from mock import MagicMock, patch
 
-from DIRAC import S_OK
+from DIRAC import S_OK, S_ERROR
 
 MODULE_NAME = "DIRAC.WorkloadManagementSystem.DB.JobDB"
 
@@ -34,3 +34,73 @@ class JobDBTest( unittest.TestCase ):
     print result
     self.assertTrue( result['OK'] )
     self.assertEqual( result['Value'], [ '/vo/user/lfn1', '/vo/user/lfn2' ] )
+
+  @patch(MODULE_NAME + ".Operations", new=MagicMock())
+  @patch(MODULE_NAME + ".gConfig", new=MagicMock())
+  @patch(MODULE_NAME + ".getVOForGroup", new=MagicMock(return_value='vo'))
+  @patch(MODULE_NAME + ".JobManifest")
+  def test_insertNewJobsIntoDB( self, jobManifestMock ):
+    # The manifest gives back the JDL it loaded
+    loadedJDLs = []
+    jobManifestMock.return_value.load.side_effect = lambda jdl: loadedJDLs.append( jdl ) or S_OK()
+    jobManifestMock.return_value.dumpAsJDL.side_effect = lambda: loadedJDLs[-1]
+    jobManifestMock.return_value.check.return_value = S_OK()
+    jobManifestMock.return_value.getOption.side_effect = lambda name: {'CPUTime': '1000', 'Priority': '1'}[name]
+    self.jobDB.jdl2DBParameters = ['JobName', 'JobType', 'JobGroup']
+    self.jobDB._update = MagicMock( return_value=dict( S_OK( 3 ), lastRowId=100 ) )
+    # The JobIDs generated are not consecutive
+    self.jobDB._query = MagicMock( return_value=S_OK( ( ( 100, ), ( 102, ), ( 104, ) ) ) )
+    self.jobDB.insertMany = MagicMock( return_value=S_OK() )
+    self.jobDB.transactionStart = MagicMock( return_value=S_OK() )
+    self.jobDB.transactionCommit = MagicMock( return_value=S_OK() )
+    self.jobDB.transactionRollback = MagicMock( return_value=S_OK() )
+
+    jdls = [ 'JobName = "job_%d"; Executable = "%%j.sh"; InputData = {"/vo/lfn%d", "/vo/lfn%d"}; '
+             'Parameters = [ Name = "p%d" ];' % ( i, i, i + 3, i ) for i in xrange( 3 ) ]
+    result = self.jobDB.insertNewJobsIntoDB( jdls, 'user', '/DN/user', 'group', 'Setup',
+                                             initialStatus='Submitting', initialMinorStatus='Bulk' )
+    self.assertTrue( result['OK'] )
+    self.assertEqual( result['Value'], [ 100, 102, 104 ] )
+    # The manifest is checked once for all the jobs, and its checked options are set in each JDL
+    self.assertEqual( jobManifestMock.return_value.check.call_count, 1 )
+    jobManifestMock.return_value.setOptionsFromDict.assert_any_call( {'CPUTime': 1000, 'Priority': 1} )
+    jobManifestMock.return_value.setOption.assert_any_call( 'JobID', 102 )
+    # The JobIDs are read back with the mark of the inserted rows, which are replaced
+    updates = [ call[0][0] for call in self.jobDB._update.call_args_list ]
+    self.assertTrue( updates[0].startswith( "INSERT INTO JobJDLs" ) )
+    reservation = updates[0].split( "'" )[1]
+    self.assertEqual( self.jobDB._query.call_args[0][0],
+                      "SELECT JobID FROM JobJDLs WHERE JobID >= 100 AND JDL = '%s' ORDER BY JobID" % reservation )
+    self.assertEqual( updates[1], "DELETE FROM JobJDLs WHERE JobID IN (100,102,104)" )
+    self.assertEqual( self.jobDB.transactionCommit.call_count, 1 )
+    self.assertFalse( self.jobDB.transactionRollback.called )
+
+    insertedRows = dict( ( call[0][0], call[0][1:] ) for call in self.jobDB.insertMany.call_args_list )
+    jdlRows = insertedRows['JobJDLs'][1]
+    self.assertEqual( [ row[0] for row in jdlRows ], [ 100, 102, 104 ] )
+    self.assertIn( '"102.sh"', jdlRows[1][1] )
+    self.assertEqual( jdlRows[1][3], '[%s]' % jdls[1] )
+    jobFields, jobRows = insertedRows['Jobs']
+    self.assertEqual( len( jobRows ), 3 )
+    jobRow = dict( zip( jobFields, jobRows[2] ) )
+    self.assertEqual( ( jobRow['JobID'], jobRow['JobName'], jobRow['Owner'], jobRow['Status'], jobRow['MinorStatus'] ),
+                      ( 104, 'job_2', 'user', 'Submitting', 'Bulk' ) )
+    self.assertEqual( insertedRows['InputData'][1], [ ( 100, '/vo/lfn0' ), ( 100, '/vo/lfn3' ),
+                                                       ( 102, '/vo/lfn1' ), ( 102, '/vo/lfn4' ),
+                                                       ( 104, '/vo/lfn2' ), ( 104, '/vo/lfn5' ) ] )
+    self.assertEqual( insertedRows['JobParameters'][1], [ ( 100, 'Name', 'p0' ), ( 102, 'Name', 'p1' ),
+                                                           ( 104, 'Name', 'p2' ) ] )
+
+    # The JobIDs that can not be read back are not used
+    self.jobDB._query.return_value = S_OK( ( ( 100, ), ( 102, ) ) )
+    result = self.jobDB.insertNewJobsIntoDB( jdls, 'user', '/DN/user', 'group', 'Setup' )
+    self.assertFalse( result['OK'] )
+    self.assertEqual( self.jobDB.transactionRollback.call_count, 1 )
+    self.jobDB._query.return_value = S_OK( ( ( 100, ), ( 102, ), ( 104, ) ) )
+
+    # Nothing is kept when a job can not be inserted
+    self.jobDB.insertMany.return_value = S_ERROR( 'Error' )
+    result = self.jobDB.insertNewJobsIntoDB( jdls, 'user', '/DN/user', 'group', 'Setup' )
+    self.assertFalse( result['OK'] )
+    self.assertEqual( self.jobDB.transactionCommit.call_count, 1 )
+    self.assertEqual( self.jobDB.transactionRollback.call_count, 2 )
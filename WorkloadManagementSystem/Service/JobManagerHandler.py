@@ -163,9 +163,6 @@ class JobManagerHandler(RequestHandler):
       if not result['OK']:
         return result
       jobDescList = result['Value']
-    else:
-      # if we are here, then jobDesc was the description of a single job.
-      jobDescList = [jobDesc]
 
     jobIDList = []
 
@@ -176,8 +173,27 @@ class JobManagerHandler(RequestHandler):
       initialStatus = 'Received'
       initialMinorStatus = 'Job accepted'
 
-    for jobDescription in jobDescList:  # jobDescList because there might be a list generated by a parametric job
-      result = gJobDB.insertNewJobIntoDB(jobDescription,
+    if parametricJob:
+      # All the jobs generated by a parametric job are inserted at once
+      result = gJobDB.insertNewJobsIntoDB(jobDescList,
+                                          self.owner,
+                                          self.ownerDN,
+                                          self.ownerGroup,
+                                          self.diracSetup,
+                                          initialStatus=initialStatus,
+                                          initialMinorStatus=initialMinorStatus)
+      if not result['OK']:
+        return result
+
+      jobIDList = result['Value']
+      self.log.info("Jobs added to the JobDB", "%d jobs for %s/%s" % (len(jobIDList), self.ownerDN, self.ownerGroup))
+
+      result = gJobLoggingDB.addLoggingRecords(jobIDList, initialStatus, initialMinorStatus, source='JobManager')
+      if not result['OK']:
+        self.log.error("Failed to add the logging records of the jobs",
+                       "%d jobs from %d to %d: %s" % (len(jobIDList), jobIDList[0], jobIDList[-1], result['Message']))
+    else:
+      result = gJobDB.insertNewJobIntoDB(jobDesc,
                                          self.owner,
                                          self.ownerDN,
                                          self.ownerGroup,
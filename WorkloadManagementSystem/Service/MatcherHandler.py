@@ -103,6 +103,39 @@ class MatcherHandler(RequestHandler):
     # FIXME: This is correctly interpreted by the JobAgent, but DErrno should be used instead
     return S_ERROR("No match found")
 
+##############################################################################
+  types_requestJobs = [[basestring, dict], (int, long)]
+
+  def export_requestJobs(self, resourceDescription, numJobs):
+    """ Serve up to numJobs jobs to a resource with several free slots, in a single matching.
+        The maximum number of jobs per request is given by the MaxJobsPerRequest option
+
+        :returns: S_OK( list of job dictionaries as returned by requestJob ), empty if no job matched
+    """
+    numJobs = min(numJobs, self.srv_getCSOption('MaxJobsPerRequest', 64))
+    if numJobs < 1:
+      return S_ERROR("The number of jobs requested has to be positive")
+
+    resourceDescription['Setup'] = self.serviceInfoDict['clientSetup']
+    credDict = self.getRemoteCredentials()
+
+    try:
+      opsHelper = Operations(group=credDict['group'])
+      matcher = Matcher(pilotAgentsDB=pilotAgentsDB,
+                        jobDB=gJobDB,
+                        tqDB=gTaskQueueDB,
+                        jlDB=jlDB,
+                        opsHelper=opsHelper)
+      result = matcher.selectJobs(resourceDescription, credDict, numJobs)
+    except RuntimeError as rte:
+      self.log.error("Error requesting jobs: ", rte)
+      return S_ERROR("Error requesting jobs")
+
+    gMonitor.addMark("matchesDone")
+    if result:
+      gMonitor.addMark("matchesOK", len(result))
+    return S_OK(result)
+
 ##############################################################################
   types_getActiveTaskQueues = []
 
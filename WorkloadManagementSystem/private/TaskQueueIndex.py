@@ -0,0 +1,290 @@
+""" In-memory index of the task queues, to select the task queues matching a resource without SQL
+
+    It reproduces the conditions generated by TaskQueueDB.__generateTQMatchSQL. The definition of a
+    task queue never changes once it has been enabled, only its priority does, so the index is kept up
+    to date by adding and removing task queues and by updating their priorities.
+"""
+
+import heapq
+import itertools
+import random
+import string
+import threading
+
+from DIRAC import S_OK, S_ERROR
+from DIRAC.Core.Security import Properties
+from DIRAC.ConfigurationSystem.Client.Helpers import Registry
+
+__RCSID__ = "$Id$"
+
+# Same as in TaskQueueDB, that imports this module
+singleValueDefFields = ('OwnerDN', 'OwnerGroup', 'Setup', 'CPUTime')
+multiValueMatchFields = ('GridCE', 'Site', 'GridMiddleware', 'Platform',
+                         'PilotType', 'SubmitPool', 'JobType', 'Tag')
+bannedJobMatchFields = ('Site', )
+
+
+def _toList(value):
+  if isinstance(value, (list, tuple)):
+    return list(value)
+  return [value]
+
+
+def _isAny(values):
+  """ True if one of the values means that any value is accepted
+  """
+  for value in values:
+    if "".join(char for char in value.lower() if char not in string.punctuation) == 'any':
+      return True
+  return False
+
+
+class TaskQueueIndex(object):
+  """ Task queues kept in memory, with inverted indexes on the Setup, the CPUTime and the multi-value
+      fields, so that a match is made of set operations. Only the owner conditions are checked task
+      queue by task queue.
+  """
+
+  def __init__(self):
+    self.__lock = threading.Lock()
+    # TQId -> dict of the definition, with frozensets for the multi-value fields
+    self.__tqs = {}
+    # TQId -> 1 / Priority, to order the task queues like RAND() / Priority
+    self.__invPriorities = {}
+    self.__bySetup = {}
+    self.__byCPUTime = {}
+    # Plural field -> { value -> set of TQIds }, and the TQIds without any value for the field
+    self.__byValue = {}
+    self.__unrestricted = {}
+    for field in multiValueMatchFields + tuple("Banned%s" % field for field in bannedJobMatchFields):
+      self.__byValue["%ss" % field] = {}
+      self.__unrestricted["%ss" % field] = set()
+
+  def __len__(self):
+    return len(self.__tqs)
+
+  def getTaskQueueIds(self):
+    """ The ids of the task queues in the index
+    """
+    with self.__lock:
+      return set(self.__tqs)
+
+  def add(self, tqId, tqDefDict, priority):
+    """ Add a task queue, or replace it
+
+        :param int tqId: task queue id
+        :param dict tqDefDict: single value fields, and lists of values for the multi-value fields (Sites...)
+        :param float priority: priority of the task queue
+    """
+    tqData = {}
+    for field in singleValueDefFields:
+      tqData[field] = tqDefDict.get(field)
+    for defField in self.__byValue:
+      tqData[defField] = frozenset(tqDefDict.get(defField) or [])
+    with self.__lock:
+      if tqId in self.__tqs:
+        self.__remove(tqId)
+      self.__tqs[tqId] = tqData
+      self.__invPriorities[tqId] = self.__invPriority(priority)
+      self.__bySetup.setdefault(tqData['Setup'], set()).add(tqId)
+      self.__byCPUTime.setdefault(tqData['CPUTime'], set()).add(tqId)
+      for defField, valueIndex in self.__byValue.iteritems():
+        if not tqData[defField]:
+          self.__unrestricted[defField].add(tqId)
+        for value in tqData[defField]:
+          valueIndex.setdefault(value, set()).add(tqId)
+
+  def remove(self, tqIds):
+    """ Remove task queues, unknown ids are ignored
+    """
+    with self.__lock:
+      for tqId in tqIds:
+        if tqId in self.__tqs:
+          self.__remove(tqId)
+
+  def __remove(self, tqId):
+    tqData = self.__tqs.pop(tqId)
+    del self.__invPriorities[tqId]
+    self.__discardFrom(self.__bySetup, tqData['Setup'], tqId)
+    self.__discardFrom(self.__byCPUTime, tqData['CPUTime'], tqId)
+    for defField, valueIndex in self.__byValue.iteritems():
+      self.__unrestricted[defField].discard(tqId)
+      for value in tqData[defField]:
+        self.__discardFrom(valueIndex, value, tqId)
+
+  @staticmethod
+  def __discardFrom(valueIndex, value, tqId):
+    tqIds = valueIndex.get(value)
+    if tqIds is not None:
+      tqIds.discard(tqId)
+      if not tqIds:
+        del valueIndex[value]
+
+  def setPriorities(self, priorities):
+    """ Update the priorities of task queues
+
+        :param dict priorities: TQId -> priority
+    """
+    with self.__lock:
+      for tqId, priority in priorities.iteritems():
+        if tqId in self.__tqs:
+          self.__invPriorities[tqId] = self.__invPriority(priority)
+
+  @staticmethod
+  def __invPriority(priority):
+    # A NULL RAND() / 0 comes first in MySQL
+    return 1. / priority if priority > 0 else 0.
+
+  def __withAny(self, defField, values):
+    """ The task queues with one of the values at least
+    """
+    valueIndex = self.__byValue[defField]
+    tqIds = set()
+    for value in values:
+      tqIds.update(valueIndex.get(value, ()))
+    return tqIds
+
+  def __withAll(self, defField, values):
+    """ The task queues with all the values
+    """
+    valueIndex = self.__byValue[defField]
+    tqIds = set(valueIndex.get(values[0], ()))
+    for value in values[1:]:
+      tqIds.intersection_update(valueIndex.get(value, ()))
+    return tqIds
+
+  def __excludedBy(self, condDict, candidates):
+    """ The candidates fulfilling all the conditions of a negative condition dict,
+        as not ( cond1 and cond2 ) = ( not cond1 or not cond2 ), see TaskQueueDB.__generateNotDictSQL
+    """
+    excluded = None
+    singleValueConds = []
+    for field, values in condDict.iteritems():
+      if field in multiValueMatchFields:
+        tqIds = self.__withAny("%ss" % field, _toList(values))
+        excluded = tqIds if excluded is None else excluded & tqIds
+      elif field in singleValueDefFields:
+        singleValueConds.extend((field, value) for value in _toList(values))
+    if excluded is None:
+      if not singleValueConds:
+        return set()
+      excluded = candidates
+    excluded = excluded & candidates
+    if singleValueConds:
+      excluded = set(tqId for tqId in excluded
+                     if all(self.__tqs[tqId][field] == value for field, value in singleValueConds))
+    return excluded
+
+  def match(self, tqMatchDict, numQueuesToGet=1, negativeCond=None):
+    """ Select the task queues matching a resource, in the order of TaskQueueDB.matchAndGetTaskQueue
+
+        :param dict tqMatchDict: resource description, with unescaped values
+        :param int numQueuesToGet: maximum number of task queues returned, all of them if 0
+        :param negativeCond: dict, or list of dicts, of conditions the task queues must not fulfill
+        :returns: S_OK( [ ( TQId, OwnerDN, OwnerGroup ) ] ) / S_ERROR
+    """
+    # The task queue tags have to be provided by the resource, and it can require some of them
+    if 'Tag' not in tqMatchDict and 'RequiredTag' not in tqMatchDict:
+      tags = []
+    else:
+      tags = _toList(tqMatchDict.get('Tag', []))
+    checkTags = ('Tag' in tqMatchDict or 'RequiredTag' not in tqMatchDict) and not _isAny(tags)
+    requiredTags = _toList(tqMatchDict.get('RequiredTag', []))
+    if not requiredTags or _isAny(requiredTags):
+      requiredTags = []
+    elif not set(requiredTags).issubset(set(tags)):
+      return S_ERROR('Wrong conditions')
+
+    ownerCondition = self.__getOwnerCondition(tqMatchDict)
+
+    with self.__lock:
+      if 'Setup' in tqMatchDict:
+        candidates = set()
+        for setup in _toList(tqMatchDict['Setup']):
+          candidates.update(self.__bySetup.get(setup, ()))
+      else:
+        candidates = set(self.__tqs)
+
+      if 'CPUTime' in tqMatchDict and candidates:
+        maxCPUTime = max(_toList(tqMatchDict['CPUTime']))
+        tqIds = set()
+        for cpuTime, cpuTimeTQs in self.__byCPUTime.iteritems():
+          if cpuTime <= maxCPUTime:
+            tqIds.update(cpuTimeTQs)
+        candidates &= tqIds
+
+      # The resource has to provide one of the values of the task queue
+      for field in multiValueMatchFields:
+        if field == 'Tag' or not candidates or not tqMatchDict.get(field):
+          continue
+        values = _toList(tqMatchDict[field])
+        if _isAny(values):
+          continue
+        defField = "%ss" % field
+        candidates = (candidates & self.__unrestricted[defField]) | (candidates & self.__withAny(defField, values))
+        if field in bannedJobMatchFields:
+          # The task queues banning all of them
+          candidates -= self.__withAll("Banned%s" % defField, values)
+
+      if checkTags and candidates:
+        tagSet = frozenset(tags)
+        tqIds = set(tqId for tqId in self.__withAny('Tags', tags) if self.__tqs[tqId]['Tags'] <= tagSet)
+        candidates = (candidates & self.__unrestricted['Tags']) | (candidates & tqIds)
+      if requiredTags and candidates:
+        candidates &= self.__withAll('Tags', requiredTags)
+
+      # The resource bans some values, the task queues with all of them are excluded
+      for field in multiValueMatchFields:
+        bannedValues = tqMatchDict.get("Banned%s" % field)
+        if not bannedValues or not candidates:
+          continue
+        bannedValues = _toList(bannedValues)
+        if not _isAny(bannedValues):
+          candidates -= self.__withAll("%ss" % field, bannedValues)
+
+      if negativeCond and candidates:
+        if isinstance(negativeCond, dict):
+          negativeCond = [negativeCond]
+        excluded = None
+        for condDict in negativeCond:
+          tqIds = self.__excludedBy(condDict, candidates)
+          excluded = tqIds if excluded is None else excluded & tqIds
+        candidates -= excluded
+
+      if ownerCondition:
+        candidates = [tqId for tqId in candidates if ownerCondition(self.__tqs[tqId])]
+
+      # ORDER BY RAND() / Priority
+      rand = random.random
+      keys = [rand() * invPriority for invPriority in itertools.imap(self.__invPriorities.__getitem__, candidates)]
+      if numQueuesToGet:
+        ordered = heapq.nsmallest(numQueuesToGet, itertools.izip(keys, candidates))
+      else:
+        ordered = sorted(itertools.izip(keys, candidates))
+      tqList = []
+      for _, tqId in ordered:
+        tqData = self.__tqs[tqId]
+        tqList.append((tqId, tqData['OwnerDN'], tqData['OwnerGroup']))
+    return S_OK(tqList)
+
+  @staticmethod
+  def __getOwnerCondition(tqMatchDict):
+    """ Function checking the owner of a task queue, or None
+    """
+    if 'OwnerDN' in tqMatchDict and 'OwnerGroup' in tqMatchDict:
+      dns = _toList(tqMatchDict['OwnerDN'])
+      sharingGroups = set()
+      owners = set()
+      for group in _toList(tqMatchDict['OwnerGroup']):
+        if Properties.JOB_SHARING in Registry.getPropertiesForGroup(group):
+          sharingGroups.add(group)
+        else:
+          owners.update((dn, group) for dn in dns)
+      return lambda tq: tq['OwnerGroup'] in sharingGroups or (tq['OwnerDN'], tq['OwnerGroup']) in owners
+    conditions = []
+    for field in ('OwnerGroup', 'OwnerDN'):
+      if field in tqMatchDict:
+        conditions.append((field, set(_toList(tqMatchDict[field]))))
+    if not conditions:
+      return None
+    return lambda tq: all(tq[field] in values for field, values in conditions)
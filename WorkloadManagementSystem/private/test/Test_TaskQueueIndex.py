@@ -0,0 +1,120 @@
+""" Unit tests of the in-memory index of the task queues
+"""
+
+import collections
+
+import mock
+import pytest
+
+from DIRAC.WorkloadManagementSystem.private import TaskQueueIndex as TaskQueueIndexModule
+from DIRAC.WorkloadManagementSystem.private.TaskQueueIndex import TaskQueueIndex
+
+__RCSID__ = "$Id$"
+
+setup = 'aSetup'
+resource = {'Setup': setup, 'CPUTime': 50000}
+
+
+def tqDef(**kwargs):
+  tqDefDict = {'OwnerDN': '/my/DN', 'OwnerGroup': 'myGroup', 'Setup': setup, 'CPUTime': 10000}
+  tqDefDict.update(kwargs)
+  return tqDefDict
+
+
+@pytest.fixture
+def index():
+  """ An index where only the prod group has the JobSharing property
+  """
+  properties = {'prod': ['JobSharing']}
+  with mock.patch.object(TaskQueueIndexModule.Registry, 'getPropertiesForGroup',
+                         side_effect=lambda group: properties.get(group, [])):
+    yield TaskQueueIndex()
+
+
+def matchIds(index, matchDict, **kwargs):
+  result = index.match(matchDict, numQueuesToGet=0, **kwargs)
+  assert result['OK'], result['Message']
+  return sorted(tqId for tqId, _ownerDN, _ownerGroup in result['Value'])
+
+
+def test_singleValueFields(index):
+  index.add(1, tqDef(), 1)
+  index.add(2, tqDef(CPUTime=100000), 1)
+  index.add(3, tqDef(Setup='otherSetup'), 1)
+  index.add(4, tqDef(OwnerDN='/other/DN', OwnerGroup='prod'), 1)
+  index.add(5, tqDef(OwnerDN='/other/DN'), 1)
+
+  assert matchIds(index, resource) == [1, 4, 5]
+  assert matchIds(index, dict(resource, CPUTime=500000)) == [1, 2, 4, 5]
+  assert matchIds(index, dict(resource, Setup=[setup, 'otherSetup'])) == [1, 3, 4, 5]
+  assert matchIds(index, dict(resource, OwnerGroup='myGroup')) == [1, 5]
+  # Pilots of a JobSharing group run the jobs of anybody in the group
+  assert matchIds(index, dict(resource, OwnerDN='/my/DN', OwnerGroup=['myGroup', 'prod'])) == [1, 4]
+
+
+def test_multiValueFields(index):
+  index.add(1, tqDef(), 1)
+  index.add(2, tqDef(Sites=['Site1', 'Site2']), 1)
+  index.add(3, tqDef(Sites=['Site3'], Platforms=['Linux']), 1)
+  index.add(4, tqDef(BannedSites=['Site1']), 1)
+
+  assert matchIds(index, resource) == [1, 2, 3, 4]
+  assert matchIds(index, dict(resource, Site='Site1')) == [1, 2]
+  assert matchIds(index, dict(resource, Site=['Site1', 'Site3'])) == [1, 2, 3, 4]
+  assert matchIds(index, dict(resource, Site='ANY')) == [1, 2, 3, 4]
+  assert matchIds(index, dict(resource, Site='Site3', Platform='Windows')) == [1, 4]
+  # The resource bans sites, task queues without sites are not concerned
+  assert matchIds(index, dict(resource, BannedSite=['Site3'])) == [1, 2, 4]
+
+
+def test_tags(index):
+  index.add(1, tqDef(), 1)
+  index.add(2, tqDef(Tags=['MultiProcessor']), 1)
+  index.add(3, tqDef(Tags=['MultiProcessor', 'GPU']), 1)
+
+  assert matchIds(index, resource) == [1]
+  assert matchIds(index, dict(resource, Tag='MultiProcessor')) == [1, 2]
+  assert matchIds(index, dict(resource, Tag=['MultiProcessor', 'GPU'])) == [1, 2, 3]
+  assert matchIds(index, dict(resource, Tag=['MultiProcessor', 'GPU'], RequiredTag='GPU')) == [3]
+  assert matchIds(index, dict(resource, Tag='Any')) == [1, 2, 3]
+  assert not index.match(dict(resource, Tag='MultiProcessor', RequiredTag='GPU'))['OK']
+
+
+def test_negativeCond(index):
+  index.add(1, tqDef(Sites=['Site1'], JobTypes=['User']), 1)
+  index.add(2, tqDef(JobTypes=['MCSimulation']), 1)
+  index.add(3, tqDef(OwnerGroup='prod'), 1)
+
+  assert matchIds(index, resource, negativeCond={'JobType': ['User', 'Merge']}) == [2, 3]
+  # Only the task queues fulfilling all the conditions of a dict are excluded
+  assert matchIds(index, resource, negativeCond={'JobType': 'User', 'OwnerGroup': ['myGroup']}) == [2, 3]
+  assert matchIds(index, resource, negativeCond=[{'JobType': 'User'}, {'OwnerGroup': ['prod']}]) == [1, 2, 3]
+  assert matchIds(index, resource, negativeCond={'OwnerGroup': ['myGroup']}) == [3]
+
+
+def test_updates(index):
+  for tqId in xrange(10):
+    index.add(tqId, tqDef(Sites=['Site%s' % (tqId % 2)]), 1)
+  index.remove([0, 1, 2, 100])
+  assert len(index) == 7
+  assert index.getTaskQueueIds() == set(xrange(3, 10))
+  assert matchIds(index, dict(resource, Site='Site0')) == [4, 6, 8]
+
+  # A task queue added again replaces the previous one
+  index.add(4, tqDef(Sites=['Site1']), 1)
+  assert matchIds(index, dict(resource, Site='Site0')) == [6, 8]
+
+
+def test_priorities(index):
+  index.add(1, tqDef(), 1)
+  index.add(2, tqDef(), 1)
+  index.add(3, tqDef(Sites=['Site1']), 1)
+  index.setPriorities({1: 10, 2: 0.1})
+
+  result = index.match(resource, numQueuesToGet=2)
+  assert result['OK']
+  assert len(result['Value']) == 2
+  assert result['Value'][0][1:] == ('/my/DN', 'myGroup')
+
+  counts = collections.Counter(index.match(resource)['Value'][0][0] for _ in xrange(1000))
+  assert counts[1] > counts[3] > counts[2]
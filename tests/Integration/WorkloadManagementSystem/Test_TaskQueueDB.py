@@ -985,3 +985,31 @@ def test_TQ():
 
   result = tqDB.deleteTaskQueueIfEmpty(tq)
   assert result['OK'] is True
+
+
+def test_matchAndGetJobs():
+  """ several jobs are taken out of the task queues with one matching
+  """
+  tqDefDict = {'OwnerDN': '/my/DN', 'OwnerGroup': 'myGroup', 'Setup': 'aSetup', 'CPUTime': 50000}
+  for jobId in xrange(201, 206):
+    result = tqDB.insertJob(jobId, tqDefDict, 10)
+    assert result['OK'] is True
+
+  result = tqDB.matchAndGetJobs({'Setup': 'aSetup', 'CPUTime': 300000}, 3)
+  assert result['OK'] is True
+  assert result['Value']['matchFound'] is True
+  jobs = result['Value']['jobs']
+  assert len(jobs) == 3
+  assert len(set(jobs)) == 3
+
+  result = tqDB.matchAndGetJobs({'Setup': 'aSetup', 'CPUTime': 300000}, 10)
+  assert result['OK'] is True
+  assert len(result['Value']['jobs']) == 2
+  assert not set(result['Value']['jobs']) & set(jobs)
+
+  result = tqDB.matchAndGetJobs({'Setup': 'aSetup', 'CPUTime': 300000}, 10)
+  assert result['OK'] is True
+  assert result['Value']['matchFound'] is False
+
+  result = tqDB.deleteTaskQueueIfEmpty(jobs[0][1])
+  assert result['OK'] is True
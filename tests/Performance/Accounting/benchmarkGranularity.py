@@ -0,0 +1,116 @@
+#!/usr/bin/env python
+""" Compare the conversion of the accounting buckets to the granularity of the plots,
+    key by key with dictionaries as it used to be done, and for all the keys at once with arrays.
+
+    The synthetic data is one year of hourly buckets, plus some daily ones, for each key,
+    summed to a daily granularity. The time of each conversion is printed,
+    and the results of both are checked to be the same.
+
+    Usage: benchmarkGranularity.py [nbKeys ...]
+"""
+
+import random
+import sys
+import time
+
+from DIRAC.AccountingSystem.private.DBUtils import DBUtils
+
+START = 1500000000 - 1500000000 % 86400
+HOURS = 365 * 24
+
+
+def spanToGranularity(granularity, bucketsData):
+  """ The previous dictionary implementation of DBUtils._spanToGranularity
+  """
+  normData = {}
+
+  def addToNormData(bucketDate, data, proportion=1.0):
+    if bucketDate in normData:
+      for iP in range(len(data)):
+        val = data[iP]
+        if val is None:
+          val = 0
+        normData[bucketDate][iP] += float(val) * proportion
+      normData[bucketDate][-1] += proportion
+    else:
+      normData[bucketDate] = []
+      for fD in data:
+        if fD is None:
+          fD = 0
+        normData[bucketDate].append(float(fD) * proportion)
+      normData[bucketDate].append(proportion)
+
+  for bucketData in bucketsData:
+    bucketDate = bucketData[0]
+    originalBucketLength = bucketData[1]
+    bucketValues = bucketData[2:]
+    if originalBucketLength == granularity:
+      addToNormData(bucketDate, bucketValues)
+    else:
+      startEpoch = bucketDate
+      endEpoch = bucketDate + originalBucketLength
+      newBucketEpoch = startEpoch - startEpoch % granularity
+      if startEpoch == endEpoch:
+        addToNormData(newBucketEpoch, bucketValues)
+      else:
+        while newBucketEpoch < endEpoch:
+          start = max(newBucketEpoch, startEpoch)
+          end = min(newBucketEpoch + granularity, endEpoch)
+          proportion = float(end - start) / originalBucketLength
+          addToNormData(newBucketEpoch, bucketValues, proportion)
+          newBucketEpoch += granularity
+  return normData
+
+
+def sumToGranularity(granularity, bucketsData):
+  """ The previous dictionary implementation of DBUtils._sumToGranularity
+  """
+  normData = spanToGranularity(granularity, bucketsData)
+  for bDate in normData:
+    del normData[bDate][-1]
+  return normData
+
+
+def generateBuckets(nbKeys):
+  """ One year of buckets for each key: hourly ones, and daily ones for the oldest month
+  """
+  dataDict = {}
+  for key in xrange(nbKeys):
+    buckets = [[START + 86400 * day, 86400, random.random() * 1000, random.randint(1, 10)]
+               for day in xrange(30)]
+    buckets.extend([START + 3600 * hour, 3600, random.random() * 100, random.randint(0, 5)]
+                   for hour in xrange(30 * 24, HOURS) if random.random() < 0.8)
+    dataDict['Site%d' % key] = buckets
+  return dataDict
+
+
+def benchmark(nbKeys):
+  """ Time both conversions of the same data and compare their results
+  """
+  dataDict = generateBuckets(nbKeys)
+  nbBuckets = sum(len(buckets) for buckets in dataDict.itervalues())
+
+  startTime = time.time()
+  loopResult = dict((key, sumToGranularity(86400, buckets)) for key, buckets in dataDict.iteritems())
+  loopTime = time.time() - startTime
+
+  startTime = time.time()
+  arrayResult = DBUtils(None, None)._convertToGranularity(86400, dataDict, "sum")
+  arrayTime = time.time() - startTime
+
+  for key in loopResult:
+    assert sorted(loopResult[key]) == sorted(arrayResult[key])
+    for timeKey in loopResult[key]:
+      for loopValue, arrayValue in zip(loopResult[key][timeKey], arrayResult[key][timeKey]):
+        assert abs(loopValue - arrayValue) <= 1e-9 * max(1, abs(loopValue))
+
+  print "%4d keys, %8d buckets: dictionaries %6.2f s, arrays %6.2f s (x%.1f)" % (nbKeys, nbBuckets, loopTime,
+                                                                                  arrayTime, loopTime / arrayTime)
+
+
+if __name__ == '__main__':
+  if '-h' in sys.argv or '--help' in sys.argv:
+    print __doc__
+    sys.exit(0)
+  for nbKeys in [int(arg) for arg in sys.argv[1:]] or [10, 100, 300]:
+    benchmark(nbKeys)
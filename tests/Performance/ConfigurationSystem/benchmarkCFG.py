@@ -0,0 +1,110 @@
+#!/usr/bin/env python
+""" Measure the CFG operations the configuration clients and servers spend their time in:
+
+      * load: CFG.loadFromBuffer, when a new version of the configuration is received
+      * serialize: str( CFG ), when the configuration is sent or written to disk
+      * clone: CFG.clone
+      * merge: CFG.mergeWith, with a small local configuration
+      * sync merge: the same merge, sharing the sections like ConfigurationData.sync does
+      * modifications: CFG.getModifications between two versions
+
+    The configurations are a synthetic one, with a number of sites, each with its computing elements and
+    queues, users, and operations sections, and the cfg files given in the command line, like the
+    dirac.cfg of an installation or a dump of a production configuration.
+    It checks that serializing and loading back a configuration gives the same CFG, then prints the
+    best time out of a few repetitions for each operation.
+
+    Usage: benchmarkCFG.py [nbSites] [repeat] [cfg files...]
+"""
+
+import sys
+import timeit
+
+from DIRAC.Core.Utilities.CFG import CFG
+
+
+def syntheticCFG(nbSites):
+  """ Configuration with nbSites sites, 10 users per site, and the sections of the operations
+  """
+  lines = ["# Synthetic configuration", "DIRAC", "{", "  Setup = Production",
+           "  Configuration", "  {", "    Name = Synthetic", "    Version = 2018-01-01 00:00:00.000000", "  }",
+           "}", "Resources", "{", "  Sites", "  {", "    LCG", "    {"]
+  for site in xrange(nbSites):
+    ces = ["ce%s%s.site%s.org" % (i, site, site) for i in xrange(3)]
+    lines.extend(["      # Site number %s" % site, "      LCG.Site%s.org" % site, "      {",
+                  "        Name = SITE%s" % site, "        CE = %s" % ", ".join(ces),
+                  "        SE = SITE%s-DISK" % site, "        SE += SITE%s-TAPE" % site,
+                  "        Coordinates = %s:%s" % (site % 90, site % 180),
+                  "        CEs", "        {"])
+    for ce in ces:
+      lines.extend(["          %s" % ce, "          {", "            CEType = HTCondorCE",
+                    "            SubmissionMode = Direct", "            Tag = MultiProcessor, GPU",
+                    "            Queues", "            {"])
+      for queue in ('short', 'long', 'multicore'):
+        lines.extend(["              %s" % queue, "              {",
+                      "                maxCPUTime = 2880", "                SI00 = 2500",
+                      "                MaxTotalJobs = 1000", "                MaxWaitingJobs = 100",
+                      "                # Operating system", "                Platform = x86_64-centos7",
+                      "              }"])
+      lines.extend(["            }", "          }"])
+    lines.extend(["        }", "      }"])
+  lines.extend(["    }", "  }", "}", "Registry", "{", "  Users", "  {"])
+  for user in xrange(nbSites * 10):
+    lines.extend(["    user%s" % user, "    {", "      DN = /DC=org/DC=example/CN=User %s" % user,
+                  "      Email = user%s@example.org" % user, "    }"])
+  lines.extend(["  }", "}", "Operations", "{", "  Defaults", "  {", "    JobScheduling", "    {",
+                "      CheckJobLimits = True", "      RunningLimit", "      {"])
+  for site in xrange(nbSites):
+    lines.extend(["        LCG.Site%s.org" % site, "        {", "          JobType", "          {",
+                  "            MCSimulation = 1000", "            User = 500", "          }", "        }"])
+  lines.extend(["      }", "    }", "  }", "}"])
+  return CFG().loadFromBuffer("\n".join(lines))
+
+
+def localCFG():
+  """ Small local configuration, like the dirac.cfg of a client
+  """
+  return CFG().loadFromBuffer("\n".join(["DIRAC", "{", "  Setup = Production", "  Configuration", "  {",
+                                         "    Servers = dips://cs.example.org:9135/Configuration/Server",
+                                         "  }", "  Security", "  {", "    UseServerCertificate = no",
+                                         "  }", "}", "LocalSite", "{", "  Site = LCG.Site1.org", "}"]))
+
+
+def bestTime(func, repeat):
+  """ Best wall clock time of func out of repeat calls
+  """
+  return min(timeit.repeat(func, number=1, repeat=repeat))
+
+
+def benchmark(name, cfg, repeat):
+  """ Time the CFG operations on a configuration and print the results
+  """
+  data = str(cfg)
+  # CFG has no __ne__
+  if not CFG().loadFromBuffer(data) == cfg or str(CFG().loadFromBuffer(data)) != data:
+    raise RuntimeError("Serializing and loading %s does not give the same CFG" % name)
+  newerCFG = CFG().loadFromBuffer(data)
+  newerCFG.setOption('DIRAC/Configuration/Version', '2018-01-01 00:00:01.000000')
+  newerCFG.createNewSection('Resources/Sites/LCG/LCG.New.org')
+  newerCFG.setOption('Resources/Sites/LCG/LCG.New.org/Name', 'NEW')
+  local = localCFG()
+
+  print "%s: %.1f MB" % (name, len(data) / 1024. / 1024.)
+  for action, func in (('load', lambda: CFG().loadFromBuffer(data)),
+                       ('serialize', cfg.serialize),
+                       ('clone', cfg.clone),
+                       ('merge', lambda: cfg.mergeWith(local)),
+                       ('sync merge', lambda: cfg.mergeWith(local, shareSections=True)),
+                       ('modifications', lambda: cfg.getModifications(newerCFG))):
+    print "  %-14s %8.3f s" % (action, bestTime(func, repeat))
+
+
+if __name__ == '__main__':
+  if '-h' in sys.argv or '--help' in sys.argv:
+    print __doc__
+    sys.exit(0)
+  nbSites = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+  nbRepeat = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+  benchmark('synthetic (%s sites)' % nbSites, syntheticCFG(nbSites), nbRepeat)
+  for cfgFile in sys.argv[3:]:
+    benchmark(cfgFile, CFG().loadFromFile(cfgFile), nbRepeat)
@@ -0,0 +1,92 @@
+#!/usr/bin/env python
+""" Measure the number of gConfig.getValue lookups per second, with and without the option cache.
+
+    The dirac.cfg of the installation is loaded (or the documented dirac.cfg of the repository if there is
+    none) and all its options are looked up again and again,
+    as strings, with the type they have (int, float, bool, list), and together with as many
+    paths that do not exist, like an agent asking for an option with a default value.
+    The lookups without cache use a new, empty cache for each call.
+
+    Usage: benchmarkGetValue.py [path of a cfg file] [number of rounds]
+"""
+
+import os
+import re
+import sys
+import time
+
+from mock import patch
+
+import DIRAC
+from DIRAC.Core.Utilities.CFG import CFG
+from DIRAC.ConfigurationSystem.Client.ConfigurationData import gConfigurationData
+from DIRAC.ConfigurationSystem.private.ConfigurationClient import ConfigurationClient
+
+
+def loadCFG(cfgFile):
+  """ Without the comments: the template dirac.cfg has some the CFG parser does not accept, after section names
+  """
+  with open(cfgFile) as fd:
+    return CFG().loadFromBuffer(re.sub(r"#.*", "", fd.read()))
+
+
+def guessDefault(value):
+  """ A default value of the type the option would be read with
+  """
+  if value.lower() in ('yes', 'no', 'true', 'false'):
+    return False
+  for castType in (int, float):
+    try:
+      castType(value)
+      return castType(0)
+    except ValueError:
+      pass
+  if ',' in value:
+    return []
+  return ''
+
+
+def getLookups(cfg, path=''):
+  lookups = []
+  for option in cfg.listOptions():
+    lookups.append(("%s/%s" % (path, option), guessDefault(cfg[option])))
+    lookups.append(("%s/%s" % (path, option), None))
+    lookups.append(("%s/%sMissing" % (path, option), 0))
+  for section in cfg.listSections():
+    lookups.extend(getLookups(cfg[section], "%s/%s" % (path, section)))
+  return lookups
+
+
+def runLookups(gConfig, lookups, nbRounds):
+  getValue = gConfig.getValue
+  start = time.time()
+  for _ in xrange(nbRounds):
+    for path, default in lookups:
+      getValue(path, default)
+  return len(lookups) * nbRounds / (time.time() - start)
+
+
+if __name__ == '__main__':
+  if '-h' in sys.argv or '--help' in sys.argv:
+    print __doc__
+    sys.exit(0)
+  if len(sys.argv) > 1:
+    cfgFile = sys.argv[1]
+  elif os.path.isfile(os.path.join(DIRAC.rootPath, 'etc', 'dirac.cfg')):
+    cfgFile = os.path.join(DIRAC.rootPath, 'etc', 'dirac.cfg')
+  else:
+    cfgFile = os.path.join(os.path.dirname(DIRAC.__file__), 'dirac.cfg')
+  nbRounds = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+
+  cfg = loadCFG(cfgFile)
+  gConfig = ConfigurationClient()
+  gConfig.loadCFG(cfg)
+  lookups = getLookups(cfg)
+
+  with patch.object(gConfigurationData, 'getOptionCache', side_effect=dict):
+    uncachedRate = runLookups(gConfig, lookups, nbRounds)
+  cachedRate = runLookups(gConfig, lookups, nbRounds)
+
+  print "%s lookups of %s, %s rounds" % (len(lookups), cfgFile, nbRounds)
+  print "  without cache : %10.0f lookups per second" % uncachedRate
+  print "  with cache    : %10.0f lookups per second" % cachedRate
@@ -0,0 +1,96 @@
+#!/usr/bin/env python
+""" Measure the helpers looking up the sites, computing elements, queues and storage elements of /Resources/Sites,
+    as the SiteDirector, the PilotAgentsDB and the DataManager call them:
+
+      * getQueues: all the queues of a community, like the SiteDirector at each cycle
+      * getQueues site: the queues of one site
+      * getSiteForCE: the site of each CE, one call per CE
+      * getCESiteMapping: the whole CE -> site mapping
+      * getSitesForSE: the sites of each SE, one call per SE
+      * getSEsForSite: the SEs of each site, one call per site
+
+    The configuration is a synthetic one with a number of sites, each with 2 CEs of 3 queues and 2 SEs.
+    Each helper is timed a first time after a new version of the configuration, then the best time
+    out of a few repetitions is printed.
+
+    Usage: benchmarkResourcesTopology.py [nbSites] [repeat]
+"""
+
+import sys
+import time
+import timeit
+
+from DIRAC.ConfigurationSystem.Client.ConfigurationData import gConfigurationData
+from DIRAC.ConfigurationSystem.Client.Helpers.Resources import getQueues
+from DIRAC.Core.Utilities.CFG import CFG
+from DIRAC.Core.Utilities.SiteCEMapping import getSiteForCE, getCESiteMapping
+from DIRAC.Core.Utilities.SiteSEMapping import getSitesForSE, getSEsForSite
+
+
+def syntheticCFG(nbSites):
+  """ Configuration with nbSites sites with 2 CEs of 3 queues and 2 SEs each, for 2 VOs
+  """
+  lines = ["Resources", "{", "  Sites", "  {"]
+  for grid in ('LCG', 'ARC'):
+    lines.extend(["    %s" % grid, "    {"])
+    for site in xrange(nbSites / 2):
+      siteName = "%s.Site%s.org" % (grid, site)
+      ces = ["ce%s.site%s.%s.org" % (i, site, grid.lower()) for i in xrange(2)]
+      lines.extend(["      %s" % siteName, "      {",
+                    "        CE = %s" % ", ".join(ces),
+                    "        SE = %s-DISK, %s-TAPE" % (siteName, siteName),
+                    "        VO = vo1, vo2" if site % 4 else "        VO = vo2",
+                    "        CEs", "        {", "          GridEnv = /etc/profile"])
+      for ce in ces:
+        lines.extend(["          %s" % ce, "          {", "            CEType = HTCondorCE",
+                      "            SubmissionMode = Direct", "            Queues", "            {"])
+        for queue in ('short', 'long', 'multicore'):
+          lines.extend(["              %s" % queue, "              {", "                maxCPUTime = 2880",
+                        "                SI00 = 2500", "                MaxTotalJobs = 1000", "              }"])
+        lines.extend(["            }", "          }"])
+      lines.extend(["        }", "      }"])
+    lines.extend(["    }"])
+  lines.extend(["  }", "  StorageElements", "  {"])
+  for grid in ('LCG', 'ARC'):
+    for site in xrange(nbSites / 2):
+      for seType in ('DISK', 'TAPE'):
+        lines.extend(["    %s.Site%s.org-%s" % (grid, site, seType), "    {", "      BackendType = EOS", "    }"])
+  lines.extend(["  }", "}"])
+  return CFG().loadFromBuffer("\n".join(lines))
+
+
+def newVersion(cfg):
+  """ Load the configuration as a new version
+  """
+  gConfigurationData.localCFG = cfg
+  gConfigurationData.sync()
+
+
+if __name__ == '__main__':
+  if '-h' in sys.argv or '--help' in sys.argv:
+    print __doc__
+    sys.exit(0)
+  nbSites = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+  nbRepeat = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+
+  cfg = syntheticCFG(nbSites)
+  newVersion(cfg)
+  sites = getCESiteMapping()['Value'].values()
+  ces = getCESiteMapping()['Value'].keys()
+  nbQueues = sum(len(ceDict['Queues']) for siteDict in getQueues()['Value'].itervalues()
+                 for ceDict in siteDict.itervalues())
+  ses = ["%s-DISK" % site for site in sites]
+
+  print "%s sites, %s CEs, %s queues, %s SEs" % (len(set(sites)), len(ces), nbQueues, 2 * len(ses))
+  print "  %-18s %12s %12s" % ('', 'new version', 'best')
+  for action, func in (('getQueues', lambda: getQueues(community='vo1')),
+                       ('getQueues site', lambda: getQueues(siteList=[sites[0]], community='vo2')),
+                       ('getSiteForCE', lambda: [getSiteForCE(ce) for ce in ces]),
+                       ('getCESiteMapping', getCESiteMapping),
+                       ('getSitesForSE', lambda: [getSitesForSE(se) for se in ses]),
+                       ('getSEsForSite', lambda: [getSEsForSite(site) for site in sites])):
+    newVersion(cfg)
+    start = time.time()
+    func()
+    firstTime = time.time() - start
+    print "  %-18s %10.3f s %10.3f s" % (action, firstTime, min(timeit.repeat(func, number=1, repeat=nbRepeat)))
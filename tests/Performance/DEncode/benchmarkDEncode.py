@@ -0,0 +1,101 @@
+#!/usr/bin/env python
+""" Compare the pure python DEncode functions with the DEncodeStream engine
+    on payloads shaped like the replies of our busiest services:
+
+      * dfc: FileCatalog listDirectory reply (nested dictionaries of metadata)
+      * jobs: JobMonitoring getJobPageSummaryWeb reply (list of rows)
+
+    It checks that both engines produce the same data, then prints the best
+    time out of a few repetitions for encoding and decoding each payload.
+
+    Tunable parameters (command line):
+      * number of files/jobs in the payloads (default 100000)
+      * number of repetitions (default 3)
+
+    Usage: benchmarkDEncode.py [nbEntries] [repeat]
+"""
+
+import sys
+import datetime
+import timeit
+
+from DIRAC.Core.Utilities import DEncode
+from DIRAC.Core.Utilities import DEncodeStream
+
+
+def dfcPayload(nbFiles):
+  """ Reply of FileCatalog.listDirectory for a directory with nbFiles files
+  """
+  now = datetime.datetime.utcnow().replace(microsecond=0)
+  directory = '/vo/data/2018/RAW/FULL/LHCb/COLLISION18/123456'
+  files = {}
+  for fileIndex in xrange(nbFiles):
+    lfn = '%s/%08d_%08d_1.raw' % (directory, fileIndex // 1000, fileIndex)
+    files[lfn] = {'MetaData': {'FileID': fileIndex,
+                               'DirID': 42,
+                               'Size': 3000000000L + fileIndex,
+                               'UID': 1,
+                               'GID': 2,
+                               'Owner': 'lhcbprod',
+                               'OwnerGroup': 'lhcb_prod',
+                               'Status': 'AprioriGood',
+                               'GUID': 'A0B1C2D3-E4F5-0617-2839-%012d' % fileIndex,
+                               'Checksum': 'f1e2d3c4',
+                               'ChecksumType': 'Adler32',
+                               'Mode': 509,
+                               'CreationDate': now,
+                               'ModificationDate': now}}
+  return {'OK': True,
+          'Value': {'Successful': {directory: {'Files': files, 'SubDirs': {}, 'Links': {}, 'Datasets': {}}},
+                    'Failed': {}}}
+
+
+def jobsPayload(nbJobs):
+  """ Reply of JobMonitoring.getJobPageSummaryWeb for nbJobs jobs
+  """
+  now = datetime.datetime.utcnow().replace(microsecond=0)
+  paramNames = ['JobID', 'JobName', 'Status', 'MinorStatus', 'ApplicationStatus', 'Site',
+                'Owner', 'OwnerGroup', 'SubmissionTime', 'LastUpdateTime', 'RescheduleCounter', 'JobGroup']
+  records = []
+  for jobID in xrange(nbJobs):
+    records.append([jobID, 'MCSimulation_%s' % jobID, 'Running', 'Application', 'Gauss step 1',
+                    'LCG.CERN.cern', 'lhcbprod', 'lhcb_mc', now, now, 0, '00012345'])
+  return {'OK': True,
+          'Value': {'ParameterNames': paramNames,
+                    'Records': records,
+                    'TotalRecords': nbJobs,
+                    'Extras': {}}}
+
+
+def bestTime(func, repeat):
+  """ Best wall clock time of func out of repeat calls
+  """
+  return min(timeit.repeat(func, number=1, repeat=repeat))
+
+
+def benchmark(name, payload, repeat):
+  """ Time both engines on a payload and print the results
+  """
+  encoded = DEncode.pythonEncode(payload)
+  if DEncodeStream.encode(payload) != encoded:
+    raise RuntimeError("Engines do not produce the same encoding for %s" % name)
+  if DEncodeStream.decode(encoded) != DEncode.pythonDecode(encoded):
+    raise RuntimeError("Engines do not decode %s the same way" % name)
+
+  print "%s payload: %.1f MB encoded" % (name, len(encoded) / 1024. / 1024.)
+  for action, pyFunc, streamFunc in (('encode',
+                                      lambda: DEncode.pythonEncode(payload),
+                                      lambda: DEncodeStream.encode(payload)),
+                                     ('decode',
+                                      lambda: DEncode.pythonDecode(encoded),
+                                      lambda: DEncodeStream.decode(encoded))):
+    pyTime = bestTime(pyFunc, repeat)
+    streamTime = bestTime(streamFunc, repeat)
+    print "  %s: python %.3fs, stream %.3fs (x%.2f)" % (action, pyTime, streamTime, pyTime / streamTime)
+
+
+if __name__ == '__main__':
+  nbEntries = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+  nbRepeat = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+  benchmark('dfc', dfcPayload(nbEntries), nbRepeat)
+  benchmark('jobs', jobsPayload(nbEntries), nbRepeat)
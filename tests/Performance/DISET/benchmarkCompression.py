@@ -0,0 +1,91 @@
+#!/usr/bin/env python
+""" Measure the effect of the DISET compression on a throttled link.
+
+    Two PlainTransports are connected over the loopback interface, and the sending side
+    is throttled to a given bandwidth to emulate a WAN link between a VO box and the
+    central services. A JobMonitoring-like reply is sent with and without compression
+    (and with several compression levels), and the effective throughput is printed,
+    in MB of encoded data per second.
+
+    Usage: benchmarkCompression.py [bandwidth in MB/s] [number of jobs in the reply]
+"""
+
+import sys
+import time
+import socket
+import threading
+
+from DIRAC.Core.DISET.private.Transports.PlainTransport import PlainTransport
+
+
+class ThrottledTransport(PlainTransport):
+  """ PlainTransport whose writes do not go faster than a given bandwidth
+  """
+
+  def __init__(self, bandwidth, *args, **kwargs):
+    super(ThrottledTransport, self).__init__(*args, **kwargs)
+    self.bandwidth = bandwidth
+    self.sendStart = None
+    self.sentBytes = 0
+
+  def _write(self, buffer):
+    if self.sendStart is None:
+      self.sendStart = time.time()
+    result = super(ThrottledTransport, self)._write(buffer)
+    if result['OK']:
+      self.sentBytes += result['Value']
+      delay = self.sentBytes / self.bandwidth - (time.time() - self.sendStart)
+      if delay > 0:
+        time.sleep(delay)
+    return result
+
+
+def jobsPayload(nbJobs):
+  """ Reply of JobMonitoring.getJobPageSummaryWeb for nbJobs jobs
+  """
+  paramNames = ['JobID', 'JobName', 'Status', 'MinorStatus', 'ApplicationStatus', 'Site',
+                'Owner', 'OwnerGroup', 'SubmissionTime', 'LastUpdateTime', 'RescheduleCounter']
+  records = [[jobID, 'MCSimulation_%s' % jobID, 'Running', 'Application', 'Gauss step 1',
+              'LCG.CERN.cern', 'lhcbprod', 'lhcb_mc', '2018-01-01 00:00:00', '2018-01-01 01:00:00', 0]
+             for jobID in xrange(nbJobs)]
+  return {'OK': True, 'Value': {'ParameterNames': paramNames, 'Records': records, 'TotalRecords': nbJobs}}
+
+
+def transfer(payload, bandwidth, threshold, level):
+  """ Send the payload over a throttled loopback connection
+
+      :returns: tuple (seconds to receive the payload, send statistics of the last message)
+  """
+  listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+  listener.bind(('127.0.0.1', 0))
+  listener.listen(1)
+  sender = ThrottledTransport(bandwidth, None)
+  sender.oSocket = socket.create_connection(listener.getsockname())
+  receiver = PlainTransport(None)
+  receiver.oSocket = listener.accept()[0]
+  listener.close()
+  sender.setCompression(threshold, level)
+
+  start = time.time()
+  senderThread = threading.Thread(target=sender.sendData, args=(payload,))
+  senderThread.start()
+  result = receiver.receiveData()
+  elapsed = time.time() - start
+  senderThread.join()
+  sender.close()
+  receiver.close()
+  if not result['OK']:
+    raise RuntimeError(result['Message'])
+  return elapsed, sender.getSendStats()['LastMessage']
+
+
+if __name__ == '__main__':
+  mbPerSecond = float(sys.argv[1]) if len(sys.argv) > 1 else 10.
+  nbJobs = int(sys.argv[2]) if len(sys.argv) > 2 else 100000
+  testPayload = jobsPayload(nbJobs)
+  print "Link throttled to %.1f MB/s, reply with %s jobs" % (mbPerSecond, nbJobs)
+  for testThreshold, testLevel in ((0, 1), (1024, 1), (1024, 6), (1024, 9)):
+    seconds, stats = transfer(testPayload, mbPerSecond * 1024 * 1024, testThreshold, testLevel)
+    label = "level %s" % testLevel if testThreshold else "uncompressed"
+    print "  %-12s: %6.1f MB on the wire, %6.2fs, %6.1f MB/s of encoded data" % (
+        label, stats['Bytes'] / 1024. / 1024., seconds, stats['EncodedBytes'] / 1024. / 1024. / seconds)
@@ -0,0 +1,63 @@
+#!/usr/bin/env python
+""" Measure gMonitor.addMark as a service calls it for each request, from a number of threads
+    adding marks to the same activities at the same time.
+
+    For each number of threads, the total number of marks per second is printed,
+    together with the time taken to consolidate them as the flush does.
+
+    Usage: benchmarkAddMark.py [nbMarks per thread] [nbThreads ...]
+"""
+
+import sys
+import threading
+import time
+
+from DIRAC.FrameworkSystem.Client.MonitoringClient import MonitoringClient
+
+ACTIVITIES = ('Queries', 'Connections', 'PendingQueries', 'ActiveQueries', 'RunningThreads')
+
+
+def addMarks(client, nbMarks, start):
+  """ Add nbMarks marks to each activity, once all the threads are ready
+  """
+  start.wait()
+  for i in xrange(nbMarks):
+    for name in ACTIVITIES:
+      client.addMark(name, i % 10)
+
+
+def benchmark(nbMarks, nbThreads):
+  """ Time the marks of nbThreads threads, then their consolidation
+  """
+  client = MonitoringClient()
+  client.setComponentType(MonitoringClient.COMPONENT_SCRIPT)
+  client.initialize()
+  for name in ACTIVITIES:
+    client.registerActivity(name, name, 'Framework', 'units', MonitoringClient.OP_MEAN)
+
+  start = threading.Event()
+  threads = [threading.Thread(target=addMarks, args=(client, nbMarks, start)) for _ in xrange(nbThreads)]
+  for thread in threads:
+    thread.start()
+  startTime = time.time()
+  start.set()
+  for thread in threads:
+    thread.join()
+  markTime = time.time() - startTime
+
+  startTime = time.time()
+  client._MonitoringClient__consolidateMarks(True)  # pylint: disable=protected-access
+  consolidateTime = time.time() - startTime
+
+  total = nbMarks * nbThreads * len(ACTIVITIES)
+  print "%3d threads: %8d marks/s, consolidation of %d marks in %.1f ms" % (nbThreads, total / markTime,
+                                                                            total, consolidateTime * 1000)
+
+
+if __name__ == '__main__':
+  if '-h' in sys.argv or '--help' in sys.argv:
+    print __doc__
+    sys.exit(0)
+  nbMarks = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+  for nbThreads in [int(arg) for arg in sys.argv[2:]] or [1, 8, 64]:
+    benchmark(nbMarks, nbThreads)
@@ -0,0 +1,48 @@
+#!/usr/bin/env python
+""" Measure the latency saved per query by not pinging the connections before every statement.
+
+    A number of cheap queries is run against a MySQL server, first pinging the connection before each
+    of them (the default), then only pinging the connections idle for more than a minute
+    (PingIdleTime = 60 in the database section). The mean latency per query is printed for both.
+    The saving is one round trip to the server per query, so it is best measured against a remote server.
+
+    Usage: benchmarkPing.py <host> <user> <password> <dbName> [port] [number of queries]
+"""
+
+import sys
+import time
+
+from DIRAC.Core.Utilities.MySQL import MySQL
+
+
+def meanLatency(db, nbQueries):
+  """ Mean time of a SELECT 1, in seconds
+  """
+  # The first query opens the connection
+  db._query('SELECT 1')
+  start = time.time()
+  for _ in xrange(nbQueries):
+    result = db._query('SELECT 1')
+    if not result['OK']:
+      raise RuntimeError(result['Message'])
+  return (time.time() - start) / nbQueries
+
+
+if __name__ == '__main__':
+  if len(sys.argv) < 5:
+    print __doc__
+    sys.exit(1)
+  host, user, passwd, dbName = sys.argv[1:5]
+  port = int(sys.argv[5]) if len(sys.argv) > 5 else 3306
+  nbQueries = int(sys.argv[6]) if len(sys.argv) > 6 else 10000
+
+  testDB = MySQL(hostName=host, userName=user, passwd=passwd, dbName=dbName, port=port)
+  pingLatency = meanLatency(testDB, nbQueries)
+  # Instances on the same server share the pool of connections, and change its mode
+  testDB = MySQL(hostName=host, userName=user, passwd=passwd, dbName=dbName, port=port, pingIdleTime=60)
+  idleLatency = meanLatency(testDB, nbQueries)
+  print "%s queries on %s:%s" % (nbQueries, host, port)
+  print "  ping before every query : %8.1f us per query" % (pingLatency * 1e6)
+  print "  ping idle connections   : %8.1f us per query" % (idleLatency * 1e6)
+  print "  saved                   : %8.1f us per query (%.0f%%)" % ((pingLatency - idleLatency) * 1e6,
+                                                                   100 * (1 - idleLatency / pingLatency))
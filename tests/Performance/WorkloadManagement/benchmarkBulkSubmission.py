@@ -0,0 +1,93 @@
+#!/usr/bin/env python
+""" Compare the insertion of the jobs of a parametric submission one by one, as it used to be done
+    by the JobManager, and all at once with JobDB.insertNewJobsIntoDB.
+
+    The jobs of a parametric JDL with one input file per job are generated, then inserted in the JobDB
+    and logged in the JobLoggingDB both ways. The time of each insertion is printed, then the jobs are removed.
+    It needs the JobDB and JobLoggingDB configured like for the integration tests, and a user in the CS.
+    Through the JobManager, the number of jobs of a submission is limited by its MaxParametricJobs option.
+
+    Usage: benchmarkBulkSubmission.py <owner> <ownerDN> <ownerGroup> [nbJobs ...]
+"""
+
+import sys
+import time
+
+from DIRAC.Core.Base.Script import parseCommandLine
+parseCommandLine()
+
+# pylint: disable=wrong-import-position
+from DIRAC import gConfig
+from DIRAC.Core.Utilities.ClassAd.ClassAdLight import ClassAd
+from DIRAC.WorkloadManagementSystem.DB.JobDB import JobDB
+from DIRAC.WorkloadManagementSystem.DB.JobLoggingDB import JobLoggingDB
+from DIRAC.WorkloadManagementSystem.Utilities.ParametricJob import generateParametricJobs
+
+PARAMETRIC_JDL = """[
+  JobName = "benchmark_%%n";
+  Executable = "dirac-jobexec";
+  Arguments = "jobDescription.xml -o LogLevel=info -p Run=%%s";
+  OutputSandbox = { "std.out", "std.err" };
+  InputData = { "/vo/benchmark/%%s.dst" };
+  CPUTime = 3600;
+  Parameters = %d;
+  ParameterStart = 1000;
+  ParameterStep = 1;
+]"""
+
+
+def oneByOne(jobDB, jobLoggingDB, jdlList, owner, ownerDN, ownerGroup, setup):
+  """ The previous loop of JobManagerHandler.export_submitJob
+  """
+  jobIDList = []
+  for jdl in jdlList:
+    result = jobDB.insertNewJobIntoDB(jdl, owner, ownerDN, ownerGroup, setup,
+                                      initialStatus='Submitting', initialMinorStatus='Bulk transaction confirmation')
+    if not result['OK']:
+      raise RuntimeError(result['Message'])
+    jobLoggingDB.addLoggingRecord(result['JobID'], result['Status'], result['MinorStatus'], source='JobManager')
+    jobIDList.append(result['JobID'])
+  return jobIDList
+
+
+def bulk(jobDB, jobLoggingDB, jdlList, owner, ownerDN, ownerGroup, setup):
+  """ The bulk insertion of JobManagerHandler.export_submitJob
+  """
+  result = jobDB.insertNewJobsIntoDB(jdlList, owner, ownerDN, ownerGroup, setup,
+                                     initialStatus='Submitting', initialMinorStatus='Bulk transaction confirmation')
+  if not result['OK']:
+    raise RuntimeError(result['Message'])
+  jobLoggingDB.addLoggingRecords(result['Value'], 'Submitting', 'Bulk transaction confirmation', source='JobManager')
+  return result['Value']
+
+
+def benchmark(nbJobs, owner, ownerDN, ownerGroup):
+  """ Time both insertions of the same parametric job, and remove the jobs
+  """
+  result = generateParametricJobs(ClassAd(PARAMETRIC_JDL % nbJobs))
+  if not result['OK']:
+    raise RuntimeError(result['Message'])
+  jdlList = result['Value']
+  setup = gConfig.getValue('/DIRAC/Setup', '')
+  jobDB = JobDB()
+  jobLoggingDB = JobLoggingDB()
+
+  times = []
+  for insert in (oneByOne, bulk):
+    startTime = time.time()
+    jobIDList = insert(jobDB, jobLoggingDB, jdlList, owner, ownerDN, ownerGroup, setup)
+    times.append(time.time() - startTime)
+    assert len(jobIDList) == nbJobs
+    jobDB.removeJobFromDB(jobIDList)
+    jobLoggingDB.deleteJob([str(jobID) for jobID in jobIDList])
+
+  print "%6d jobs: one by one %7.2f s, bulk %7.2f s (x%.1f)" % (nbJobs, times[0], times[1], times[0] / times[1])
+
+
+if __name__ == '__main__':
+  args = [arg for arg in sys.argv[1:] if not arg.startswith('-')]
+  if '-h' in sys.argv or '--help' in sys.argv or len(args) < 3:
+    print __doc__
+    sys.exit(0)
+  for nJobs in [int(arg) for arg in args[3:]] or [100, 1000, 10000]:
+    benchmark(nJobs, *args[:3])